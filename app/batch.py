@@ -0,0 +1,260 @@
+"""
+Offline batch inference over a JSONL file, reusing LLMService directly.
+
+Each input line is a JSON object with a "prompt" (or "message") and an
+optional "id"; the id defaults to the line number. Prompts are streamed from
+the file and run by a fixed pool of workers. Results are appended to the
+output file as they complete, one JSON line per item.
+
+The output file is the checkpoint: rerunning the same command after a crash
+skips every id that already has a successful result and retries the rest.
+
+The semantic cache is bypassed so every answer comes from the model; with
+`--use-cache` cached answers are allowed and counted as `cached`.
+
+Usage:
+    python -m app.batch prompts.jsonl results.jsonl --concurrency 8
+    LLM_MODEL_PROVIDER=sim python -m app.batch prompts.jsonl results.jsonl
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+from typing import AsyncIterator, Dict, Iterator, Optional, Set, TextIO, Tuple
+
+from .llm_service import LLMService
+
+logger = logging.getLogger(__name__)
+
+
+def read_checkpoint(path: str) -> Set[str]:
+    """
+    Ids with a successful result in an existing output file. A torn trailing
+    line left by a crash is truncated so appends start on a clean line.
+    """
+    if not os.path.exists(path):
+        return set()
+    status: Dict[str, bool] = {}
+    with open(path, "rb+") as f:
+        offset = 0
+        for raw in f:
+            if not raw.endswith(b"\n"):
+                f.truncate(offset)
+                logger.warning(f"Truncated incomplete trailing line in {path}")
+                break
+            offset += len(raw)
+            try:
+                record = json.loads(raw)
+            except ValueError:
+                continue
+            # The last record for an id wins, so a later success clears an earlier failure
+            status[str(record.get("id"))] = "error" not in record
+    return {item_id for item_id, ok in status.items() if ok}
+
+
+def _read_items(path: str) -> Iterator[Tuple[int, Optional[str], Optional[str]]]:
+    """(line number, id, prompt) per non-blank line; id and prompt are None for lines without a prompt"""
+    with open(path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                item = json.loads(line)
+                prompt = item.get("prompt") or item.get("message")
+            except (ValueError, AttributeError):
+                prompt = None
+            if not prompt:
+                yield line_number, None, None
+                continue
+            yield line_number, str(item.get("id", line_number)), prompt
+
+
+def count_items(path: str, skip: Set[str]) -> int:
+    """Number of items iter_items() will yield for the same `skip`"""
+    return sum(1 for _, item_id, prompt in _read_items(path) if prompt and item_id not in skip)
+
+
+async def iter_items(path: str, skip: Set[str]) -> AsyncIterator[Tuple[str, str]]:
+    """Yield (id, prompt) pairs lazily, skipping completed ids and bad lines"""
+    for line_number, item_id, prompt in _read_items(path):
+        if not prompt:
+            logger.warning(f"Skipping line {line_number}: no prompt")
+        elif item_id not in skip:
+            yield item_id, prompt
+
+
+class Progress:
+    """Throughput and ETA for the current run, printed to stderr"""
+
+    def __init__(self, total: int, interval: float, stream: TextIO = None):
+        self.total = total
+        self.interval = interval
+        self.stream = stream or sys.stderr
+        self.started = time.monotonic()
+        self.done = 0
+        self.failed = 0
+        self.cached = 0
+        self._last_report = self.started
+
+    def record(self, ok: bool, cached: bool = False):
+        self.done += 1
+        if not ok:
+            self.failed += 1
+        if cached:
+            self.cached += 1
+        now = time.monotonic()
+        if self.interval and now - self._last_report >= self.interval:
+            self._last_report = now
+            self.report()
+
+    @property
+    def rate(self) -> float:
+        elapsed = time.monotonic() - self.started
+        return self.done / elapsed if elapsed > 0 else 0.0
+
+    @property
+    def eta_seconds(self) -> Optional[float]:
+        rate = self.rate
+        return (self.total - self.done) / rate if rate else None
+
+    def report(self):
+        eta = self.eta_seconds
+        print(f"[batch] {self.done}/{self.total} done, {self.failed} failed, {self.rate:.2f} items/s, "
+              f"ETA {'-' if eta is None else f'{eta:.0f}s'}", file=self.stream, flush=True)
+
+    def summary(self) -> dict:
+        return {
+            "processed": self.done,
+            "failed": self.failed,
+            "cached": self.cached,
+            "elapsed_seconds": round(time.monotonic() - self.started, 3),
+            "items_per_second": round(self.rate, 3)
+        }
+
+
+class BatchRunner:
+    """Runs prompts through an LLMService with bounded concurrency, appending results to a JSONL file"""
+
+    def __init__(self, llm_service: LLMService, concurrency: int = 4, retries: int = 2,
+                 retry_backoff: float = 1.0, fsync_every: int = 50, progress_interval: float = 5.0):
+        self.llm_service = llm_service
+        self.concurrency = concurrency
+        self.retries = retries
+        self.retry_backoff = retry_backoff
+        self.fsync_every = fsync_every
+        self.progress_interval = progress_interval
+        self._unsynced = 0
+
+    async def _run_item(self, item_id: str, prompt: str) -> dict:
+        conversation_id = f"batch-{item_id}"
+        start = time.perf_counter()
+        for attempt in range(self.retries + 1):
+            if attempt:
+                await asyncio.sleep(self.retry_backoff * 2 ** (attempt - 1))
+            metadata = {}
+            try:
+                response = await self.llm_service.process_message(prompt, conversation_id,
+                                                                   priority="batch", metadata=metadata)
+                error = metadata.get("error")
+            except Exception as e:  # e.g. OverloadedError
+                response, error = None, str(e)
+            finally:
+                # Items are independent; don't let history accumulate across the run
+                self.llm_service.release_conversation(conversation_id)
+            if error is None:
+                break
+        record = {"id": item_id, "attempts": attempt + 1,
+                  "duration_ms": round((time.perf_counter() - start) * 1000, 1)}
+        if error is None:
+            record["response"] = response
+            usage = self.llm_service.telemetry.get_conversation_usage(conversation_id)
+            if usage:
+                record["usage"] = usage
+            if "cache" in metadata:
+                record["cache"] = metadata["cache"]
+        else:
+            record["error"] = error
+        return record
+
+    def _write(self, out: TextIO, record: dict):
+        out.write(json.dumps(record) + "\n")
+        out.flush()
+        self._unsynced += 1
+        if self._unsynced >= self.fsync_every:
+            os.fsync(out.fileno())
+            self._unsynced = 0
+
+    async def run(self, input_path: str, output_path: str) -> dict:
+        completed = read_checkpoint(output_path)
+        total = count_items(input_path, completed)
+        if completed:
+            logger.info(f"Resuming: {len(completed)} item(s) already done")
+        progress = Progress(total, self.progress_interval)
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.concurrency * 2)
+
+        with open(output_path, "a", encoding="utf-8") as out:
+            async def worker():
+                while True:
+                    item = await queue.get()
+                    if item is None:
+                        return
+                    record = await self._run_item(*item)
+                    self._write(out, record)
+                    progress.record("error" not in record, cached="cache" in record)
+
+            workers = [asyncio.create_task(worker()) for _ in range(self.concurrency)]
+            try:
+                async for item in iter_items(input_path, completed):
+                    await queue.put(item)
+                for _ in workers:
+                    await queue.put(None)
+                await asyncio.gather(*workers)
+            finally:
+                for task in workers:
+                    task.cancel()
+                out.flush()
+                os.fsync(out.fileno())
+
+        if self.progress_interval:
+            progress.report()
+        return {**progress.summary(), "skipped": len(completed)}
+
+
+async def run_batch(input_path: str, output_path: str, use_cache: bool = False, **kwargs) -> dict:
+    llm_service = LLMService()
+    await llm_service.initialize()
+    # The batch pool is the only client; bound concurrency here instead of shedding
+    llm_service.limiter.enabled = False
+    if not use_cache:
+        # An evaluation run needs each prompt's own answer, not one cached for a similar item
+        llm_service.semantic_cache = None
+    try:
+        return await BatchRunner(llm_service, **kwargs).run(input_path, output_path)
+    finally:
+        await llm_service.cleanup()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Run prompts from a JSONL file through the LLM service")
+    parser.add_argument("input", help="JSONL file with one {\"id\", \"prompt\"} object per line")
+    parser.add_argument("output", help="JSONL results file; also the resume checkpoint")
+    parser.add_argument("--concurrency", type=int, default=int(os.getenv("BATCH_CONCURRENCY", "4")))
+    parser.add_argument("--retries", type=int, default=2, help="Retries per failed item")
+    parser.add_argument("--progress-interval", type=float, default=5.0, help="Seconds between progress lines")
+    parser.add_argument("--use-cache", action="store_true",
+                        help="Allow answers from the semantic cache (counted as cached in the summary)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=os.getenv("LOG_LEVEL", "WARNING"))
+    summary = asyncio.run(run_batch(args.input, args.output, concurrency=args.concurrency,
+                                    retries=args.retries, progress_interval=args.progress_interval,
+                                    use_cache=args.use_cache))
+    print(json.dumps(summary))
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,255 @@
+"""
+Response compression with bounded CPU cost.
+
+REST: `CompressionMiddleware` negotiates brotli (when the `brotli` package is
+installed) or gzip from Accept-Encoding. It compresses only complete,
+compressible bodies between COMPRESSION_MIN_BYTES and COMPRESSION_MAX_BYTES.
+Streaming responses (SSE token deltas) pass through untouched, so
+compression never delays a token.
+
+WebSocket: `python -m app.serve` runs uvicorn with `CompressedWebSocketProtocol`
+(uvicorn's `--ws` flag only accepts its built-in names) to negotiate
+permessage-deflate at WS_COMPRESSION_LEVEL. Messages smaller
+than WS_COMPRESSION_MIN_BYTES (e.g. token frames) are sent uncompressed.
+
+Bytes saved and compression CPU time are tracked per route.
+"""
+import gzip
+import logging
+import os
+import time
+from typing import Dict, Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from uvicorn.protocols.websockets.websockets_impl import WebSocketProtocol
+from websockets.extensions.permessage_deflate import PerMessageDeflate, ServerPerMessageDeflateFactory
+from websockets.frames import CTRL_OPCODES, OP_CONT
+
+try:
+    import brotli
+except ImportError:  # Optional: gzip only
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+COMPRESSIBLE_TYPES = ("text/", "application/json", "application/javascript", "application/xml", "image/svg+xml")
+
+WS_ROUTE = "/ws/{client_id}"
+
+
+class CompressionStats:
+    """Per-route compression counters"""
+
+    def __init__(self):
+        self.routes: Dict[str, dict] = {}
+
+    def _route(self, route: str) -> dict:
+        stats = self.routes.get(route)
+        if stats is None:
+            stats = self.routes[route] = {
+                "compressed": 0, "bytes_in": 0, "bytes_out": 0, "cpu_seconds": 0.0, "skipped": {}
+            }
+        return stats
+
+    def record(self, route: str, bytes_in: int, bytes_out: int, cpu_seconds: float):
+        stats = self._route(route)
+        stats["compressed"] += 1
+        stats["bytes_in"] += bytes_in
+        stats["bytes_out"] += bytes_out
+        stats["cpu_seconds"] += cpu_seconds
+
+    def skip(self, route: str, reason: str):
+        skipped = self._route(route)["skipped"]
+        skipped[reason] = skipped.get(reason, 0) + 1
+
+    def get_stats(self) -> dict:
+        routes = {}
+        for route, stats in sorted(self.routes.items()):
+            kb_in = stats["bytes_in"] / 1024
+            routes[route] = {
+                "compressed": stats["compressed"],
+                "bytes_in": stats["bytes_in"],
+                "bytes_out": stats["bytes_out"],
+                "bytes_saved": stats["bytes_in"] - stats["bytes_out"],
+                "ratio": round(stats["bytes_out"] / stats["bytes_in"], 3) if stats["bytes_in"] else None,
+                "cpu_ms": round(stats["cpu_seconds"] * 1000, 2),
+                "cpu_us_per_kb": round(stats["cpu_seconds"] * 1e6 / kb_in, 1) if kb_in else None,
+                "skipped": dict(stats["skipped"])
+            }
+        return {
+            "encodings": ["br", "gzip"] if brotli is not None else ["gzip"],
+            "bytes_saved": sum(route["bytes_saved"] for route in routes.values()),
+            "routes": routes
+        }
+
+
+compression_stats = CompressionStats()
+
+
+def parse_accept_encoding(value: str) -> Dict[str, float]:
+    """Map each listed coding to its q-value"""
+    codings = {}
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        name, _, params = item.partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        codings[name.strip().lower()] = q
+    return codings
+
+
+class CompressionMiddleware:
+    """Compress complete REST responses; see module docstring"""
+
+    def __init__(self, app, min_size: int = None, max_size: int = None, gzip_level: int = None,
+                 brotli_quality: int = None, stats: CompressionStats = None):
+        self.app = app
+        self.enabled = os.getenv("COMPRESSION_ENABLED", "true").lower() == "true"
+        self.min_size = min_size if min_size is not None else int(os.getenv("COMPRESSION_MIN_BYTES", "1024"))
+        self.max_size = max_size if max_size is not None else int(os.getenv("COMPRESSION_MAX_BYTES", str(4 * 1024 * 1024)))
+        self.gzip_level = gzip_level or int(os.getenv("COMPRESSION_GZIP_LEVEL", "5"))
+        self.brotli_quality = brotli_quality or int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
+        self.stats = stats or compression_stats
+        self._route_names: Dict[object, str] = {}
+
+    def _negotiate(self, headers: Headers) -> Optional[str]:
+        codings = parse_accept_encoding(headers.get("accept-encoding", ""))
+        if brotli is not None and codings.get("br", 0) > 0:
+            return "br"
+        if codings.get("gzip", codings.get("*", 0)) > 0:
+            return "gzip"
+        return None
+
+    def _route_name(self, scope) -> str:
+        # The router stores the matched endpoint in the scope; map it back to its path template
+        endpoint = scope.get("endpoint")
+        name = self._route_names.get(endpoint)
+        if name is None:
+            router = scope.get("router")
+            for route in getattr(router, "routes", []):
+                if getattr(route, "endpoint", None) is endpoint:
+                    name = route.path
+                    break
+            else:
+                return "unmatched"
+            self._route_names[endpoint] = name
+        return name
+
+    def _skip_reason(self, headers: MutableHeaders, body: bytes, more_body: bool) -> Optional[str]:
+        if more_body:
+            return "streaming"
+        if "content-encoding" in headers:
+            return "already_encoded"
+        if not headers.get("content-type", "").startswith(COMPRESSIBLE_TYPES):
+            return "content_type"
+        if len(body) < self.min_size:
+            return "too_small"
+        if len(body) > self.max_size:
+            return "too_large"
+        return None
+
+    def _compress(self, body: bytes, encoding: str) -> bytes:
+        if encoding == "br":
+            return brotli.compress(body, quality=self.brotli_quality)
+        return gzip.compress(body, compresslevel=self.gzip_level, mtime=0)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        encoding = self._negotiate(Headers(scope=scope))
+        start_message = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start_message, passthrough
+            if passthrough:
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+
+            route = self._route_name(scope)
+            body = message.get("body", b"")
+            headers = MutableHeaders(raw=start_message["headers"])
+            reason = "not_accepted" if encoding is None else self._skip_reason(headers, body, message.get("more_body", False))
+            if reason:
+                self.stats.skip(route, reason)
+                passthrough = True
+                await send(start_message)
+                await send(message)
+                return
+
+            cpu_start = time.thread_time()
+            compressed = self._compress(body, encoding)
+            self.stats.record(route, len(body), len(compressed), time.thread_time() - cpu_start)
+            headers["Content-Encoding"] = encoding
+            headers["Content-Length"] = str(len(compressed))
+            headers.add_vary_header("Accept-Encoding")
+            passthrough = True
+            await send(start_message)
+            await send({"type": "http.response.body", "body": compressed})
+
+        await self.app(scope, receive, send_wrapper)
+
+
+class ThresholdPerMessageDeflate(PerMessageDeflate):
+    """permessage-deflate that sends small messages uncompressed (RSV1 unset)"""
+
+    def __init__(self, *args, min_size: int = 256, stats: CompressionStats = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.min_size = min_size
+        self.stats = stats or compression_stats
+        self._compressing = False
+
+    def encode(self, frame):
+        if frame.opcode in CTRL_OPCODES:
+            return frame
+        if frame.opcode is not OP_CONT:
+            # Decide per message; continuation frames follow the first frame's choice
+            self._compressing = not (frame.fin and len(frame.data) < self.min_size)
+            if not self._compressing:
+                self.stats.skip(WS_ROUTE, "too_small")
+        if not self._compressing:
+            return frame
+        cpu_start = time.thread_time()
+        encoded = super().encode(frame)
+        self.stats.record(WS_ROUTE, len(frame.data), len(encoded.data), time.thread_time() - cpu_start)
+        return encoded
+
+
+class ThresholdDeflateFactory(ServerPerMessageDeflateFactory):
+    """Negotiates permessage-deflate like the default factory, with ThresholdPerMessageDeflate"""
+
+    def __init__(self, min_size: int, **kwargs):
+        super().__init__(**kwargs)
+        self.min_size = min_size
+
+    def process_request_params(self, params, accepted_extensions):
+        response_params, extension = super().process_request_params(params, accepted_extensions)
+        return response_params, ThresholdPerMessageDeflate(
+            extension.remote_no_context_takeover,
+            extension.local_no_context_takeover,
+            extension.remote_max_window_bits,
+            extension.local_max_window_bits,
+            extension.compress_settings,
+            min_size=self.min_size
+        )
+
+
+class CompressedWebSocketProtocol(WebSocketProtocol):
+    """uvicorn's websockets protocol with CPU-bounded permessage-deflate"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if self.config.ws_per_message_deflate:
+            self.available_extensions = [ThresholdDeflateFactory(
+                min_size=int(os.getenv("WS_COMPRESSION_MIN_BYTES", "256")),
+                compress_settings={"level": int(os.getenv("WS_COMPRESSION_LEVEL", "5")), "memLevel": 5}
+            )]
@@ -0,0 +1,209 @@
+import math
+import time
+import logging
+from contextlib import asynccontextmanager
+from typing import Callable, Dict, List
+
+logger = logging.getLogger(__name__)
+
+
+class OverloadedError(Exception):
+    """Raised when a request is shed because the concurrency limit is reached"""
+
+    def __init__(self, priority: str, limit: int, retry_after: float = 1.0):
+        super().__init__(f"Server overloaded: concurrency limit {limit} reached for {priority} traffic")
+        self.priority = priority
+        self.limit = limit
+        self.retry_after = retry_after
+
+
+class DrainingError(OverloadedError):
+    """Raised when the replica is draining and no longer admits generations"""
+
+    def __init__(self, priority: str, retry_after: float = 1.0):
+        Exception.__init__(self, "Server is shutting down; retry on another replica")
+        self.priority = priority
+        self.limit = 0
+        self.retry_after = retry_after
+
+
+class LimiterSlot:
+    """Handle for an acquired slot; mark `dropped` when the request failed upstream"""
+
+    def __init__(self, priority: str):
+        self.priority = priority
+        self.dropped = False
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    Gradient-based adaptive concurrency limit (after Netflix concurrency-limits' Gradient2).
+
+    A long-term latency average approximates the no-load baseline and a short-term
+    average tracks current latency. While they stay close (within `tolerance`) the
+    limit grows by ~sqrt(limit) per sample; when queueing inflates short-term latency
+    the limit shrinks proportionally. Requests over the limit are rejected at once.
+
+    Lower-priority traffic may only use part of the limit, so it is shed first:
+    interactive (WebSocket) can use all of it, standard (REST) 90%, batch 50%
+    and shadow (mirrored candidate-model) calls 30%. Shadow sheds don't count
+    towards the shed rate, which drives autoscaling.
+    """
+
+    PRIORITY_SHARES = {
+        "interactive": 1.0,
+        "standard": 0.9,
+        "batch": 0.5,
+        "shadow": 0.3
+    }
+
+    def __init__(self, initial_limit: int = 4, min_limit: int = 1, max_limit: int = 50,
+                 tolerance: float = 1.5, smoothing: float = 0.2, short_window: int = 10,
+                 long_window: int = 200, enabled: bool = True):
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.tolerance = tolerance
+        self.smoothing = smoothing
+        self.enabled = enabled
+        self._short_alpha = 2.0 / (short_window + 1)
+        self._long_alpha = 2.0 / (long_window + 1)
+
+        self.short_rtt = 0.0
+        self.long_rtt = 0.0
+        self.inflight = 0
+        self.admitting = True
+        self.accepted: Dict[str, int] = {priority: 0 for priority in self.PRIORITY_SHARES}
+        self.shed: Dict[str, int] = {priority: 0 for priority in self.PRIORITY_SHARES}
+        # Sheds per second over the last minute, in a fixed ring (memory stays flat under overload)
+        self.shed_window_seconds = 60
+        self._shed_counts = [0] * self.shed_window_seconds
+        self._shed_seconds = [0] * self.shed_window_seconds  # which second each slot counts
+        self._listeners: List[Callable[[], None]] = []
+
+    @property
+    def current_limit(self) -> int:
+        return int(self.limit)
+
+    def try_acquire(self, priority: str = "standard") -> bool:
+        """Take a slot for `priority` traffic if the limit allows"""
+        share = self.PRIORITY_SHARES.get(priority, self.PRIORITY_SHARES["standard"])
+        if self.enabled and self.inflight >= max(1.0, self.limit * share):
+            self.shed[priority] = self.shed.get(priority, 0) + 1
+            if priority != "shadow":
+                self._record_shed()
+                self._notify()
+            return False
+        self.inflight += 1
+        self.accepted[priority] = self.accepted.get(priority, 0) + 1
+        if priority != "shadow":
+            self._notify()
+        return True
+
+    def add_listener(self, callback: Callable[[], None]):
+        """Call `callback()` whenever non-shadow traffic is admitted or shed, and on stop_admitting()"""
+        self._listeners.append(callback)
+
+    def _notify(self):
+        for callback in self._listeners:
+            callback()
+
+    def release(self, rtt: float = None, dropped: bool = False):
+        """Return a slot and feed its outcome into the limit"""
+        inflight = self.inflight
+        self.inflight = max(0, self.inflight - 1)
+        if dropped:
+            self._on_dropped()
+        elif rtt is not None:
+            self._on_sample(rtt, inflight)
+
+    @asynccontextmanager
+    async def acquire(self, priority: str = "standard"):
+        """Hold a slot for the duration of the block or raise OverloadedError"""
+        if not self.admitting:
+            raise DrainingError(priority)
+        if not self.try_acquire(priority):
+            raise OverloadedError(priority, self.current_limit, retry_after=self._retry_after())
+        slot = LimiterSlot(priority)
+        start = time.perf_counter()
+        try:
+            yield slot
+        except Exception:
+            self.release(dropped=True)
+            raise
+        except BaseException:
+            # Cancelled (client went away): no signal about server latency
+            self.release()
+            raise
+        else:
+            if slot.dropped:
+                self.release(dropped=True)
+            else:
+                self.release(rtt=time.perf_counter() - start)
+
+    def stop_admitting(self):
+        """Reject all new acquisitions with DrainingError; held slots are unaffected"""
+        self.admitting = False
+        # Lets discardable holders (shadow calls) give their slots back instead of delaying a drain
+        self._notify()
+
+    def _on_sample(self, rtt: float, inflight: int):
+        if self.long_rtt == 0.0:
+            self.short_rtt = self.long_rtt = rtt
+            return
+        self.short_rtt += self._short_alpha * (rtt - self.short_rtt)
+        self.long_rtt += self._long_alpha * (rtt - self.long_rtt)
+
+        # Let the baseline recover quickly after a sustained latency drop
+        if self.long_rtt / self.short_rtt > 2.0:
+            self.long_rtt *= 0.95
+
+        # Don't grow while the limit isn't the bottleneck
+        if inflight < self.limit / 2:
+            return
+
+        gradient = max(0.5, min(1.0, self.tolerance * self.long_rtt / self.short_rtt))
+        new_limit = self.limit * gradient + math.sqrt(self.limit)
+        new_limit = self.limit * (1 - self.smoothing) + new_limit * self.smoothing
+        self._set_limit(new_limit)
+
+    def _on_dropped(self):
+        self._set_limit(self.limit * 0.9)
+
+    def _set_limit(self, value: float):
+        old = self.current_limit
+        self.limit = max(float(self.min_limit), min(float(self.max_limit), value))
+        if self.current_limit != old:
+            logger.debug(f"Concurrency limit {old} -> {self.current_limit}")
+
+    def _retry_after(self) -> float:
+        # Roughly one request's worth of latency; at least a second
+        return max(1.0, round(self.short_rtt, 1))
+
+    def _record_shed(self):
+        second = int(time.monotonic())
+        slot = second % self.shed_window_seconds
+        if self._shed_seconds[slot] != second:
+            self._shed_seconds[slot] = second
+            self._shed_counts[slot] = 0
+        self._shed_counts[slot] += 1
+
+    def get_shed_rate(self) -> float:
+        """Shed requests per second over the last window"""
+        oldest = int(time.monotonic()) - self.shed_window_seconds
+        shed = sum(count for second, count in zip(self._shed_seconds, self._shed_counts) if second > oldest)
+        return shed / self.shed_window_seconds
+
+    def get_stats(self) -> dict:
+        """Limiter state for /metrics and /stats"""
+        return {
+            "enabled": self.enabled,
+            "admitting": self.admitting,
+            "limit": self.current_limit,
+            "inflight": self.inflight,
+            "short_rtt_ms": round(self.short_rtt * 1000, 1),
+            "baseline_rtt_ms": round(self.long_rtt * 1000, 1),
+            "accepted": dict(self.accepted),
+            "shed": dict(self.shed),
+            "shed_rate_per_s": round(self.get_shed_rate(), 3)
+        }
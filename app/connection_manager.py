@@ -4,8 +4,10 @@ from typing import Dict, List
 import asyncio
 import json
 from datetime import datetime
+import structlog
 
 logger = logging.getLogger(__name__)
+log = structlog.get_logger(__name__)
 
 class ConnectionManager:
     """Manages WebSocket connections for the chatbot"""
@@ -29,7 +31,7 @@ class ConnectionManager:
         }
         self.total_connections_served += 1
         
-        logger.info(f"Client {client_id} connected. Total active: {len(self.active_connections)}")
+        log.info("ws_connected", client_id=client_id, active=len(self.active_connections))
         
         # Send welcome message
         welcome_message = {
@@ -47,7 +49,7 @@ class ConnectionManager:
         if client_id in self.connection_metadata:
             del self.connection_metadata[client_id]
         
-        logger.info(f"Client {client_id} disconnected. Total active: {len(self.active_connections)}")
+        log.info("ws_disconnected", client_id=client_id, active=len(self.active_connections))
     
     async def send_personal_message(self, message: str, client_id: str):
         """Send a message to a specific client"""
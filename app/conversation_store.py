@@ -0,0 +1,227 @@
+import asyncio
+import json
+import logging
+import mmap
+import os
+import time
+from collections import deque
+from typing import Dict, List, Optional
+
+from .stats import percentile
+
+logger = logging.getLogger(__name__)
+
+
+class ConversationJournal:
+    """
+    Durable conversation history: an append-only journal plus compacted snapshots.
+
+    Turns are recorded in memory on the request path and written to
+    `journal.jsonl` by a background task in batches (off the event loop).
+    Every `snapshot_interval` seconds, or once the journal passes
+    `max_journal_bytes`, the full history is written to `snapshot.jsonl`
+    (one conversation per line) and the journal is truncated. Each entry
+    carries a sequence number so replay applies only journal entries newer
+    than the snapshot. Dropped conversations are journaled as delete records.
+    """
+
+    SNAPSHOT_FILE = "snapshot.jsonl"
+    JOURNAL_FILE = "journal.jsonl"
+
+    def __init__(self, directory: str, flush_interval: float = None, snapshot_interval: float = None,
+                 max_journal_bytes: int = None):
+        self.directory = directory
+        self.flush_interval = flush_interval or float(os.getenv("CONVERSATION_FLUSH_INTERVAL", "0.2"))
+        self.snapshot_interval = snapshot_interval or float(os.getenv("CONVERSATION_SNAPSHOT_INTERVAL", "60"))
+        self.max_journal_bytes = max_journal_bytes or int(os.getenv("CONVERSATION_JOURNAL_MAX_BYTES", str(8 * 1024 * 1024)))
+        self.snapshot_path = os.path.join(directory, self.SNAPSHOT_FILE)
+        self.journal_path = os.path.join(directory, self.JOURNAL_FILE)
+
+        self.seq = 0
+        self._pending: List[dict] = []
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._conversations: Optional[Dict[str, list]] = None
+        self._last_snapshot = time.monotonic()
+        self._journal_bytes = 0
+
+        # Measurements
+        self.flush_latencies_ms = deque(maxlen=500)
+        self.entries_written = 0
+        self.snapshots_written = 0
+        self.last_snapshot_ms = None
+        self.last_snapshot_bytes = 0
+        self.restore_ms = None
+        self.restored_conversations = 0
+        self.restored_messages = 0
+        self.write_errors = 0
+
+    def restore(self) -> Dict[str, list]:
+        """Load the snapshot (memory-mapped) and replay the journal tail"""
+        start = time.perf_counter()
+        os.makedirs(self.directory, exist_ok=True)
+        conversations: Dict[str, list] = {}
+        snapshot_seq = 0
+
+        if os.path.exists(self.snapshot_path) and os.path.getsize(self.snapshot_path) > 0:
+            with open(self.snapshot_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                header = json.loads(mm.readline())
+                snapshot_seq = header["seq"]
+                for line in iter(mm.readline, b""):
+                    item = json.loads(line)
+                    conversations[item["id"]] = item["messages"]
+
+        self.seq = snapshot_seq
+        if os.path.exists(self.journal_path):
+            with open(self.journal_path, "rb") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # Torn write at the tail from a crash; everything before it is intact
+                        logger.warning("Ignoring truncated conversation journal entry")
+                        break
+                    if entry["seq"] <= snapshot_seq:
+                        continue
+                    if entry.get("deleted"):
+                        conversations.pop(entry["id"], None)
+                    else:
+                        conversations.setdefault(entry["id"], []).append(entry["message"])
+                    self.seq = entry["seq"]
+            self._journal_bytes = os.path.getsize(self.journal_path)
+
+        self.restore_ms = (time.perf_counter() - start) * 1000
+        self.restored_conversations = len(conversations)
+        self.restored_messages = sum(len(messages) for messages in conversations.values())
+        logger.info(f"Restored {self.restored_conversations} conversations "
+                    f"({self.restored_messages} messages) in {self.restore_ms:.1f}ms")
+        return conversations
+
+    async def start(self, conversations: Dict[str, list]):
+        """Start background flushing for the (restored) conversations dict"""
+        self._conversations = conversations
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    def record(self, conversation_id: str, message: dict):
+        """Queue one appended turn; cheap enough for the request path"""
+        self.seq += 1
+        self._pending.append({"seq": self.seq, "id": conversation_id, "message": message})
+
+    def record_delete(self, conversation_id: str):
+        """Queue removal of a conversation so a restart doesn't bring it back"""
+        self.seq += 1
+        self._pending.append({"seq": self.seq, "id": conversation_id, "deleted": True})
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+                if self._snapshot_due():
+                    await self.snapshot()
+            except OSError as e:
+                self.write_errors += 1
+                logger.error(f"Conversation journal write failed: {e}")
+
+    def _snapshot_due(self) -> bool:
+        if self._journal_bytes == 0:
+            return False
+        return (self._journal_bytes >= self.max_journal_bytes or
+                time.monotonic() - self._last_snapshot >= self.snapshot_interval)
+
+    async def flush(self):
+        """Append pending entries to the journal"""
+        async with self._lock:
+            if not self._pending:
+                return
+            batch, self._pending = self._pending, []
+            start = time.perf_counter()
+            try:
+                size = await asyncio.to_thread(self._append, batch)
+            except OSError:
+                # Keep the entries for the next attempt
+                self._pending = batch + self._pending
+                raise
+            self.flush_latencies_ms.append((time.perf_counter() - start) * 1000)
+            self.entries_written += len(batch)
+            self._journal_bytes += size
+
+    def _append(self, batch: List[dict]) -> int:
+        data = "".join(json.dumps(entry, separators=(",", ":")) + "\n" for entry in batch).encode()
+        with open(self.journal_path, "ab") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        return len(data)
+
+    async def snapshot(self):
+        """Write a compacted snapshot of all conversations and truncate the journal"""
+        if self._conversations is None:
+            return
+        async with self._lock:
+            # Pending entries are all covered by the copy taken at the same sequence number;
+            # messages are never mutated once appended, so shallow copies suffice
+            pending, self._pending = self._pending, []
+            seq = self.seq
+            items = [(conversation_id, list(messages)) for conversation_id, messages in self._conversations.items()]
+            start = time.perf_counter()
+            try:
+                size = await asyncio.to_thread(self._write_snapshot, seq, items)
+            except OSError:
+                self._pending = pending + self._pending
+                raise
+            self.last_snapshot_ms = (time.perf_counter() - start) * 1000
+            self.last_snapshot_bytes = size
+            self.snapshots_written += 1
+            self._journal_bytes = 0
+            self._last_snapshot = time.monotonic()
+
+    def _write_snapshot(self, seq: int, items: list) -> int:
+        lines = [json.dumps({"seq": seq})]
+        lines.extend(
+            json.dumps({"id": conversation_id, "messages": messages}, separators=(",", ":"))
+            for conversation_id, messages in items
+        )
+        data = ("\n".join(lines) + "\n").encode()
+        tmp_path = self.snapshot_path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.snapshot_path)
+        # Entries up to the snapshot's sequence number are now redundant
+        with open(self.journal_path, "wb"):
+            pass
+        return len(data)
+
+    async def close(self):
+        """Stop the background task and persist everything"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        try:
+            await self.snapshot()
+        except OSError as e:
+            logger.error(f"Final conversation snapshot failed: {e}")
+
+    def get_stats(self) -> dict:
+        return {
+            "directory": self.directory,
+            "restore_ms": round(self.restore_ms, 2) if self.restore_ms is not None else None,
+            "restored_conversations": self.restored_conversations,
+            "restored_messages": self.restored_messages,
+            "pending_entries": len(self._pending),
+            "entries_written": self.entries_written,
+            "journal_bytes": self._journal_bytes,
+            "journal_flush_ms_p50": percentile(self.flush_latencies_ms, 50, 3),
+            "journal_flush_ms_p99": percentile(self.flush_latencies_ms, 99, 3),
+            "snapshots_written": self.snapshots_written,
+            "last_snapshot_ms": round(self.last_snapshot_ms, 2) if self.last_snapshot_ms is not None else None,
+            "last_snapshot_bytes": self.last_snapshot_bytes,
+            "write_errors": self.write_errors
+        }
@@ -0,0 +1,136 @@
+import asyncio
+import json
+import logging
+import os
+import random
+import signal
+import threading
+import time
+from datetime import datetime
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Close code telling clients the server is restarting and they should reconnect
+WS_CLOSE_SERVICE_RESTART = 1012
+
+
+class DrainController:
+    """
+    Graceful shutdown for one replica.
+
+    On SIGTERM (or `drain()`), readiness flips to false and the concurrency
+    limiter stops admitting generations. In-flight generations get up to
+    `grace_seconds` to finish. Each WebSocket client is then sent a
+    `reconnect` frame with a jittered `retry_after` and closed with code 1012.
+    Sockets close in batches so the reconnects spread over the remaining
+    replicas instead of arriving at once. Afterwards uvicorn's normal
+    shutdown runs.
+    """
+
+    def __init__(self, llm_service, connection_manager):
+        self.llm_service = llm_service
+        self.connection_manager = connection_manager
+        self.enabled = os.getenv("DRAIN_ON_SIGTERM", "true").lower() == "true"
+        self.grace_seconds = float(os.getenv("DRAIN_GRACE_SECONDS", "20"))
+        self.reconnect_spread = float(os.getenv("DRAIN_RECONNECT_SPREAD_SECONDS", "5"))
+        self.close_batch_size = int(os.getenv("DRAIN_CLOSE_BATCH_SIZE", "50"))
+        self.close_batch_interval = float(os.getenv("DRAIN_CLOSE_BATCH_INTERVAL", "0.5"))
+
+        self.draining = False
+        self._task: Optional[asyncio.Task] = None
+
+        # Measurements
+        self.started_at: Optional[float] = None
+        self.inflight_at_start = 0
+        self.inflight_abandoned = 0
+        self.wait_seconds = None
+        self.sockets_closed = 0
+        self.duration_seconds = None
+
+    def install_signal_handler(self) -> bool:
+        """
+        Take over SIGTERM from uvicorn: drain first, then hand off to
+        uvicorn's own shutdown (it treats SIGINT the same way).
+        Must run inside the server's event loop, e.g. from a startup hook.
+        """
+        if not self.enabled or threading.current_thread() is not threading.main_thread():
+            return False
+        try:
+            asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, self._on_sigterm)
+        except (NotImplementedError, RuntimeError):
+            return False
+        return True
+
+    def _on_sigterm(self):
+        if self.draining:
+            logger.info("SIGTERM received while already draining")
+            return
+        logger.info("SIGTERM received, draining before shutdown")
+        asyncio.get_running_loop().create_task(self._drain_then_exit())
+
+    async def _drain_then_exit(self):
+        try:
+            await self.drain()
+        finally:
+            os.kill(os.getpid(), signal.SIGINT)
+
+    async def drain(self):
+        """Run the drain sequence once; concurrent callers wait for the same run"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._drain())
+        await asyncio.shield(self._task)
+
+    async def _drain(self):
+        self.draining = True
+        self.started_at = time.monotonic()
+        limiter = self.llm_service.limiter
+        limiter.stop_admitting()
+        self.inflight_at_start = limiter.inflight
+
+        deadline = self.started_at + self.grace_seconds
+        while limiter.inflight > 0 and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        self.wait_seconds = round(time.monotonic() - self.started_at, 3)
+        self.inflight_abandoned = limiter.inflight
+        if self.inflight_abandoned:
+            logger.warning(f"Drain grace period ended with {self.inflight_abandoned} generation(s) in flight")
+
+        await self._close_websockets()
+        self.duration_seconds = round(time.monotonic() - self.started_at, 3)
+        logger.info(f"Drain finished in {self.duration_seconds}s: waited {self.wait_seconds}s for "
+                    f"{self.inflight_at_start} generation(s), closed {self.sockets_closed} socket(s)")
+
+    async def _close_websockets(self):
+        client_ids = list(self.connection_manager.active_connections)
+        for offset in range(0, len(client_ids), self.close_batch_size):
+            if offset:
+                await asyncio.sleep(self.close_batch_interval)
+            batch = client_ids[offset:offset + self.close_batch_size]
+            await asyncio.gather(*(self._close_client(client_id) for client_id in batch))
+
+    async def _close_client(self, client_id: str):
+        websocket = self.connection_manager.active_connections.get(client_id)
+        if websocket is None:
+            return
+        await self.connection_manager.send_personal_message(json.dumps({
+            "type": "reconnect",
+            "reason": "draining",
+            "retry_after": round(random.uniform(0, self.reconnect_spread), 2),
+            "timestamp": datetime.now().isoformat()
+        }), client_id)
+        try:
+            await websocket.close(code=WS_CLOSE_SERVICE_RESTART)
+        except Exception as e:
+            logger.debug(f"Closing WebSocket for {client_id} failed: {e}")
+        self.sockets_closed += 1
+
+    def get_stats(self) -> dict:
+        return {
+            "draining": self.draining,
+            "inflight_at_start": self.inflight_at_start,
+            "inflight_abandoned": self.inflight_abandoned,
+            "wait_seconds": self.wait_seconds,
+            "sockets_closed": self.sockets_closed,
+            "duration_seconds": self.duration_seconds
+        }
@@ -0,0 +1,369 @@
+"""
+Batched text embeddings with a persistent, content-addressed cache.
+
+Texts in a request are deduplicated, looked up in an on-disk cache keyed by
+a hash of their content, and only the misses are sent upstream: in batches
+of `EMBEDDINGS_BATCH_SIZE`, with at most `EMBEDDINGS_MAX_CONCURRENCY` batches
+in flight. Vectors are handled as raw little-endian float32 bytes
+throughout, so a cache hit is one slice of a memory-mapped file and binary
+responses need no conversion.
+"""
+import asyncio
+import hashlib
+import logging
+import mmap
+import os
+import re
+import sys
+import threading
+import time
+from array import array
+from collections import deque
+from typing import Dict, List, Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+KEY_BYTES = 16
+
+
+class TooManyTextsError(Exception):
+    """Raised when a request carries more texts than EMBEDDINGS_MAX_TEXTS"""
+
+    def __init__(self, count: int, max_texts: int):
+        super().__init__(f"At most {max_texts} texts per request, got {count}")
+        self.count = count
+        self.max_texts = max_texts
+
+
+class ModelNotAllowedError(Exception):
+    """Raised for a model outside EMBEDDINGS_ALLOWED_MODELS, or past EMBEDDINGS_MAX_MODELS caches"""
+
+
+def content_key(text: str) -> bytes:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=KEY_BYTES).digest()
+
+
+def pack_vector(values: List[float]) -> bytes:
+    packed = array("f", values)
+    if sys.byteorder == "big":
+        packed.byteswap()
+    return packed.tobytes()
+
+
+def unpack_vector(data: bytes) -> List[float]:
+    values = array("f")
+    values.frombytes(data)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values.tolist()
+
+
+class EmbeddingStore:
+    """
+    Append-only file of (content key, float32 vector) records for one model,
+    read through mmap. The header holds the vector dimension; a torn trailing
+    record is truncated on open. When the file would pass `max_bytes` it is
+    cleared and refilled, which is cheaper than tracking recency per vector.
+    """
+
+    MAGIC = b"EMB1"
+    HEADER_BYTES = 16
+
+    def __init__(self, path: str, max_bytes: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.dim: Optional[int] = None
+        self._index: Dict[bytes, int] = {}  # key -> offset of the vector
+        self._map: Optional[mmap.mmap] = None
+        self._size = 0
+        self._write_lock = threading.Lock()
+        # Readers (event loop) and the writer (worker thread) swap dim, index and map together
+        self._lock = threading.Lock()
+        self.resets = 0
+        self._open()
+
+    @property
+    def record_bytes(self) -> int:
+        return KEY_BYTES + self.dim * 4
+
+    def _open(self):
+        if not os.path.exists(self.path) or os.path.getsize(self.path) < self.HEADER_BYTES:
+            return
+        with open(self.path, "r+b") as f:
+            header = f.read(self.HEADER_BYTES)
+            if header[:4] != self.MAGIC:
+                logger.warning(f"Ignoring embedding cache with unknown format: {self.path}")
+                return
+            self.dim = int.from_bytes(header[4:8], "little")
+            size = os.path.getsize(self.path)
+            usable = self.HEADER_BYTES + (size - self.HEADER_BYTES) // self.record_bytes * self.record_bytes
+            if usable != size:
+                f.truncate(usable)
+        self._size = usable
+        self._remap()
+        for offset in range(self.HEADER_BYTES, usable, self.record_bytes):
+            self._index[self._map[offset:offset + KEY_BYTES]] = offset + KEY_BYTES
+
+    def _remap(self):
+        # Callers hold _lock (or own the store exclusively, as in _open)
+        self._map = None
+        if self._size > self.HEADER_BYTES:
+            with open(self.path, "rb") as f:
+                self._map = mmap.mmap(f.fileno(), self._size, access=mmap.ACCESS_READ)
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def get(self, key: bytes) -> Optional[bytes]:
+        with self._lock:
+            offset = self._index.get(key)
+            if offset is None:
+                return None
+            end = offset + self.dim * 4
+            if self._map is None or end > len(self._map):
+                self._remap()
+            return self._map[offset:end]
+
+    def put_many(self, items: Dict[bytes, bytes]):
+        """Append vectors (blocking; call off the event loop)"""
+        if not items:
+            return
+        dim = len(next(iter(items.values()))) // 4
+        with self._write_lock:
+            if dim != self.dim or self._size + len(items) * (KEY_BYTES + dim * 4) > self.max_bytes:
+                self._reset(dim)
+            items = {key: vector for key, vector in items.items() if key not in self._index}
+            with open(self.path, "ab") as f:
+                f.write(b"".join(key + vector for key, vector in items.items()))
+            # The records are on disk before any reader can find (and map) them
+            with self._lock:
+                offset = self._size
+                for key in items:
+                    self._index[key] = offset + KEY_BYTES
+                    offset += self.record_bytes
+                self._size = offset
+
+    def _reset(self, dim: int):
+        if self.dim is not None:
+            self.resets += 1
+            logger.info(f"Clearing embedding cache {self.path} (dim {self.dim} -> {dim})")
+        # A new inode rather than truncating in place: reading mapped pages past EOF raises SIGBUS
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(self.MAGIC + dim.to_bytes(4, "little") + bytes(self.HEADER_BYTES - 8))
+        os.replace(tmp_path, self.path)
+        with self._lock:
+            # The old map is left to the garbage collector; it keeps the old inode alive
+            self.dim = dim
+            self._index = {}
+            self._size = self.HEADER_BYTES
+            self._map = None
+
+    def close(self):
+        with self._lock:
+            if self._map is not None:
+                self._map.close()
+                self._map = None
+
+    def get_stats(self) -> dict:
+        return {"vectors": len(self._index), "dim": self.dim, "bytes": self._size, "resets": self.resets}
+
+
+class EmbeddingService:
+    """
+    Serves embedding requests from the cache and the upstream provider:
+    Ollama's /api/embed (one call per batch), or the model-free
+    HashingVectorizer when the chat provider is not Ollama.
+    """
+
+    def __init__(self, llm_service, provider: str = None, model: str = None, cache_dir: str = None,
+                 batch_size: int = None, max_concurrency: int = None, max_texts: int = None):
+        self.llm_service = llm_service
+        default_provider = "ollama" if llm_service.model_provider == "ollama" else "hashing"
+        self.provider = provider or os.getenv("EMBEDDINGS_PROVIDER", default_provider)
+        self.default_model = model or os.getenv(
+            "EMBEDDINGS_MODEL", "nomic-embed-text" if self.provider == "ollama" else "hashing")
+        self.cache_dir = cache_dir or os.getenv("EMBEDDINGS_CACHE_DIR", "/tmp/embedding-cache")
+        self.cache_max_bytes = int(os.getenv("EMBEDDINGS_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+        self.batch_size = batch_size or int(os.getenv("EMBEDDINGS_BATCH_SIZE", "32"))
+        self.max_concurrency = max_concurrency or int(os.getenv("EMBEDDINGS_MAX_CONCURRENCY", "4"))
+        self.max_texts = max_texts or int(os.getenv("EMBEDDINGS_MAX_TEXTS", "512"))
+        self.timeout = float(os.getenv("EMBEDDINGS_TIMEOUT_SECONDS", "60"))
+        # Each model gets its own cache file; only operator-listed models may create one ("*": any)
+        allowed = os.getenv("EMBEDDINGS_ALLOWED_MODELS", self.default_model)
+        self.allowed_models = {m.strip() for m in allowed.split(",") if m.strip()} | {self.default_model}
+        self.max_models = int(os.getenv("EMBEDDINGS_MAX_MODELS", "4"))
+        self._stores: Dict[str, EmbeddingStore] = {}
+        self._store_lock = asyncio.Lock()
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._client: Optional[httpx.AsyncClient] = None
+        self._hashing = None
+        self._legacy_api = False  # Ollama before /api/embed: one /api/embeddings call per text
+
+        # Measurements
+        self.requests = 0
+        self.texts = 0
+        self.duplicates = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.upstream_batches = 0
+        self.upstream_errors = 0
+        self.recent = deque(maxlen=1000)  # (monotonic time, texts) per request
+
+    def resolve_model(self, model: Optional[str]) -> str:
+        """The model to embed with; raises ModelNotAllowedError for one the operator did not allow"""
+        if not model or self.provider == "hashing":
+            # The hashing vectorizer has no models: any name would only open another cache file
+            return self.default_model
+        if model not in self.allowed_models and "*" not in self.allowed_models:
+            raise ModelNotAllowedError(f"Embedding model {model!r} is not allowed")
+        return model
+
+    async def _store(self, model: str) -> EmbeddingStore:
+        store = self._stores.get(model)
+        if store is None:
+            async with self._store_lock:
+                store = self._stores.get(model)
+                if store is None:
+                    if len(self._stores) >= self.max_models:
+                        raise ModelNotAllowedError(f"At most {self.max_models} embedding models per replica")
+                    os.makedirs(self.cache_dir, exist_ok=True)
+                    slug = re.sub(r"[^A-Za-z0-9_.-]", "_", model)
+                    path = os.path.join(self.cache_dir, f"{self.provider}-{slug}.f32")
+                    # Opening scans every key; keep it off the event loop
+                    store = await asyncio.to_thread(EmbeddingStore, path, self.cache_max_bytes)
+                    self._stores[model] = store
+        return store
+
+    async def embed(self, texts: List[str], model: str = None) -> dict:
+        """
+        Embed `texts`; returns {"model", "dim", "vectors": [float32 bytes per
+        text, in order], "cache_hits", "computed", "duplicates"}.
+        Raises TooManyTextsError for too many texts, ModelNotAllowedError for
+        a model that may not be used, and httpx.HTTPError,
+        ValueError or KeyError when the upstream fails or answers malformed.
+        """
+        if len(texts) > self.max_texts:
+            raise TooManyTextsError(len(texts), self.max_texts)
+        model = self.resolve_model(model)
+        store = await self._store(model)
+        unique = list(dict.fromkeys(texts))
+        keys = {text: content_key(text) for text in unique}
+        vectors: Dict[str, bytes] = {}
+        misses = []
+        for text in unique:
+            vector = store.get(keys[text])
+            if vector is None:
+                misses.append(text)
+            else:
+                vectors[text] = vector
+
+        if misses:
+            batches = [misses[i:i + self.batch_size] for i in range(0, len(misses), self.batch_size)]
+            results = await self._embed_upstream(model, batches)
+            computed = {}
+            for batch, batch_vectors in zip(batches, results):
+                for text, values in zip(batch, batch_vectors):
+                    vectors[text] = computed[keys[text]] = pack_vector(values)
+            await asyncio.to_thread(store.put_many, computed)
+
+        self.requests += 1
+        self.texts += len(texts)
+        self.duplicates += len(texts) - len(unique)
+        self.cache_hits += len(unique) - len(misses)
+        self.cache_misses += len(misses)
+        self.recent.append((time.monotonic(), len(texts)))
+        ordered = [vectors[text] for text in texts]
+        return {
+            "model": model,
+            "dim": len(ordered[0]) // 4 if ordered else store.dim,
+            "vectors": ordered,
+            "cache_hits": len(unique) - len(misses),
+            "computed": len(misses),
+            "duplicates": len(texts) - len(unique)
+        }
+
+    async def _embed_upstream(self, model: str, batches: List[List[str]]) -> List[List[List[float]]]:
+        async def run(batch):
+            async with self._semaphore:
+                self.upstream_batches += 1
+                try:
+                    if self.provider == "ollama":
+                        return await self._embed_ollama(model, batch)
+                    return await self._embed_hashing(batch)
+                except Exception:
+                    self.upstream_errors += 1
+                    raise
+
+        if self.provider != "ollama":
+            return await asyncio.gather(*(run(batch) for batch in batches))
+        # Embedding shares the inference server with chat: take one batch-priority limiter slot
+        async with self.llm_service.limiter.acquire("batch") as slot:
+            # Embedding latency says nothing about generation latency; keep it out of the limit
+            slot.dropped = True
+            return await asyncio.gather(*(run(batch) for batch in batches))
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(timeout=self.timeout,
+                                             limits=httpx.Limits(max_connections=self.max_concurrency))
+        return self._client
+
+    async def _embed_ollama(self, model: str, batch: List[str]) -> List[List[float]]:
+        client = self._get_client()
+        base_url = self.llm_service.base_url.rstrip("/")
+        if not self._legacy_api:
+            response = await client.post(f"{base_url}/api/embed", json={"model": model, "input": batch})
+            # A 404 naming the model is a missing model; a bare 404 is an Ollama without /api/embed
+            if response.status_code != 404 or "model" in response.text.lower():
+                response.raise_for_status()
+                embeddings = response.json()["embeddings"]
+                if len(embeddings) != len(batch):
+                    raise ValueError(f"Upstream returned {len(embeddings)} embeddings for {len(batch)} texts")
+                return embeddings
+            logger.info("Ollama has no /api/embed; falling back to /api/embeddings per text")
+            self._legacy_api = True
+        vectors = []
+        for text in batch:
+            response = await client.post(f"{base_url}/api/embeddings", json={"model": model, "prompt": text})
+            response.raise_for_status()
+            vectors.append(response.json()["embedding"])
+        return vectors
+
+    async def _embed_hashing(self, batch: List[str]) -> List[List[float]]:
+        if self._hashing is None:
+            from .semantic_cache import HashingVectorizer
+            self._hashing = HashingVectorizer(int(os.getenv("EMBEDDINGS_HASHING_DIM", "256")))
+        return [await self._hashing.embed(text) for text in batch]
+
+    def throughput(self, window: float = 60.0) -> float:
+        """Texts per second over the last `window` seconds"""
+        cutoff = time.monotonic() - window
+        return round(sum(count for at, count in self.recent if at >= cutoff) / window, 3)
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+        for store in self._stores.values():
+            store.close()
+        self._stores.clear()
+
+    def get_stats(self) -> dict:
+        lookups = self.cache_hits + self.cache_misses
+        return {
+            "provider": self.provider,
+            "default_model": self.default_model,
+            "requests": self.requests,
+            "texts": self.texts,
+            "duplicates": self.duplicates,
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses,
+            "cache_hit_rate": round(self.cache_hits / lookups, 3) if lookups else None,
+            "upstream_batches": self.upstream_batches,
+            "upstream_errors": self.upstream_errors,
+            "throughput_texts_per_s": self.throughput(),
+            "caches": {model: store.get_stats() for model, store in self._stores.items()}
+        }
@@ -0,0 +1,189 @@
+import json
+import logging
+import os
+import time
+from collections import deque
+from typing import Dict, List, Optional
+
+from .stats import percentile
+
+logger = logging.getLogger(__name__)
+
+
+class GenerationProfile:
+    """Generation parameters for one model at full budget"""
+
+    def __init__(self, num_predict: int = 256, num_ctx: int = 2048, temperature: float = 0.7,
+                 stop: List[str] = None, context_messages: int = 5):
+        self.num_predict = num_predict
+        self.num_ctx = num_ctx
+        self.temperature = temperature
+        self.stop = stop if stop is not None else ["\nUser:"]
+        self.context_messages = context_messages
+
+    def to_dict(self) -> dict:
+        return {
+            "num_predict": self.num_predict,
+            "num_ctx": self.num_ctx,
+            "temperature": self.temperature,
+            "stop": list(self.stop),
+            "context_messages": self.context_messages
+        }
+
+
+# Per-model defaults, keyed by Ollama model name without tag
+DEFAULT_PROFILES = {
+    "default": GenerationProfile(),
+    "tinyllama": GenerationProfile(num_predict=192, num_ctx=2048),
+    "phi": GenerationProfile(num_predict=256, num_ctx=2048),
+    "llama2": GenerationProfile(num_predict=384, num_ctx=4096),
+    "mistral": GenerationProfile(num_predict=384, num_ctx=4096),
+    "neural-chat": GenerationProfile(num_predict=384, num_ctx=4096),
+    "deepseek-coder": GenerationProfile(num_predict=512, num_ctx=4096, temperature=0.2),
+    "codellama": GenerationProfile(num_predict=512, num_ctx=4096, temperature=0.2),
+}
+
+
+class GenerationBudgetController:
+    """
+    Scales num_predict, num_ctx and conversation context with load.
+
+    Pressure is queue depth (generations in flight) at or above `queue_high`,
+    or p99 latency of recent responses above `p99_target`. Under pressure the
+    budget steps down one level at most every `tighten_interval` seconds; once
+    depth is at or below `queue_low` and p99 is comfortably under target it
+    steps back up after `relax_interval` seconds at the current level.
+    """
+
+    LEVELS = (
+        ("normal", 1.0),
+        ("reduced", 0.75),
+        ("constrained", 0.5),
+        ("minimal", 0.25)
+    )
+    MIN_NUM_PREDICT = 32
+    MIN_NUM_CTX = 512
+    MIN_SAMPLES = 5
+
+    def __init__(self, profiles: Dict[str, GenerationProfile] = None, queue_high: int = None,
+                 queue_low: int = None, p99_target: float = None, tighten_interval: float = None,
+                 relax_interval: float = None, window: int = 50, enabled: bool = None):
+        if enabled is None:
+            enabled = os.getenv("BUDGET_ADAPTIVE_ENABLED", "true").lower() == "true"
+        self.enabled = enabled
+        self.profiles = dict(DEFAULT_PROFILES)
+        self.profiles.update(profiles if profiles is not None else self._profiles_from_env())
+        self.queue_high = queue_high or int(os.getenv("BUDGET_QUEUE_HIGH", "4"))
+        self.queue_low = queue_low if queue_low is not None else int(os.getenv("BUDGET_QUEUE_LOW", "1"))
+        self.p99_target = p99_target or float(os.getenv("BUDGET_P99_TARGET_SECONDS", "20"))
+        self.tighten_interval = tighten_interval if tighten_interval is not None else float(
+            os.getenv("BUDGET_TIGHTEN_INTERVAL_SECONDS", "2"))
+        self.relax_interval = relax_interval if relax_interval is not None else float(
+            os.getenv("BUDGET_RELAX_INTERVAL_SECONDS", "15"))
+
+        self.level = 0
+        self.last_change = time.monotonic()
+        self.latencies = deque(maxlen=window)
+        self.responses_by_level: Dict[str, int] = {name: 0 for name, _ in self.LEVELS}
+
+    @staticmethod
+    def _profiles_from_env() -> Dict[str, GenerationProfile]:
+        """LLM_GENERATION_PROFILES: JSON object of model -> profile field overrides"""
+        raw = os.getenv("LLM_GENERATION_PROFILES")
+        if not raw:
+            return {}
+        try:
+            overrides = json.loads(raw)
+        except ValueError as e:
+            logger.error(f"Ignoring invalid LLM_GENERATION_PROFILES: {e}")
+            return {}
+        profiles = {}
+        for model, fields in overrides.items():
+            base = DEFAULT_PROFILES.get(model, DEFAULT_PROFILES["default"]).to_dict()
+            base.update(fields)
+            profiles[model] = GenerationProfile(**base)
+        return profiles
+
+    def get_profile(self, model_name: str) -> GenerationProfile:
+        return self.profiles.get(model_name.split(":")[0], self.profiles["default"])
+
+    @property
+    def level_name(self) -> str:
+        return self.LEVELS[self.level][0]
+
+    @property
+    def scale(self) -> float:
+        return self.LEVELS[self.level][1]
+
+    def p99(self) -> Optional[float]:
+        """Nearest-rank p99 of recent latencies; None until enough samples"""
+        if len(self.latencies) < self.MIN_SAMPLES:
+            return None
+        return percentile(self.latencies, 99)
+
+    def observe(self, latency: float):
+        """Record the latency of a completed generation"""
+        self.latencies.append(latency)
+
+    def update(self, queue_depth: int, now: float = None):
+        """Move one level tighter or looser based on current pressure"""
+        if not self.enabled:
+            return
+        now = time.monotonic() if now is None else now
+        p99 = self.p99()
+        elapsed = now - self.last_change
+        pressure = queue_depth >= self.queue_high or (p99 is not None and p99 > self.p99_target)
+        calm = queue_depth <= self.queue_low and (p99 is None or p99 < 0.7 * self.p99_target)
+
+        if pressure and self.level < len(self.LEVELS) - 1 and elapsed >= self.tighten_interval:
+            self._set_level(self.level + 1, now, queue_depth, p99)
+        elif calm and self.level > 0 and elapsed >= self.relax_interval:
+            self._set_level(self.level - 1, now, queue_depth, p99)
+
+    def _set_level(self, level: int, now: float, queue_depth: int, p99: Optional[float]):
+        old = self.level_name
+        self.level = level
+        self.last_change = now
+        # Latencies measured under the old budget would keep pushing the same way
+        self.latencies.clear()
+        p99_text = f"{p99:.2f}s" if p99 is not None else "n/a"
+        logger.info(f"Generation budget {old} -> {self.level_name} (queue depth {queue_depth}, p99 {p99_text})")
+
+    def budget_for(self, model_name: str, queue_depth: int = 0) -> dict:
+        """Generation parameters to use for the next request"""
+        self.update(queue_depth)
+        profile = self.get_profile(model_name)
+        scale = self.scale
+        self.responses_by_level[self.level_name] += 1
+        return {
+            "level": self.level_name,
+            "scale": scale,
+            "num_predict": max(min(self.MIN_NUM_PREDICT, profile.num_predict), int(profile.num_predict * scale)),
+            "num_ctx": max(min(self.MIN_NUM_CTX, profile.num_ctx), int(profile.num_ctx * scale)),
+            "temperature": profile.temperature,
+            "stop": list(profile.stop),
+            "context_messages": max(1, round(profile.context_messages * scale))
+        }
+
+    @staticmethod
+    def ollama_options(budget: dict) -> dict:
+        """Ollama `options` for a budget"""
+        return {
+            "num_predict": budget["num_predict"],
+            "num_ctx": budget["num_ctx"],
+            "temperature": budget["temperature"],
+            "stop": budget["stop"]
+        }
+
+    def get_stats(self) -> dict:
+        p99 = self.p99()
+        return {
+            "enabled": self.enabled,
+            "level": self.level_name,
+            "scale": self.scale,
+            "p99_seconds": round(p99, 3) if p99 is not None else None,
+            "p99_target_seconds": self.p99_target,
+            "queue_high": self.queue_high,
+            "queue_low": self.queue_low,
+            "responses_by_level": dict(self.responses_by_level)
+        }
@@ -0,0 +1,132 @@
+import os
+from collections import OrderedDict, deque
+from typing import Dict, Optional
+
+from .stats import percentile
+
+# Prompt-size buckets (tokens); upper bounds, the last bucket is open-ended
+PROMPT_TOKEN_BUCKETS = (64, 128, 256, 512, 1024, 2048, 4096)
+
+
+class ModelTelemetry:
+    """Accumulated Ollama generation timings for one model"""
+
+    def __init__(self, window: int):
+        self.generations = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.prefill_seconds = 0.0
+        self.decode_seconds = 0.0
+        self.load_events = 0
+        self.load_seconds = 0.0
+        self.prefill_tps = deque(maxlen=window)
+        self.decode_tps = deque(maxlen=window)
+        # Per prompt-size bucket: [count, prefill seconds, total seconds]
+        self.prompt_buckets = [[0, 0.0, 0.0] for _ in range(len(PROMPT_TOKEN_BUCKETS) + 1)]
+
+
+class GenerationTelemetry:
+    """
+    Per-model throughput from the timing fields Ollama returns with each
+    generation (`prompt_eval_count`, `prompt_eval_duration`, `eval_count`,
+    `eval_duration`, `load_duration`, `total_duration`; durations in ns).
+
+    Tracks prefill and decode tokens/s, model-load events (load_duration above
+    `load_event_ms`), the prompt-size distribution with mean prefill and total
+    latency per size bucket, and token usage per conversation.
+    """
+
+    def __init__(self, window: int = None, load_event_ms: float = None, max_conversations: int = None):
+        self.window = window or int(os.getenv("TELEMETRY_WINDOW", "500"))
+        # Ollama reports a few ms of load_duration even when the model is resident
+        self.load_event_ms = load_event_ms if load_event_ms is not None else float(os.getenv("TELEMETRY_LOAD_EVENT_MS", "500"))
+        self.max_conversations = max_conversations or int(os.getenv("TELEMETRY_MAX_CONVERSATIONS", "10000"))
+        self.models: Dict[str, ModelTelemetry] = {}
+        self.conversations: "OrderedDict[str, dict]" = OrderedDict()
+
+    def record(self, model: str, timings: dict, conversation_id: str = None):
+        """Fold one generation's timing fields into the per-model and per-conversation totals"""
+        if not timings:
+            return
+        stats = self.models.get(model)
+        if stats is None:
+            stats = self.models[model] = ModelTelemetry(self.window)
+
+        prompt_tokens = timings.get("prompt_eval_count", 0)
+        completion_tokens = timings.get("eval_count", 0)
+        prefill = timings.get("prompt_eval_duration", 0) / 1e9
+        decode = timings.get("eval_duration", 0) / 1e9
+        load = timings.get("load_duration", 0) / 1e9
+        total = timings.get("total_duration", 0) / 1e9
+
+        stats.generations += 1
+        stats.prompt_tokens += prompt_tokens
+        stats.completion_tokens += completion_tokens
+        stats.prefill_seconds += prefill
+        stats.decode_seconds += decode
+        if prefill > 0 and prompt_tokens:
+            stats.prefill_tps.append(prompt_tokens / prefill)
+        if decode > 0 and completion_tokens:
+            stats.decode_tps.append(completion_tokens / decode)
+        if load * 1000 >= self.load_event_ms:
+            stats.load_events += 1
+            stats.load_seconds += load
+
+        bucket = stats.prompt_buckets[self._bucket_index(prompt_tokens)]
+        bucket[0] += 1
+        bucket[1] += prefill
+        bucket[2] += total
+
+        if conversation_id is not None:
+            usage = self.conversations.pop(conversation_id, None) or {
+                "generations": 0, "prompt_tokens": 0, "completion_tokens": 0
+            }
+            usage["generations"] += 1
+            usage["prompt_tokens"] += prompt_tokens
+            usage["completion_tokens"] += completion_tokens
+            self.conversations[conversation_id] = usage
+            if len(self.conversations) > self.max_conversations:
+                self.conversations.popitem(last=False)
+
+    @staticmethod
+    def _bucket_index(prompt_tokens: int) -> int:
+        for index, bound in enumerate(PROMPT_TOKEN_BUCKETS):
+            if prompt_tokens <= bound:
+                return index
+        return len(PROMPT_TOKEN_BUCKETS)
+
+    @staticmethod
+    def bucket_label(index: int) -> str:
+        if index < len(PROMPT_TOKEN_BUCKETS):
+            return f"<={PROMPT_TOKEN_BUCKETS[index]}"
+        return f">{PROMPT_TOKEN_BUCKETS[-1]}"
+
+    def get_conversation_usage(self, conversation_id: str) -> Optional[dict]:
+        usage = self.conversations.get(conversation_id)
+        if usage is None:
+            return None
+        return {**usage, "total_tokens": usage["prompt_tokens"] + usage["completion_tokens"]}
+
+    def get_stats(self) -> dict:
+        models = {}
+        for model, stats in self.models.items():
+            models[model] = {
+                "generations": stats.generations,
+                "prompt_tokens": stats.prompt_tokens,
+                "completion_tokens": stats.completion_tokens,
+                "prefill_tps_p50": percentile(stats.prefill_tps, 50, 1),
+                "prefill_tps_p10": percentile(stats.prefill_tps, 10, 1),
+                "decode_tps_p50": percentile(stats.decode_tps, 50, 1),
+                "decode_tps_p10": percentile(stats.decode_tps, 10, 1),
+                "load_events": stats.load_events,
+                "load_seconds": round(stats.load_seconds, 3),
+                "prompt_sizes": {
+                    self.bucket_label(index): {
+                        "count": count,
+                        "mean_prefill_ms": round(prefill / count * 1000, 1),
+                        "mean_total_ms": round(total / count * 1000, 1)
+                    }
+                    for index, (count, prefill, total) in enumerate(stats.prompt_buckets) if count
+                }
+            }
+        return {"models": models, "conversations_tracked": len(self.conversations)}
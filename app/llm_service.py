@@ -2,17 +2,31 @@ import asyncio
 import time
 import logging
 import os
-from typing import Dict, Optional, List
+from typing import AsyncIterator, Dict, Optional, List
 from datetime import datetime
 import httpx
 import json
+import structlog
+
+from .model_pull import ModelPullJob, PullRejected
+from .concurrency_limiter import AdaptiveConcurrencyLimiter
+from .generation_budget import GenerationBudgetController
+from .tracing import tracer
+from .conversation_store import ConversationJournal
+from .startup import StartupTimer
+from .generation_telemetry import GenerationTelemetry
+
+# Provider-specific modules (sim_engine, micro_batcher) and the optional
+# semantic cache are imported on first use so replicas only pay for what they run
 
 logger = logging.getLogger(__name__)
+log = structlog.get_logger(__name__)
 
 class LLMService:
     """
     Enhanced LLM Service supporting multiple free model providers.
-    Supports: Ollama (local), Hugging Face Inference API (free), and mock mode.
+    Supports: Ollama (local), Hugging Face Inference API (free), a latency
+    simulator (sim) for capacity testing, and mock mode.
     """
     
     # Available free models configuration
@@ -34,11 +48,82 @@ class LLMService:
         }
     }
     
+    # Generation timing fields reported by Ollama (durations in nanoseconds)
+    TIMING_FIELDS = (
+        "total_duration", "load_duration", "prompt_eval_count",
+        "prompt_eval_duration", "eval_count", "eval_duration"
+    )
+    
     def __init__(self):
-        self.model_provider = os.getenv("LLM_MODEL_PROVIDER", "ollama")  # ollama, huggingface, mock
+        self.model_provider = os.getenv("LLM_MODEL_PROVIDER", "ollama")  # ollama, huggingface, sim, mock
         self.model_name = os.getenv("LLM_MODEL_NAME", "phi")
         self.base_url = os.getenv("LLM_BASE_URL", "http://localhost:11434")
         self.hf_api_token = os.getenv("HF_API_TOKEN")  # Optional for higher rate limits
+        self.hf_api_url = os.getenv("HF_API_URL", "https://api-inference.huggingface.co/models").rstrip("/")
+        # Model served while the configured one is still being pulled
+        self.fallback_model_name = os.getenv("LLM_FALLBACK_MODEL")
+        self.pull_max_attempts = int(os.getenv("LLM_PULL_MAX_ATTEMPTS", "5"))
+        self.pull_retry_delay = float(os.getenv("LLM_PULL_RETRY_DELAY", "1.0"))  # Base backoff in seconds
+        self.init_retry_delay = float(os.getenv("LLM_INIT_RETRY_DELAY", "5.0"))  # Base backoff in seconds
+        
+        # Simulated provider settings (defaults approximate TinyLlama on one CPU)
+        self.sim_config = {
+            "prefill_tps": float(os.getenv("SIM_PREFILL_TPS", "100")),
+            "decode_tps": float(os.getenv("SIM_DECODE_TPS", "15")),
+            "slots": int(os.getenv("SIM_SLOTS", "2")),
+            "response_tokens": int(os.getenv("SIM_RESPONSE_TOKENS", "64")),
+            "jitter": float(os.getenv("SIM_JITTER", "0.1")),
+            "cpu_burn": float(os.getenv("SIM_CPU_BURN", "0"))
+        }
+        self.sim_engine = None  # SimulatedInferenceEngine, created on first use
+        
+        # Adaptive concurrency limit around upstream generation
+        self.limiter = AdaptiveConcurrencyLimiter(
+            initial_limit=int(os.getenv("CONCURRENCY_INITIAL_LIMIT", "4")),
+            min_limit=int(os.getenv("CONCURRENCY_MIN_LIMIT", "1")),
+            max_limit=int(os.getenv("CONCURRENCY_MAX_LIMIT", "50")),
+            tolerance=float(os.getenv("CONCURRENCY_TOLERANCE", "1.5")),
+            enabled=os.getenv("CONCURRENCY_LIMIT_ENABLED", "true").lower() == "true"
+        )
+        
+        # Generation parameters per model, tightened under load
+        self.budget = GenerationBudgetController()
+        
+        # Per-model prefill/decode throughput and per-conversation token usage
+        self.telemetry = GenerationTelemetry()
+        
+        # Concurrent Hugging Face calls with the same model and parameters share one request
+        self.hf_batcher = None  # MicroBatcher, created on first Hugging Face call
+        
+        # Optional cache serving stored answers to near-duplicate opening prompts
+        self.semantic_cache = None
+        if os.getenv("SEMANTIC_CACHE_ENABLED", "false").lower() == "true":
+            from .semantic_cache import OllamaEmbedder, SemanticCache
+            embedder = None
+            if os.getenv("SEMANTIC_CACHE_EMBEDDER", "hashing") == "ollama":
+                embedder = OllamaEmbedder(self.base_url, os.getenv("SEMANTIC_CACHE_EMBED_MODEL", "nomic-embed-text"))
+            self.semantic_cache = SemanticCache(embedder)
+        
+        # Optional mirroring of sampled requests to a candidate model
+        self.shadow = None
+        if os.getenv("SHADOW_ENABLED", "false").lower() == "true":
+            from .shadow import ShadowMirror
+            self.shadow = ShadowMirror(self)
+        
+        # Optional routing of each request to the smallest adequate model
+        self.cascade = None
+        if os.getenv("CASCADE_ENABLED", "false").lower() == "true":
+            from .model_cascade import ModelCascade, OllamaClassifier
+            classifier = None
+            if os.getenv("CASCADE_CLASSIFIER", "heuristic") == "ollama":
+                classifier = OllamaClassifier(self.base_url, os.getenv("CASCADE_CLASSIFIER_MODEL", "tinyllama"))
+            sizes = {}
+            for name, info in self.AVAILABLE_MODELS["ollama"].items():
+                try:
+                    sizes[name] = float(info["size"].rstrip("B"))
+                except ValueError:
+                    pass
+            self.cascade = ModelCascade(sizes=sizes, classifier=classifier)
         
         # Service metrics
         self.start_time = time.time()
@@ -46,27 +131,65 @@ class LLMService:
         self.total_response_time = 0.0
         self.is_initialized = False
         self.conversations: Dict[str, list] = {}
+        # Optional on-disk journal so history survives restarts
+        store_dir = os.getenv("CONVERSATION_STORE_DIR")
+        self.conversation_store: Optional[ConversationJournal] = ConversationJournal(store_dir) if store_dir else None
+        self._conversations_restored = False
         
         # Model status
         self.model_loaded = False
         self.last_health_check = None
         self.current_model_info = None
         
-    async def initialize(self):
-        """Initialize the LLM service with selected provider"""
+        # Pooled HTTP client for generation requests
+        self._http_client: Optional[httpx.AsyncClient] = None
+        
+        # Background model pulls
+        self.pull_jobs: Dict[str, ModelPullJob] = {}
+        self.active_pull: Optional[ModelPullJob] = None
+        self._pull_task: Optional[asyncio.Task] = None
+        # Provider re-initialization after a failed start, and a fatal state for liveness
+        self._init_retry_task: Optional[asyncio.Task] = None
+        self.init_retries = 0
+        self.serving_fallback = False
+        self.fatal_error: Optional[str] = None
+        
+    async def initialize(self, timer: StartupTimer = None):
+        """
+        Initialize the LLM service with selected provider.
+        Independent steps run concurrently; each is timed on `timer` when given.
+        """
+        timer = timer or StartupTimer()
+        
+        async def timed(name, coroutine):
+            async with timer.phase(name):
+                await coroutine
+        
         try:
             logger.info(f"Initializing LLM service with provider: {self.model_provider}, model: {self.model_name}")
+            if self.active_pull and self.active_pull.is_finished:
+                self.active_pull = None
+            self.serving_fallback = False
+            self.fatal_error = None
             
             if self.model_provider == "ollama":
-                await self._initialize_ollama()
+                provider_init = self._initialize_ollama()
             elif self.model_provider == "huggingface":
-                await self._initialize_huggingface()
+                provider_init = self._initialize_huggingface()
+            elif self.model_provider == "sim":
+                provider_init = self._initialize_sim()
             else:
                 # Mock mode for testing
-                await self._initialize_mock()
+                provider_init = self._initialize_mock()
+            
+            await asyncio.gather(
+                timed("conversation_restore", self._restore_conversations()),
+                timed(f"provider_init.{self.model_provider}", provider_init)
+            )
                 
             self.is_initialized = True
-            self.model_loaded = True
+            # While the target model is still being pulled we only serve the fallback
+            self.model_loaded = self.active_pull is None
             logger.info("LLM service initialized successfully")
             
         except Exception as e:
@@ -74,21 +197,84 @@ class LLMService:
             # Fallback to mock mode
             await self._initialize_mock()
             self.is_initialized = True
+            self._schedule_init_retry()
+    
+    def _schedule_init_retry(self):
+        """Keep retrying provider init in the background so readiness can recover"""
+        if self.model_provider != "ollama" or (self._init_retry_task and not self._init_retry_task.done()):
+            return
+        self._init_retry_task = asyncio.create_task(self._retry_provider_init())
+    
+    async def _retry_provider_init(self):
+        delay = self.init_retry_delay
+        while True:
+            await asyncio.sleep(delay)
+            try:
+                await self._initialize_ollama()
+            except Exception as e:
+                self.init_retries += 1
+                delay = min(delay * 2, 60)
+                logger.warning(f"Provider init retry {self.init_retries} failed: {e}; next in {delay}s")
+                continue
+            self.model_loaded = self.active_pull is None
+            logger.info(f"Provider {self.model_provider} reachable after {self.init_retries + 1} retries")
+            return
+    
+    async def _restore_conversations(self):
+        """Load journaled history once and start persisting new turns"""
+        if self.conversation_store is None or self._conversations_restored:
+            return
+        try:
+            restored = await asyncio.to_thread(self.conversation_store.restore)
+            restored.update(self.conversations)
+            self.conversations = restored
+            await self.conversation_store.start(self.conversations)
+            self._conversations_restored = True
+        except (OSError, ValueError, KeyError) as e:
+            logger.error(f"Conversation restore failed, starting empty: {e}")
+    
+    def _append_turn(self, conversation_id: str, role: str, content: str):
+        """Add a message to the conversation history (and the journal, if enabled)"""
+        message = {
+            "role": role,
+            "content": content,
+            "timestamp": datetime.now().isoformat()
+        }
+        self.conversations.setdefault(conversation_id, []).append(message)
+        if self.conversation_store is not None:
+            self.conversation_store.record(conversation_id, message)
+    
+    def adopt_conversation(self, conversation_id: str, history: list) -> bool:
+        """Take over history handed off by the conversation's previous owner; False if we already have some"""
+        if self.conversations.get(conversation_id):
+            return False
+        for message in history:
+            self._append_turn(conversation_id, message["role"], message["content"])
+        return True
+    
+    def release_conversation(self, conversation_id: str):
+        """Forget a conversation (e.g. one now owned by another replica), on disk too"""
+        if self.conversations.pop(conversation_id, None) is not None and self.conversation_store is not None:
+            self.conversation_store.record_delete(conversation_id)
     
     async def _initialize_ollama(self):
         """Initialize Ollama with selected model"""
         try:
             async with httpx.AsyncClient() as client:
-                # Check if Ollama is running
-                response = await client.get(f"{self.base_url}/api/version", timeout=10.0)
+                # Check that Ollama is running and list its models in parallel
+                response, models_response = await asyncio.gather(
+                    client.get(f"{self.base_url}/api/version", timeout=10.0),
+                    client.get(f"{self.base_url}/api/tags", timeout=10.0)
+                )
                 if response.status_code == 200:
                     logger.info("Ollama service is running")
                     
                     # Check available models
-                    models_response = await client.get(f"{self.base_url}/api/tags")
                     if models_response.status_code == 200:
                         models = models_response.json()
                         available_models = [model['name'] for model in models.get('models', [])]
+                        if self.cascade is not None:
+                            self.cascade.resolve(available_models)
                         
                         # Check if exact model is available
                         model_found = False
@@ -100,15 +286,18 @@ class LLMService:
                         
                         if model_found:
                             logger.info(f"Model {self.model_name} is available")
-                            self.current_model_info = self.AVAILABLE_MODELS["ollama"].get(self.model_name.split(':')[0], {
-                                "name": self.model_name,
-                                "display_name": self.model_name,
-                                "size": "Unknown"
-                            })
+                            self.current_model_info = self._ollama_model_info(self.model_name)
                         else:
                             logger.warning(f"Model {self.model_name} not found. Available models: {available_models}")
-                            logger.info("Attempting to pull model...")
-                            await self._pull_ollama_model()
+                            target_model = self.model_name
+                            fallback_model = self._select_fallback_model(available_models)
+                            if fallback_model:
+                                logger.info(f"Serving fallback model {fallback_model} while {target_model} is pulled")
+                                self.model_name = fallback_model
+                                self.current_model_info = self._ollama_model_info(fallback_model)
+                            else:
+                                logger.warning("No fallback model present; service stays unready until pull completes")
+                            self.start_model_pull(target_model)
                 else:
                     raise Exception("Ollama service not accessible")
                     
@@ -136,35 +325,175 @@ class LLMService:
             logger.error(f"Hugging Face initialization failed: {e}")
             raise
     
-    async def _pull_ollama_model(self):
-        """Pull Ollama model if not available"""
+    def _ollama_model_info(self, model_name: str) -> dict:
+        """Look up display info for an Ollama model name (tag suffix ignored)"""
+        return self.AVAILABLE_MODELS["ollama"].get(model_name.split(':')[0], {
+            "name": model_name,
+            "display_name": model_name,
+            "size": "Unknown"
+        })
+    
+    def _select_fallback_model(self, available_models: List[str]) -> Optional[str]:
+        """Pick an already-present model to serve while the target is pulled"""
+        if not available_models:
+            return None
+        if self.fallback_model_name:
+            for available_model in available_models:
+                if available_model.startswith(self.fallback_model_name):
+                    return available_model
+        return available_models[0]
+    
+    def start_model_pull(self, model_name: str) -> ModelPullJob:
+        """Start pulling a model in the background and return the tracking job"""
+        if self.active_pull and not self.active_pull.is_finished:
+            if self.active_pull.model_name == model_name:
+                return self.active_pull
+            self.cancel_model_pull()
+        
+        job = ModelPullJob(model_name, max_attempts=self.pull_max_attempts)
+        self.pull_jobs[job.id] = job
+        self.active_pull = job
+        self._pull_task = asyncio.create_task(self._run_pull_job(job))
+        logger.info(f"Started background pull {job.id} for model {model_name}")
+        return job
+    
+    def cancel_model_pull(self):
+        """Cancel the active background pull, if any"""
+        if self._pull_task and not self._pull_task.done():
+            self._pull_task.cancel()
+        if self.active_pull and not self.active_pull.is_finished:
+            self.active_pull.mark(ModelPullJob.CANCELLED)
+        self._pull_task = None
+    
+    def get_pull_job(self, pull_id: str) -> Optional[ModelPullJob]:
+        """Get a pull job by id"""
+        return self.pull_jobs.get(pull_id)
+    
+    async def _run_pull_job(self, job: ModelPullJob):
+        """Pull a model with retries; Ollama resumes partially downloaded layers"""
         try:
-            async with httpx.AsyncClient(timeout=300.0) as client:
-                pull_data = {"name": self.model_name}
-                response = await client.post(
-                    f"{self.base_url}/api/pull",
-                    json=pull_data
-                )
-                
-                if response.status_code == 200:
-                    logger.info(f"Successfully pulled model {self.model_name}")
-                    self.current_model_info = self.AVAILABLE_MODELS["ollama"].get(self.model_name.split(':')[0], {
-                        "name": self.model_name,
-                        "display_name": self.model_name,
-                        "size": "Unknown"
-                    })
-                else:
-                    raise Exception(f"Failed to pull model: {response.text}")
-                    
-        except Exception as e:
-            logger.error(f"Model pull failed: {e}")
+            while job.attempts < job.max_attempts:
+                job.attempts += 1
+                job.mark(ModelPullJob.RUNNING)
+                try:
+                    await self._pull_ollama_model(job)
+                    if await self._activate_pulled_model(job):
+                        job.mark(ModelPullJob.SUCCESS)
+                        logger.info(f"Model {job.model_name} pulled and active after {job.attempts} attempt(s)")
+                        return
+                    raise Exception("model not listed after pull completed")
+                except PullRejected as e:
+                    job.mark(ModelPullJob.FAILED, str(e))
+                    logger.error(f"Model pull {job.id} failed: {e}")
+                    self._pull_gave_up(job)
+                    return
+                except Exception as e:
+                    job.error = str(e)
+                    if job.attempts >= job.max_attempts:
+                        break
+                    delay = min(self.pull_retry_delay * 2 ** (job.attempts - 1), 30)
+                    job.mark(ModelPullJob.RETRYING)
+                    logger.warning(f"Model pull {job.id} attempt {job.attempts} failed: {e}; retrying in {delay}s")
+                    await asyncio.sleep(delay)
+            job.mark(ModelPullJob.FAILED)
+            logger.error(f"Model pull {job.id} gave up after {job.attempts} attempts: {job.error}")
+            self._pull_gave_up(job)
+        except asyncio.CancelledError:
+            job.mark(ModelPullJob.CANCELLED)
             raise
     
+    def _pull_gave_up(self, job: ModelPullJob):
+        """
+        A failed pull must not leave the pod unready forever: go ready on the
+        fallback model when one is serving, otherwise fail liveness so the pod
+        is restarted and the pull starts over.
+        """
+        if self.active_pull is not job:
+            return
+        if self.current_model_info and self.model_name != job.model_name:
+            logger.error(f"Serving fallback model {self.model_name}; {job.model_name} is unavailable")
+            self.serving_fallback = True
+            self.model_loaded = True
+        else:
+            self.fatal_error = f"Pull of {job.model_name} failed and no fallback model is present: {job.error}"
+    
+    async def _pull_ollama_model(self, job: ModelPullJob):
+        """Stream /api/pull progress into the job until Ollama reports success"""
+        timeout = httpx.Timeout(30.0, read=120.0)
+        async with httpx.AsyncClient(timeout=timeout) as client:
+            async with client.stream(
+                "POST",
+                f"{self.base_url}/api/pull",
+                json={"name": job.model_name, "stream": True}
+            ) as response:
+                if response.status_code >= 500:
+                    raise Exception(f"Ollama pull error: {response.status_code}")
+                if response.status_code != 200:
+                    await response.aread()
+                    raise PullRejected(f"Failed to pull model: {response.text}")
+                
+                async for line in response.aiter_lines():
+                    if not line.strip():
+                        continue
+                    try:
+                        event = json.loads(line)
+                    except ValueError:
+                        # A truncated or garbled progress line is a stream glitch: retry
+                        raise Exception(f"Unreadable pull progress line: {line[:200]!r}")
+                    if "error" in event:
+                        if "not found" in event["error"] or "does not exist" in event["error"]:
+                            raise PullRejected(event["error"])
+                        raise Exception(event["error"])
+                    job.apply_event(event)
+                    if event.get("status") == "success":
+                        return
+        raise Exception("pull stream ended before success")
+    
+    async def _activate_pulled_model(self, job: ModelPullJob) -> bool:
+        """Switch serving to a freshly pulled model once Ollama lists it"""
+        async with httpx.AsyncClient() as client:
+            response = await client.get(f"{self.base_url}/api/tags", timeout=10.0)
+            if response.status_code != 200:
+                return False
+            for model in response.json().get("models", []):
+                if model["name"].startswith(job.model_name):
+                    if self.active_pull is not job:
+                        # Superseded by a model switch; the pulled model stays on disk only
+                        return True
+                    self.model_name = model["name"]
+                    self.current_model_info = self._ollama_model_info(self.model_name)
+                    self.model_loaded = True
+                    return True
+        return False
+    
+    async def _initialize_sim(self):
+        """Initialize the latency-simulating provider"""
+        if self.sim_engine is None:
+            from .sim_engine import SimulatedInferenceEngine
+            self.sim_engine = SimulatedInferenceEngine(**self.sim_config)
+        self.current_model_info = {
+            "name": f"sim:{self.model_name}",
+            "display_name": f"Simulated {self.model_name}",
+            "size": "Simulated"
+        }
+        logger.info(f"Simulated provider ready with {self.sim_engine.slots} slots")
+    
     async def _initialize_mock(self):
         """Initialize mock LLM for testing"""
         logger.info("Initializing mock LLM service for testing")
         self.current_model_info = {"name": "mock", "display_name": "Mock Model", "size": "Test"}
-        await asyncio.sleep(1)  # Simulate initialization time
+        # Optional simulated initialization time (off by default so mock replicas start fast)
+        await asyncio.sleep(float(os.getenv("MOCK_INIT_DELAY", "0")))
+    
+    async def warm_up(self):
+        """Load the model into Ollama's memory so the first chat doesn't pay for it"""
+        if self.model_provider != "ollama" or not self.model_loaded:
+            return
+        if os.getenv("LLM_WARMUP", "true").lower() != "true":
+            return
+        async with httpx.AsyncClient(timeout=300.0) as client:
+            response = await client.post(f"{self.base_url}/api/generate", json={"model": self.model_name, "prompt": ""})
+            logger.info(f"Warmed up {self.model_name} (status {response.status_code})")
     
     async def get_available_models(self) -> Dict[str, List[Dict]]:
         """Get list of available models by provider"""
@@ -181,10 +510,10 @@ class LLMService:
             logger.info(f"Switching to {provider}:{model_name}")
             
             # Validate provider and model
-            if provider not in ["ollama", "huggingface", "mock"]:
+            if provider not in ["ollama", "huggingface", "sim", "mock"]:
                 raise ValueError(f"Unsupported provider: {provider}")
             
-            if provider != "mock":
+            if provider not in ("mock", "sim"):
                 # For model validation, check both exact name and base name (without version)
                 model_found = False
                 if provider in self.AVAILABLE_MODELS:
@@ -209,9 +538,13 @@ class LLMService:
             old_provider = self.model_provider
             old_model = self.model_name
             
+            self.cancel_model_pull()
             self.model_provider = provider
             self.model_name = model_name
             self.model_loaded = False
+            if self.semantic_cache is not None:
+                # Cached answers came from the previous model
+                self.semantic_cache.clear()
             
             # Reinitialize with new model
             try:
@@ -230,69 +563,346 @@ class LLMService:
             logger.error(f"Model switch failed: {e}")
             return False
     
-    async def process_message(self, message: str, conversation_id: str = None) -> str:
-        """Process a chat message and return response"""
+    async def process_message(self, message: str, conversation_id: str = None, priority: str = "standard",
+                              metadata: dict = None) -> str:
+        """
+        Process a chat message and return response.
+        When `metadata` is given it receives the generation budget used, or
+        the semantic cache match when the answer was served from cache,
+        "cascade" with the model tier and escalations when cascade routing is
+        on, and "error" when generation failed and the returned text is an apology.
+        Raises OverloadedError when the request is shed by the concurrency limiter.
+        """
         start_time = time.time()
         
-        try:
-            # Get or create conversation history
-            if conversation_id not in self.conversations:
-                self.conversations[conversation_id] = []
-            
-            # Add user message to history
-            self.conversations[conversation_id].append({
-                "role": "user",
-                "content": message,
-                "timestamp": datetime.now().isoformat()
-            })
+        hit, cache_vector = await self._semantic_lookup(message, conversation_id)
+        if hit:
+            if metadata is not None:
+                metadata["cache"] = self._cache_metadata(hit)
+            return self._serve_cached(message, conversation_id, hit, start_time)
+        
+        route = await self._cascade_route(message)
+        model = route["model"] if route else self.model_name
+        async with self.limiter.acquire(priority) as slot, \
+                tracer.span("llm.process_message", provider=self.model_provider, model=model):
+            budget = self.budget.budget_for(model, self.limiter.inflight)
+            tracer.set_attribute("queue_depth", self.limiter.inflight)
+            tracer.set_attribute("budget", budget["level"])
+            if metadata is not None:
+                metadata["budget"] = budget
+            try:
+                with tracer.span("history.append"):
+                    # Add user message to history
+                    self._append_turn(conversation_id, "user", message)
+                shadow_job = self._shadow_prepare(message, conversation_id, budget)
+                
+                # Generate response based on model type
+                timings = {}
+                if route:
+                    response = await self._generate_cascade(message, conversation_id, budget, route, timings)
+                    if metadata is not None:
+                        metadata["cascade"] = route
+                elif self.model_provider == "ollama":
+                    response = await self._process_ollama_message(message, conversation_id, budget, timings=timings)
+                elif self.model_provider == "huggingface":
+                    response = await self._process_huggingface_message(message, conversation_id)
+                elif self.model_provider == "sim":
+                    response = await self._process_sim_message(message, conversation_id, budget, timings=timings)
+                else:
+                    response = await self._process_mock_message(message, conversation_id)
+                
+                with tracer.span("history.append"):
+                    # Add assistant response to history
+                    self._append_turn(conversation_id, "assistant", response)
+                await self._semantic_store(message, response, cache_vector)
+                
+                # Update metrics
+                response_time = time.time() - start_time
+                self.message_count += 1
+                self.total_response_time += response_time
+                self.budget.observe(response_time)
+                
+                if shadow_job:
+                    self.shadow.submit(shadow_job, route["model"] if route else model, response_time * 1000,
+                                       response, timings)
+                
+                log.info("message_processed", provider=self.model_provider,
+                         duration_s=round(response_time, 3), budget=budget["level"])
+                return response
+                
+            except Exception as e:
+                slot.dropped = True
+                tracer.set_attribute("error", str(e))
+                if metadata is not None:
+                    metadata["error"] = str(e)
+                logger.error(f"Error processing message: {e}")
+                return f"I apologize, but I encountered an error processing your message: {str(e)}"
+    
+    async def stream_message(self, message: str, conversation_id: str = None,
+                             priority: str = "standard") -> AsyncIterator[dict]:
+        """
+        Process a chat message, yielding events as the response is generated:
+        {"type": "token", "content": ...} per text delta, then one
+        {"type": "done", "response": ..., "timings": ..., "budget": ...} with
+        Ollama-style timings and the generation budget used.
+        Providers without native streaming yield the whole response as one token.
+        A semantic cache hit yields the cached response as one token and a done
+        event with "cache" in place of timings and budget. With cascade routing
+        the done event also carries "cascade"; streamed answers are never
+        escalated since their tokens have already been sent.
+        Raises OverloadedError before any event when the request is shed.
+        """
+        start_time = time.time()
+        
+        hit, cache_vector = await self._semantic_lookup(message, conversation_id)
+        if hit:
+            response = self._serve_cached(message, conversation_id, hit, start_time)
+            yield {"type": "token", "content": response}
+            yield {"type": "done", "response": response, "timings": None, "budget": None,
+                   "cache": self._cache_metadata(hit)}
+            return
+        
+        route = await self._cascade_route(message)
+        model = route["model"] if route else self.model_name
+        async with self.limiter.acquire(priority) as slot, \
+                tracer.span("llm.stream_message", provider=self.model_provider, model=model):
+            budget = self.budget.budget_for(model, self.limiter.inflight)
+            tracer.set_attribute("queue_depth", self.limiter.inflight)
+            tracer.set_attribute("budget", budget["level"])
+            self._append_turn(conversation_id, "user", message)
+            shadow_job = self._shadow_prepare(message, conversation_id, budget)
             
-            # Generate response based on model type
-            if self.model_provider == "ollama":
-                response = await self._process_ollama_message(message, conversation_id)
-            elif self.model_provider == "huggingface":
-                response = await self._process_huggingface_message(message, conversation_id)
-            else:
-                response = await self._process_mock_message(message, conversation_id)
+            parts = []
+            timings = None
+            try:
+                if self.model_provider == "ollama":
+                    deltas = self._stream_ollama_message(message, conversation_id, budget, model)
+                elif self.model_provider == "sim":
+                    deltas = self._stream_sim_message(message, conversation_id, budget, model)
+                else:
+                    deltas = self._stream_single(message, conversation_id)
+                
+                async for delta, final_timings in deltas:
+                    if final_timings:
+                        timings = final_timings
+                    if delta:
+                        parts.append(delta)
+                        yield {"type": "token", "content": delta}
+            except Exception as e:
+                slot.dropped = True
+                logger.error(f"Error streaming message: {e}")
+                parts = [f"I apologize, but I encountered an error processing your message: {str(e)}"]
             
-            # Add assistant response to history
-            self.conversations[conversation_id].append({
-                "role": "assistant",
-                "content": response,
-                "timestamp": datetime.now().isoformat()
-            })
+            response = "".join(parts)
+            self._append_turn(conversation_id, "assistant", response)
+            if not slot.dropped:
+                await self._semantic_store(message, response, cache_vector)
             
-            # Update metrics
             response_time = time.time() - start_time
             self.message_count += 1
             self.total_response_time += response_time
+            self.budget.observe(response_time)
             
-            logger.info(f"Processed message in {response_time:.2f}s")
-            return response
+            if shadow_job and not slot.dropped:
+                self.shadow.submit(shadow_job, model, response_time * 1000, response, timings)
+            if route and not slot.dropped:
+                tokens = self._generation_tokens(timings)
+                self.cascade.record_attempt(model, tokens, response_time * 1000)
+                self.cascade.record_served(model, tokens, response_time * 1000, response_time * 1000)
             
-        except Exception as e:
-            logger.error(f"Error processing message: {e}")
-            return f"I apologize, but I encountered an error processing your message: {str(e)}"
+            log.info("message_streamed", provider=self.model_provider,
+                     duration_s=round(response_time, 3), budget=budget["level"])
+            done = {"type": "done", "response": response, "timings": timings, "budget": budget}
+            if route:
+                done["cascade"] = route
+            yield done
+    
+    def _shadow_prepare(self, message: str, conversation_id: str, budget: dict) -> Optional[dict]:
+        """Capture the prompt and options of a request sampled for shadowing (history holds the new user turn)"""
+        if self.shadow is None or self.model_provider not in ("ollama", "sim"):
+            return None
+        if not self.shadow.should_sample():
+            return None
+        return self.shadow.prepare(self._build_prompt(message, conversation_id, budget),
+                                   self.budget.ollama_options(budget))
+    
+    async def _cascade_route(self, message: str) -> Optional[dict]:
+        """Pick the model tier for a request, or None when cascade routing does not apply"""
+        if self.cascade is None or self.model_provider not in ("ollama", "sim"):
+            return None
+        with tracer.span("cascade.route"):
+            route = await self.cascade.route(message, self.model_name)
+            tracer.set_attribute("tier", route["model"])
+        return route
+    
+    @staticmethod
+    def _generation_tokens(timings: Optional[dict]) -> int:
+        timings = timings or {}
+        return timings.get("prompt_eval_count", 0) + timings.get("eval_count", 0)
+    
+    async def _generate_cascade(self, message: str, conversation_id: str, budget: dict, route: dict,
+                                timings: dict = None) -> str:
+        """
+        Generate on the routed tier, moving up one tier at a time while the
+        answer fails the cascade's confidence checks. Updates route["model"]
+        to the tier that produced the returned answer, and `timings` (if
+        given) with that attempt's timings.
+        """
+        start = time.perf_counter()
+        model = route["model"]
+        while True:
+            attempt_timings = {}
+            attempt_start = time.perf_counter()
+            error = None
+            try:
+                if self.model_provider == "ollama":
+                    response = await self._process_ollama_message(message, conversation_id, budget, model,
+                                                                  attempt_timings)
+                else:
+                    response = await self._process_sim_message(message, conversation_id, budget, model,
+                                                               attempt_timings)
+                failure = self.cascade.assess(message, response, attempt_timings, budget["num_predict"])
+            except Exception as e:
+                error, failure = e, "error"
+            latency_ms = (time.perf_counter() - attempt_start) * 1000
+            tokens = self._generation_tokens(attempt_timings)
+            
+            next_model = self.cascade.next_tier(model) if failure and self.cascade.should_escalate(route) else None
+            if next_model is None:
+                if error is not None:
+                    raise error
+                self.cascade.record_attempt(model, tokens, latency_ms)
+                self.cascade.record_served(model, tokens, latency_ms, (time.perf_counter() - start) * 1000)
+                route["model"] = model
+                if timings is not None:
+                    timings.update(attempt_timings)
+                return response
+            
+            logger.info(f"Cascade escalating from {model} to {next_model}: {failure}")
+            self.cascade.record_attempt(model, tokens, latency_ms, failure)
+            self.cascade.record_escalation(route, model, next_model, failure)
+            model = next_model
+            budget = self.budget.budget_for(model, self.limiter.inflight)
+    
+    # Provider fallbacks returned as text; never cached
+    TRANSIENT_RESPONSES = (
+        "I apologize",
+        "The model is currently loading"
+    )
+    
+    async def _semantic_lookup(self, message: str, conversation_id: str):
+        """
+        Look up a cached answer for the opening prompt of a conversation.
+        Follow-up turns depend on history, so they are never cached.
+        Returns (hit, vector); vector is passed to _semantic_store on a miss.
+        """
+        if self.semantic_cache is None or self.conversations.get(conversation_id):
+            return None, None
+        with tracer.span("semantic_cache.lookup"):
+            hit, vector = await self.semantic_cache.lookup(message)
+            tracer.set_attribute("hit", hit is not None)
+            if hit:
+                # The slot identifies the entry; the matched prompt is another user's and never recorded
+                tracer.set_attribute("similarity", hit["similarity"])
+                tracer.set_attribute("slot", hit["slot"])
+        return hit, vector
+    
+    async def _semantic_store(self, message: str, response: str, vector):
+        if vector is None or not response or response.startswith(self.TRANSIENT_RESPONSES):
+            return
+        await self.semantic_cache.store(message, response, vector)
+    
+    def _serve_cached(self, message: str, conversation_id: str, hit: dict, start_time: float) -> str:
+        self._append_turn(conversation_id, "user", message)
+        self._append_turn(conversation_id, "assistant", hit["response"])
+        response_time = time.time() - start_time
+        self.message_count += 1
+        self.total_response_time += response_time
+        log.info("message_processed", provider=self.model_provider, duration_s=round(response_time, 3),
+                 cache="hit", similarity=hit["similarity"])
+        return hit["response"]
+    
+    @staticmethod
+    def _cache_metadata(hit: dict) -> dict:
+        # The cache is shared across users: never echo the matched prompt to the caller
+        return {"hit": True, "similarity": hit["similarity"]}
+    
+    async def _stream_single(self, message: str, conversation_id: str):
+        """Adapt a non-streaming provider to the streaming interface"""
+        if self.model_provider == "huggingface":
+            response = await self._process_huggingface_message(message, conversation_id)
+        else:
+            response = await self._process_mock_message(message, conversation_id)
+        yield response, None
+    
+    def _build_prompt(self, message: str, conversation_id: str, budget: dict = None) -> str:
+        """Build a completion prompt with recent conversation context"""
+        max_messages = budget["context_messages"] if budget else 5
+        with tracer.span("prompt.build", context_messages=max_messages):
+            context = self._get_conversation_context(conversation_id, max_messages)
+            return f"Context: {context}\nUser: {message}\nAssistant:"
     
-    async def _process_ollama_message(self, message: str, conversation_id: str) -> str:
-        """Process message using Ollama"""
+    def _trace_timings(self, timings: dict, end: float):
+        """Record Ollama-style load/prefill/decode durations as back-to-back spans ending at `end`"""
+        phases = [
+            ("model.load", timings.get("load_duration", 0) / 1e9, {}),
+            ("prefill", timings.get("prompt_eval_duration", 0) / 1e9, {"tokens": timings.get("prompt_eval_count")}),
+            ("decode", timings.get("eval_duration", 0) / 1e9, {"tokens": timings.get("eval_count")})
+        ]
+        start = end - sum(duration for _, duration, _ in phases)
+        for name, duration, attributes in phases:
+            if duration > 0:
+                tracer.add_span(name, start, start + duration, **attributes)
+                start += duration
+    
+    def _get_http_client(self) -> httpx.AsyncClient:
+        """Shared keep-alive client for generation calls; created on first use, closed in cleanup()"""
+        if self._http_client is None or self._http_client.is_closed:
+            max_connections = int(os.getenv("LLM_HTTP_MAX_CONNECTIONS", "32"))
+            self._http_client = httpx.AsyncClient(
+                timeout=180.0,
+                limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+            )
+        return self._http_client
+    
+    def _ollama_payload(self, message: str, conversation_id: str, budget: dict, stream: bool,
+                        model: str = None) -> dict:
+        model = model or self.model_name
+        budget = budget or self.budget.budget_for(model)
+        return {
+            "model": model,
+            "prompt": self._build_prompt(message, conversation_id, budget),
+            "stream": stream,
+            "options": self.budget.ollama_options(budget)
+        }
+    
+    async def _process_ollama_message(self, message: str, conversation_id: str, budget: dict = None,
+                                      model: str = None, timings: dict = None) -> str:
+        """Process message using Ollama; `timings` (if given) receives Ollama's timing fields"""
+        model = model or self.model_name
         try:
-            async with httpx.AsyncClient(timeout=180.0, http2=False) as client:
-                # Get conversation context
-                context = self._get_conversation_context(conversation_id)
-                
-                prompt_data = {
-                    "model": self.model_name,
-                    "prompt": f"Context: {context}\nUser: {message}\nAssistant:",
-                    "stream": False
-                }
+            with tracer.span("ollama.generate"):
+                client = self._get_http_client()
+                prompt_data = self._ollama_payload(message, conversation_id, budget, stream=False, model=model)
                 
+                request_start = time.perf_counter()
                 response = await client.post(
                     f"{self.base_url}/api/generate",
                     json=prompt_data
                 )
+                request_end = time.perf_counter()
+                tracer.set_attribute("status_code", response.status_code)
                 
                 if response.status_code == 200:
                     result = response.json()
+                    # Time not covered by Ollama's own timings: connect, HTTP and queueing
+                    upstream_wait = (request_end - request_start) - result.get("total_duration", 0) / 1e9
+                    if upstream_wait > 0:
+                        tracer.add_span("upstream.wait", request_start, request_start + upstream_wait)
+                    self._trace_timings(result, request_end)
+                    self.telemetry.record(model, result, conversation_id)
+                    if timings is not None:
+                        timings.update({key: result[key] for key in self.TIMING_FIELDS + ("done_reason",) if key in result})
                     return result.get("response", "No response generated")
                 else:
                     raise Exception(f"Ollama API error: {response.status_code}")
@@ -301,82 +911,160 @@ class LLMService:
             logger.error(f"Ollama processing error: {e}")
             raise
     
+    async def _stream_ollama_message(self, message: str, conversation_id: str, budget: dict = None,
+                                     model: str = None):
+        """Stream a response from Ollama, yielding (delta, timings) pairs"""
+        model = model or self.model_name
+        prompt_data = self._ollama_payload(message, conversation_id, budget, stream=True, model=model)
+        with tracer.span("ollama.stream"):
+            start = time.perf_counter()
+            first_token = None
+            client = self._get_http_client()
+            async with client.stream("POST", f"{self.base_url}/api/generate", json=prompt_data) as response:
+                if response.status_code != 200:
+                    raise Exception(f"Ollama API error: {response.status_code}")
+                tracer.add_span("upstream.headers", start, time.perf_counter())
+                async for line in response.aiter_lines():
+                    if not line.strip():
+                        continue
+                    chunk = json.loads(line)
+                    if "error" in chunk:
+                        raise Exception(f"Ollama API error: {chunk['error']}")
+                    if first_token is None:
+                        first_token = time.perf_counter()
+                        tracer.set_attribute("ttft_ms", round((first_token - start) * 1000, 1))
+                    timings = None
+                    if chunk.get("done"):
+                        timings = {key: chunk[key] for key in self.TIMING_FIELDS if key in chunk}
+                        self._trace_timings(timings, time.perf_counter())
+                        self.telemetry.record(model, timings, conversation_id)
+                    yield chunk.get("response", ""), timings
+    
+    async def _process_sim_message(self, message: str, conversation_id: str, budget: dict = None,
+                                   model: str = None, timings: dict = None) -> str:
+        """Process message using the latency simulator; `timings` (if given) receives the simulated timings"""
+        parts = []
+        async for delta, final_timings in self._stream_sim_message(message, conversation_id, budget, model):
+            parts.append(delta)
+            if final_timings and timings is not None:
+                timings.update(final_timings)
+        return "".join(parts)
+    
+    async def _stream_sim_message(self, message: str, conversation_id: str, budget: dict = None,
+                                  model: str = None):
+        """Stream a simulated response, yielding (delta, timings) pairs"""
+        if self.sim_engine is None:
+            from .sim_engine import SimulatedInferenceEngine
+            self.sim_engine = SimulatedInferenceEngine(**self.sim_config)
+        prompt = self._build_prompt(message, conversation_id, budget)
+        max_tokens = budget["num_predict"] if budget else None
+        with tracer.span("sim.generate"):
+            start = time.perf_counter()
+            async for delta, timings in self.sim_engine.generate(prompt, max_tokens):
+                if timings:
+                    end = time.perf_counter()
+                    # Slot wait is whatever the simulated phases don't account for
+                    busy = sum(timings.get(key, 0) for key in ("load_duration", "prompt_eval_duration", "eval_duration")) / 1e9
+                    if end - start - busy > 0:
+                        tracer.add_span("queue.wait", start, end - busy)
+                    self._trace_timings(timings, end)
+                    self.telemetry.record(model or self.model_name, timings, conversation_id)
+                yield delta, timings
+    
+    def _huggingface_payload(self, message: str, conversation_id: str):
+        """Build the (inputs, parameters) pair for the current Hugging Face model"""
+        if "flan-t5" in self.model_name.lower():
+            # For T5 models, format as question
+            return f"Question: {message}", {
+                "max_length": 200,
+                "temperature": 0.7,
+                "do_sample": True
+            }
+        if "dialogpt" in self.model_name.lower():
+            # For DialoGPT, include conversation history
+            context = self._get_conversation_context(conversation_id)
+            full_context = f"{context}\nUser: {message}\nBot:" if context else f"User: {message}\nBot:"
+            return full_context, {
+                "max_length": 100,
+                "temperature": 0.7,
+                "return_full_text": False
+            }
+        # Generic text generation
+        return f"User: {message}\nAssistant:", {
+            "max_length": 150,
+            "temperature": 0.7,
+            "return_full_text": False
+        }
+    
+    def _get_hf_batcher(self):
+        if self.hf_batcher is None:
+            from .micro_batcher import MicroBatcher
+            self.hf_batcher = MicroBatcher(
+                self._send_huggingface_batch,
+                max_batch_size=int(os.getenv("HF_BATCH_MAX_SIZE", "8")),
+                max_wait=float(os.getenv("HF_BATCH_MAX_WAIT_MS", "25")) / 1000.0
+            )
+        return self.hf_batcher
+    
+    async def _send_huggingface_batch(self, key: tuple, inputs: List[str]) -> list:
+        """Send one Inference API call for a micro-batch; returns one result per input"""
+        from .micro_batcher import BatchError
+        model_name, parameters = key[0], json.loads(key[1])
+        headers = {"Content-Type": "application/json"}
+        if self.hf_api_token:
+            headers["Authorization"] = f"Bearer {self.hf_api_token}"
+        
+        # A single input keeps the plain string form of the API
+        payload = {"inputs": inputs if len(inputs) > 1 else inputs[0], "parameters": parameters}
+        async with httpx.AsyncClient() as client:
+            response = await client.post(
+                f"{self.hf_api_url}/{model_name}",
+                headers=headers,
+                json=payload,
+                timeout=30.0
+            )
+        
+        if response.status_code != 200:
+            logger.error(f"HF API error {response.status_code}: {response.text}")
+            raise BatchError(f"Hugging Face API error: {response.status_code}", status_code=response.status_code)
+        
+        result = response.json()
+        if len(inputs) == 1:
+            result = [result]
+        elif not isinstance(result, list):
+            raise BatchError(f"Unexpected Hugging Face batch response: {str(result)[:200]}")
+        return [
+            BatchError(f"Hugging Face API error: {item['error']}") if isinstance(item, dict) and "error" in item else item
+            for item in result
+        ]
+    
     async def _process_huggingface_message(self, message: str, conversation_id: str) -> str:
         """Process message using Hugging Face Inference API"""
+        from .micro_batcher import BatchError
         try:
-            async with httpx.AsyncClient() as client:
-                # Prepare headers
-                headers = {"Content-Type": "application/json"}
-                if self.hf_api_token:
-                    headers["Authorization"] = f"Bearer {self.hf_api_token}"
-                
-                # Build API URL
-                api_url = f"https://api-inference.huggingface.co/models/{self.model_name}"
-                
-                # Get conversation context
-                context = self._get_conversation_context(conversation_id)
-                
-                # Prepare payload based on model type
-                if "flan-t5" in self.model_name.lower():
-                    # For T5 models, format as question
-                    payload = {
-                        "inputs": f"Question: {message}",
-                        "parameters": {
-                            "max_length": 200,
-                            "temperature": 0.7,
-                            "do_sample": True
-                        }
-                    }
-                elif "dialogpt" in self.model_name.lower():
-                    # For DialoGPT, include conversation history
-                    full_context = f"{context}\nUser: {message}\nBot:" if context else f"User: {message}\nBot:"
-                    payload = {
-                        "inputs": full_context,
-                        "parameters": {
-                            "max_length": 100,
-                            "temperature": 0.7,
-                            "return_full_text": False
-                        }
-                    }
-                else:
-                    # Generic text generation
-                    payload = {
-                        "inputs": f"User: {message}\nAssistant:",
-                        "parameters": {
-                            "max_length": 150,
-                            "temperature": 0.7,
-                            "return_full_text": False
-                        }
-                    }
-                
-                response = await client.post(
-                    api_url,
-                    headers=headers,
-                    json=payload,
-                    timeout=30.0
-                )
-                
-                if response.status_code == 200:
-                    result = response.json()
-                    
-                    # Handle different response formats
-                    if isinstance(result, list) and len(result) > 0:
-                        if "generated_text" in result[0]:
-                            generated_text = result[0]["generated_text"]
-                            # Clean up the response
-                            if full_context in generated_text:
-                                generated_text = generated_text.replace(full_context, "").strip()
-                            return generated_text or "I understand, but I don't have a specific response right now."
-                        else:
-                            return str(result[0])
-                    else:
-                        return "I received your message but couldn't generate a proper response."
-                        
-                elif response.status_code == 503:
+            inputs, parameters = self._huggingface_payload(message, conversation_id)
+            key = (self.model_name, json.dumps(parameters, sort_keys=True))
+            try:
+                with tracer.span("huggingface.generate"):
+                    result = await self._get_hf_batcher().submit(key, inputs)
+            except BatchError as e:
+                if e.status_code == 503:
                     return "The model is currently loading. Please try again in a moment."
+                raise
+            
+            # Handle different response formats
+            generations = result if isinstance(result, list) else [result]
+            if len(generations) > 0:
+                if isinstance(generations[0], dict) and "generated_text" in generations[0]:
+                    generated_text = generations[0]["generated_text"]
+                    # Clean up the response
+                    if inputs in generated_text:
+                        generated_text = generated_text.replace(inputs, "").strip()
+                    return generated_text or "I understand, but I don't have a specific response right now."
                 else:
-                    logger.error(f"HF API error {response.status_code}: {response.text}")
-                    raise Exception(f"Hugging Face API error: {response.status_code}")
+                    return str(generations[0])
+            else:
+                return "I received your message but couldn't generate a proper response."
                     
         except Exception as e:
             logger.error(f"Hugging Face processing error: {e}")
@@ -399,7 +1087,7 @@ class LLMService:
         response_index = hash(message) % len(mock_responses)
         return mock_responses[response_index]
     
-    def _get_conversation_context(self, conversation_id: str) -> str:
+    def _get_conversation_context(self, conversation_id: str, max_messages: int = 5) -> str:
         """Get conversation context for Ollama prompts"""
         conversation = self.conversations.get(conversation_id, [])
         if not conversation:
@@ -407,13 +1095,16 @@ class LLMService:
         
         # Format recent messages as context
         context_messages = []
-        for msg in conversation[-5:]:  # Last 5 messages
+        for msg in conversation[-max_messages:]:  # Most recent messages
             context_messages.append(f"{msg['role'].title()}: {msg['content']}")
         
         return "\n".join(context_messages)
     
     async def health_check(self) -> bool:
         """Check if the LLM service is healthy"""
+        if self.fatal_error:
+            # Only a restart can help (see _pull_gave_up)
+            return False
         try:
             if self.model_provider == "ollama":
                 async with httpx.AsyncClient() as client:
@@ -426,7 +1117,7 @@ class LLMService:
                     if self.hf_api_token:
                         headers["Authorization"] = f"Bearer {self.hf_api_token}"
                     
-                    api_url = f"https://api-inference.huggingface.co/models/{self.model_name}"
+                    api_url = f"{self.hf_api_url}/{self.model_name}"
                     test_payload = {"inputs": "Hello"}
                     
                     response = await client.post(
@@ -438,7 +1129,7 @@ class LLMService:
                     # 200 (OK) or 503 (model loading) are both acceptable
                     healthy = response.status_code in [200, 503]
             else:
-                healthy = True  # Mock is always healthy
+                healthy = True  # Mock and sim are always healthy
             
             self.last_health_check = datetime.now()
             return healthy
@@ -453,8 +1144,33 @@ class LLMService:
             "model_provider": self.model_provider,
             "model_name": self.model_name,
             "model_loaded": self.model_loaded,
+            "serving_fallback": self.serving_fallback,
+            "init_retries": self.init_retries,
+            "fatal_error": self.fatal_error,
             "is_initialized": self.is_initialized,
-            "last_health_check": self.last_health_check.isoformat() if self.last_health_check else None
+            "last_health_check": self.last_health_check.isoformat() if self.last_health_check else None,
+            "pull": self.active_pull.to_dict() if self.active_pull else None,
+            "sim": self.sim_engine.get_stats() if self.model_provider == "sim" and self.sim_engine else None,
+            "concurrency": self.limiter.get_stats(),
+            "generation_budget": self.budget.get_stats(),
+            "conversation_store": self.conversation_store.get_stats() if self.conversation_store else None,
+            "hf_batching": self.hf_batcher.get_stats() if self.hf_batcher else None,
+            "semantic_cache": self.semantic_cache.get_stats() if self.semantic_cache else None,
+            "generation_telemetry": self.telemetry.get_stats(),
+            "cascade": self.cascade.get_stats() if self.cascade else None,
+            "shadow": self.shadow.get_stats() if self.shadow else None
+        }
+    
+    def memory_sources(self) -> dict:
+        """In-memory state worth sizing when a pod's memory grows (see MemoryInspector)"""
+        return {
+            "conversations": self.conversations,
+            "semantic_cache": self.semantic_cache,
+            "generation_telemetry": self.telemetry,
+            "http_client": self._http_client,
+            "hf_batcher": self.hf_batcher,
+            "conversation_store": self.conversation_store,
+            "pull_jobs": self.pull_jobs
         }
     
     async def is_model_loaded(self) -> bool:
@@ -478,5 +1194,20 @@ class LLMService:
     async def cleanup(self):
         """Cleanup resources"""
         logger.info("Cleaning up LLM service resources")
+        self.cancel_model_pull()
+        if self._init_retry_task is not None:
+            self._init_retry_task.cancel()
+            self._init_retry_task = None
+        if self.hf_batcher is not None:
+            await self.hf_batcher.close()
+        if self._http_client is not None:
+            await self._http_client.aclose()
+            self._http_client = None
+        if self.shadow is not None:
+            await self.shadow.close()
+        if self.conversation_store is not None and self._conversations_restored:
+            # Persist everything before dropping it so a replacement pod can pick it up
+            await self.conversation_store.close()
+            self._conversations_restored = False
         self.conversations.clear()
         self.is_initialized = False 
\ No newline at end of file
@@ -0,0 +1,212 @@
+"""
+Structured, non-blocking logging.
+
+Log calls on the event loop only filter the record, capture the bound
+context (request/conversation ids) and put it on a bounded queue; a
+background thread renders JSON and writes it out. uvicorn's server and
+access loggers are routed the same way. When the queue is full
+records are dropped rather than blocking. High-volume events can be sampled
+(LOG_SAMPLE_RATES) and every event or logger is rate limited
+(LOG_RATE_LIMIT_PER_SEC); warnings and errors are never sampled or limited.
+"""
+import atexit
+import copy
+import logging
+import os
+import queue
+import random
+import sys
+import time
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional
+
+import structlog
+
+_listener: Optional[QueueListener] = None
+_queue_handler: Optional["NonBlockingQueueHandler"] = None
+_sampling_filter: Optional["SamplingFilter"] = None
+_atexit_registered = False
+
+# Loggers uvicorn configures with its own synchronous stdout handlers
+SERVER_LOGGERS = ("uvicorn", "uvicorn.error", "uvicorn.access")
+
+
+def parse_sample_rates(value: str) -> Dict[str, float]:
+    """Parse "event=rate,event=rate" into a dict"""
+    rates = {}
+    for item in filter(None, (part.strip() for part in (value or "").split(","))):
+        name, _, rate = item.partition("=")
+        rates[name.strip()] = float(rate)
+    return rates
+
+
+class SamplingFilter(logging.Filter):
+    """Per-event sampling plus a token bucket per event (or logger) name"""
+
+    def __init__(self, sample_rates: Dict[str, float] = None, rate_per_sec: float = 100.0):
+        super().__init__()
+        self.sample_rates = sample_rates or {}
+        self.rate_per_sec = rate_per_sec
+        self._buckets: Dict[str, list] = {}  # key -> [tokens, updated]
+        self._suppressed: Dict[str, int] = {}
+        self.sampled_out: Dict[str, int] = {}
+        self.rate_limited: Dict[str, int] = {}
+
+    @staticmethod
+    def event_key(record: logging.LogRecord) -> str:
+        if isinstance(record.msg, dict):
+            return record.msg.get("event", record.name)
+        return record.name
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        key = self.event_key(record)
+
+        rate = self.sample_rates.get(key, 1.0)
+        if rate < 1.0 and random.random() >= rate:
+            self.sampled_out[key] = self.sampled_out.get(key, 0) + 1
+            return False
+
+        if self.rate_per_sec > 0:
+            now = time.monotonic()
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = [self.rate_per_sec, now]
+            bucket[0] = min(self.rate_per_sec, bucket[0] + (now - bucket[1]) * self.rate_per_sec)
+            bucket[1] = now
+            if bucket[0] < 1:
+                self.rate_limited[key] = self.rate_limited.get(key, 0) + 1
+                self._suppressed[key] = self._suppressed.get(key, 0) + 1
+                return False
+            bucket[0] -= 1
+
+        suppressed = self._suppressed.pop(key, 0)
+        if suppressed:
+            record.suppressed = suppressed
+        return True
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """QueueHandler that never blocks the caller and defers formatting to the listener"""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Only cheap work here: rendering happens on the listener thread
+        record = copy.copy(record)
+        record.log_context = structlog.contextvars.get_contextvars()
+        if not isinstance(record.msg, dict):
+            record.msg = record.getMessage()
+            record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def _add_record_fields(logger, method_name, event_dict):
+    """Fill timestamp, level, logger and captured context from the LogRecord"""
+    record = event_dict.get("_record")
+    if record is None:
+        return event_dict
+    event_dict.setdefault("timestamp", datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat())
+    event_dict.setdefault("level", record.levelname.lower())
+    event_dict.setdefault("logger", record.name)
+    for key, value in getattr(record, "log_context", {}).items():
+        event_dict.setdefault(key, value)
+    if getattr(record, "suppressed", 0):
+        event_dict["suppressed"] = record.suppressed
+    if record.exc_text:
+        event_dict["exception"] = record.exc_text
+    return event_dict
+
+
+def configure_logging(level: str = None, fmt: str = None, stream=None, queue_size: int = None,
+                      sample_rates: Dict[str, float] = None, rate_per_sec: float = None):
+    """Route stdlib and structlog logging through a bounded queue to a writer thread"""
+    global _listener, _queue_handler, _sampling_filter, _atexit_registered
+    shutdown_logging()
+    if not _atexit_registered:
+        atexit.register(shutdown_logging)
+        _atexit_registered = True
+
+    level = (level or os.getenv("LOG_LEVEL", "INFO")).upper()
+    fmt = fmt or os.getenv("LOG_FORMAT", "json")
+    queue_size = queue_size or int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+    if sample_rates is None:
+        sample_rates = parse_sample_rates(os.getenv("LOG_SAMPLE_RATES", ""))
+    if rate_per_sec is None:
+        rate_per_sec = float(os.getenv("LOG_RATE_LIMIT_PER_SEC", "100"))
+
+    renderer = structlog.dev.ConsoleRenderer(colors=False) if fmt == "console" else structlog.processors.JSONRenderer()
+    formatter = structlog.stdlib.ProcessorFormatter(
+        processors=[
+            _add_record_fields,
+            structlog.stdlib.ProcessorFormatter.remove_processors_meta,
+            renderer
+        ]
+    )
+    output = logging.StreamHandler(stream or sys.stdout)
+    output.setFormatter(formatter)
+
+    _sampling_filter = SamplingFilter(sample_rates, rate_per_sec)
+    _queue_handler = NonBlockingQueueHandler(queue.Queue(maxsize=queue_size))
+    _queue_handler.addFilter(_sampling_filter)
+    _listener = QueueListener(_queue_handler.queue, output, respect_handler_level=False)
+    _listener.start()
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        if isinstance(handler, (NonBlockingQueueHandler, logging.StreamHandler)) and \
+                not type(handler).__module__.startswith("_pytest"):
+            root.removeHandler(handler)
+    root.addHandler(_queue_handler)
+    root.setLevel(level)
+    # Access and server logs go through the queue too (JSON, sampled, off the event loop), at LOG_LEVEL
+    for name in SERVER_LOGGERS:
+        server_logger = logging.getLogger(name)
+        for handler in list(server_logger.handlers):
+            server_logger.removeHandler(handler)
+        server_logger.setLevel(logging.NOTSET)
+        server_logger.propagate = True
+
+    structlog.configure(
+        processors=[
+            structlog.stdlib.filter_by_level,
+            structlog.processors.format_exc_info,
+            structlog.stdlib.ProcessorFormatter.wrap_for_formatter
+        ],
+        logger_factory=structlog.stdlib.LoggerFactory(),
+        wrapper_class=structlog.stdlib.BoundLogger,
+        cache_logger_on_first_use=True
+    )
+
+
+def shutdown_logging():
+    """Flush queued records and stop the writer thread"""
+    global _listener, _queue_handler
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+    if _queue_handler is not None:
+        logging.getLogger().removeHandler(_queue_handler)
+        _queue_handler = None
+
+
+def get_logging_stats() -> dict:
+    return {
+        "queued": _queue_handler.queue.qsize() if _queue_handler else 0,
+        "dropped_queue_full": _queue_handler.dropped if _queue_handler else 0,
+        "sampled_out": dict(_sampling_filter.sampled_out) if _sampling_filter else {},
+        "rate_limited": dict(_sampling_filter.rate_limited) if _sampling_filter else {}
+    }
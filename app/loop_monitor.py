@@ -0,0 +1,162 @@
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from datetime import datetime
+from typing import List, Optional
+
+from .stats import percentile
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds in seconds; the last bucket is open-ended
+LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+_APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+class LoopLagMonitor:
+    """
+    Measures event-loop lag: a timer scheduled every `interval` seconds
+    records how late it actually fired. Any blocking call on the loop shows up
+    as lag, for every connection at once.
+
+    The optional slow-callback detector runs a watchdog thread. When the
+    timer is more than `slow_threshold_ms` overdue, the watchdog captures the
+    loop thread's stack, which shows the code that is blocking. One capture
+    per stall is kept in a ring buffer.
+    """
+
+    def __init__(self, interval: float = None, enabled: bool = None, detect_slow: bool = None,
+                 slow_threshold_ms: float = None, buffer_size: int = None, window: int = 1000):
+        if enabled is None:
+            enabled = os.getenv("LOOP_MONITOR_ENABLED", "true").lower() == "true"
+        if detect_slow is None:
+            detect_slow = os.getenv("SLOW_CALLBACK_DETECTOR_ENABLED", "false").lower() == "true"
+        self.enabled = enabled
+        self.detect_slow = detect_slow
+        self.interval = interval or float(os.getenv("LOOP_MONITOR_INTERVAL", "0.1"))
+        self.slow_threshold = (slow_threshold_ms or float(os.getenv("SLOW_CALLBACK_THRESHOLD_MS", "100"))) / 1000
+        self.slow_callbacks = deque(maxlen=buffer_size or int(os.getenv("SLOW_CALLBACK_BUFFER", "50")))
+
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._loop_thread_id: Optional[int] = None
+        # Monotonic time the timer is next due; read by the watchdog thread
+        self._due: Optional[float] = None
+
+        # Measurements
+        self.samples = 0
+        self.bucket_counts = [0] * (len(LAG_BUCKETS) + 1)
+        self.lag_sum = 0.0
+        self.lag_max = 0.0
+        self.recent = deque(maxlen=window)
+        self.slow_callback_count = 0
+
+    def start(self) -> bool:
+        """Start sampling on the running loop (and the watchdog when enabled)"""
+        if not self.enabled or self._task is not None:
+            return False
+        self._loop_thread_id = threading.get_ident()
+        self._stop.clear()
+        self._task = asyncio.get_running_loop().create_task(self._sample())
+        if self.detect_slow:
+            self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+            self._watchdog.start()
+        return True
+
+    async def stop(self):
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._watchdog is not None:
+            await asyncio.to_thread(self._watchdog.join, 1.0)
+            self._watchdog = None
+
+    async def _sample(self):
+        while True:
+            self._due = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            self.observe(max(0.0, time.monotonic() - self._due))
+
+    def observe(self, lag: float):
+        self.samples += 1
+        self.lag_sum += lag
+        self.lag_max = max(self.lag_max, lag)
+        self.recent.append(lag)
+        for index, bound in enumerate(LAG_BUCKETS):
+            if lag <= bound:
+                self.bucket_counts[index] += 1
+                break
+        else:
+            self.bucket_counts[-1] += 1
+
+    def _watch(self):
+        captured_for = None
+        poll = min(self.slow_threshold / 2, 0.05)
+        while not self._stop.wait(poll):
+            due = self._due
+            if due is None:
+                continue
+            overdue = time.monotonic() - due
+            if overdue < self.slow_threshold:
+                continue
+            if captured_for == due:
+                # Same stall; keep its duration current
+                self.slow_callbacks[-1]["blocked_ms"] = round(overdue * 1000, 1)
+                continue
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                continue
+            captured_for = due
+            self.slow_callback_count += 1
+            self.slow_callbacks.append(self._capture(frame, overdue))
+
+    @staticmethod
+    def _capture(frame, overdue: float) -> dict:
+        stack = traceback.extract_stack(frame)
+        # Innermost frame in our own code: usually the line to fix
+        app_frame = next((f for f in reversed(stack) if f.filename.startswith(_APP_DIR)), None)
+        return {
+            "timestamp": datetime.now().isoformat(),
+            "blocked_ms": round(overdue * 1000, 1),
+            "app_frame": f"{app_frame.filename}:{app_frame.lineno} in {app_frame.name}" if app_frame else None,
+            "stack": traceback.format_list(stack[-30:])
+        }
+
+    def percentile(self, p: float) -> Optional[float]:
+        return percentile(self.recent, p)
+
+    def get_stats(self) -> dict:
+        def ms(value):
+            return round(value * 1000, 2) if value is not None else None
+
+        return {
+            "enabled": self.enabled,
+            "running": self._task is not None,
+            "interval_ms": ms(self.interval),
+            "samples": self.samples,
+            "lag_ms_p50": ms(self.percentile(50)),
+            "lag_ms_p99": ms(self.percentile(99)),
+            "lag_ms_max": ms(self.lag_max),
+            "slow_callback_detector": self.detect_slow,
+            "slow_threshold_ms": ms(self.slow_threshold),
+            "slow_callbacks": self.slow_callback_count
+        }
+
+    def get_slow_callbacks(self, limit: int = 20) -> List[dict]:
+        """Most recent captures first"""
+        return list(reversed(self.slow_callbacks))[:limit]
+
+
+loop_monitor = LoopLagMonitor()
@@ -1,21 +1,37 @@
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException
+from .startup import startup_timer  # first, so import time is measured
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, JSONResponse, StreamingResponse, Response
+import base64
+import ipaddress
 import json
 import logging
 import os
 from typing import List
 import asyncio
+import uuid
 from datetime import datetime
 from pydantic import BaseModel
+import httpx
+import structlog
 
-from .models import ChatMessage, ChatResponse
+from .models import ChatMessage, ChatResponse, EmbeddingRequest, ForwardedTurn
 from .llm_service import LLMService
 from .connection_manager import ConnectionManager
+from .concurrency_limiter import DrainingError, OverloadedError
+from .rate_limiter import RateLimiter, RateLimitExceeded, estimate_tokens
+from .metrics_exporter import build_registry, render_metrics
+from .tracing import tracer
+from .logging_config import configure_logging, get_logging_stats
+from .drain import DrainController, WS_CLOSE_SERVICE_RESTART
+
+startup_timer.mark("imports")
 
 # Configure logging
-logging.basicConfig(level=logging.INFO)
+with startup_timer.phase("logging_setup"):
+    configure_logging()
 logger = logging.getLogger(__name__)
+log = structlog.get_logger(__name__)
 
 app = FastAPI(
     title="Scalable LLM Chatbot",
@@ -32,9 +48,74 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress complete REST responses (streams pass through)
+compression_stats = None
+if os.getenv("COMPRESSION_ENABLED", "true").lower() == "true":
+    from .compression import CompressionMiddleware, compression_stats
+    app.add_middleware(CompressionMiddleware)
+
 # Initialize services
 llm_service = LLMService()
 connection_manager = ConnectionManager()
+rate_limiter = RateLimiter()
+drain_controller = DrainController(llm_service, connection_manager)
+embedding_service = None  # EmbeddingService, created on the first /embeddings request
+
+# Optional services: imported and constructed only when enabled
+loop_monitor = None
+if os.getenv("LOOP_MONITOR_ENABLED", "true").lower() == "true":
+    from .loop_monitor import loop_monitor
+
+metrics_registry = build_registry(llm_service, connection_manager, rate_limiter, lambda: embedding_service,
+                                  loop_monitor)
+
+# Chat turns go through the ownership router: local when this replica owns the conversation
+ownership = None
+if os.getenv("OWNERSHIP_ENABLED", "false").lower() == "true":
+    from .ownership import OwnershipRouter
+    ownership = OwnershipRouter(llm_service)
+
+traffic_capture = None
+if os.getenv("TRAFFIC_CAPTURE_ENABLED", "false").lower() == "true":
+    from .traffic_capture import traffic_capture
+
+def build_memory_inspector():
+    """Memory inspector over the service's in-memory state"""
+    from .memory_profiler import MemoryInspector
+    inspector = MemoryInspector(enabled=True)
+    inspector.register(llm_service.memory_sources)
+    inspector.register(lambda: {
+        "websocket_connections": connection_manager.active_connections,
+        "websocket_metadata": connection_manager.connection_metadata,
+        "rate_limit_buckets": rate_limiter.buckets,
+        "trace_buffer": tracer.recent
+    })
+    # WebSocket scopes reference the app; don't count it against every connection
+    inspector.exclude_from_sizes(app, llm_service, connection_manager, rate_limiter, tracer)
+    return inspector
+
+memory_inspector = None
+if os.getenv("DEBUG_MEMORY_ENABLED", "false").lower() == "true":
+    memory_inspector = build_memory_inspector()
+
+# Trace attributes and stack captures are internal details; their endpoints are opt-in like /debug/memory
+debug_traces_enabled = os.getenv("DEBUG_TRACES_ENABLED", "false").lower() == "true"
+debug_loop_enabled = os.getenv("DEBUG_LOOP_ENABLED", "false").lower() == "true"
+
+def _chat_backend():
+    """Where chat turns go: the ownership router when enabled, else this replica's service"""
+    return ownership if ownership is not None else llm_service
+
+def _capture(conversation_id, message: str, transport: str):
+    if traffic_capture is not None:
+        traffic_capture.record(conversation_id, message, transport)
+
+def _get_embedding_service():
+    global embedding_service
+    if embedding_service is None:
+        from .embeddings import EmbeddingService
+        embedding_service = EmbeddingService(llm_service)
+    return embedding_service
 
 # New models for model management
 class ModelSwitchRequest(BaseModel):
@@ -51,14 +132,36 @@ class ModelSwitchResponse(BaseModel):
 async def startup_event():
     """Initialize services on startup"""
     logger.info("Starting LLM Chatbot Service...")
-    await llm_service.initialize()
+    if drain_controller.install_signal_handler():
+        logger.info("SIGTERM drains connections before shutdown")
+    if loop_monitor is not None:
+        loop_monitor.start()
+    async with startup_timer.phase("llm_service_init"):
+        await llm_service.initialize(timer=startup_timer)
+    if llm_service.is_initialized and llm_service.model_loaded:
+        startup_timer.mark_ready()
+    # Not needed to serve the first request: limits are enforced locally until the first sync
+    startup_timer.defer("rate_limit_sync", rate_limiter.start())
+    startup_timer.defer("model_warmup", llm_service.warm_up())
+    if ownership is not None:
+        startup_timer.defer("ownership_discovery", ownership.start())
     logger.info("LLM Service initialized successfully")
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """Cleanup on shutdown"""
     logger.info("Shutting down LLM Chatbot Service...")
+    await startup_timer.cancel_deferred()
+    if loop_monitor is not None:
+        await loop_monitor.stop()
+    if ownership is not None:
+        await ownership.stop()
+    await rate_limiter.stop()
     await llm_service.cleanup()
+    if embedding_service is not None:
+        await embedding_service.close()
+    if traffic_capture is not None:
+        traffic_capture.close()
 
 @app.get("/")
 async def read_root():
@@ -85,6 +188,23 @@ async def health_check():
         logger.error(f"Health check failed: {e}")
         raise HTTPException(status_code=503, detail=f"Service unhealthy: {str(e)}")
 
+@app.get("/ready")
+async def readiness_check():
+    """Kubernetes readiness endpoint - ready only once the configured model is usable"""
+    if drain_controller.draining:
+        raise HTTPException(status_code=503, detail="Draining")
+    if not llm_service.is_initialized or not llm_service.model_loaded:
+        detail = "Model not ready"
+        if llm_service.active_pull:
+            detail = f"Pulling {llm_service.active_pull.model_name} ({llm_service.active_pull.percent}%)"
+        raise HTTPException(status_code=503, detail=detail)
+    startup_timer.mark_ready()
+    result = {"status": "ready", "timestamp": datetime.now().isoformat()}
+    if llm_service.serving_fallback:
+        # The configured model could not be pulled; the fallback keeps the pod in service
+        result["serving_fallback"] = llm_service.model_name
+    return result
+
 @app.get("/models")
 async def get_available_models():
     """Get list of available models and current model info"""
@@ -95,7 +215,8 @@ async def get_available_models():
             "description": "Free models available for selection",
             "providers": {
                 "ollama": "Local models running on your machine (privacy-focused)",
-                "huggingface": "Free Hugging Face Inference API models"
+                "huggingface": "Free Hugging Face Inference API models",
+                "sim": "Latency simulator for load testing without a model"
             }
         }
     except Exception as e:
@@ -140,9 +261,26 @@ async def get_current_model():
             "loaded": llm_service.model_loaded,
             "initialized": llm_service.is_initialized,
             "last_health_check": llm_service.last_health_check.isoformat() if llm_service.last_health_check else None
-        }
+        },
+        "pull": llm_service.active_pull.to_dict() if llm_service.active_pull else None
     }
 
+@app.get("/models/pull/{pull_id}")
+async def get_model_pull(pull_id: str):
+    """Get progress of a background model pull"""
+    job = llm_service.get_pull_job(pull_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown pull job: {pull_id}")
+    return job.to_dict()
+
+@app.get("/conversations/{conversation_id}/usage")
+async def get_conversation_usage(conversation_id: str):
+    """Prompt and completion tokens used by a conversation, from Ollama's counts"""
+    usage = llm_service.telemetry.get_conversation_usage(conversation_id)
+    if usage is None:
+        raise HTTPException(status_code=404, detail=f"No token usage recorded for {conversation_id}")
+    return {"conversation_id": conversation_id, **usage}
+
 @app.get("/metrics")
 async def get_metrics():
     """Basic metrics endpoint for monitoring"""
@@ -153,25 +291,189 @@ async def get_metrics():
         "model_status": await llm_service.get_model_status()
     }
 
+@app.get("/metrics/prometheus")
+async def get_prometheus_metrics():
+    """Prometheus text-format metrics (concurrency limit, shed rate, ...)"""
+    body, content_type = render_metrics(metrics_registry)
+    return Response(content=body, media_type=content_type)
+
+# Proxies (ingress, load balancer) whose X-Forwarded-For entries are trusted
+TRUSTED_PROXIES = [
+    ipaddress.ip_network(cidr.strip(), strict=False)
+    for cidr in os.getenv("TRUSTED_PROXY_CIDRS", "").split(",") if cidr.strip()
+]
+
+def _is_trusted_proxy(address: str) -> bool:
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(ip in network for network in TRUSTED_PROXIES)
+
+def _client_ip(headers, client) -> str:
+    """
+    Caller address. X-Forwarded-For is read only when the peer is a trusted
+    proxy, from the right, skipping trusted hops: everything left of the last
+    proxy we trust was written by the client and can be forged.
+    """
+    peer = client.host if client else "unknown"
+    forwarded = headers.get("x-forwarded-for")
+    if not forwarded or not _is_trusted_proxy(peer):
+        return peer
+    for hop in reversed([hop.strip() for hop in forwarded.split(",") if hop.strip()]):
+        if not _is_trusted_proxy(hop):
+            return hop
+    return peer
+
+def _rate_limit_subjects(user_id: str, client_key: str, headers, client) -> dict:
+    """Rate limit identities: the user (or caller IP when anonymous) and the client/conversation"""
+    return {
+        "user": user_id or f"ip:{_client_ip(headers, client)}",
+        "client": client_key
+    }
+
+def _check_rate_limit(subjects: dict):
+    """Admit a request or raise a 429 with remaining-quota headers"""
+    decision = rate_limiter.check(subjects)
+    if not decision.allowed:
+        raise HTTPException(
+            status_code=429,
+            detail=str(RateLimitExceeded(decision)),
+            headers=decision.headers()
+        )
+    return decision
+
+def _overloaded_exception(e: OverloadedError) -> HTTPException:
+    return HTTPException(
+        status_code=503,
+        detail=str(e),
+        headers={"Retry-After": str(int(e.retry_after))}
+    )
+
 @app.post("/chat", response_model=ChatResponse)
-async def chat_endpoint(message: ChatMessage):
+async def chat_endpoint(message: ChatMessage, request: Request, http_response: Response):
     """REST endpoint for chat messages"""
+    request_id = request.headers.get("x-request-id") or uuid.uuid4().hex
+    structlog.contextvars.bind_contextvars(request_id=request_id, conversation_id=message.conversation_id)
+    http_response.headers["X-Request-ID"] = request_id
+    _capture(message.conversation_id, message.message, "rest")
+    with tracer.trace("POST /chat", force=request.headers.get("x-trace") == "1",
+                      conversation_id=message.conversation_id) as trace:
+        subjects = _rate_limit_subjects(message.user_id, message.conversation_id, request.headers, request.client)
+        decision = _check_rate_limit(subjects)
+        try:
+            metadata = {}
+            response = await _chat_backend().process_message(message.message, message.conversation_id, metadata=metadata)
+            decision.remaining.update(rate_limiter.record_tokens(subjects, estimate_tokens(response)))
+            http_response.headers.update(decision.headers())
+            if trace:
+                http_response.headers["X-Trace-Id"] = trace.trace_id
+            return ChatResponse(
+                response=response,
+                conversation_id=message.conversation_id,
+                timestamp=datetime.now().isoformat(),
+                metadata=metadata
+            )
+        except OverloadedError as e:
+            raise _overloaded_exception(e)
+        except Exception as e:
+            logger.error(f"Error processing chat message: {e}")
+            raise HTTPException(status_code=500, detail=f"Error processing message: {str(e)}")
+
+@app.post("/chat/stream")
+async def chat_stream_endpoint(message: ChatMessage, request: Request):
+    """Server-Sent Events endpoint streaming response tokens as they are generated"""
+    structlog.contextvars.bind_contextvars(
+        request_id=request.headers.get("x-request-id") or uuid.uuid4().hex,
+        conversation_id=message.conversation_id
+    )
+    _capture(message.conversation_id, message.message, "sse")
+    subjects = _rate_limit_subjects(message.user_id, message.conversation_id, request.headers, request.client)
+    decision = _check_rate_limit(subjects)
+    events = _chat_backend().stream_message(message.message, message.conversation_id)
     try:
-        response = await llm_service.process_message(message.message, message.conversation_id)
-        return ChatResponse(
-            response=response,
-            conversation_id=message.conversation_id,
-            timestamp=datetime.now().isoformat()
+        # Pull the first event before responding so shed requests still get a 503
+        first_event = await events.__anext__()
+    except OverloadedError as e:
+        raise _overloaded_exception(e)
+    
+    def format_event(event: dict) -> str:
+        if event["type"] == "done":
+            timings = event.get("timings") or {}
+            tokens = timings.get("eval_count") or estimate_tokens(event["response"])
+            decision.remaining.update(rate_limiter.record_tokens(subjects, tokens))
+            event = {
+                **event,
+                "conversation_id": message.conversation_id,
+                "timestamp": datetime.now().isoformat(),
+                "quota": decision.remaining
+            }
+        return f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+    
+    async def event_stream():
+        yield format_event(first_event)
+        async for event in events:
+            yield format_event(event)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no", **decision.headers()}
+    )
+
+@app.post("/embeddings")
+async def embeddings_endpoint(body: EmbeddingRequest, request: Request):
+    """
+    Embed many texts in one call. Duplicates are embedded once and cached
+    vectors are served from disk. `encoding` selects float lists (json), one
+    base64 float32 matrix of shape [count, dim] (base64), or the raw
+    little-endian float32 matrix as the body with X-Embedding-* headers (binary).
+    """
+    subjects = _rate_limit_subjects(body.user_id, None, request.headers, request.client)
+    _check_rate_limit(subjects)
+    from .embeddings import ModelNotAllowedError, TooManyTextsError, unpack_vector
+    try:
+        result = await _get_embedding_service().embed(body.texts, body.model)
+    except TooManyTextsError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except ModelNotAllowedError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except OverloadedError as e:
+        raise _overloaded_exception(e)
+    except (httpx.HTTPError, ValueError, KeyError) as e:
+        # ValueError/KeyError: a malformed upstream answer (bad JSON, wrong embedding count)
+        logger.error(f"Embedding upstream failed: {e!r}")
+        raise HTTPException(status_code=502, detail=f"Embedding upstream failed: {str(e)}")
+    rate_limiter.record_tokens(subjects, sum(estimate_tokens(text) for text in body.texts))
+    
+    info = {
+        "model": result["model"],
+        "dim": result["dim"],
+        "count": len(body.texts),
+        "cache_hits": result["cache_hits"],
+        "computed": result["computed"],
+        "duplicates": result["duplicates"]
+    }
+    matrix = b"".join(result["vectors"])
+    if body.encoding == "binary":
+        return Response(
+            content=matrix,
+            media_type="application/octet-stream",
+            headers={f"X-Embedding-{key.replace('_', '-').title()}": str(value) for key, value in info.items()}
         )
-    except Exception as e:
-        logger.error(f"Error processing chat message: {e}")
-        raise HTTPException(status_code=500, detail=f"Error processing message: {str(e)}")
+    if body.encoding == "base64":
+        return {**info, "encoding": "base64", "dtype": "float32", "data": base64.b64encode(matrix).decode()}
+    return {**info, "encoding": "json", "embeddings": [unpack_vector(vector) for vector in result["vectors"]]}
 
 @app.websocket("/ws/{client_id}")
 async def websocket_endpoint(websocket: WebSocket, client_id: str):
     """WebSocket endpoint for real-time chat"""
+    if drain_controller.draining:
+        # Refuse before accepting so the client retries against another replica
+        await websocket.close(code=WS_CLOSE_SERVICE_RESTART)
+        return
     await connection_manager.connect(websocket, client_id)
-    logger.info(f"Client {client_id} connected via WebSocket")
+    logger.debug(f"Client {client_id} connected via WebSocket")
     
     try:
         while True:
@@ -179,32 +481,213 @@ async def websocket_endpoint(websocket: WebSocket, client_id: str):
             data = await websocket.receive_text()
             message_data = json.loads(data)
             
-            # Process message with LLM
-            response = await llm_service.process_message(
-                message_data.get("message", ""),
-                message_data.get("conversation_id", client_id)
+            conversation_id = message_data.get("conversation_id", client_id)
+            structlog.contextvars.bind_contextvars(
+                request_id=message_data.get("request_id") or uuid.uuid4().hex,
+                client_id=client_id,
+                conversation_id=conversation_id
             )
+            _capture(conversation_id, message_data.get("message", ""),
+                     "ws_stream" if message_data.get("stream") else "ws")
             
-            # Send response back to client
-            response_data = {
-                "response": response,
-                "timestamp": datetime.now().isoformat(),
-                "conversation_id": message_data.get("conversation_id", client_id)
-            }
+            with tracer.trace("ws.message", force=bool(message_data.get("trace")),
+                              client_id=client_id, conversation_id=conversation_id):
+                subjects = _rate_limit_subjects(
+                    message_data.get("user_id"), client_id, websocket.headers, websocket.client
+                )
+                decision = rate_limiter.check(subjects)
+                if not decision.allowed:
+                    await connection_manager.send_personal_message(json.dumps({
+                        "type": "error",
+                        "code": 429,
+                        "message": str(RateLimitExceeded(decision)),
+                        "retry_after": round(decision.retry_after, 2),
+                        "remaining": decision.remaining,
+                        "conversation_id": conversation_id
+                    }), client_id)
+                    continue
             
-            await connection_manager.send_personal_message(
-                json.dumps(response_data), client_id
-            )
+                try:
+                    if message_data.get("stream"):
+                        # Stream token frames, then the usual final response frame
+                        timings = None
+                        budget = None
+                        cache = None
+                        cascade = None
+                        async for event in _chat_backend().stream_message(
+                            message_data.get("message", ""), conversation_id, priority="interactive"
+                        ):
+                            if event["type"] == "token":
+                                await connection_manager.send_personal_message(json.dumps({
+                                    "type": "token",
+                                    "delta": event["content"],
+                                    "conversation_id": conversation_id
+                                }), client_id)
+                            else:
+                                response = event["response"]
+                                timings = event["timings"]
+                                budget = event["budget"]
+                                cache = event.get("cache")
+                                cascade = event.get("cascade")
+                    else:
+                        # Process message with LLM
+                        metadata = {}
+                        response = await _chat_backend().process_message(
+                            message_data.get("message", ""),
+                            conversation_id,
+                            priority="interactive",
+                            metadata=metadata
+                        )
+                        timings = None
+                        budget = metadata.get("budget")
+                        cache = metadata.get("cache")
+                        cascade = metadata.get("cascade")
+                except OverloadedError as e:
+                    await connection_manager.send_personal_message(json.dumps({
+                        "type": "error",
+                        "code": 503,
+                        "message": str(e),
+                        "retry_after": e.retry_after,
+                        "conversation_id": conversation_id
+                    }), client_id)
+                    continue
+            
+                # Send response back to client
+                response_data = {
+                    "response": response,
+                    "timestamp": datetime.now().isoformat(),
+                    "conversation_id": conversation_id
+                }
+                if timings:
+                    response_data["timings"] = timings
+                if budget:
+                    response_data["budget"] = budget
+                if cache:
+                    response_data["cache"] = cache
+                if cascade:
+                    response_data["cascade"] = cascade
+                tokens = (timings or {}).get("eval_count") or estimate_tokens(response)
+                decision.remaining.update(rate_limiter.record_tokens(subjects, tokens))
+                if decision.remaining:
+                    response_data["quota"] = decision.remaining
             
-            logger.info(f"Processed message for client {client_id}")
+                with tracer.span("ws.send"):
+                    await connection_manager.send_personal_message(
+                        json.dumps(response_data), client_id
+                    )
+            
+                log.info("ws_message_processed")
             
     except WebSocketDisconnect:
         connection_manager.disconnect(client_id)
-        logger.info(f"Client {client_id} disconnected")
+        logger.debug(f"Client {client_id} disconnected")
     except Exception as e:
         logger.error(f"WebSocket error for client {client_id}: {e}")
         connection_manager.disconnect(client_id)
 
+@app.post("/internal/turn")
+async def internal_turn(turn: ForwardedTurn, request: Request):
+    """Serve a turn forwarded by the replica that received it; this replica owns the conversation"""
+    if ownership is None:
+        raise HTTPException(status_code=404, detail="Ownership routing is disabled (OWNERSHIP_ENABLED)")
+    from .ownership import INTERNAL_TOKEN_HEADER
+    # Forwarded turns carry history and skip rate limiting: only peers holding the secret may send them
+    if not ownership.authorize(request.headers.get(INTERNAL_TOKEN_HEADER)):
+        raise HTTPException(status_code=403, detail="Invalid or missing internal token")
+    ownership.accept_turn(turn.model_dump())
+    try:
+        if turn.stream:
+            events = llm_service.stream_message(turn.message, turn.conversation_id, turn.priority)
+            # Pull the first event before responding so shed turns still get a 503
+            first_event = await events.__anext__()
+            
+            async def event_lines():
+                yield json.dumps(first_event) + "\n"
+                async for event in events:
+                    yield json.dumps(event) + "\n"
+            
+            return StreamingResponse(event_lines(), media_type="application/x-ndjson")
+        metadata = {}
+        response = await llm_service.process_message(turn.message, turn.conversation_id, turn.priority, metadata)
+        return {"response": response, "metadata": metadata}
+    except OverloadedError as e:
+        return JSONResponse(
+            status_code=503,
+            content={"detail": str(e), "limit": e.limit, "retry_after": e.retry_after,
+                     "draining": isinstance(e, DrainingError)},
+            headers={"Retry-After": str(int(e.retry_after))}
+        )
+
+def _require_traces_debug():
+    if not debug_traces_enabled:
+        raise HTTPException(status_code=404, detail="Trace inspection is disabled (DEBUG_TRACES_ENABLED)")
+
+@app.get("/debug/traces")
+async def list_traces(view: str = "recent", limit: int = 20):
+    """Sampled request traces: most recent first, or slowest first with view=slowest"""
+    _require_traces_debug()
+    if view not in ("recent", "slowest"):
+        raise HTTPException(status_code=400, detail="view must be 'recent' or 'slowest'")
+    return {
+        "tracing": tracer.get_stats(),
+        "traces": tracer.get_traces(view, limit)
+    }
+
+@app.get("/debug/traces/{trace_id}")
+async def get_trace(trace_id: str):
+    """All spans of one buffered trace"""
+    _require_traces_debug()
+    trace = tracer.get_trace(trace_id)
+    if trace is None:
+        raise HTTPException(status_code=404, detail=f"Unknown or evicted trace: {trace_id}")
+    return trace
+
+@app.get("/debug/loop")
+async def loop_report(limit: int = 20):
+    """Event-loop lag and the most recent slow-callback stack captures"""
+    if not debug_loop_enabled:
+        raise HTTPException(status_code=404, detail="Event-loop inspection is disabled (DEBUG_LOOP_ENABLED)")
+    if loop_monitor is None:
+        raise HTTPException(status_code=404, detail="Event-loop monitoring is disabled (LOOP_MONITOR_ENABLED)")
+    return {
+        "event_loop": loop_monitor.get_stats(),
+        "slow_callbacks": loop_monitor.get_slow_callbacks(limit)
+    }
+
+def _require_memory_debug():
+    if memory_inspector is None or not memory_inspector.enabled:
+        raise HTTPException(status_code=404, detail="Memory introspection is disabled (DEBUG_MEMORY_ENABLED)")
+
+@app.get("/debug/memory")
+async def memory_report():
+    """Process RSS and approximate deep sizes of in-memory state"""
+    _require_memory_debug()
+    return await memory_inspector.report()
+
+@app.post("/debug/memory/snapshots")
+async def take_memory_snapshot(label: str = None):
+    """Take a tracemalloc snapshot (tracing starts with the first one)"""
+    _require_memory_debug()
+    return await memory_inspector.take_snapshot(label)
+
+@app.get("/debug/memory/diff")
+async def memory_diff(base: int, target: int = None, limit: int = 20, group_by: str = "lineno"):
+    """Top allocation changes between two snapshots; `target` defaults to a fresh snapshot"""
+    _require_memory_debug()
+    if group_by not in ("lineno", "filename", "traceback"):
+        raise HTTPException(status_code=400, detail="group_by must be 'lineno', 'filename' or 'traceback'")
+    diff = await memory_inspector.diff(base, target, limit, group_by)
+    if diff is None:
+        raise HTTPException(status_code=404, detail="Unknown or evicted snapshot")
+    return diff
+
+@app.delete("/debug/memory/snapshots")
+async def clear_memory_snapshots():
+    """Drop snapshots and stop tracemalloc"""
+    _require_memory_debug()
+    memory_inspector.clear()
+    return memory_inspector.tracemalloc_stats()
+
 @app.get("/stats")
 async def get_stats():
     """Get detailed service statistics"""
@@ -224,6 +707,22 @@ async def get_stats():
             "model_loaded": await llm_service.is_model_loaded(),
             "uptime_seconds": llm_service.get_uptime()
         },
+        "concurrency": llm_service.limiter.get_stats(),
+        "rate_limits": rate_limiter.get_stats(),
+        "logging": get_logging_stats(),
+        "conversation_store": llm_service.conversation_store.get_stats() if llm_service.conversation_store else None,
+        "generation_budget": llm_service.budget.get_stats(),
+        "generation_telemetry": llm_service.telemetry.get_stats(),
+        "semantic_cache": llm_service.semantic_cache.get_stats() if llm_service.semantic_cache else None,
+        "cascade": llm_service.cascade.get_stats() if llm_service.cascade else None,
+        "shadow": llm_service.shadow.get_stats() if llm_service.shadow else None,
+        "startup": startup_timer.to_dict(),
+        "drain": drain_controller.get_stats(),
+        "compression": compression_stats.get_stats() if compression_stats else None,
+        "event_loop": loop_monitor.get_stats() if loop_monitor else None,
+        "ownership": ownership.get_stats() if ownership else None,
+        "traffic_capture": traffic_capture.get_stats() if traffic_capture else None,
+        "embeddings": embedding_service.get_stats() if embedding_service else None,
         "system": {
             "timestamp": datetime.now().isoformat(),
             "pod_name": os.getenv("HOSTNAME", "unknown"),
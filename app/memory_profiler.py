@@ -0,0 +1,204 @@
+import asyncio
+import logging
+import os
+import sys
+import time
+import tracemalloc
+import types
+from collections import OrderedDict, deque
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Never followed: shared code and interpreter objects rather than per-pod state
+_OPAQUE_TYPES = (
+    type, types.ModuleType, types.FunctionType, types.BuiltinFunctionType, types.MethodType,
+    types.CodeType, types.FrameType, types.CoroutineType, types.GeneratorType, types.AsyncGeneratorType
+)
+
+
+def _children(obj):
+    if isinstance(obj, dict):
+        # Copy first: the event loop may mutate the container while we walk it
+        items = list(obj.items())
+        return [v for item in items for v in item]
+    if isinstance(obj, (list, tuple, set, frozenset, deque)):
+        return list(obj)
+    children = []
+    attributes = getattr(obj, "__dict__", None)
+    if isinstance(attributes, dict):
+        children.append(attributes)
+    for slot in getattr(type(obj), "__slots__", ()):
+        if isinstance(slot, str) and hasattr(obj, slot):
+            children.append(getattr(obj, slot))
+    return children
+
+
+def deep_sizeof(obj, exclude_ids: set = None, max_objects: int = 200_000) -> dict:
+    """
+    Approximate retained size of `obj`: sys.getsizeof over everything
+    reachable through containers, __dict__ and __slots__, counting shared
+    objects once. Classes, modules, functions and bound methods are not
+    followed, nor is anything in `exclude_ids`. Stops after `max_objects`.
+    """
+    seen = set(exclude_ids or ())
+    stack = [obj]
+    total = 0
+    count = 0
+    while stack:
+        current = stack.pop()
+        if id(current) in seen or isinstance(current, _OPAQUE_TYPES):
+            continue
+        seen.add(id(current))
+        count += 1
+        if count > max_objects:
+            return {"bytes": total, "objects": count - 1, "truncated": True}
+        try:
+            total += sys.getsizeof(current)
+            stack.extend(_children(current))
+        except (RuntimeError, TypeError, ReferenceError):
+            # Changed size while copying, or an object that refuses introspection
+            continue
+    return {"bytes": total, "objects": count, "truncated": False}
+
+
+def process_memory() -> dict:
+    """Resident set size and its high-water mark from /proc (Linux), or None elsewhere"""
+    fields = {"VmRSS": "rss_bytes", "VmHWM": "peak_rss_bytes"}
+    result = {value: None for value in fields.values()}
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                key, _, value = line.partition(":")
+                if key in fields:
+                    result[fields[key]] = int(value.split()[0]) * 1024
+    except OSError:
+        pass
+    return result
+
+
+class MemoryInspector:
+    """
+    Approximate deep sizes of registered in-memory state, plus on-demand
+    tracemalloc snapshots and top-allocation diffs between them.
+
+    Sizing and snapshot comparison run in a worker thread so the event loop
+    keeps serving. tracemalloc adds CPU and memory overhead while tracing, so
+    it only starts with the first snapshot and stops on clear().
+    """
+
+    def __init__(self, enabled: bool = None, max_snapshots: int = None, frames: int = None,
+                 max_objects: int = None):
+        if enabled is None:
+            enabled = os.getenv("DEBUG_MEMORY_ENABLED", "false").lower() == "true"
+        self.enabled = enabled
+        self.max_snapshots = max_snapshots or int(os.getenv("DEBUG_MEMORY_MAX_SNAPSHOTS", "4"))
+        self.frames = frames or int(os.getenv("DEBUG_MEMORY_TRACE_FRAMES", "1"))
+        self.max_objects = max_objects or int(os.getenv("DEBUG_MEMORY_MAX_OBJECTS", "500000"))
+        self.sources: List[Callable[[], Dict[str, object]]] = []
+        self.exclude: Dict[int, object] = {}
+        self.snapshots: "OrderedDict[int, dict]" = OrderedDict()
+        self._next_snapshot_id = 1
+
+    def register(self, source: Callable[[], Dict[str, object]]):
+        """`source()` returns {name: object} to report; None values are skipped"""
+        self.sources.append(source)
+
+    def exclude_from_sizes(self, *objects):
+        """Stop traversal at these shared objects (e.g. the app) so they aren't counted per source"""
+        for obj in objects:
+            self.exclude[id(obj)] = obj
+
+    def _measure(self, objects: Dict[str, object]) -> dict:
+        exclude_ids = set(self.exclude)
+        sizes = {}
+        for name, obj in objects.items():
+            start = time.perf_counter()
+            size = deep_sizeof(obj, exclude_ids, self.max_objects)
+            size["items"] = len(obj) if hasattr(obj, "__len__") else None
+            size["measure_ms"] = round((time.perf_counter() - start) * 1000, 1)
+            sizes[name] = size
+        return sizes
+
+    async def report(self) -> dict:
+        objects = {}
+        for source in self.sources:
+            objects.update((name, obj) for name, obj in source().items() if obj is not None)
+        sizes = await asyncio.to_thread(self._measure, objects)
+        return {
+            "process": process_memory(),
+            "objects": dict(sorted(sizes.items(), key=lambda item: item[1]["bytes"], reverse=True)),
+            "tracemalloc": self.tracemalloc_stats()
+        }
+
+    def tracemalloc_stats(self) -> dict:
+        tracing = tracemalloc.is_tracing()
+        current, peak = tracemalloc.get_traced_memory() if tracing else (None, None)
+        return {
+            "tracing": tracing,
+            "traced_bytes": current,
+            "traced_peak_bytes": peak,
+            "snapshots": [{"id": sid, "label": s["label"], "taken_at": s["taken_at"]} for sid, s in self.snapshots.items()]
+        }
+
+    async def take_snapshot(self, label: str = None) -> dict:
+        """Start tracing if needed and keep a snapshot; the oldest is dropped past max_snapshots"""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+            logger.info(f"tracemalloc started ({self.frames} frame(s)); earlier allocations are not traced")
+        snapshot = await asyncio.to_thread(self._filtered_snapshot)
+        snapshot_id = self._next_snapshot_id
+        self._next_snapshot_id += 1
+        self.snapshots[snapshot_id] = {"snapshot": snapshot, "label": label, "taken_at": time.time()}
+        while len(self.snapshots) > self.max_snapshots:
+            self.snapshots.popitem(last=False)
+        return {"id": snapshot_id, "label": label, "traced_bytes": tracemalloc.get_traced_memory()[0]}
+
+    @staticmethod
+    def _filtered_snapshot():
+        return tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<unknown>")
+        ))
+
+    async def diff(self, base_id: int, target_id: int = None, limit: int = 20,
+                   group_by: str = "lineno") -> Optional[dict]:
+        """
+        Top allocation changes from snapshot `base_id` to `target_id` (a fresh
+        snapshot when omitted). Returns None for an unknown id.
+        """
+        base = self.snapshots.get(base_id)
+        if base is None:
+            return None
+        if target_id is None:
+            target_id = (await self.take_snapshot("diff"))["id"]
+        target = self.snapshots.get(target_id)
+        if target is None:
+            return None
+
+        def compare():
+            stats = target["snapshot"].compare_to(base["snapshot"], group_by)
+            return [{
+                "location": str(stat.traceback),
+                "size_diff_bytes": stat.size_diff,
+                "size_bytes": stat.size,
+                "count_diff": stat.count_diff,
+                "count": stat.count
+            } for stat in stats[:limit]]
+
+        top = await asyncio.to_thread(compare)
+        return {
+            "base": base_id,
+            "target": target_id,
+            "elapsed_seconds": round(target["taken_at"] - base["taken_at"], 3),
+            "group_by": group_by,
+            "top_diff_bytes": sum(entry["size_diff_bytes"] for entry in top),
+            "top": top
+        }
+
+    def clear(self):
+        """Drop snapshots and stop tracing"""
+        self.snapshots.clear()
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
@@ -0,0 +1,164 @@
+from prometheus_client import CollectorRegistry, generate_latest, CONTENT_TYPE_LATEST
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily, HistogramMetricFamily
+
+from .generation_telemetry import PROMPT_TOKEN_BUCKETS
+
+
+class ServiceMetricsCollector:
+    """
+    Prometheus collector reading live service state at scrape time,
+    so nothing on the request path has to update metric objects.
+    """
+
+    def __init__(self, llm_service, connection_manager, rate_limiter=None, embeddings=None, loop_monitor=None):
+        self.llm_service = llm_service
+        self.connection_manager = connection_manager
+        self.rate_limiter = rate_limiter
+        self.embeddings = embeddings
+        self.loop_monitor = loop_monitor
+
+    def collect(self):
+        yield GaugeMetricFamily(
+            "llm_active_websocket_connections", "Open WebSocket connections",
+            value=self.connection_manager.get_connection_count()
+        )
+        yield CounterMetricFamily(
+            "llm_messages_processed", "Chat messages processed",
+            value=self.llm_service.get_message_count()
+        )
+
+        limiter = self.llm_service.limiter.get_stats()
+        yield GaugeMetricFamily(
+            "llm_concurrency_limit", "Current adaptive concurrency limit",
+            value=limiter["limit"]
+        )
+        yield GaugeMetricFamily(
+            "llm_concurrency_inflight", "Generations currently holding a limiter slot",
+            value=limiter["inflight"]
+        )
+        yield GaugeMetricFamily(
+            "llm_requests_shed_rate", "Requests shed per second over the last minute",
+            value=limiter["shed_rate_per_s"]
+        )
+        shed = CounterMetricFamily(
+            "llm_requests_shed", "Requests rejected by the concurrency limiter",
+            labels=["priority"]
+        )
+        for priority, count in limiter["shed"].items():
+            shed.add_metric([priority], count)
+        yield shed
+
+        yield GaugeMetricFamily(
+            "llm_generation_budget_scale", "Fraction of the full generation budget in use (1.0 = normal)",
+            value=self.llm_service.budget.scale
+        )
+
+        yield from self._collect_generation_telemetry()
+        yield from self._collect_loop_lag()
+
+        cache = self.llm_service.semantic_cache
+        if cache is not None:
+            stats = cache.get_stats()
+            yield CounterMetricFamily("llm_semantic_cache_lookups", "Semantic cache lookups", value=stats["lookups"])
+            yield CounterMetricFamily("llm_semantic_cache_hits", "Semantic cache hits", value=stats["hits"])
+            yield CounterMetricFamily(
+                "llm_semantic_cache_near_misses", "Lookups whose best match fell just below the threshold",
+                value=stats["near_misses"]
+            )
+            yield GaugeMetricFamily("llm_semantic_cache_entries", "Cached responses", value=stats["entries"])
+
+        cascade = self.llm_service.cascade
+        if cascade is not None:
+            stats = cascade.get_stats()
+            served = CounterMetricFamily("llm_cascade_served", "Answers served per cascade tier", labels=["model"])
+            escalated = CounterMetricFamily(
+                "llm_cascade_escalations", "Answers that failed confidence checks and moved up a tier",
+                labels=["model", "reason"]
+            )
+            for model, tier in stats["per_tier"].items():
+                served.add_metric([model], tier["served"])
+                for reason, count in tier["escalated_out"].items():
+                    escalated.add_metric([model, reason], count)
+            yield served
+            yield escalated
+
+        if self.rate_limiter is not None:
+            rejected = CounterMetricFamily(
+                "llm_rate_limited", "Requests rejected by per-user/per-client rate limits",
+                labels=["limit"]
+            )
+            for limit, count in self.rate_limiter.get_stats()["rejected"].items():
+                rejected.add_metric([limit], count)
+            yield rejected
+
+        # The embedding service may be passed as a function: it is created on first use
+        embeddings = self.embeddings() if callable(self.embeddings) else self.embeddings
+        if embeddings is not None:
+            stats = embeddings.get_stats()
+            yield CounterMetricFamily("llm_embedding_texts", "Texts received by /embeddings", value=stats["texts"])
+            yield CounterMetricFamily("llm_embedding_cache_hits", "Unique texts served from the embedding cache",
+                                      value=stats["cache_hits"])
+            yield CounterMetricFamily("llm_embedding_cache_misses", "Unique texts embedded upstream",
+                                      value=stats["cache_misses"])
+            yield GaugeMetricFamily("llm_embedding_cache_hit_rate", "Share of unique texts served from cache",
+                                    value=stats["cache_hit_rate"] or 0.0)
+            yield GaugeMetricFamily("llm_embedding_throughput_texts_per_second",
+                                    "Texts embedded per second over the last minute",
+                                    value=stats["throughput_texts_per_s"])
+            yield CounterMetricFamily("llm_embedding_upstream_batches", "Batches sent to the embedding model",
+                                      value=stats["upstream_batches"])
+
+
+    def _collect_generation_telemetry(self):
+        """Per-model token and time counters; tokens/s = rate(tokens) / rate(seconds)"""
+        models = self.llm_service.telemetry.models
+        families = {
+            "prompt_tokens": CounterMetricFamily("llm_prompt_tokens", "Prompt tokens evaluated", labels=["model"]),
+            "completion_tokens": CounterMetricFamily("llm_completion_tokens", "Tokens generated", labels=["model"]),
+            "prefill_seconds": CounterMetricFamily("llm_prefill_seconds", "Time spent evaluating prompts", labels=["model"]),
+            "decode_seconds": CounterMetricFamily("llm_decode_seconds", "Time spent generating tokens", labels=["model"]),
+            "load_events": CounterMetricFamily("llm_model_loads", "Generations that had to load the model", labels=["model"])
+        }
+        prompt_sizes = HistogramMetricFamily("llm_prompt_size_tokens", "Prompt size per generation", labels=["model"])
+        for model, stats in models.items():
+            for attribute, family in families.items():
+                family.add_metric([model], getattr(stats, attribute))
+            cumulative, buckets = 0, []
+            for bound, (count, _, _) in zip(PROMPT_TOKEN_BUCKETS + (float("inf"),), stats.prompt_buckets):
+                cumulative += count
+                buckets.append(("+Inf" if bound == float("inf") else str(bound), cumulative))
+            prompt_sizes.add_metric([model], buckets, sum_value=stats.prompt_tokens)
+        yield from families.values()
+        yield prompt_sizes
+
+    def _collect_loop_lag(self):
+        loop_monitor = self.loop_monitor
+        if loop_monitor is None or not loop_monitor.samples:
+            return
+        from .loop_monitor import LAG_BUCKETS  # Already imported by whoever built the monitor
+        cumulative, buckets = 0, []
+        for bound, count in zip(LAG_BUCKETS + (float("inf"),), loop_monitor.bucket_counts):
+            cumulative += count
+            buckets.append(("+Inf" if bound == float("inf") else str(bound), cumulative))
+        yield HistogramMetricFamily(
+            "llm_event_loop_lag_seconds", "How late the event loop ran a timer scheduled every interval",
+            buckets=buckets, sum_value=loop_monitor.lag_sum
+        )
+        yield CounterMetricFamily(
+            "llm_event_loop_slow_callbacks", "Loop stalls longer than the slow-callback threshold",
+            value=loop_monitor.slow_callback_count
+        )
+
+
+def build_registry(llm_service, connection_manager, rate_limiter=None, embeddings=None,
+                   loop_monitor=None) -> CollectorRegistry:
+    """Create a registry exposing the service collector; loop lag metrics need `loop_monitor`"""
+    registry = CollectorRegistry()
+    registry.register(ServiceMetricsCollector(llm_service, connection_manager, rate_limiter, embeddings,
+                                              loop_monitor))
+    return registry
+
+
+def render_metrics(registry: CollectorRegistry):
+    """Render the registry in Prometheus text format; returns (body, content_type)"""
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -0,0 +1,121 @@
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class BatchError(Exception):
+    """Upstream failure for a whole batch or for one item in it"""
+
+    def __init__(self, message: str, status_code: int = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class _PendingBatch:
+    __slots__ = ("key", "inputs", "futures", "timer", "opened")
+
+    def __init__(self, key: Hashable):
+        self.key = key
+        self.inputs: List[Any] = []
+        self.futures: List[asyncio.Future] = []
+        self.timer: Optional[asyncio.TimerHandle] = None
+        self.opened = time.monotonic()
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent calls that share a key into one upstream request.
+
+    The first call for a key opens a batch; it is sent when it reaches
+    `max_batch_size` or `max_wait` seconds after it opened, whichever comes
+    first. `send_batch(key, inputs)` must return one result per input (an
+    exception instance fails just that item). If it raises, every caller in
+    the batch gets the error.
+    """
+
+    def __init__(self, send_batch: Callable[[Hashable, List[Any]], Awaitable[List[Any]]],
+                 max_batch_size: int = 8, max_wait: float = 0.02):
+        self.send_batch = send_batch
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait
+        self._pending: Dict[Hashable, _PendingBatch] = {}
+        self._tasks = set()
+
+        self.batches_sent = 0
+        self.items_sent = 0
+        self.batch_errors = 0
+        self.item_errors = 0
+        self.largest_batch = 0
+
+    async def submit(self, key: Hashable, item: Any) -> Any:
+        """Queue `item` under `key` and wait for its individual result"""
+        batch = self._pending.get(key)
+        if batch is None:
+            batch = _PendingBatch(key)
+            self._pending[key] = batch
+            if self.max_batch_size > 1:
+                batch.timer = asyncio.get_running_loop().call_later(self.max_wait, self._flush, key)
+        future = asyncio.get_running_loop().create_future()
+        batch.inputs.append(item)
+        batch.futures.append(future)
+        if len(batch.inputs) >= self.max_batch_size:
+            self._flush(key)
+        return await future
+
+    def _flush(self, key: Hashable):
+        batch = self._pending.pop(key, None)
+        if batch is None:
+            return
+        if batch.timer is not None:
+            batch.timer.cancel()
+        task = asyncio.create_task(self._send(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _send(self, batch: _PendingBatch):
+        size = len(batch.inputs)
+        self.batches_sent += 1
+        self.items_sent += size
+        self.largest_batch = max(self.largest_batch, size)
+        try:
+            results = await self.send_batch(batch.key, batch.inputs)
+            if len(results) != size:
+                raise BatchError(f"Upstream returned {len(results)} results for a batch of {size}")
+        except Exception as e:
+            self.batch_errors += 1
+            logger.warning(f"Batch of {size} failed: {e}")
+            for future in batch.futures:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for future, result in zip(batch.futures, results):
+            if future.done():
+                continue  # Caller gave up (cancelled)
+            if isinstance(result, Exception):
+                self.item_errors += 1
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    async def close(self):
+        """Send whatever is still queued and wait for in-flight batches"""
+        for key in list(self._pending):
+            self._flush(key)
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def get_stats(self) -> dict:
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": round(self.max_wait * 1000, 1),
+            "batches_sent": self.batches_sent,
+            "items_sent": self.items_sent,
+            "average_batch_size": round(self.items_sent / self.batches_sent, 2) if self.batches_sent else 0.0,
+            "largest_batch": self.largest_batch,
+            "batch_errors": self.batch_errors,
+            "item_errors": self.item_errors
+        }
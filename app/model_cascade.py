@@ -0,0 +1,287 @@
+import logging
+import os
+import re
+from collections import deque
+from typing import Dict, List, Optional
+
+import httpx
+
+from .stats import percentile
+
+logger = logging.getLogger(__name__)
+
+COMPLEXITY_LEVELS = ("simple", "moderate", "complex")
+
+_CODE_RE = re.compile(
+    r"```|\bdef |\bclass |\bfunction\b|\bimport |#include|=>|\bselect .+ from\b|traceback|stack trace|"
+    r"\berror:|\bexception\b|[{};]\s*$",
+    re.IGNORECASE | re.MULTILINE
+)
+_REASONING_RE = re.compile(
+    r"\b(why|compare|comparison|analy[sz]e|trade-?offs?|step by step|design|architect\w*|prove|"
+    r"optimi[sz]e|debug|evaluate|pros and cons|in detail|derive)\b",
+    re.IGNORECASE
+)
+_GREETING_RE = re.compile(r"^\s*(hi|hello|hey|thanks|thank you|ok|okay|bye|good (morning|evening))\b[\s!.?]*$",
+                          re.IGNORECASE)
+_REFUSAL_RE = re.compile(
+    r"^\W*(i'?m sorry|i am sorry|i apologi[sz]e|i cannot|i can'?t|i'?m unable|i am unable|i'?m not able|"
+    r"as an ai|i don'?t know|i do not know)",
+    re.IGNORECASE
+)
+
+
+class HeuristicClassifier:
+    """Scores request complexity from length, code markers and reasoning keywords; no model call"""
+
+    name = "heuristic"
+
+    def __init__(self, long_words: int = 40, very_long_words: int = 150):
+        self.long_words = long_words
+        self.very_long_words = very_long_words
+
+    async def classify(self, message: str) -> dict:
+        words = len(message.split())
+        if _GREETING_RE.match(message):
+            return {"complexity": 0, "code": False, "reasons": ["greeting"]}
+        score, reasons = 0, []
+        if words > self.very_long_words:
+            score += 2
+            reasons.append("very_long")
+        elif words > self.long_words:
+            score += 1
+            reasons.append("long")
+        code = bool(_CODE_RE.search(message))
+        if code:
+            score += 1
+            reasons.append("code")
+        keywords = len(set(match.lower() for match in _REASONING_RE.findall(message)))
+        if keywords:
+            score += min(2, keywords)
+            reasons.append("reasoning")
+        if message.count("?") > 1:
+            score += 1
+            reasons.append("multi_question")
+        complexity = 0 if score == 0 else 1 if score < 3 else 2
+        return {"complexity": complexity, "code": code, "reasons": reasons}
+
+
+class OllamaClassifier:
+    """
+    Asks a tiny Ollama model to rate complexity 1-3; code detection and any
+    failure fall back to the heuristic classifier.
+    """
+
+    name = "ollama"
+
+    PROMPT = ("Rate how hard this request is to answer well. Reply with one digit: "
+              "1 = simple chit-chat or a fact, 2 = a normal explanation, 3 = complex reasoning or code.\n"
+              "Request: {message}\nRating:")
+
+    def __init__(self, base_url: str, model: str, timeout: float = 5.0):
+        self.base_url = base_url.rstrip("/")
+        self.model = model
+        self.timeout = timeout
+        self.fallback = HeuristicClassifier()
+        self.errors = 0
+
+    async def classify(self, message: str) -> dict:
+        heuristic = await self.fallback.classify(message)
+        try:
+            async with httpx.AsyncClient(timeout=self.timeout) as client:
+                response = await client.post(f"{self.base_url}/api/generate", json={
+                    "model": self.model,
+                    "prompt": self.PROMPT.format(message=message[:2000]),
+                    "stream": False,
+                    "options": {"num_predict": 3, "temperature": 0}
+                })
+                response.raise_for_status()
+                digits = re.findall(r"[123]", response.json().get("response", ""))
+            if not digits:
+                raise ValueError("no rating in classifier output")
+        except Exception as e:
+            self.errors += 1
+            logger.debug(f"Cascade classifier failed, using heuristics: {e}")
+            return heuristic
+        return {**heuristic, "complexity": int(digits[0]) - 1, "reasons": ["model"]}
+
+
+class ModelCascade:
+    """
+    Routes each request to the smallest adequate model.
+
+    `tiers` are model names ordered smallest first. A classifier rates the
+    request simple, moderate or complex, which picks the tier (code requests
+    go to `code_model` when it is available). When an answer fails the
+    confidence checks (too short, a refusal, or cut off at num_predict) it is
+    retried on the next larger tier, up to `max_escalations` times.
+
+    Cost is estimated as model parameters x tokens; savings compare that with
+    serving every request on the largest tier.
+    """
+
+    def __init__(self, tiers: List[str] = None, sizes: Dict[str, float] = None, code_model: str = None,
+                 classifier=None, escalate: bool = None, max_escalations: int = None,
+                 min_response_chars: int = None, window: int = 500):
+        if tiers is None:
+            tiers = [t.strip() for t in os.getenv("CASCADE_TIERS", "tinyllama,phi,llama2").split(",") if t.strip()]
+        self.sizes = dict(sizes or {})
+        self.tiers = sorted(tiers, key=self.size_of)
+        self.code_model = code_model if code_model is not None else os.getenv("CASCADE_CODE_MODEL", "deepseek-coder")
+        self.classifier = classifier or HeuristicClassifier()
+        self.escalate = escalate if escalate is not None else os.getenv("CASCADE_ESCALATE", "true").lower() == "true"
+        self.max_escalations = max_escalations if max_escalations is not None else int(
+            os.getenv("CASCADE_MAX_ESCALATIONS", "1"))
+        self.min_response_chars = min_response_chars or int(os.getenv("CASCADE_MIN_RESPONSE_CHARS", "20"))
+        self.window = window
+        self._resolved: Optional[Dict[str, str]] = None  # configured name -> provider model name
+
+        # Measurements
+        self.requests = 0
+        self.by_complexity = {level: 0 for level in COMPLEXITY_LEVELS}
+        self._tier_stats: Dict[str, dict] = {}
+        self.cost_units = 0.0
+        self.baseline_cost_units = 0.0
+        self.latency_ms = 0.0
+        self.baseline_latency_ms = 0.0
+        self.escalation_overhead_ms = 0.0
+
+    def size_of(self, model: str) -> float:
+        return self.sizes.get(model.split(":")[0], 1.0)
+
+    def resolve(self, available_models: List[str]):
+        """
+        Map configured tiers to models the provider actually has (e.g. "phi" ->
+        "phi:latest") and drop the rest. Without a list every tier is kept as is.
+        """
+        self._resolved = {}
+        for name in self.tiers + ([self.code_model] if self.code_model else []):
+            match = next((m for m in available_models if m == name or m.startswith(name + ":")), None)
+            if match:
+                self._resolved[name] = match
+        missing = [t for t in self.tiers if t not in self._resolved]
+        if missing:
+            logger.warning(f"Cascade tiers not available and skipped: {missing}")
+
+    @property
+    def active_tiers(self) -> List[str]:
+        if self._resolved is None:
+            return list(self.tiers)
+        return [self._resolved[t] for t in self.tiers if t in self._resolved]
+
+    def _code_tier(self) -> Optional[str]:
+        if not self.code_model:
+            return None
+        if self._resolved is None:
+            return self.code_model
+        return self._resolved.get(self.code_model)
+
+    async def route(self, message: str, default_model: str) -> dict:
+        """
+        Classify `message` and pick its first tier; returns the routing decision.
+        `default_model` is used when none of the tiers is available.
+        """
+        tiers = self.active_tiers
+        classification = await self.classifier.classify(message)
+        complexity = classification["complexity"]
+        self.requests += 1
+        self.by_complexity[COMPLEXITY_LEVELS[complexity]] += 1
+        model = tiers[round(complexity * (len(tiers) - 1) / (len(COMPLEXITY_LEVELS) - 1))] if tiers else default_model
+        code_tier = self._code_tier()
+        if classification["code"] and code_tier:
+            model = code_tier
+        self._tier(model)["routed"] += 1
+        return {
+            "model": model,
+            "complexity": COMPLEXITY_LEVELS[complexity],
+            "reasons": classification["reasons"],
+            "escalations": []
+        }
+
+    def next_tier(self, model: str) -> Optional[str]:
+        """The next larger general tier after `model`, or None at the top"""
+        for tier in self.active_tiers:
+            if self.size_of(tier) > self.size_of(model):
+                return tier
+        return None
+
+    def assess(self, message: str, response: str, timings: dict = None, num_predict: int = None) -> Optional[str]:
+        """Return why `response` looks inadequate, or None when it passes"""
+        text = (response or "").strip()
+        if _REFUSAL_RE.match(text):
+            return "refusal"
+        if len(text) < self.min_response_chars and not _GREETING_RE.match(message):
+            return "too_short"
+        timings = timings or {}
+        if timings.get("done_reason") == "length" or (
+                num_predict and timings.get("eval_count", 0) >= num_predict):
+            return "truncated"
+        return None
+
+    def should_escalate(self, route: dict) -> bool:
+        return self.escalate and len(route["escalations"]) < self.max_escalations
+
+    def _tier(self, model: str) -> dict:
+        stats = self._tier_stats.get(model)
+        if stats is None:
+            stats = self._tier_stats[model] = {
+                "routed": 0, "served": 0, "escalated_in": 0, "escalated_out": {},
+                "latency_ms": deque(maxlen=self.window)
+            }
+        return stats
+
+    def record_attempt(self, model: str, tokens: int, latency_ms: float, failure: str = None):
+        """Account one generation on `model`; `failure` is the assess() reason when it was escalated"""
+        self.cost_units += self.size_of(model) * tokens
+        if failure:
+            stats = self._tier(model)
+            stats["escalated_out"][failure] = stats["escalated_out"].get(failure, 0) + 1
+            self.escalation_overhead_ms += latency_ms
+
+    def record_escalation(self, route: dict, from_model: str, to_model: str, reason: str):
+        route["escalations"].append({"from": from_model, "to": to_model, "reason": reason})
+        self._tier(to_model)["escalated_in"] += 1
+
+    def record_served(self, model: str, tokens: int, latency_ms: float, total_latency_ms: float):
+        """
+        Account the answer that was returned. Baselines assume the largest
+        tier on the same tokens, with latency scaled by parameter count.
+        """
+        stats = self._tier(model)
+        stats["served"] += 1
+        stats["latency_ms"].append(total_latency_ms)
+        tiers = self.active_tiers
+        largest = self.size_of(tiers[-1]) if tiers else self.size_of(model)
+        self.baseline_cost_units += largest * tokens
+        self.latency_ms += total_latency_ms
+        self.baseline_latency_ms += latency_ms * largest / self.size_of(model)
+
+    def get_stats(self) -> dict:
+        served_total = sum(stats["served"] for stats in self._tier_stats.values())
+        tiers = {}
+        for model, stats in self._tier_stats.items():
+            tiers[model] = {
+                "size_b": self.size_of(model),
+                "routed": stats["routed"],
+                "served": stats["served"],
+                "hit_rate": round(stats["served"] / served_total, 4) if served_total else 0.0,
+                "escalated_in": stats["escalated_in"],
+                "escalated_out": dict(stats["escalated_out"]),
+                "latency_ms_p50": percentile(stats["latency_ms"], 50, 1),
+                "latency_ms_p95": percentile(stats["latency_ms"], 95, 1)
+            }
+        return {
+            "classifier": self.classifier.name,
+            "tiers": self.active_tiers,
+            "code_model": self._code_tier(),
+            "escalation_enabled": self.escalate,
+            "requests": self.requests,
+            "by_complexity": dict(self.by_complexity),
+            "escalations": sum(sum(t["escalated_out"].values()) for t in tiers.values()),
+            "per_tier": tiers,
+            "estimated_cost_savings": round(1 - self.cost_units / self.baseline_cost_units, 4)
+            if self.baseline_cost_units else None,
+            "estimated_latency_savings": round(1 - self.latency_ms / self.baseline_latency_ms, 4)
+            if self.baseline_latency_ms else None,
+            "escalation_overhead_ms": round(self.escalation_overhead_ms, 1)
+        }
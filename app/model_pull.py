@@ -0,0 +1,87 @@
+import uuid
+from typing import Dict, Optional
+from datetime import datetime
+
+
+class PullRejected(Exception):
+    """Ollama refused the pull for good (e.g. unknown model); retrying cannot help"""
+
+
+class ModelPullJob:
+    """Tracks progress of a background Ollama model pull"""
+
+    PENDING = "pending"
+    RUNNING = "running"
+    RETRYING = "retrying"
+    SUCCESS = "success"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+    def __init__(self, model_name: str, max_attempts: int = 5):
+        self.id = uuid.uuid4().hex[:12]
+        self.model_name = model_name
+        self.max_attempts = max_attempts
+        self.status = self.PENDING
+        self.detail = None  # Last status line reported by Ollama
+        self.attempts = 0
+        self.error: Optional[str] = None
+        self.created_at = datetime.now()
+        self.finished_at: Optional[datetime] = None
+        # Per-layer progress: digest -> {"total": int, "completed": int}
+        self.layers: Dict[str, dict] = {}
+
+    @property
+    def is_finished(self) -> bool:
+        return self.status in (self.SUCCESS, self.FAILED, self.CANCELLED)
+
+    @property
+    def total_bytes(self) -> int:
+        return sum(layer["total"] for layer in self.layers.values())
+
+    @property
+    def completed_bytes(self) -> int:
+        return sum(layer["completed"] for layer in self.layers.values())
+
+    @property
+    def percent(self) -> float:
+        if self.status == self.SUCCESS:
+            return 100.0
+        total = self.total_bytes
+        if total == 0:
+            return 0.0
+        return round(100.0 * self.completed_bytes / total, 1)
+
+    def apply_event(self, event: dict):
+        """Fold one streamed /api/pull progress line into the job state"""
+        self.detail = event.get("status", self.detail)
+        digest = event.get("digest")
+        if digest and "total" in event:
+            layer = self.layers.setdefault(digest, {"total": 0, "completed": 0})
+            layer["total"] = event.get("total") or layer["total"]
+            # Progress never goes backwards, even when a retry resumes a layer
+            layer["completed"] = max(layer["completed"], event.get("completed") or 0)
+
+    def mark(self, status: str, error: str = None):
+        """Move the job to a new status"""
+        self.status = status
+        if error is not None:
+            self.error = error
+        if self.is_finished:
+            self.finished_at = datetime.now()
+
+    def to_dict(self) -> dict:
+        """Serialize job state for API responses"""
+        return {
+            "id": self.id,
+            "model_name": self.model_name,
+            "status": self.status,
+            "detail": self.detail,
+            "attempts": self.attempts,
+            "max_attempts": self.max_attempts,
+            "completed_bytes": self.completed_bytes,
+            "total_bytes": self.total_bytes,
+            "percent": self.percent,
+            "error": self.error,
+            "created_at": self.created_at.isoformat(),
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None
+        }
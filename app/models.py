@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional, List
+from typing import Literal, Optional, List
 from datetime import datetime
 
 class ChatMessage(BaseModel):
@@ -34,4 +34,20 @@ class MetricsResponse(BaseModel):
     active_connections: int = Field(..., description="Number of active connections")
     total_messages_processed: int = Field(..., description="Total messages processed")
     uptime_seconds: float = Field(..., description="Service uptime in seconds")
-    model_status: dict = Field(..., description="LLM model status information") 
\ No newline at end of file
+    model_status: dict = Field(..., description="LLM model status information")
+
+class ForwardedTurn(BaseModel):
+    """Chat turn forwarded by another replica to the conversation's owner"""
+    message: str = Field(..., description="The user's message")
+    conversation_id: str = Field(..., description="Conversation identifier")
+    priority: str = Field("standard", description="Concurrency limiter priority")
+    stream: bool = Field(False, description="Return NDJSON events instead of one JSON response")
+    history: Optional[List[dict]] = Field(None, description="History handed over by the previous owner")
+
+class EmbeddingRequest(BaseModel):
+    """Model for embedding requests"""
+    texts: List[str] = Field(..., description="Texts to embed; duplicates are embedded once")
+    model: Optional[str] = Field(None, description="Embedding model (defaults to EMBEDDINGS_MODEL; must be in EMBEDDINGS_ALLOWED_MODELS)")
+    encoding: Literal["json", "base64", "binary"] = Field(
+        "json", description="json: float lists; base64: one float32 matrix; binary: raw float32 body")
+    user_id: Optional[str] = Field(None, description="User identifier")
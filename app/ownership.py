@@ -0,0 +1,319 @@
+"""
+Conversation ownership across backend replicas.
+
+Each replica discovers its peers (a static list, or the A records of the
+headless service) and places them on a consistent-hash ring. The owner of a
+conversation is the ring node for its `conversation_id`, so every turn of a
+conversation lands on one replica with its history and warm upstream cache.
+Turns that arrive at another replica are forwarded to the owner over a pooled
+keep-alive connection (`/internal/turn`).
+
+Rebalancing is gradual. Consistent hashing moves only about 1/N of the
+conversations when a replica joins or leaves. A peer must be missing for
+several discovery rounds before it is dropped. A replica that still holds
+history for a conversation it no longer owns sends that history with the
+first forwarded turn, so the new owner continues where it left off.
+"""
+import asyncio
+import bisect
+import hashlib
+import hmac
+import json
+import logging
+import os
+import socket
+import time
+from collections import deque
+from typing import AsyncIterator, Dict, List, Optional
+
+import httpx
+
+from .concurrency_limiter import OverloadedError
+from .stats import percentile
+
+logger = logging.getLogger(__name__)
+
+INTERNAL_TOKEN_HEADER = "X-Internal-Token"
+
+
+def _hash(key: str) -> int:
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    """Consistent-hash ring with `vnodes` points per node"""
+
+    def __init__(self, nodes: List[str] = (), vnodes: int = 64):
+        self.vnodes = vnodes
+        self.nodes = sorted(set(nodes))
+        points = sorted((_hash(f"{node}#{i}"), node) for node in self.nodes for i in range(vnodes))
+        self._keys = [point for point, _ in points]
+        self._owners = [node for _, node in points]
+
+    def owner(self, key: str) -> Optional[str]:
+        if not self._keys:
+            return None
+        index = bisect.bisect(self._keys, _hash(key)) % len(self._keys)
+        return self._owners[index]
+
+
+class OwnershipRouter:
+    """
+    Routes chat turns to the replica owning the conversation. Exposes the
+    same `process_message` / `stream_message` interface as LLMService and
+    falls through to the local service when this replica is the owner,
+    when ownership is disabled, or when the owner cannot be reached.
+    """
+
+    # Synthetic keys used to measure how much ownership moved in a rebalance
+    SAMPLE_KEYS = [f"sample-{i}" for i in range(1000)]
+
+    def __init__(self, llm_service, enabled: bool = None, peers: List[str] = None, dns_name: str = None,
+                 self_address: str = None, refresh_interval: float = None, missing_rounds: int = None,
+                 vnodes: int = None, timeout: float = None, shared_secret: str = None):
+        self.llm_service = llm_service
+        if enabled is None:
+            enabled = os.getenv("OWNERSHIP_ENABLED", "false").lower() == "true"
+        self.enabled = enabled
+        port = os.getenv("PORT", "8000")
+        self.self_address = self_address or os.getenv("OWNERSHIP_SELF") or f"{os.getenv('POD_IP', '127.0.0.1')}:{port}"
+        if peers is None:
+            peers = [p.strip() for p in os.getenv("OWNERSHIP_PEERS", "").split(",") if p.strip()]
+        self.static_peers = peers
+        self.dns_name = dns_name if dns_name is not None else os.getenv("OWNERSHIP_DNS_NAME")
+        self.dns_port = int(os.getenv("OWNERSHIP_DNS_PORT", port))
+        self.refresh_interval = refresh_interval or float(os.getenv("OWNERSHIP_REFRESH_SECONDS", "5"))
+        self.missing_rounds = missing_rounds or int(os.getenv("OWNERSHIP_MISSING_ROUNDS", "3"))
+        self.vnodes = vnodes or int(os.getenv("OWNERSHIP_VNODES", "64"))
+        self.timeout = timeout or float(os.getenv("OWNERSHIP_FORWARD_TIMEOUT", "180"))
+        self.shared_secret = shared_secret or os.getenv("OWNERSHIP_SHARED_SECRET")
+        if self.enabled and not self.shared_secret:
+            # Peers refuse unauthenticated internal turns; forwarding would only add latency
+            logger.error("OWNERSHIP_ENABLED requires OWNERSHIP_SHARED_SECRET; serving every turn locally")
+            self.enabled = False
+
+        self._missing: Dict[str, int] = {}  # member -> consecutive rounds not discovered
+        self.ring = HashRing([self.self_address], self.vnodes)
+        self._client: Optional[httpx.AsyncClient] = None
+        self._task: Optional[asyncio.Task] = None
+
+        # Measurements
+        self.local_turns = 0
+        self.forwarded = 0
+        self.received = 0
+        self.forward_errors = 0
+        self.handoffs_sent = 0
+        self.handoffs_received = 0
+        self.rebalances = 0
+        self.last_rebalance: Optional[dict] = None
+        self.forward_ms = deque(maxlen=500)
+
+    # Membership
+
+    async def start(self):
+        if not self.enabled or self._task is not None:
+            return
+        await self.refresh()
+        self._task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def _refresh_loop(self):
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.warning(f"Peer discovery failed, keeping current ring: {e}")
+
+    async def discover(self) -> List[str]:
+        peers = set(self.static_peers)
+        if self.dns_name:
+            infos = await asyncio.get_running_loop().getaddrinfo(
+                self.dns_name, self.dns_port, type=socket.SOCK_STREAM)
+            peers.update(f"{info[4][0]}:{self.dns_port}" for info in infos)
+        peers.add(self.self_address)
+        return sorted(peers)
+
+    async def refresh(self):
+        self.update_members(await self.discover())
+
+    def update_members(self, discovered: List[str]):
+        """
+        Apply one discovery round. New peers join at once; a known peer
+        leaves only after `missing_rounds` consecutive rounds without it.
+        """
+        discovered = set(discovered) | {self.self_address}
+        members = set(self.ring.nodes)
+        for member in members - discovered:
+            self._missing[member] = self._missing.get(member, 0) + 1
+        for member in discovered:
+            self._missing.pop(member, None)
+        leaving = {m for m in members - discovered if self._missing[m] >= self.missing_rounds}
+        for member in leaving:
+            self._missing.pop(member, None)
+        new_members = (members - leaving) | discovered
+        if new_members != members:
+            self._set_members(sorted(new_members))
+
+    def mark_unreachable(self, peer: str):
+        """Drop a peer that refused a forward; discovery adds it back once it reappears"""
+        if peer in self.ring.nodes and peer != self.self_address:
+            self._set_members([m for m in self.ring.nodes if m != peer])
+
+    def _set_members(self, members: List[str]):
+        old = self.ring
+        self.ring = HashRing(members, self.vnodes)
+        moved = sum(1 for key in self.SAMPLE_KEYS if old.owner(key) != self.ring.owner(key))
+        self.rebalances += 1
+        self.last_rebalance = {
+            "at": time.time(),
+            "joined": sorted(set(members) - set(old.nodes)),
+            "left": sorted(set(old.nodes) - set(members)),
+            "moved_fraction": round(moved / len(self.SAMPLE_KEYS), 3)
+        }
+        logger.info(f"Ownership ring now has {len(members)} member(s): {self.last_rebalance}")
+
+    def owner_of(self, conversation_id: str) -> Optional[str]:
+        """Peer address owning the conversation, or None when it is this replica"""
+        if not self.enabled or not conversation_id:
+            return None
+        owner = self.ring.owner(conversation_id)
+        return None if owner == self.self_address else owner
+
+    # Forwarding
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                timeout=httpx.Timeout(self.timeout, connect=2.0),
+                limits=httpx.Limits(max_connections=int(os.getenv("OWNERSHIP_MAX_CONNECTIONS", "64")),
+                                    max_keepalive_connections=16),
+                headers={INTERNAL_TOKEN_HEADER: self.shared_secret} if self.shared_secret else None
+            )
+        return self._client
+
+    def _turn_body(self, message: str, conversation_id: str, priority: str, stream: bool) -> dict:
+        body = {"message": message, "conversation_id": conversation_id, "priority": priority, "stream": stream}
+        history = self.llm_service.conversations.get(conversation_id)
+        if history:
+            # We served this conversation before ownership moved: hand its history over
+            body["history"] = list(history)
+        return body
+
+    def _handed_off(self, body: dict):
+        if "history" in body:
+            self.llm_service.release_conversation(body["conversation_id"])
+            self.handoffs_sent += 1
+
+    @staticmethod
+    def _raise_for_overload(response: httpx.Response, body: dict, priority: str):
+        if response.status_code == 503 and not body.get("draining"):
+            raise OverloadedError(priority, body.get("limit", 0), body.get("retry_after", 1.0))
+        response.raise_for_status()
+
+    async def process_message(self, message: str, conversation_id: str = None, priority: str = "standard",
+                              metadata: dict = None) -> str:
+        owner = self.owner_of(conversation_id)
+        if owner is not None:
+            body = self._turn_body(message, conversation_id, priority, stream=False)
+            start = time.perf_counter()
+            try:
+                response = await self._get_client().post(f"http://{owner}/internal/turn", json=body)
+                result = response.json() if response.headers.get("content-type", "").startswith("application/json") else {}
+                self._raise_for_overload(response, result, priority)
+                self.forward_ms.append((time.perf_counter() - start) * 1000)
+                self.forwarded += 1
+                self._handed_off(body)
+                if metadata is not None:
+                    metadata.update(result.get("metadata") or {})
+                    metadata["owner"] = owner
+                return result["response"]
+            except OverloadedError:
+                raise
+            except (httpx.HTTPError, KeyError, ValueError) as e:
+                self._forward_failed(owner, e)
+        self.local_turns += 1
+        return await self.llm_service.process_message(message, conversation_id, priority, metadata)
+
+    async def stream_message(self, message: str, conversation_id: str = None,
+                             priority: str = "standard") -> AsyncIterator[dict]:
+        owner = self.owner_of(conversation_id)
+        if owner is not None:
+            body = self._turn_body(message, conversation_id, priority, stream=True)
+            start = time.perf_counter()
+            started = False
+            try:
+                async with self._get_client().stream("POST", f"http://{owner}/internal/turn", json=body) as response:
+                    if response.status_code != 200:
+                        await response.aread()
+                        self._raise_for_overload(response, response.json(), priority)
+                    async for line in response.aiter_lines():
+                        if not line.strip():
+                            continue
+                        event = json.loads(line)
+                        if not started:
+                            started = True
+                            self._handed_off(body)
+                        if event["type"] == "done":
+                            event["owner"] = owner
+                            self.forward_ms.append((time.perf_counter() - start) * 1000)
+                            self.forwarded += 1
+                        yield event
+                return
+            except OverloadedError:
+                raise
+            except (httpx.HTTPError, KeyError, ValueError) as e:
+                if started:
+                    # Tokens already went to the client; a local retry would duplicate them
+                    self.forward_errors += 1
+                    raise
+                self._forward_failed(owner, e)
+        self.local_turns += 1
+        async for event in self.llm_service.stream_message(message, conversation_id, priority):
+            yield event
+
+    def _forward_failed(self, owner: str, error: Exception):
+        self.forward_errors += 1
+        logger.warning(f"Forwarding to owner {owner} failed, serving locally: {error}")
+        if isinstance(error, httpx.TransportError):
+            self.mark_unreachable(owner)
+
+    def authorize(self, token: Optional[str]) -> bool:
+        """Whether a forwarded turn carries this cluster's shared secret"""
+        return bool(self.shared_secret) and hmac.compare_digest(token or "", self.shared_secret)
+
+    def accept_turn(self, body: dict):
+        """Owner side of a forwarded turn: adopt any handed-over history"""
+        self.received += 1
+        if body.get("history") and self.llm_service.adopt_conversation(body["conversation_id"], body["history"]):
+            self.handoffs_received += 1
+
+    def get_stats(self) -> dict:
+        owned = sum(1 for key in self.SAMPLE_KEYS if self.ring.owner(key) == self.self_address)
+        return {
+            "enabled": self.enabled,
+            "self": self.self_address,
+            "members": list(self.ring.nodes),
+            "owned_share": round(owned / len(self.SAMPLE_KEYS), 3),
+            "local_turns": self.local_turns,
+            "forwarded": self.forwarded,
+            "received": self.received,
+            "forward_errors": self.forward_errors,
+            "forward_ms_p50": percentile(self.forward_ms, 50, 1),
+            "forward_ms_p99": percentile(self.forward_ms, 99, 1),
+            "handoffs_sent": self.handoffs_sent,
+            "handoffs_received": self.handoffs_received,
+            "rebalances": self.rebalances,
+            "last_rebalance": self.last_rebalance
+        }
@@ -0,0 +1,296 @@
+import asyncio
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from .resp_store import RespClient, RespError
+
+logger = logging.getLogger(__name__)
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate generated tokens (~4 characters per token)"""
+    return max(1, len(text) // 4) if text else 0
+
+
+class TokenBucket:
+    """Token bucket with lazy refill; may run into deficit when debited after the fact"""
+
+    __slots__ = ("capacity", "rate", "tokens", "updated", "pending", "window", "window_local", "window_others")
+
+    def __init__(self, capacity: float, rate: float, now: float):
+        self.capacity = capacity
+        self.rate = rate  # tokens per second
+        self.tokens = capacity
+        self.updated = now
+        # Shared-backend bookkeeping
+        self.pending = 0  # Consumed locally since the last sync
+        self.window = None
+        self.window_local = 0  # Pushed to the backend in the current window
+        self.window_others = 0  # Other replicas' consumption already applied
+
+    def refill(self, now: float):
+        if now > self.updated:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def consume(self, amount: float):
+        self.tokens -= amount
+        self.pending += amount
+
+    def retry_after(self, amount: float) -> float:
+        """Seconds until `amount` tokens are available"""
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate if self.rate > 0 else float("inf")
+
+
+class RateLimitPolicy:
+    """A limit on one resource ("requests" or "tokens") for one scope ("user" or "client")"""
+
+    def __init__(self, scope: str, resource: str, per_minute: float, burst: float):
+        self.scope = scope
+        self.resource = resource
+        self.per_minute = per_minute
+        self.burst = burst
+
+    @property
+    def rate(self) -> float:
+        return self.per_minute / 60.0
+
+
+class RateLimitDecision:
+    """Outcome of a rate limit check with the remaining quota"""
+
+    def __init__(self, allowed: bool, retry_after: float = 0.0, limited_by: str = None,
+                 remaining: Dict[str, int] = None, limits: Dict[str, int] = None):
+        self.allowed = allowed
+        self.retry_after = retry_after
+        self.limited_by = limited_by
+        self.remaining = remaining or {}
+        self.limits = limits or {}
+
+    def headers(self) -> Dict[str, str]:
+        """Remaining-quota headers for HTTP responses"""
+        headers = {}
+        if "requests" in self.remaining:
+            headers["X-RateLimit-Limit"] = str(self.limits["requests"])
+            headers["X-RateLimit-Remaining"] = str(self.remaining["requests"])
+        if "tokens" in self.remaining:
+            headers["X-RateLimit-Limit-Tokens"] = str(self.limits["tokens"])
+            headers["X-RateLimit-Remaining-Tokens"] = str(self.remaining["tokens"])
+        if not self.allowed:
+            headers["Retry-After"] = str(max(1, int(self.retry_after + 0.999)))
+        return headers
+
+    def to_dict(self) -> dict:
+        return {
+            "allowed": self.allowed,
+            "retry_after": round(self.retry_after, 2),
+            "limited_by": self.limited_by,
+            "remaining": self.remaining
+        }
+
+
+class RateLimitExceeded(Exception):
+    """Raised when a request exceeds its user or client quota"""
+
+    def __init__(self, decision: RateLimitDecision):
+        super().__init__(f"Rate limit exceeded ({decision.limited_by}); retry in {decision.retry_after:.1f}s")
+        self.decision = decision
+
+
+class RateLimiter:
+    """
+    Per-user and per-client token buckets on requests and generated tokens.
+
+    Checks run entirely against in-memory buckets. With RATE_LIMIT_REDIS_URL set,
+    a background task periodically pushes local consumption to a Redis-protocol
+    store (INCRBY on per-window counters) and debits every bucket by what other
+    replicas consumed, so limits hold across replicas within one sync interval.
+    """
+
+    SYNC_WINDOW_SECONDS = 60
+
+    def __init__(self, policies: List[RateLimitPolicy] = None, redis_url: str = None,
+                 enabled: bool = None, max_keys: int = None, sync_interval: float = None):
+        if enabled is None:
+            enabled = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+        self.enabled = enabled
+        self.policies = policies if policies is not None else self._policies_from_env()
+        self.max_keys = max_keys or int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+        self.sync_interval = sync_interval or float(os.getenv("RATE_LIMIT_SYNC_INTERVAL", "1.0"))
+        redis_url = redis_url if redis_url is not None else os.getenv("RATE_LIMIT_REDIS_URL")
+        self.shared: Optional[RespClient] = RespClient(redis_url) if redis_url else None
+
+        self.buckets: "OrderedDict[tuple, TokenBucket]" = OrderedDict()
+        self.rejected: Dict[str, int] = {}
+        self.sync_errors = 0
+        self._sync_task: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def _policies_from_env() -> List[RateLimitPolicy]:
+        defaults = {
+            ("user", "requests"): (60, 20),
+            ("user", "tokens"): (4000, 8000),
+            ("client", "requests"): (30, 10),
+            ("client", "tokens"): (3000, 6000)
+        }
+        policies = []
+        for (scope, resource), (per_minute, burst) in defaults.items():
+            prefix = f"RATE_LIMIT_{scope.upper()}_{resource.upper()}"
+            per_minute = float(os.getenv(f"{prefix}_PER_MIN", per_minute))
+            burst = float(os.getenv(f"{prefix}_BURST", burst))
+            if per_minute > 0:
+                policies.append(RateLimitPolicy(scope, resource, per_minute, burst))
+        return policies
+
+    def _bucket(self, policy: RateLimitPolicy, subject: str, now: float) -> TokenBucket:
+        key = (policy.scope, policy.resource, subject)
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            bucket = TokenBucket(policy.burst, policy.rate, now)
+            self.buckets[key] = bucket
+            if len(self.buckets) > self.max_keys:
+                self.buckets.popitem(last=False)
+        else:
+            self.buckets.move_to_end(key)
+            bucket.refill(now)
+        return bucket
+
+    def _remaining(self, entries) -> Dict[str, int]:
+        remaining = {}
+        for policy, bucket in entries:
+            value = max(0, int(bucket.tokens))
+            remaining[policy.resource] = min(remaining.get(policy.resource, value), value)
+        return remaining
+
+    def _limits(self, entries) -> Dict[str, int]:
+        limits = {}
+        for policy, _ in entries:
+            limits[policy.resource] = min(limits.get(policy.resource, int(policy.burst)), int(policy.burst))
+        return limits
+
+    def check(self, subjects: Dict[str, Optional[str]]) -> RateLimitDecision:
+        """
+        Admit one request for the given {scope: subject} ids, charging one request
+        per request bucket. Token buckets must not be in deficit; generated tokens
+        are charged afterwards with record_tokens().
+        """
+        if not self.enabled:
+            return RateLimitDecision(True)
+        now = time.monotonic()
+        entries = [
+            (policy, self._bucket(policy, subjects[policy.scope], now))
+            for policy in self.policies if subjects.get(policy.scope)
+        ]
+
+        # Check every bucket before charging any, so a rejection costs nothing
+        for policy, bucket in entries:
+            if policy.resource == "requests":
+                exhausted = bucket.tokens < 1
+            else:
+                exhausted = bucket.tokens <= 0
+            if exhausted:
+                label = f"{policy.scope}_{policy.resource}"
+                self.rejected[label] = self.rejected.get(label, 0) + 1
+                return RateLimitDecision(
+                    False,
+                    retry_after=bucket.retry_after(1.0),
+                    limited_by=label,
+                    remaining=self._remaining(entries),
+                    limits=self._limits(entries)
+                )
+
+        for policy, bucket in entries:
+            if policy.resource == "requests":
+                bucket.consume(1)
+        return RateLimitDecision(True, remaining=self._remaining(entries), limits=self._limits(entries))
+
+    def record_tokens(self, subjects: Dict[str, Optional[str]], tokens: int) -> Dict[str, int]:
+        """Charge generated tokens; returns the remaining token quota"""
+        if not self.enabled or tokens <= 0:
+            return {}
+        now = time.monotonic()
+        entries = []
+        for policy in self.policies:
+            if policy.resource == "tokens" and subjects.get(policy.scope):
+                bucket = self._bucket(policy, subjects[policy.scope], now)
+                bucket.consume(tokens)
+                entries.append((policy, bucket))
+        return self._remaining(entries)
+
+    async def start(self):
+        """Start syncing with the shared backend, if configured"""
+        if self.enabled and self.shared and self._sync_task is None:
+            self._sync_task = asyncio.create_task(self._sync_loop())
+            logger.info(f"Rate limits shared via {self.shared.host}:{self.shared.port}")
+
+    async def stop(self):
+        if self._sync_task:
+            self._sync_task.cancel()
+            try:
+                await self._sync_task
+            except asyncio.CancelledError:
+                pass
+            self._sync_task = None
+        if self.shared:
+            await self.shared.close()
+
+    async def _sync_loop(self):
+        while True:
+            await asyncio.sleep(self.sync_interval)
+            try:
+                await self.sync()
+            except (OSError, ConnectionError, asyncio.TimeoutError, RespError) as e:
+                # Fail open to local-only limiting until the backend is back
+                self.sync_errors += 1
+                logger.warning(f"Rate limit sync failed: {e}")
+
+    async def sync(self):
+        """Exchange consumption with other replicas for recently active buckets"""
+        window = int(time.time() // self.SYNC_WINDOW_SECONDS)
+        cutoff = time.monotonic() - self.SYNC_WINDOW_SECONDS
+        active = []
+        for key, bucket in self.buckets.items():
+            if bucket.window != window:
+                bucket.window, bucket.window_local, bucket.window_others = window, 0, 0
+            if bucket.pending or bucket.updated >= cutoff:
+                active.append((key, bucket))
+        if not active:
+            return
+
+        commands = []
+        pushed = []
+        for (scope, resource, subject), bucket in active:
+            redis_key = f"rl:{scope}:{resource}:{subject}:{window}"
+            delta = int(bucket.pending)
+            pushed.append(delta)
+            commands.append(("INCRBY", redis_key, delta))
+            commands.append(("EXPIRE", redis_key, self.SYNC_WINDOW_SECONDS * 2))
+        replies = await self.shared.pipeline(commands)
+
+        for (key, bucket), delta, total in zip(active, pushed, replies[::2]):
+            if isinstance(total, RespError):
+                continue
+            bucket.pending -= delta
+            bucket.window_local += delta
+            others = total - bucket.window_local
+            if others > bucket.window_others:
+                bucket.tokens -= others - bucket.window_others
+                bucket.window_others = others
+
+    def get_stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "shared_backend": f"{self.shared.host}:{self.shared.port}" if self.shared else None,
+            "tracked_buckets": len(self.buckets),
+            "rejected": dict(self.rejected),
+            "sync_errors": self.sync_errors,
+            "policies": [
+                {"scope": p.scope, "resource": p.resource, "per_minute": p.per_minute, "burst": p.burst}
+                for p in self.policies
+            ]
+        }
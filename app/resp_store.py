@@ -0,0 +1,200 @@
+"""
+Minimal Redis-protocol (RESP2) client and a local stand-in server.
+
+The client speaks just enough RESP to pipeline simple commands (INCRBY,
+EXPIRE, GET, ...) against Redis or anything compatible. The stand-in server
+implements those commands in memory so shared features can run locally or
+in tests without a Redis deployment:
+
+    python -m app.resp_store --port 6379
+"""
+import argparse
+import asyncio
+import logging
+import time
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+
+class RespError(Exception):
+    """Error reply from the server"""
+
+
+def encode_command(*args) -> bytes:
+    """Encode a command as a RESP array of bulk strings"""
+    parts = [f"*{len(args)}\r\n".encode()]
+    for arg in args:
+        data = arg if isinstance(arg, bytes) else str(arg).encode()
+        parts.append(f"${len(data)}\r\n".encode() + data + b"\r\n")
+    return b"".join(parts)
+
+
+async def read_reply(reader: asyncio.StreamReader):
+    """Read one RESP reply; error replies are returned as RespError instances"""
+    line = await reader.readline()
+    if not line:
+        raise ConnectionError("connection closed")
+    kind, payload = line[:1], line[1:-2]
+    if kind == b"+":
+        return payload.decode()
+    if kind == b"-":
+        return RespError(payload.decode())
+    if kind == b":":
+        return int(payload)
+    if kind == b"$":
+        length = int(payload)
+        if length < 0:
+            return None
+        data = await reader.readexactly(length + 2)
+        return data[:-2]
+    if kind == b"*":
+        count = int(payload)
+        if count < 0:
+            return None
+        return [await read_reply(reader) for _ in range(count)]
+    raise RespError(f"unexpected reply type: {line!r}")
+
+
+class RespClient:
+    """Single-connection pipelining RESP client with lazy reconnect"""
+
+    def __init__(self, url: str, timeout: float = 2.0):
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port or 6379
+        self.timeout = timeout
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._lock = asyncio.Lock()
+
+    async def _connect(self):
+        self._reader, self._writer = await asyncio.wait_for(
+            asyncio.open_connection(self.host, self.port), timeout=self.timeout
+        )
+
+    async def pipeline(self, commands: List[Tuple]) -> list:
+        """Send several commands in one round trip and return their replies"""
+        async with self._lock:
+            try:
+                if self._writer is None:
+                    await self._connect()
+                self._writer.write(b"".join(encode_command(*command) for command in commands))
+                await self._writer.drain()
+                return [
+                    await asyncio.wait_for(read_reply(self._reader), timeout=self.timeout)
+                    for _ in commands
+                ]
+            except (OSError, ConnectionError, asyncio.TimeoutError, asyncio.IncompleteReadError):
+                await self.close()
+                raise
+
+    async def execute(self, *command):
+        reply = (await self.pipeline([command]))[0]
+        if isinstance(reply, RespError):
+            raise reply
+        return reply
+
+    async def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            try:
+                await self._writer.wait_closed()
+            except Exception:
+                pass
+        self._reader = self._writer = None
+
+
+class LocalRespServer:
+    """In-memory stand-in for Redis supporting PING, GET, SET, INCRBY, INCR, EXPIRE, DEL"""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        self.host = host
+        self.port = port
+        self.data: Dict[bytes, bytes] = {}
+        self.expiry: Dict[bytes, float] = {}
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    @property
+    def url(self) -> str:
+        return f"redis://{self.host}:{self.port}"
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+
+    def _expire_key(self, key: bytes):
+        deadline = self.expiry.get(key)
+        if deadline is not None and deadline <= time.monotonic():
+            self.data.pop(key, None)
+            self.expiry.pop(key, None)
+
+    def _dispatch(self, command: List[bytes]) -> bytes:
+        name = command[0].upper()
+        args = command[1:]
+        for key in args[:1]:
+            self._expire_key(key)
+        if name == b"PING":
+            return b"+PONG\r\n"
+        if name == b"GET":
+            value = self.data.get(args[0])
+            return b"$-1\r\n" if value is None else b"$%d\r\n%s\r\n" % (len(value), value)
+        if name == b"SET":
+            self.data[args[0]] = args[1]
+            self.expiry.pop(args[0], None)
+            return b"+OK\r\n"
+        if name in (b"INCR", b"INCRBY"):
+            try:
+                value = int(self.data.get(args[0], b"0")) + (int(args[1]) if name == b"INCRBY" else 1)
+            except ValueError:
+                return b"-ERR value is not an integer or out of range\r\n"
+            self.data[args[0]] = str(value).encode()
+            return b":%d\r\n" % value
+        if name == b"EXPIRE":
+            if args[0] not in self.data:
+                return b":0\r\n"
+            self.expiry[args[0]] = time.monotonic() + int(args[1])
+            return b":1\r\n"
+        if name == b"DEL":
+            removed = 0
+            for key in args:
+                removed += self.data.pop(key, None) is not None
+                self.expiry.pop(key, None)
+            return b":%d\r\n" % removed
+        return b"-ERR unknown command '%s'\r\n" % name
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                command = await read_reply(reader)
+                if not isinstance(command, list) or not command:
+                    writer.write(b"-ERR protocol error\r\n")
+                else:
+                    writer.write(self._dispatch(command))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+async def _serve(host: str, port: int):
+    server = await LocalRespServer(host, port).start()
+    logger.info(f"RESP stand-in listening on {server.url}")
+    await asyncio.Event().wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local Redis-protocol stand-in")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6379)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_serve(args.host, args.port))
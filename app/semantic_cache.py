@@ -0,0 +1,279 @@
+import logging
+import math
+import os
+import re
+import time
+import zlib
+from collections import OrderedDict, deque
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+from .stats import percentile
+
+try:
+    import numpy as np
+except ImportError:  # Optional: falls back to sparse pure-Python search
+    np = None
+
+logger = logging.getLogger(__name__)
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "a an the is are was were be been do does did what which who how why when where "
+    "can could would should will i you me my your it its of in on for to and or with "
+    "about please tell explain describe".split()
+)
+
+
+def _normalize_word(word: str) -> str:
+    # Crude plural folding so "pods" and "pod" share features
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+
+class HashingVectorizer:
+    """
+    Model-free prompt embedding: signed feature hashing of content words,
+    word bigrams and character trigrams into a fixed-size L2-normalized vector.
+    Catches rewordings that share vocabulary; true paraphrases need a model
+    embedder (see OllamaEmbedder).
+    """
+
+    name = "hashing"
+
+    def __init__(self, dim: int = 1024):
+        self.dim = dim
+
+    def features(self, text: str) -> Dict[str, float]:
+        words = [_normalize_word(w) for w in _WORD_RE.findall(text.lower())]
+        content = [w for w in words if w not in _STOPWORDS] or words
+        features: Dict[str, float] = {}
+        for word in content:
+            features["w:" + word] = features.get("w:" + word, 0.0) + 1.0
+            padded = f"#{word}#"
+            for i in range(len(padded) - 2):
+                key = "c:" + padded[i:i + 3]
+                features[key] = features.get(key, 0.0) + 0.3
+        for first, second in zip(content, content[1:]):
+            key = f"b:{first} {second}"
+            features[key] = features.get(key, 0.0) + 0.5
+        return features
+
+    def embed_sparse(self, text: str) -> Dict[int, float]:
+        vector: Dict[int, float] = {}
+        for feature, weight in self.features(text).items():
+            # crc32 is stable across processes, unlike hash()
+            h = zlib.crc32(feature.encode())
+            index = h % self.dim
+            sign = 1.0 if (h >> 31) & 1 else -1.0
+            vector[index] = vector.get(index, 0.0) + sign * weight
+        norm = math.sqrt(sum(v * v for v in vector.values()))
+        return {i: v / norm for i, v in vector.items() if v} if norm else {}
+
+    async def embed(self, text: str) -> List[float]:
+        dense = [0.0] * self.dim
+        for index, value in self.embed_sparse(text).items():
+            dense[index] = value
+        return dense
+
+
+class OllamaEmbedder:
+    """Prompt embeddings from Ollama's /api/embeddings endpoint"""
+
+    name = "ollama"
+
+    def __init__(self, base_url: str, model: str, timeout: float = 10.0):
+        self.base_url = base_url.rstrip("/")
+        self.model = model
+        self.timeout = timeout
+
+    async def embed(self, text: str) -> List[float]:
+        async with httpx.AsyncClient(timeout=self.timeout) as client:
+            response = await client.post(f"{self.base_url}/api/embeddings",
+                                         json={"model": self.model, "prompt": text})
+            response.raise_for_status()
+            vector = response.json()["embedding"]
+        norm = math.sqrt(sum(v * v for v in vector))
+        return [v / norm for v in vector] if norm else vector
+
+
+class VectorIndex:
+    """
+    Fixed-capacity cosine index over unit vectors. Uses one NumPy matrix
+    product per search when NumPy is installed, otherwise sparse dot products.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.dim: Optional[int] = None
+        self._matrix = None  # NumPy: (capacity, dim) float32
+        self._valid = None
+        self._sparse: Dict[int, Dict[int, float]] = {}  # Fallback: slot -> {index: value}
+        self._free = list(range(capacity - 1, -1, -1))
+
+    @property
+    def vectorized(self) -> bool:
+        return np is not None
+
+    def __len__(self) -> int:
+        return self.capacity - len(self._free)
+
+    def add(self, vector: List[float]) -> int:
+        """Store a vector; returns its slot. The caller must evict when full."""
+        if self.dim is None:
+            self.dim = len(vector)
+            if np is not None:
+                self._matrix = np.zeros((self.capacity, self.dim), dtype=np.float32)
+                self._valid = np.zeros(self.capacity, dtype=bool)
+        elif len(vector) != self.dim:
+            raise ValueError(f"vector has {len(vector)} dimensions, index has {self.dim}")
+        slot = self._free.pop()
+        if np is not None:
+            self._matrix[slot] = vector
+            self._valid[slot] = True
+        else:
+            self._sparse[slot] = {i: v for i, v in enumerate(vector) if v}
+        return slot
+
+    def remove(self, slot: int):
+        if np is not None:
+            self._valid[slot] = False
+        else:
+            self._sparse.pop(slot, None)
+        self._free.append(slot)
+
+    def search(self, vector: List[float]) -> Tuple[Optional[int], float]:
+        """Best (slot, cosine similarity), or (None, 0.0) when empty"""
+        if len(self) == 0 or len(vector) != self.dim:
+            return None, 0.0
+        if np is not None:
+            scores = self._matrix @ np.asarray(vector, dtype=np.float32)
+            scores[~self._valid] = -np.inf
+            slot = int(np.argmax(scores))
+            return slot, float(scores[slot])
+        query = {i: v for i, v in enumerate(vector) if v}
+        best_slot, best_score = None, -1.0
+        for slot, stored in self._sparse.items():
+            small, large = (query, stored) if len(query) <= len(stored) else (stored, query)
+            score = sum(v * large.get(i, 0.0) for i, v in small.items())
+            if score > best_score:
+                best_slot, best_score = slot, score
+        return best_slot, best_score
+
+    def clear(self):
+        self.__init__(self.capacity)
+
+
+class SemanticCache:
+    """
+    Response cache keyed by prompt meaning rather than exact text.
+
+    A prompt is embedded and compared against cached prompts; the cached
+    response is served when cosine similarity reaches `threshold`. Entries
+    expire after `ttl` seconds and the least recently used entry is evicted
+    once `max_entries` is reached.
+    """
+
+    def __init__(self, embedder=None, threshold: float = None, max_entries: int = None, ttl: float = None):
+        self.embedder = embedder or HashingVectorizer(int(os.getenv("SEMANTIC_CACHE_DIM", "1024")))
+        self.threshold = threshold if threshold is not None else float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.85"))
+        self.max_entries = max_entries or int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "1000"))
+        self.ttl = ttl if ttl is not None else float(os.getenv("SEMANTIC_CACHE_TTL_SECONDS", "3600"))
+        # Best matches this far below the threshold are counted as near misses
+        self.near_miss_margin = 0.1
+
+        self.index = VectorIndex(self.max_entries)
+        self._entries: "OrderedDict[int, dict]" = OrderedDict()  # slot -> entry, LRU order
+
+        # Measurements
+        self.lookups = 0
+        self.hits = 0
+        self.near_misses = 0
+        self.expired = 0
+        self.evictions = 0
+        self.embed_errors = 0
+        self.hit_similarities = deque(maxlen=1000)
+        self.lookup_ms = deque(maxlen=1000)
+
+    async def _embed(self, prompt: str) -> Optional[List[float]]:
+        try:
+            return await self.embedder.embed(prompt)
+        except Exception as e:
+            self.embed_errors += 1
+            logger.warning(f"Semantic cache embedding failed: {e}")
+            return None
+
+    async def lookup(self, prompt: str) -> Tuple[Optional[dict], Optional[List[float]]]:
+        """
+        Return (hit, vector). `hit` has the cached response, similarity and
+        index slot, or is None on a miss; pass `vector` back to store().
+        """
+        start = time.perf_counter()
+        self.lookups += 1
+        vector = await self._embed(prompt)
+        hit = None
+        if vector is not None:
+            slot, similarity = self.index.search(vector)
+            if slot is not None:
+                entry = self._entries[slot]
+                if time.time() - entry["stored_at"] > self.ttl:
+                    self._evict(slot)
+                    self.expired += 1
+                elif similarity >= self.threshold:
+                    self._entries.move_to_end(slot)
+                    entry["hits"] += 1
+                    self.hits += 1
+                    self.hit_similarities.append(similarity)
+                    hit = {"response": entry["response"], "similarity": round(similarity, 4), "slot": slot}
+                elif similarity >= self.threshold - self.near_miss_margin:
+                    self.near_misses += 1
+        self.lookup_ms.append((time.perf_counter() - start) * 1000)
+        return hit, vector
+
+    async def store(self, prompt: str, response: str, vector: List[float] = None):
+        if vector is None:
+            vector = await self._embed(prompt)
+            if vector is None:
+                return
+        if len(self.index) >= self.max_entries:
+            self._evict(next(iter(self._entries)))
+            self.evictions += 1
+        try:
+            slot = self.index.add(vector)
+        except ValueError as e:
+            # Embedder changed dimensions (e.g. a different embedding model)
+            logger.warning(f"Semantic cache reset: {e}")
+            self.clear()
+            slot = self.index.add(vector)
+        self._entries[slot] = {"prompt": prompt, "response": response, "stored_at": time.time(), "hits": 0}
+
+    def _evict(self, slot: int):
+        self._entries.pop(slot, None)
+        self.index.remove(slot)
+
+    def clear(self):
+        """Drop all entries, e.g. after switching models"""
+        self._entries.clear()
+        self.index.clear()
+
+    def get_stats(self) -> dict:
+        return {
+            "embedder": self.embedder.name,
+            "vectorized_search": self.index.vectorized,
+            "threshold": self.threshold,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "lookups": self.lookups,
+            "hits": self.hits,
+            "hit_rate": round(self.hits / self.lookups, 4) if self.lookups else 0.0,
+            "near_misses": self.near_misses,
+            "hit_similarity_p50": percentile(self.hit_similarities, 50, 4),
+            "hit_similarity_min": round(min(self.hit_similarities), 4) if self.hit_similarities else None,
+            "lookup_ms_p50": percentile(self.lookup_ms, 50, 4),
+            "lookup_ms_p99": percentile(self.lookup_ms, 99, 4),
+            "evictions": self.evictions,
+            "expired": self.expired,
+            "embed_errors": self.embed_errors
+        }
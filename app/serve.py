@@ -0,0 +1,31 @@
+"""
+Production entry point: `python -m app.serve`.
+
+uvicorn's `--ws` option only accepts its built-in protocol names, so the
+server is started from Python to pass `CompressedWebSocketProtocol` as the
+WebSocket implementation.
+"""
+import argparse
+import os
+
+import uvicorn
+
+from .compression import CompressedWebSocketProtocol
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run the chatbot API server")
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    parser.add_argument("--log-level", default=os.getenv("UVICORN_LOG_LEVEL", "info"))
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    uvicorn.run("app.main:app", host=args.host, port=args.port, workers=1, log_level=args.log_level,
+                ws=CompressedWebSocketProtocol)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+import asyncio
+import logging
+import os
+import random
+import time
+from collections import deque
+from typing import Dict, Optional, Set
+
+import httpx
+
+from .stats import percentile
+
+logger = logging.getLogger(__name__)
+
+
+class _ModelSamples:
+    """Rolling latency, throughput and length samples for one side of the comparison"""
+
+    def __init__(self, model: str, window: int):
+        self.model = model
+        self.count = 0
+        self.errors = 0
+        self.latency_ms = deque(maxlen=window)
+        self.decode_tps = deque(maxlen=window)
+        self.completion_tokens = deque(maxlen=window)
+        self.response_chars = deque(maxlen=window)
+
+    def add(self, latency_ms: float, response: str, timings: dict = None):
+        self.count += 1
+        self.latency_ms.append(latency_ms)
+        self.response_chars.append(len(response))
+        timings = timings or {}
+        if timings.get("eval_count"):
+            self.completion_tokens.append(timings["eval_count"])
+            if timings.get("eval_duration"):
+                self.decode_tps.append(timings["eval_count"] / (timings["eval_duration"] / 1e9))
+
+    def to_dict(self) -> dict:
+        def mean(values):
+            return round(sum(values) / len(values), 1) if values else None
+
+        return {
+            "model": self.model,
+            "samples": self.count,
+            "errors": self.errors,
+            "latency_ms_p50": percentile(self.latency_ms, 50, 1),
+            "latency_ms_p95": percentile(self.latency_ms, 95, 1),
+            "decode_tps_p50": percentile(self.decode_tps, 50, 1),
+            "completion_tokens_mean": mean(self.completion_tokens),
+            "response_chars_mean": mean(self.response_chars)
+        }
+
+
+class ShadowMirror:
+    """
+    Mirrors a fraction of requests to a candidate model to compare it with
+    production on real traffic.
+
+    A sampled request's prompt and generation options are captured before the
+    primary answer is generated. The shadow call starts only after the user
+    has their answer, and runs under its own concurrency cap and a "shadow"
+    slot in the primary limiter. A shadow is dropped, never queued, when the
+    cap is full or when primary load is past the limiter's shadow share, and
+    shadows already running are cancelled as soon as it gets there or the
+    limiter stops admitting (a drain). Shadow
+    responses are measured and discarded: they never reach users, history,
+    caches or telemetry.
+    """
+
+    def __init__(self, llm_service, model: str = None, provider: str = None, fraction: float = None,
+                 max_concurrency: int = None, window: int = 500):
+        self.llm_service = llm_service
+        self.model = model or os.getenv("SHADOW_MODEL", "phi")
+        self.provider = provider or os.getenv("SHADOW_PROVIDER", llm_service.model_provider)
+        self.base_url = os.getenv("SHADOW_BASE_URL", llm_service.base_url).rstrip("/")
+        self.fraction = fraction if fraction is not None else float(os.getenv("SHADOW_FRACTION", "0.1"))
+        self.max_concurrency = max_concurrency or int(os.getenv("SHADOW_MAX_CONCURRENCY", "1"))
+        self.timeout = float(os.getenv("SHADOW_TIMEOUT_SECONDS", "120"))
+        self._inflight = 0
+        self._slots = 0  # primary limiter slots held by running shadows
+        self._tasks: Set[asyncio.Task] = set()
+        self._preempted: Set[asyncio.Task] = set()
+        self._client: Optional[httpx.AsyncClient] = None
+        self._sim_engine = None
+
+        # Measurements
+        self.sampled = 0
+        self.completed = 0
+        self.dropped = {"busy": 0, "load": 0, "preempted": 0, "cancelled": 0}
+        self.primary: Dict[str, _ModelSamples] = {}
+        self.shadow = _ModelSamples(self.model, window)
+        self.window = window
+        self.latency_ratios = deque(maxlen=window)
+
+        llm_service.limiter.add_listener(self._preempt_if_overloaded)
+
+    def should_sample(self) -> bool:
+        """Decide whether to mirror this request"""
+        return random.random() < self.fraction
+
+    def prepare(self, prompt: str, options: dict) -> dict:
+        """Capture a sampled request as the job to submit() once the primary answered"""
+        self.sampled += 1
+        return {"prompt": prompt, "options": dict(options)}
+
+    def _overloaded(self) -> bool:
+        """Whether primary traffic (excluding our own slots) is past the shadow share"""
+        limiter = self.llm_service.limiter
+        primary = limiter.inflight - self._slots
+        return not limiter.admitting or primary >= max(1.0, limiter.limit * limiter.PRIORITY_SHARES["shadow"])
+
+    def _preempt_if_overloaded(self):
+        """Limiter hook: cancel running shadows once primary load needs their capacity"""
+        if not self._tasks or not self._overloaded():
+            return
+        for task in self._tasks - self._preempted:
+            self._preempted.add(task)
+            task.cancel()
+
+    def submit(self, job: dict, primary_model: str, primary_latency_ms: float, response: str,
+               timings: dict = None):
+        """Record the primary side and start the shadow call in the background"""
+        samples = self.primary.get(primary_model)
+        if samples is None:
+            samples = self.primary[primary_model] = _ModelSamples(primary_model, self.window)
+        samples.add(primary_latency_ms, response, timings)
+        if self._inflight >= self.max_concurrency:
+            self.dropped["busy"] += 1
+            return
+        self._inflight += 1
+        task = asyncio.create_task(self._run(job, primary_latency_ms))
+        self._tasks.add(task)
+        task.add_done_callback(self._finished)
+
+    def _finished(self, task: asyncio.Task):
+        # A done callback rather than `finally`: a task cancelled before it ever ran skips its body
+        self._tasks.discard(task)
+        self._inflight -= 1
+        if task.cancelled():
+            self.dropped["preempted" if task in self._preempted else "cancelled"] += 1
+        self._preempted.discard(task)
+
+    async def _run(self, job: dict, primary_latency_ms: float):
+        # Runs once the primary request has returned its slot
+        limiter = self.llm_service.limiter
+        if self._overloaded() or not limiter.try_acquire("shadow"):
+            self.dropped["load"] += 1
+            return
+        self._slots += 1
+        start = time.perf_counter()
+        try:
+            if self.provider == "sim":
+                response, timings = await self._generate_sim(job)
+            else:
+                response, timings = await self._generate_ollama(job)
+            latency_ms = (time.perf_counter() - start) * 1000
+            self.shadow.add(latency_ms, response, timings)
+            if primary_latency_ms > 0:
+                self.latency_ratios.append(latency_ms / primary_latency_ms)
+            self.completed += 1
+        except Exception as e:
+            self.shadow.errors += 1
+            logger.debug(f"Shadow call to {self.model} failed: {e}")
+        finally:
+            self._slots -= 1
+            # Shadow latency is another model's; keep it out of the limit's gradient
+            limiter.release()
+
+    async def _generate_ollama(self, job: dict):
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(timeout=self.timeout,
+                                             limits=httpx.Limits(max_connections=self.max_concurrency))
+        response = await self._client.post(f"{self.base_url}/api/generate", json={
+            "model": self.model, "prompt": job["prompt"], "stream": False, "options": job["options"]
+        })
+        response.raise_for_status()
+        result = response.json()
+        return result.get("response", ""), result
+
+    async def _generate_sim(self, job: dict):
+        if self._sim_engine is None:
+            from .sim_engine import SimulatedInferenceEngine
+            config = dict(self.llm_service.sim_config)
+            config["decode_tps"] = float(os.getenv("SHADOW_SIM_DECODE_TPS", config["decode_tps"]))
+            config["prefill_tps"] = float(os.getenv("SHADOW_SIM_PREFILL_TPS", config["prefill_tps"]))
+            config["slots"] = self.max_concurrency
+            self._sim_engine = SimulatedInferenceEngine(**config)
+        parts, timings = [], None
+        async for delta, final in self._sim_engine.generate(job["prompt"], job["options"].get("num_predict")):
+            parts.append(delta)
+            timings = final or timings
+        return "".join(parts), timings
+
+    async def close(self):
+        """Cancel shadow calls in flight, e.g. on shutdown"""
+        for task in list(self._tasks):
+            task.cancel()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def get_stats(self) -> dict:
+        return {
+            "model": self.model,
+            "provider": self.provider,
+            "fraction": self.fraction,
+            "max_concurrency": self.max_concurrency,
+            "inflight": self._inflight,
+            "sampled": self.sampled,
+            "completed": self.completed,
+            "dropped": dict(self.dropped),
+            "primary": {model: samples.to_dict() for model, samples in self.primary.items()},
+            "shadow": self.shadow.to_dict(),
+            "latency_ratio_p50": percentile(self.latency_ratios, 50, 3)
+        }
@@ -0,0 +1,127 @@
+import asyncio
+import hashlib
+import random
+import time
+import zlib
+from typing import AsyncIterator, Optional, Tuple
+
+
+class SimulatedInferenceEngine:
+    """
+    Latency model of a CPU inference server such as Ollama.
+    A fixed number of parallel slots serve requests; each request pays a
+    prefill cost proportional to its prompt tokens and a per-token decode
+    cost. Optionally burns real CPU so the HPA sees load.
+    """
+
+    VOCABULARY = [
+        "kubernetes", "pod", "replica", "service", "scaling", "container", "cluster",
+        "node", "deployment", "the", "a", "is", "runs", "with", "and", "to", "of",
+        "traffic", "latency", "model", "request", "response", "autoscaler", "load",
+        "memory", "cpu", "network", "when", "each", "can", "will", "more", "fewer"
+    ]
+
+    def __init__(self, prefill_tps: float = 100.0, decode_tps: float = 15.0, slots: int = 2,
+                 response_tokens: int = 64, jitter: float = 0.1, cpu_burn: float = 0.0,
+                 seed: int = None):
+        self.prefill_tps = prefill_tps
+        self.decode_tps = decode_tps
+        self.slots = slots
+        self.response_tokens = response_tokens
+        self.jitter = jitter
+        self.cpu_burn = min(max(cpu_burn, 0.0), 1.0)
+        self.random = random.Random(seed)
+
+        self.active = 0
+        self.waiting = 0
+        self.requests_served = 0
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._burn_buffer = b"\0" * 65536
+
+    @staticmethod
+    def count_tokens(text: str) -> int:
+        """Approximate BPE token count (~4 characters per token)"""
+        return max(1, len(text) // 4)
+
+    def _jittered(self, value: float) -> float:
+        if self.jitter <= 0:
+            return value
+        return max(0.0, value * (1 + self.random.uniform(-self.jitter, self.jitter)))
+
+    def _spin(self, seconds: float):
+        # hashlib releases the GIL on large buffers, so this burns CPU without stalling the loop
+        deadline = time.perf_counter() + seconds
+        while time.perf_counter() < deadline:
+            hashlib.sha256(self._burn_buffer).digest()
+
+    async def _compute(self, seconds: float):
+        """Spend `seconds` of simulated compute time"""
+        if self.cpu_burn > 0 and seconds > 0:
+            await asyncio.to_thread(self._spin, seconds * self.cpu_burn)
+            seconds *= 1 - self.cpu_burn
+        await asyncio.sleep(seconds)
+
+    def _response_length(self, max_tokens: int = None) -> int:
+        tokens = max(1, int(self.response_tokens * self.random.uniform(0.5, 1.5)))
+        if max_tokens:
+            tokens = min(tokens, max_tokens)
+        return tokens
+
+    async def generate(self, prompt: str, max_tokens: int = None) -> AsyncIterator[Tuple[str, Optional[dict]]]:
+        """
+        Yield (text_delta, timings) pairs. `timings` is None except on the final
+        item, where it carries Ollama-compatible fields in nanoseconds.
+        """
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.slots)
+
+        start = time.perf_counter()
+        self.waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        self.active += 1
+        try:
+            prompt_tokens = self.count_tokens(prompt)
+            prefill_start = time.perf_counter()
+            await self._compute(self._jittered(prompt_tokens / self.prefill_tps))
+            prefill_duration = time.perf_counter() - prefill_start
+
+            # Deterministic text per prompt so cached/compared responses are stable
+            words = random.Random(zlib.crc32(prompt.encode()))
+            token_count = self._response_length(max_tokens)
+            decode_start = time.perf_counter()
+            for index in range(token_count):
+                await self._compute(self._jittered(1.0 / self.decode_tps))
+                delta = words.choice(self.VOCABULARY)
+                delta = delta if index == 0 else f" {delta}"
+                timings = None
+                if index == token_count - 1:
+                    delta += "."
+                    now = time.perf_counter()
+                    timings = {
+                        "total_duration": int((now - start) * 1e9),
+                        "load_duration": 0,
+                        "prompt_eval_count": prompt_tokens,
+                        "prompt_eval_duration": int(prefill_duration * 1e9),
+                        "eval_count": token_count,
+                        "eval_duration": int((now - decode_start) * 1e9)
+                    }
+                yield delta, timings
+            self.requests_served += 1
+        finally:
+            self.active -= 1
+            self._semaphore.release()
+
+    def get_stats(self) -> dict:
+        """Current slot usage"""
+        return {
+            "slots": self.slots,
+            "active": self.active,
+            "waiting": self.waiting,
+            "requests_served": self.requests_served,
+            "prefill_tps": self.prefill_tps,
+            "decode_tps": self.decode_tps,
+            "cpu_burn": self.cpu_burn
+        }
@@ -0,0 +1,95 @@
+import asyncio
+import logging
+import time
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Taken when the app package is first imported, close to interpreter start
+PROCESS_START = time.perf_counter()
+
+
+class _PhaseScope:
+    """Times one startup phase; usable with `with` and `async with`"""
+
+    def __init__(self, timer: "StartupTimer", name: str):
+        self.timer = timer
+        self.name = name
+        self.start = None
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.timer.record(self.name, self.start, time.perf_counter(), failed=exc_type is not None)
+        return False
+
+    async def __aenter__(self):
+        return self.__enter__()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return self.__exit__(exc_type, exc, tb)
+
+
+class StartupTimer:
+    """Per-phase startup timings relative to process start, plus time-to-ready"""
+
+    def __init__(self, origin: float = PROCESS_START):
+        self.origin = origin
+        self.phases: Dict[str, dict] = {}
+        self.ready_at: Optional[float] = None
+        self.deferred: Dict[str, asyncio.Task] = {}
+
+    def phase(self, name: str) -> _PhaseScope:
+        return _PhaseScope(self, name)
+
+    def record(self, name: str, start: float, end: float, failed: bool = False):
+        self.phases[name] = {
+            "start_ms": round((start - self.origin) * 1000, 1),
+            "duration_ms": round((end - start) * 1000, 1),
+            "failed": failed
+        }
+
+    def mark(self, name: str):
+        """Record a zero-length milestone (e.g. end of imports)"""
+        now = time.perf_counter()
+        self.record(name, self.origin, now)
+
+    def mark_ready(self):
+        """Record time-to-ready once"""
+        if self.ready_at is None:
+            self.ready_at = time.perf_counter()
+            logger.info(f"Ready {self.time_to_ready_ms:.0f}ms after process start")
+
+    @property
+    def time_to_ready_ms(self) -> Optional[float]:
+        if self.ready_at is None:
+            return None
+        return round((self.ready_at - self.origin) * 1000, 1)
+
+    def defer(self, name: str, coroutine):
+        """Run non-critical startup work in the background, timed as its own phase"""
+        async def run():
+            try:
+                async with self.phase(f"deferred.{name}"):
+                    await coroutine
+            except Exception as e:
+                logger.warning(f"Deferred startup step {name} failed: {e}")
+        self.deferred[name] = asyncio.create_task(run())
+
+    async def cancel_deferred(self):
+        for task in self.deferred.values():
+            task.cancel()
+        await asyncio.gather(*self.deferred.values(), return_exceptions=True)
+        self.deferred.clear()
+
+    def to_dict(self) -> dict:
+        return {
+            "time_to_ready_ms": self.time_to_ready_ms,
+            "phases": dict(sorted(self.phases.items(), key=lambda item: item[1]["start_ms"])),
+            "deferred_pending": [name for name, task in self.deferred.items() if not task.done()]
+        }
+
+
+startup_timer = StartupTimer()
@@ -0,0 +1,11 @@
+import math
+from typing import Iterable, Optional
+
+
+def percentile(values: Iterable[float], p: float, digits: int = None) -> Optional[float]:
+    """Nearest-rank `p`th percentile of `values` (in any order), rounded to `digits`; None when empty"""
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    value = ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+    return round(value, digits) if digits is not None else value
@@ -0,0 +1,277 @@
+"""
+Lightweight in-process span tracing.
+
+A sampled fraction of requests get a trace; spans opened while a trace is
+active (in the same task) are attached to it. Finished traces are kept in a
+ring buffer of the most recent ones plus a bounded set of the slowest, and
+can optionally be forwarded to OpenTelemetry. Unsampled requests only pay
+for a context variable lookup per span.
+"""
+import heapq
+import itertools
+import logging
+import os
+import random
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import List, Optional
+
+logger = logging.getLogger(__name__)
+
+_current_trace: ContextVar[Optional["Trace"]] = ContextVar("current_trace", default=None)
+_current_span: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+
+
+class Span:
+    """One timed operation; times are perf_counter seconds"""
+
+    __slots__ = ("name", "span_id", "parent_id", "start", "end", "attributes")
+
+    def __init__(self, name: str, parent_id: Optional[int], start: float, attributes: dict = None):
+        self.name = name
+        self.span_id = None
+        self.parent_id = parent_id
+        self.start = start
+        self.end = None
+        self.attributes = attributes or {}
+
+    def set_attribute(self, key: str, value):
+        self.attributes[key] = value
+
+    def to_dict(self, origin: float) -> dict:
+        end = self.end if self.end is not None else time.perf_counter()
+        return {
+            "name": self.name,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start_ms": round((self.start - origin) * 1000, 3),
+            "duration_ms": round((end - self.start) * 1000, 3),
+            "attributes": self.attributes
+        }
+
+
+class Trace:
+    """Spans recorded for one request"""
+
+    def __init__(self, name: str, max_spans: int, attributes: dict = None):
+        self.trace_id = uuid.uuid4().hex
+        self.name = name
+        self.started_at = time.time()
+        self.max_spans = max_spans
+        self.spans: List[Span] = []
+        self.dropped_spans = 0
+        self.root = self.add(Span(name, None, time.perf_counter(), attributes))
+
+    def add(self, span: Span) -> Optional[Span]:
+        if len(self.spans) >= self.max_spans:
+            self.dropped_spans += 1
+            return None
+        span.span_id = len(self.spans)
+        self.spans.append(span)
+        return span
+
+    @property
+    def duration(self) -> float:
+        end = self.root.end if self.root.end is not None else time.perf_counter()
+        return end - self.root.start
+
+    def summary(self) -> dict:
+        return {
+            "trace_id": self.trace_id,
+            "name": self.name,
+            "started_at": self.started_at,
+            "duration_ms": round(self.duration * 1000, 3),
+            "span_count": len(self.spans)
+        }
+
+    def to_dict(self) -> dict:
+        data = self.summary()
+        data["dropped_spans"] = self.dropped_spans
+        data["spans"] = [span.to_dict(self.root.start) for span in self.spans]
+        return data
+
+
+class OpenTelemetryExporter:
+    """Replays finished traces into an OpenTelemetry tracer (optional dependency)"""
+
+    def __init__(self, service_name: str = "llm-chatbot-backend"):
+        from opentelemetry import trace as otel_trace
+        self._otel_trace = otel_trace
+        self._tracer = otel_trace.get_tracer(service_name)
+
+    def export(self, trace: Trace):
+        # Convert perf_counter offsets to epoch nanoseconds
+        epoch_ns = int(trace.started_at * 1e9)
+        origin = trace.root.start
+        otel_spans = {}
+        for span in trace.spans:
+            parent = otel_spans.get(span.parent_id)
+            context = self._otel_trace.set_span_in_context(parent) if parent is not None else None
+            otel_span = self._tracer.start_span(
+                span.name, context=context, attributes=span.attributes,
+                start_time=epoch_ns + int((span.start - origin) * 1e9)
+            )
+            otel_spans[span.span_id] = otel_span
+        for span in reversed(trace.spans):
+            end = span.end if span.end is not None else trace.root.end
+            otel_spans[span.span_id].end(end_time=epoch_ns + int((end - origin) * 1e9))
+
+
+class _SpanScope:
+    """Context manager opening a span under the current one"""
+
+    __slots__ = ("name", "attributes", "span", "parent")
+
+    def __init__(self, name: str, attributes: dict):
+        self.name = name
+        self.attributes = attributes
+        self.span = None
+        self.parent = None
+
+    def __enter__(self) -> Optional[Span]:
+        trace = _current_trace.get()
+        if trace is None:
+            return None
+        self.parent = _current_span.get()
+        parent_id = self.parent.span_id if self.parent else None
+        self.span = trace.add(Span(self.name, parent_id, time.perf_counter(), self.attributes))
+        if self.span is not None:
+            _current_span.set(self.span)
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.span is None:
+            return False
+        if exc_type is not None:
+            self.span.set_attribute("error", exc_type.__name__)
+        self.span.end = time.perf_counter()
+        # set() rather than reset(): async generators may finish in another context
+        _current_span.set(self.parent)
+        return False
+
+    async def __aenter__(self) -> Optional[Span]:
+        return self.__enter__()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return self.__exit__(exc_type, exc, tb)
+
+
+class Tracer:
+    """Sampling tracer with bounded recent/slowest trace buffers"""
+
+    def __init__(self, sample_rate: float = None, buffer_size: int = None, slowest_size: int = None,
+                 max_spans: int = None, enabled: bool = None):
+        if enabled is None:
+            enabled = os.getenv("TRACING_ENABLED", "true").lower() == "true"
+        self.enabled = enabled
+        self.sample_rate = sample_rate if sample_rate is not None else float(os.getenv("TRACING_SAMPLE_RATE", "0.1"))
+        self.max_spans = max_spans or int(os.getenv("TRACING_MAX_SPANS", "64"))
+        self.recent = deque(maxlen=buffer_size or int(os.getenv("TRACING_BUFFER_SIZE", "100")))
+        self.slowest_size = slowest_size or int(os.getenv("TRACING_SLOWEST_SIZE", "20"))
+        self._slowest = []  # Min-heap of (duration, seq, trace)
+        self._seq = itertools.count()
+        self.traces_started = 0
+        self.traces_sampled = 0
+        self.exporter = None
+        if os.getenv("TRACING_OTEL_ENABLED", "false").lower() == "true":
+            try:
+                self.exporter = OpenTelemetryExporter(os.getenv("TRACING_SERVICE_NAME", "llm-chatbot-backend"))
+            except ImportError:
+                logger.warning("TRACING_OTEL_ENABLED is set but opentelemetry is not installed")
+
+    def _sampled(self, force: bool) -> bool:
+        self.traces_started += 1
+        if not self.enabled:
+            return False
+        return force or random.random() < self.sample_rate
+
+    @contextmanager
+    def trace(self, name: str, force: bool = False, **attributes):
+        """Start a trace for one request; yields the Trace, or None when not sampled"""
+        if not self._sampled(force):
+            yield None
+            return
+        self.traces_sampled += 1
+        trace = Trace(name, self.max_spans, attributes)
+        previous_trace, previous_span = _current_trace.get(), _current_span.get()
+        _current_trace.set(trace)
+        _current_span.set(trace.root)
+        try:
+            yield trace
+        except BaseException as e:
+            trace.root.set_attribute("error", type(e).__name__)
+            raise
+        finally:
+            trace.root.end = time.perf_counter()
+            # set() rather than reset(): async generators may finish in another context
+            _current_trace.set(previous_trace)
+            _current_span.set(previous_span)
+            self._finish(trace)
+
+    def span(self, name: str, **attributes) -> "_SpanScope":
+        """Time a block as a child of the current span; no-op outside a sampled trace.
+        Usable with both `with` and `async with`."""
+        return _SpanScope(name, attributes)
+
+    def add_span(self, name: str, start: float, end: float, **attributes):
+        """Record an already-measured interval (perf_counter times) under the current span"""
+        trace = _current_trace.get()
+        if trace is None:
+            return
+        parent = _current_span.get()
+        span = trace.add(Span(name, parent.span_id if parent else None, start, attributes))
+        if span is not None:
+            span.end = end
+
+    def set_attribute(self, key: str, value):
+        """Annotate the current span, if any"""
+        span = _current_span.get()
+        if span is not None and _current_trace.get() is not None:
+            span.set_attribute(key, value)
+
+    def current_trace_id(self) -> Optional[str]:
+        trace = _current_trace.get()
+        return trace.trace_id if trace else None
+
+    def _finish(self, trace: Trace):
+        self.recent.append(trace)
+        entry = (trace.duration, next(self._seq), trace)
+        if len(self._slowest) < self.slowest_size:
+            heapq.heappush(self._slowest, entry)
+        elif entry[0] > self._slowest[0][0]:
+            heapq.heapreplace(self._slowest, entry)
+        if self.exporter is not None:
+            try:
+                self.exporter.export(trace)
+            except Exception as e:
+                logger.warning(f"Trace export failed: {e}")
+
+    def get_traces(self, view: str = "recent", limit: int = 20) -> List[dict]:
+        """Summaries of recent (newest first) or slowest (slowest first) traces"""
+        if view == "slowest":
+            traces = [entry[2] for entry in sorted(self._slowest, key=lambda e: e[0], reverse=True)]
+        else:
+            traces = list(reversed(self.recent))
+        return [trace.summary() for trace in traces[:limit]]
+
+    def get_trace(self, trace_id: str) -> Optional[dict]:
+        for trace in itertools.chain(self.recent, (entry[2] for entry in self._slowest)):
+            if trace.trace_id == trace_id:
+                return trace.to_dict()
+        return None
+
+    def get_stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "sample_rate": self.sample_rate,
+            "traces_started": self.traces_started,
+            "traces_sampled": self.traces_sampled,
+            "buffered": len(self.recent),
+            "exporter": type(self.exporter).__name__ if self.exporter else None
+        }
+
+
+tracer = Tracer()
@@ -0,0 +1,116 @@
+import hashlib
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+TRANSPORTS = ("rest", "sse", "ws", "ws_stream")
+
+
+class TrafficCapture:
+    """
+    Records the shape of incoming chat requests for replay in capacity tests.
+
+    One compact JSON line per request: arrival time (`t`, epoch seconds),
+    salted hash of the conversation id (`c`), prompt length in characters
+    (`n`), turn index within the conversation (`i`) and transport (`x`).
+    Message text and user identities are never written. The file rolls over
+    to `<path>.1` at `max_bytes`, so disk use stays under twice that.
+    """
+
+    def __init__(self, enabled: bool = None, path: str = None, max_bytes: int = None, salt: str = None,
+                 max_conversations: int = None, flush_interval: float = 1.0):
+        if enabled is None:
+            enabled = os.getenv("TRAFFIC_CAPTURE_ENABLED", "false").lower() == "true"
+        self.enabled = enabled
+        self.path = path or os.getenv("TRAFFIC_CAPTURE_PATH", "/tmp/traffic_capture.jsonl")
+        self.max_bytes = max_bytes or int(os.getenv("TRAFFIC_CAPTURE_MAX_BYTES", str(10 * 1024 * 1024)))
+        # Without a shared salt hashes are only stable within this process
+        salt = salt if salt is not None else os.getenv("TRAFFIC_CAPTURE_SALT")
+        self._salt = salt.encode() if salt else os.urandom(16)
+        self.max_conversations = max_conversations or int(os.getenv("TRAFFIC_CAPTURE_MAX_CONVERSATIONS", "50000"))
+        self.flush_interval = flush_interval
+
+        self._turns: "OrderedDict[str, int]" = OrderedDict()  # conversation hash -> turns seen
+        self._file = None
+        self._size = 0
+        self._last_flush = 0.0
+
+        # Measurements
+        self.recorded = 0
+        self.rotations = 0
+        self.write_errors = 0
+
+    def hash_conversation(self, conversation_id: Optional[str]) -> str:
+        key = (conversation_id or "").encode()
+        return hashlib.blake2b(key, digest_size=6, key=self._salt[:64]).hexdigest()
+
+    def _next_turn(self, conversation: str) -> int:
+        turn = self._turns.pop(conversation, -1) + 1
+        self._turns[conversation] = turn
+        if len(self._turns) > self.max_conversations:
+            self._turns.popitem(last=False)
+        return turn
+
+    def record(self, conversation_id: Optional[str], prompt: str, transport: str):
+        """Append one request shape; never raises into the request path"""
+        if not self.enabled:
+            return
+        conversation = self.hash_conversation(conversation_id)
+        line = json.dumps({
+            "t": round(time.time(), 3),
+            "c": conversation,
+            "n": len(prompt or ""),
+            "i": self._next_turn(conversation),
+            "x": transport
+        }, separators=(",", ":")) + "\n"
+        try:
+            self._write(line)
+            self.recorded += 1
+        except OSError as e:
+            self.write_errors += 1
+            logger.warning(f"Traffic capture write failed: {e}")
+
+    def _write(self, line: str):
+        if self._file is None:
+            self._file = open(self.path, "a", encoding="utf-8")
+            self._size = self._file.tell()
+        if self._size and self._size + len(line) > self.max_bytes:
+            self._rotate()
+        self._file.write(line)
+        self._size += len(line)
+        now = time.monotonic()
+        if now - self._last_flush >= self.flush_interval:
+            self._file.flush()
+            self._last_flush = now
+
+    def _rotate(self):
+        self._file.close()
+        os.replace(self.path, self.path + ".1")
+        self._file = open(self.path, "a", encoding="utf-8")
+        self._size = 0
+        self.rotations += 1
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def get_stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "path": self.path if self.enabled else None,
+            "recorded": self.recorded,
+            "file_bytes": self._size,
+            "max_bytes": self.max_bytes,
+            "rotations": self.rotations,
+            "write_errors": self.write_errors,
+            "tracked_conversations": len(self._turns)
+        }
+
+
+traffic_capture = TrafficCapture()
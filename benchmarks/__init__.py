@@ -0,0 +1 @@
+# Offline benchmark suite (see benchmarks/README.md)
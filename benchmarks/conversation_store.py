@@ -0,0 +1,82 @@
+"""
+Conversation journal benchmark: journal flush latency while recording turns,
+snapshot time, and restore time for a replacement pod.
+
+Usage:
+    python -m benchmarks.conversation_store --conversations 5000 --turns 20
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from app.conversation_store import ConversationJournal
+
+
+async def run(conversations: int, turns: int, message_chars: int, directory: str) -> dict:
+    journal = ConversationJournal(directory, flush_interval=0.05, snapshot_interval=3600)
+    history = journal.restore()
+    await journal.start(history)
+
+    text = ("lorem ipsum " * (message_chars // 12 + 1))[:message_chars]
+    record_times = []
+    for turn in range(turns):
+        for index in range(conversations):
+            message = {"role": "user" if turn % 2 == 0 else "assistant", "content": text,
+                       "timestamp": datetime.now().isoformat()}
+            start = time.perf_counter()
+            history.setdefault(f"conv-{index}", []).append(message)
+            journal.record(f"conv-{index}", message)
+            record_times.append(time.perf_counter() - start)
+        await journal.flush()
+        # Leave half of the turns in the journal tail
+        if turn == turns // 2:
+            await journal.snapshot()
+    await journal.flush()
+    stats = journal.get_stats()
+    # Stop without the final snapshot so the replacement replays a journal tail
+    journal._task.cancel()
+
+    replacement = ConversationJournal(directory)
+    restored = replacement.restore()
+    assert len(restored) == conversations
+
+    record_times.sort()
+    return {
+        "conversations": conversations,
+        "messages": conversations * turns,
+        "record_us_p99": round(record_times[int(len(record_times) * 0.99) - 1] * 1e6, 2),
+        "journal_flush_ms_p50": stats["journal_flush_ms_p50"],
+        "journal_flush_ms_p99": stats["journal_flush_ms_p99"],
+        "snapshot_ms": stats["last_snapshot_ms"],
+        "snapshot_mb": round(stats["last_snapshot_bytes"] / 1e6, 2),
+        "journal_tail_mb": round(os.path.getsize(replacement.journal_path) / 1e6, 2),
+        "restore_ms": round(replacement.restore_ms, 1)
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark conversation journal write and restore")
+    parser.add_argument("--conversations", type=int, default=5000)
+    parser.add_argument("--turns", type=int, default=20)
+    parser.add_argument("--message-chars", type=int, default=200)
+    parser.add_argument("--dir", help="Directory to use (default: a temporary one)")
+    args = parser.parse_args(argv)
+
+    directory = args.dir or tempfile.mkdtemp(prefix="conversation-bench-")
+    try:
+        results = asyncio.run(run(args.conversations, args.turns, args.message_chars, directory))
+    finally:
+        if not args.dir:
+            shutil.rmtree(directory, ignore_errors=True)
+    for key, value in results.items():
+        print(f"{key:<22} {value}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,102 @@
+"""
+Local stand-in for the Ollama HTTP API used by the offline benchmarks.
+
+Implements /api/version, /api/tags, /api/generate (streaming and non-streaming),
+/api/embed and /api/pull on top of app.sim_engine: a bounded number of parallel slots,
+prefill time proportional to prompt tokens and a fixed per-token decode rate,
+with optional multiplicative jitter.
+"""
+import hashlib
+import json
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from app.sim_engine import SimulatedInferenceEngine
+
+
+class FakeOllama:
+    """Configurable fake Ollama server backed by the simulated inference engine"""
+
+    def __init__(self, model_name: str = "tinyllama:latest", prefill_tps: float = 2000.0,
+                 decode_tps: float = 400.0, response_tokens: int = 24, jitter: float = 0.1,
+                 max_parallel: int = 4, seed: int = None, embedding_dim: int = 32):
+        self.model_name = model_name
+        self.embedding_dim = embedding_dim
+        self.embed_calls = []  # batch size of each /api/embed call
+        self.engine = SimulatedInferenceEngine(
+            prefill_tps=prefill_tps,
+            decode_tps=decode_tps,
+            slots=max_parallel,
+            response_tokens=response_tokens,
+            jitter=jitter,
+            seed=seed
+        )
+
+    def generate(self, prompt: str, max_tokens: int = None):
+        """Yield (token, timings) pairs; timings is set on the final item only"""
+        return self.engine.generate(prompt, max_tokens=max_tokens)
+
+    def build_app(self) -> FastAPI:
+        """Build the FastAPI application exposing the fake Ollama API"""
+        app = FastAPI(title="Fake Ollama")
+
+        @app.get("/api/version")
+        async def version():
+            return {"version": "0.0.0-fake"}
+
+        @app.get("/api/tags")
+        async def tags():
+            return {"models": [{"name": self.model_name, "size": 0}]}
+
+        @app.post("/api/pull")
+        async def pull(request: Request):
+            body = await request.json()
+
+            async def events():
+                yield json.dumps({"status": "pulling manifest"}) + "\n"
+                yield json.dumps({"status": "downloading", "digest": "sha256:fake",
+                                  "total": 1, "completed": 1}) + "\n"
+                yield json.dumps({"status": "success"}) + "\n"
+
+            if body.get("stream", True):
+                return StreamingResponse(events(), media_type="application/x-ndjson")
+            return {"status": "success"}
+
+        @app.post("/api/generate")
+        async def generate(request: Request):
+            body = await request.json()
+            model = body.get("model", self.model_name)
+            prompt = body.get("prompt", "")
+            max_tokens = (body.get("options") or {}).get("num_predict")
+
+            if body.get("stream", True):
+                async def chunks():
+                    async for token, timings in self.generate(prompt, max_tokens):
+                        chunk = {"model": model, "response": token, "done": timings is not None}
+                        if timings:
+                            chunk.update(timings)
+                        yield json.dumps(chunk) + "\n"
+                return StreamingResponse(chunks(), media_type="application/x-ndjson")
+
+            tokens = []
+            final = {}
+            async for token, timings in self.generate(prompt, max_tokens):
+                tokens.append(token)
+                final = timings or final
+            return JSONResponse({"model": model, "response": "".join(tokens), "done": True, **final})
+
+        @app.post("/api/embed")
+        async def embed(request: Request):
+            body = await request.json()
+            texts = body["input"] if isinstance(body["input"], list) else [body["input"]]
+            self.embed_calls.append(len(texts))
+            return {"model": body.get("model", self.model_name),
+                    "embeddings": [self.embedding(text) for text in texts]}
+
+        return app
+
+    def embedding(self, text: str):
+        """Deterministic pseudo-embedding of `text`"""
+        digest = hashlib.sha256(text.encode()).digest()
+        return [(digest[i % len(digest)] - 128) / 128 for i in range(self.embedding_dim)]
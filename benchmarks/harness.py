@@ -0,0 +1,120 @@
+"""
+Shared helpers for the offline benchmarks: in-process uvicorn servers,
+latency statistics, memory sampling and baseline comparison.
+"""
+import resource
+import socket
+import threading
+import time
+from typing import Dict, List
+
+import uvicorn
+
+from app.stats import percentile
+
+
+class BackgroundServer:
+    """Runs an ASGI app with uvicorn on its own thread and event loop"""
+
+    def __init__(self, app, host: str = "127.0.0.1", port: int = None):
+        self.host = host
+        self.port = port or free_port()
+        config = uvicorn.Config(app, host=self.host, port=self.port, log_level="warning",
+                                lifespan="on", ws="websockets")
+        self.server = uvicorn.Server(config)
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def start(self, timeout: float = 30.0):
+        self.thread.start()
+        deadline = time.time() + timeout
+        while not self.server.started:
+            if time.time() > deadline or not self.thread.is_alive():
+                raise RuntimeError(f"Server on port {self.port} failed to start")
+            time.sleep(0.05)
+        return self
+
+    def stop(self):
+        self.server.should_exit = True
+        self.thread.join(timeout=10)
+
+
+def free_port() -> int:
+    """Ask the OS for a free local TCP port"""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def percentile_ms(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of samples in seconds, in milliseconds; 0.0 for an empty list"""
+    return round((percentile(values, pct) or 0.0) * 1000, 2)
+
+
+def rss_mb() -> float:
+    """Current resident set size in MB (falls back to peak RSS off Linux)"""
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024.0
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+def summarize(latencies: List[float], ttfts: List[float], errors: int, elapsed: float,
+              rss_before: float, rss_after: float, shed: int = 0) -> dict:
+    """Reduce raw samples from one scenario run to the reported metrics"""
+    completed = len(latencies)
+    return {
+        "requests": completed + errors + shed,
+        "errors": errors,
+        "shed": shed,
+        "elapsed_s": round(elapsed, 4),
+        "throughput_rps": round(completed / elapsed, 3) if elapsed > 0 else 0.0,
+        "latency_p50_ms": percentile_ms(latencies, 50),
+        "latency_p99_ms": percentile_ms(latencies, 99),
+        "ttft_p50_ms": percentile_ms(ttfts, 50),
+        "ttft_p99_ms": percentile_ms(ttfts, 99),
+        "rss_mb": round(rss_after, 1),
+        "rss_delta_mb": round(rss_after - rss_before, 1)
+    }
+
+
+# Metric -> True if higher is better
+COMPARED_METRICS = {
+    "throughput_rps": True,
+    "latency_p50_ms": False,
+    "latency_p99_ms": False,
+    "ttft_p50_ms": False,
+    "ttft_p99_ms": False,
+    "rss_mb": False
+}
+
+
+def compare_results(current: Dict[str, dict], baseline: Dict[str, dict], threshold: float) -> List[dict]:
+    """Return one entry per metric that regressed by more than `threshold` (relative)"""
+    regressions = []
+    for key, metrics in current.items():
+        base = baseline.get(key)
+        if not base:
+            continue
+        for metric, higher_is_better in COMPARED_METRICS.items():
+            old, new = base.get(metric), metrics.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            worse = -change if higher_is_better else change
+            if worse > threshold:
+                regressions.append({
+                    "run": key,
+                    "metric": metric,
+                    "baseline": old,
+                    "current": new,
+                    "change_pct": round(change * 100, 1)
+                })
+    return regressions
@@ -0,0 +1,259 @@
+"""
+Time-accurate replay of captured traffic.
+
+Reads a capture written with TRAFFIC_CAPTURE_ENABLED=true (plus its rolled-over
+`.1` file) and sends every request at its original offset from the first
+arrival, divided by `--speed`. Prompts are synthetic text of the captured
+length; conversations keep their turn order and transport (REST, SSE or one
+WebSocket per conversation). Without `--url` the app runs in-process against
+`--provider`, by default the latency simulator.
+
+Usage:
+    python -m benchmarks.replay capture.jsonl
+    python -m benchmarks.replay capture.jsonl --speed 4 --provider fake-ollama
+    python -m benchmarks.replay capture.jsonl --url http://chatbot.example.com --output replay.json
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List
+
+import httpx
+import websockets
+
+from app.traffic_capture import TRANSPORTS
+from .harness import BackgroundServer, percentile_ms, rss_mb, summarize
+
+PROVIDERS = ("sim", "mock", "ollama", "fake-ollama")
+
+# Worker outcome for a request rejected by the concurrency limiter
+SHED = "shed"
+
+_FILLER = ("pods replicas services nodes deployments ingress volumes secrets "
+           "configmaps autoscaling rollout namespaces ")
+
+
+def synthetic_prompt(length: int, turn: int = 0) -> str:
+    """Deterministic text of exactly `length` characters (at least one)"""
+    length = max(1, length)
+    offset = (turn * 7) % len(_FILLER)
+    text = (_FILLER * (length // len(_FILLER) + 2))[offset:offset + length]
+    return text[:-1] + "?" if length > 1 else "?"
+
+
+def load_capture(path: str, limit: int = None) -> List[dict]:
+    """Records from `path.1` and `path`, in arrival order; torn or foreign lines are skipped"""
+    records = []
+    for part in (path + ".1", path):
+        if not os.path.exists(part):
+            continue
+        with open(part, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if isinstance(record, dict) and {"t", "c", "n", "i", "x"} <= record.keys():
+                    records.append(record)
+    records.sort(key=lambda r: (r["t"], r["i"]))
+    return records[:limit] if limit else records
+
+
+class Replayer:
+    """Sends captured requests on schedule and collects per-transport samples"""
+
+    def __init__(self, app_url: str, speed: float = 1.0, timeout: float = 300.0):
+        self.app_url = app_url.rstrip("/")
+        self.ws_url = self.app_url.replace("http://", "ws://").replace("https://", "wss://")
+        self.speed = speed
+        self.timeout = timeout
+        self.samples: Dict[str, list] = defaultdict(list)  # transport -> (latency, ttft) | SHED | None
+        self.slips: List[float] = []  # seconds each request was sent after its scheduled time
+        self._sockets: Dict[str, object] = {}
+        self._locks: Dict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
+
+    async def run(self, records: List[dict]) -> float:
+        """Replay all records; returns the elapsed wall time"""
+        if not records:
+            return 0.0
+        limits = httpx.Limits(max_connections=None, max_keepalive_connections=64)
+        async with httpx.AsyncClient(base_url=self.app_url, timeout=self.timeout, limits=limits) as client:
+            first = records[0]["t"]
+            start = time.perf_counter()
+            tasks = []
+            for record in records:
+                due = start + (record["t"] - first) / self.speed
+                delay = due - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                self.slips.append(max(0.0, time.perf_counter() - due))
+                tasks.append(asyncio.create_task(self._send(client, record)))
+            await asyncio.gather(*tasks)
+            elapsed = time.perf_counter() - start
+        for ws in self._sockets.values():
+            await ws.close()
+        return elapsed
+
+    async def _send(self, client: httpx.AsyncClient, record: dict):
+        transport = record["x"] if record["x"] in TRANSPORTS else "rest"
+        payload = {
+            "message": synthetic_prompt(record["n"], record["i"]),
+            "conversation_id": f"replay-{record['c']}",
+            # Per-user quotas apply to each replayed conversation as they did to its user
+            "user_id": f"replay-{record['c']}"
+        }
+        try:
+            if transport in ("ws", "ws_stream"):
+                sample = await self._send_ws(payload, stream=transport == "ws_stream")
+            else:
+                sample = await self._send_http(client, payload, "/chat/stream" if transport == "sse" else "/chat")
+        except (httpx.HTTPError, websockets.WebSocketException, OSError, ValueError):
+            sample = None
+        self.samples[transport].append(sample)
+
+    @staticmethod
+    async def _send_http(client: httpx.AsyncClient, payload: dict, path: str):
+        start = time.perf_counter()
+        first = None
+        async with client.stream("POST", path, json=payload) as response:
+            async for _ in response.aiter_bytes():
+                if first is None:
+                    first = time.perf_counter() - start
+            status = response.status_code
+        if status == 200:
+            return (time.perf_counter() - start, first or 0.0)
+        return SHED if status == 503 else None
+
+    async def _send_ws(self, payload: dict, stream: bool):
+        conversation = payload["conversation_id"]
+        # One socket per conversation; its turns wait for each other like a real client's
+        async with self._locks[conversation]:
+            ws = self._sockets.get(conversation)
+            if ws is None:
+                ws = await websockets.connect(f"{self.ws_url}/ws/{conversation}", max_size=None)
+                await ws.recv()  # Welcome frame
+                self._sockets[conversation] = ws
+            start = time.perf_counter()
+            first = None
+            await ws.send(json.dumps({**payload, "stream": stream}))
+            while True:
+                frame = json.loads(await ws.recv())
+                if frame.get("type") in ("system", "ping", "status"):
+                    continue
+                if first is None:
+                    first = time.perf_counter() - start
+                if "response" in frame:
+                    return (time.perf_counter() - start, first)
+                if frame.get("type") == "error":
+                    return SHED if frame.get("code") == 503 else None
+
+    def report(self, elapsed: float, rss_before: float) -> dict:
+        results = {}
+        for transport, samples in sorted(self.samples.items()):
+            done = [s for s in samples if isinstance(s, tuple)]
+            results[transport] = summarize(
+                [s[0] for s in done], [s[1] for s in done],
+                errors=sum(1 for s in samples if s is None), elapsed=elapsed,
+                rss_before=rss_before, rss_after=rss_mb(), shed=sum(1 for s in samples if s == SHED)
+            )
+        return {
+            "schedule_slip_p50_ms": percentile_ms(self.slips, 50),
+            "schedule_slip_p99_ms": percentile_ms(self.slips, 99),
+            "results": results
+        }
+
+
+def _start_app(provider: str, args) -> list:
+    """Start the app (and a fake Ollama for `fake-ollama`) in-process; returns the servers, app last"""
+    servers = []
+    if provider == "fake-ollama":
+        from .fake_ollama import FakeOllama
+        fake = FakeOllama(decode_tps=args.decode_tps, max_parallel=args.max_parallel)
+        servers.append(BackgroundServer(fake.build_app()).start())
+        os.environ["LLM_MODEL_NAME"] = fake.model_name.split(":")[0]
+        os.environ["LLM_BASE_URL"] = servers[0].url
+        provider = "ollama"
+    # The app reads its provider configuration at import time
+    os.environ["LLM_MODEL_PROVIDER"] = provider
+    if provider == "sim":
+        os.environ.setdefault("SIM_DECODE_TPS", str(args.decode_tps))
+    # Replayed traffic must not be captured into the file being replayed
+    os.environ["TRAFFIC_CAPTURE_ENABLED"] = "false"
+    from app.main import app
+    servers.append(BackgroundServer(app).start())
+    return servers
+
+
+async def replay(records: List[dict], app_url: str, speed: float) -> dict:
+    """Replay `records` against a running app; returns the report"""
+    replayer = Replayer(app_url, speed)
+    rss_before = rss_mb()
+    elapsed = await replayer.run(records)
+    report = replayer.report(elapsed, rss_before)
+    captured = records[-1]["t"] - records[0]["t"] if records else 0.0
+    report["meta"] = {
+        "timestamp": datetime.now().isoformat(),
+        "requests": len(records),
+        "conversations": len({r["c"] for r in records}),
+        "speed": speed,
+        "captured_span_s": round(captured, 3),
+        "replayed_span_s": round(elapsed, 3)
+    }
+    return report
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Replay captured traffic at its original timing")
+    parser.add_argument("capture", help="Capture file (TRAFFIC_CAPTURE_PATH); its .1 file is read too")
+    parser.add_argument("--speed", type=float, default=1.0, help="Time compression factor (2 = twice as fast)")
+    parser.add_argument("--url", help="Replay against this running deployment instead of an in-process app")
+    parser.add_argument("--provider", choices=PROVIDERS, default="sim", help="Provider of the in-process app")
+    parser.add_argument("--decode-tps", type=float, default=15.0, help="Simulated tokens/s per slot")
+    parser.add_argument("--max-parallel", type=int, default=2, help="Fake Ollama parallel slots")
+    parser.add_argument("--limit", type=int, help="Replay only the first N requests")
+    parser.add_argument("--output", help="Where to write the report JSON")
+    args = parser.parse_args(argv)
+    if args.speed <= 0:
+        parser.error("--speed must be positive")
+    return args
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.WARNING)
+    logging.getLogger("app").setLevel(logging.WARNING)
+
+    records = load_capture(args.capture, args.limit)
+    if not records:
+        print(f"No captured requests in {args.capture}")
+        return 1
+    servers = [] if args.url else _start_app(args.provider, args)
+    try:
+        report = asyncio.run(replay(records, args.url or servers[-1].url, args.speed))
+    finally:
+        for server in reversed(servers):
+            server.stop()
+
+    meta = report["meta"]
+    print(f"Replayed {meta['requests']} requests from {meta['conversations']} conversations: "
+          f"{meta['captured_span_s']}s captured -> {meta['replayed_span_s']}s at {args.speed}x, "
+          f"schedule slip p99 {report['schedule_slip_p99_ms']} ms")
+    for transport, metrics in report["results"].items():
+        print(f"{transport:<10} {metrics['requests']:>6} req  p50 {metrics['latency_p50_ms']:>8.1f} ms  "
+              f"p99 {metrics['latency_p99_ms']:>8.1f} ms  ttft p50 {metrics['ttft_p50_ms']:>8.1f} ms  "
+              f"shed {metrics['shed']}  errors {metrics['errors']}")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,271 @@
+"""
+Offline benchmark runner.
+
+Starts a fake Ollama server and the FastAPI app in-process, then drives the
+/chat, /ws/{client_id} and batch (direct LLMService) paths at several
+concurrency levels. Results are written as JSON and can be compared against
+a stored baseline to flag regressions.
+
+Usage:
+    python -m benchmarks.run --output bench_results.json
+    python -m benchmarks.run --baseline benchmarks/baseline.json
+    python -m benchmarks.run --save-baseline benchmarks/baseline.json
+    python -m benchmarks.run --compare bench_results.json --baseline benchmarks/baseline.json
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import sys
+import time
+from datetime import datetime
+from typing import List
+
+import httpx
+import websockets
+
+from app.concurrency_limiter import OverloadedError
+from .fake_ollama import FakeOllama
+from .harness import BackgroundServer, compare_results, rss_mb, summarize
+
+# Worker outcome for a request rejected by the concurrency limiter
+SHED = "shed"
+
+SCENARIOS = ("chat", "ws", "batch")
+
+PROMPTS = [
+    "What is a pod in Kubernetes?",
+    "Explain horizontal pod autoscaling in a few sentences.",
+    "How do services route traffic to pods, and what happens when a pod is replaced during a rolling update?",
+    "hi"
+]
+
+
+def _prompt(index: int) -> str:
+    return PROMPTS[index % len(PROMPTS)]
+
+
+async def _run_workers(concurrency: int, total: int, worker):
+    """Run `total` requests spread over `concurrency` workers; returns samples"""
+    latencies: List[float] = []
+    ttfts: List[float] = []
+    errors = 0
+    shed = 0
+    counter = iter(range(total))
+
+    async def loop(worker_id: int):
+        nonlocal errors, shed
+        async for sample in worker(worker_id, counter):
+            if sample is None:
+                errors += 1
+            elif sample == SHED:
+                shed += 1
+            else:
+                latencies.append(sample[0])
+                ttfts.append(sample[1])
+
+    rss_before = rss_mb()
+    start = time.perf_counter()
+    await asyncio.gather(*(loop(i) for i in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    return summarize(latencies, ttfts, errors, elapsed, rss_before, rss_mb(), shed=shed)
+
+
+async def bench_chat(app_url: str, concurrency: int, total: int) -> dict:
+    """REST /chat; TTFT is time to the first response byte"""
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=app_url, timeout=120.0, limits=limits) as client:
+        async def worker(worker_id, counter):
+            for index in counter:
+                payload = {"message": _prompt(index), "conversation_id": f"bench-chat-{worker_id}"}
+                start = time.perf_counter()
+                first = None
+                try:
+                    async with client.stream("POST", "/chat", json=payload) as response:
+                        async for _ in response.aiter_bytes():
+                            if first is None:
+                                first = time.perf_counter() - start
+                        status = response.status_code
+                except httpx.HTTPError:
+                    status = None
+                if status == 200:
+                    yield (time.perf_counter() - start, first or 0.0)
+                else:
+                    yield SHED if status == 503 else None
+
+        return await _run_workers(concurrency, total, worker)
+
+
+async def bench_ws(app_url: str, concurrency: int, total: int) -> dict:
+    """WebSocket /ws/{client_id} with one long-lived connection per worker"""
+    ws_url = app_url.replace("http://", "ws://")
+
+    async def worker(worker_id, counter):
+        async with websockets.connect(f"{ws_url}/ws/bench-{worker_id}", max_size=None) as ws:
+            await ws.recv()  # Welcome frame
+            for index in counter:
+                start = time.perf_counter()
+                first = None
+                await ws.send(json.dumps({"message": _prompt(index), "conversation_id": f"bench-ws-{worker_id}"}))
+                sample = None
+                while True:
+                    frame = json.loads(await ws.recv())
+                    if frame.get("type") in ("system", "ping", "status"):
+                        continue
+                    if first is None:
+                        first = time.perf_counter() - start
+                    if "response" in frame:
+                        sample = (time.perf_counter() - start, first)
+                        break
+                    if frame.get("type") == "error":
+                        sample = SHED if frame.get("code") == 503 else None
+                        break
+                yield sample
+
+    return await _run_workers(concurrency, total, worker)
+
+
+async def bench_batch(service, concurrency: int, total: int) -> dict:
+    """Batch path: LLMService.process_message driven directly, no HTTP in front"""
+    async def worker(worker_id, counter):
+        for index in counter:
+            start = time.perf_counter()
+            try:
+                await service.process_message(_prompt(index), f"bench-batch-{index}", priority="batch")
+            except OverloadedError:
+                yield SHED
+                continue
+            except Exception:
+                yield None
+                continue
+            latency = time.perf_counter() - start
+            yield (latency, latency)
+
+    return await _run_workers(concurrency, total, worker)
+
+
+async def run_benchmarks(args) -> dict:
+    fake = FakeOllama(prefill_tps=args.prefill_tps, decode_tps=args.decode_tps,
+                      response_tokens=args.response_tokens, jitter=args.jitter,
+                      max_parallel=args.max_parallel, seed=args.seed)
+    fake_server = BackgroundServer(fake.build_app()).start()
+
+    # The app reads its provider configuration at import time
+    os.environ["LLM_MODEL_PROVIDER"] = "ollama"
+    os.environ["LLM_MODEL_NAME"] = fake.model_name.split(":")[0]
+    os.environ["LLM_BASE_URL"] = fake_server.url
+    # Benchmark workers share one identity; measure the serving path, not quotas
+    os.environ["RATE_LIMIT_ENABLED"] = "false"
+    from app.main import app
+    from app.llm_service import LLMService
+
+    app_server = BackgroundServer(app).start()
+    batch_service = LLMService()
+    await batch_service.initialize()
+
+    results = {}
+    try:
+        for scenario in args.scenarios:
+            for concurrency in args.concurrency:
+                total = max(args.requests, concurrency)
+                if scenario == "chat":
+                    metrics = await bench_chat(app_server.url, concurrency, total)
+                elif scenario == "ws":
+                    metrics = await bench_ws(app_server.url, concurrency, total)
+                else:
+                    metrics = await bench_batch(batch_service, concurrency, total)
+                key = f"{scenario}@c{concurrency}"
+                results[key] = metrics
+                print(f"{key:<12} {metrics['throughput_rps']:>8.2f} req/s  "
+                      f"p50 {metrics['latency_p50_ms']:>8.1f} ms  p99 {metrics['latency_p99_ms']:>8.1f} ms  "
+                      f"ttft p50 {metrics['ttft_p50_ms']:>8.1f} ms  rss {metrics['rss_mb']:.0f} MB  "
+                      f"shed {metrics['shed']}  errors {metrics['errors']}")
+    finally:
+        await batch_service.cleanup()
+        app_server.stop()
+        fake_server.stop()
+
+    return {
+        "meta": {
+            "timestamp": datetime.now().isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "fake_ollama": {
+                "prefill_tps": args.prefill_tps,
+                "decode_tps": args.decode_tps,
+                "response_tokens": args.response_tokens,
+                "jitter": args.jitter,
+                "max_parallel": args.max_parallel
+            },
+            "requests_per_level": args.requests
+        },
+        "results": results
+    }
+
+
+def report_regressions(current: dict, baseline_path: str, threshold: float) -> int:
+    """Print regressions against the baseline; returns a process exit code"""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    regressions = compare_results(current["results"], baseline["results"], threshold)
+    if not regressions:
+        print(f"No regressions beyond {threshold:.0%} against {baseline_path}")
+        return 0
+    print(f"{len(regressions)} regression(s) beyond {threshold:.0%} against {baseline_path}:")
+    for r in regressions:
+        print(f"  {r['run']:<12} {r['metric']:<16} {r['baseline']} -> {r['current']} ({r['change_pct']:+.1f}%)")
+    return 1
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Offline benchmarks against a simulated Ollama server")
+    parser.add_argument("--scenarios", type=lambda s: s.split(","), default=list(SCENARIOS),
+                        help="Comma-separated subset of: chat,ws,batch")
+    parser.add_argument("--concurrency", type=lambda s: [int(c) for c in s.split(",")], default=[1, 4, 16],
+                        help="Comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=32, help="Requests per scenario and level")
+    parser.add_argument("--prefill-tps", type=float, default=2000.0, help="Fake prompt tokens/s")
+    parser.add_argument("--decode-tps", type=float, default=400.0, help="Fake generated tokens/s per slot")
+    parser.add_argument("--response-tokens", type=int, default=24, help="Mean generated tokens per reply")
+    parser.add_argument("--jitter", type=float, default=0.1, help="Relative timing jitter (0-1)")
+    parser.add_argument("--max-parallel", type=int, default=4, help="Fake server parallel slots")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default="bench_results.json", help="Where to write results JSON")
+    parser.add_argument("--baseline", help="Baseline JSON to compare against")
+    parser.add_argument("--save-baseline", help="Also write results to this baseline path")
+    parser.add_argument("--threshold", type=float, default=0.15, help="Relative change treated as a regression")
+    parser.add_argument("--compare", help="Compare an existing results file instead of running")
+    args = parser.parse_args(argv)
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+    return args
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.WARNING)
+    logging.getLogger("app").setLevel(logging.WARNING)
+
+    if args.compare:
+        if not args.baseline:
+            print("--compare requires --baseline")
+            return 2
+        with open(args.compare) as f:
+            return report_regressions(json.load(f), args.baseline, args.threshold)
+
+    results = asyncio.run(run_benchmarks(args))
+    for path in filter(None, [args.output, args.save_baseline]):
+        with open(path, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {path}")
+
+    if args.baseline:
+        return report_regressions(results, args.baseline, args.threshold)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
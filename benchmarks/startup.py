@@ -0,0 +1,86 @@
+"""
+Startup benchmark: time from process launch until /ready succeeds, plus the
+per-phase timings the app reports under `startup` in /stats.
+
+Each run starts a fresh `uvicorn app.main:app` process, so imports and
+provider initialization are measured as a new pod would pay for them.
+
+Usage:
+    python -m benchmarks.startup --runs 5 --provider sim
+    python -m benchmarks.startup --max-ms 3000   # exit code 1 if the median is slower
+"""
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def measure_once(provider: str, timeout: float, extra_env: dict = None) -> dict:
+    port = _free_port()
+    env = dict(os.environ, LLM_MODEL_PROVIDER=provider, LOG_LEVEL="WARNING",
+               RATE_LIMIT_ENABLED="false", LLM_WARMUP="false", **(extra_env or {}))
+    env.pop("CONVERSATION_STORE_DIR", None)
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port)],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=2.0) as client:
+            while True:
+                if time.perf_counter() - start > timeout:
+                    raise TimeoutError(f"not ready after {timeout}s")
+                if process.poll() is not None:
+                    raise RuntimeError(f"server exited with code {process.returncode}")
+                try:
+                    if client.get("/ready").status_code == 200:
+                        break
+                except httpx.TransportError:
+                    pass
+                time.sleep(0.01)
+            ready_ms = (time.perf_counter() - start) * 1000
+            startup = client.get("/stats").json()["startup"]
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+    return {"ready_ms": ready_ms, "startup": startup}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark time-to-ready of a fresh app process")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--provider", default="sim", help="LLM_MODEL_PROVIDER for the app (default: sim)")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--max-ms", type=float, help="Fail if the median time-to-ready exceeds this")
+    args = parser.parse_args(argv)
+
+    runs = [measure_once(args.provider, args.timeout) for _ in range(args.runs)]
+    ready = sorted(run["ready_ms"] for run in runs)
+    median = statistics.median(ready)
+    print(f"{'time_to_ready_ms_p50':<32} {median:.1f}")
+    print(f"{'time_to_ready_ms_max':<32} {ready[-1]:.1f}")
+
+    # Phases from the median run, as the app measured them (ms since process start)
+    phases = sorted(runs, key=lambda run: run["ready_ms"])[len(runs) // 2]["startup"]["phases"]
+    for name, phase in phases.items():
+        print(f"  {name:<30} start {phase['start_ms']:>8.1f}  took {phase['duration_ms']:>8.1f}")
+
+    if args.max_ms is not None and median > args.max_ms:
+        print(f"REGRESSION: median time-to-ready {median:.1f}ms exceeds {args.max_ms:.1f}ms")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
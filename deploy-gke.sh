@@ -201,7 +201,8 @@ deploy_to_kubernetes() {
     sed "s|gcr.io/scalable-llm-chatbot/llm-chatbot-frontend:latest|$REGISTRY_URL/$PROJECT_ID/llm-chatbot-repo/$FRONTEND_IMAGE:latest|g" \
         k8s/frontend-deployment-cloud.yaml > /tmp/frontend-deployment.yaml
     
-    # Apply deployments
+    # Apply deployments (the backend used to be a Deployment; it is now a StatefulSet)
+    kubectl delete deployment llm-chatbot-backend --ignore-not-found
     kubectl apply -f /tmp/backend-deployment.yaml
     kubectl apply -f /tmp/frontend-deployment.yaml
     
@@ -220,9 +221,9 @@ wait_and_show_status() {
     print_status "Waiting for deployments to be ready..."
     
     # Wait for backend deployment (faster with pre-loaded model)
-    kubectl rollout status deployment/llm-chatbot-backend --timeout=300s || {
+    kubectl rollout status statefulset/llm-chatbot-backend --timeout=300s || {
         print_error "Backend deployment failed or timed out"
-        kubectl describe deployment llm-chatbot-backend
+        kubectl describe statefulset llm-chatbot-backend
         kubectl logs -l app=llm-chatbot,component=backend --tail=50
         exit 1
     }
@@ -271,8 +272,8 @@ wait_and_show_status() {
     print_status "✅ No model download required - ready to chat immediately!"
     echo ""
     print_status "You can monitor the system with:"
-    echo "kubectl logs -f deployment/llm-chatbot-backend -c ollama"
-    echo "kubectl logs -f deployment/llm-chatbot-backend -c backend"
+    echo "kubectl logs -f statefulset/llm-chatbot-backend -c ollama"
+    echo "kubectl logs -f statefulset/llm-chatbot-backend -c backend"
 }
 
 # Main execution
@@ -96,6 +96,7 @@ function App() {
   const [modelSwitching, setModelSwitching] = useState(false);
   const messagesEndRef = useRef(null);
   const wsRef = useRef(null);
+  const reconnectDelayRef = useRef(5000);
 
   const scrollToBottom = () => {
     messagesEndRef.current?.scrollIntoView({ behavior: 'smooth' });
@@ -148,6 +149,10 @@ function App() {
         if (data.type === 'system') {
           // Handle system messages
           console.log('System message:', data.message);
+        } else if (data.type === 'reconnect') {
+          // Server is draining; reconnect after its jittered delay
+          reconnectDelayRef.current = data.retry_after * 1000;
+          return;
         } else if (data.response) {
           // Handle chat responses
           setMessages(prev => [...prev, {
@@ -165,12 +170,14 @@ function App() {
         setConnectionStatus('disconnected');
         console.log('WebSocket disconnected');
         
-        // Attempt to reconnect after 5 seconds
+        // Attempt to reconnect after 5 seconds, or when a draining server said to
+        const delay = reconnectDelayRef.current;
+        reconnectDelayRef.current = 5000;
         setTimeout(() => {
           if (wsRef.current?.readyState === WebSocket.CLOSED) {
             initializeWebSocket();
           }
-        }, 5000);
+        }, delay);
       };
 
       wsRef.current.onerror = (error) => {
@@ -1,7 +1,9 @@
 import random
 import json
+import os
 import time
-from locust import HttpUser, TaskSet, task, between, tag
+import threading
+from locust import HttpUser, User, TaskSet, task, between, tag
 from locust.exception import StopUser
 import websocket
 import uuid
@@ -11,6 +13,76 @@ import logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Multi-turn conversations used by the streaming users
+CONVERSATIONS = [
+    [
+        "What is Kubernetes?",
+        "How does it decide where to run a pod?",
+        "What happens to my pods if that node fails?"
+    ],
+    [
+        "Explain horizontal pod autoscaling",
+        "Which metrics can it scale on?",
+        "Why might scaling on CPU be a poor fit for LLM inference?",
+        "What would you use instead?"
+    ],
+    [
+        "What is the difference between Docker and Kubernetes?",
+        "Can I use Kubernetes without Docker?"
+    ],
+    [
+        "How do WebSockets work behind a load balancer?",
+        "What happens to open connections during a rolling update?",
+        "How can clients reconnect without overloading the remaining pods?"
+    ]
+]
+
+class StreamSampleRecorder:
+    """
+    Appends raw streaming samples (epoch, metric, value_ms) to the CSV named by
+    STREAM_SAMPLES_CSV so streaming_report.py can correlate them with HPA replicas.
+    """
+    
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.file = None
+        if path:
+            new_file = not os.path.exists(path)
+            self.file = open(path, "a", buffering=1)
+            if new_file:
+                self.file.write("timestamp,metric,value_ms\n")
+    
+    def record(self, metric, value_ms):
+        if self.file is None:
+            return
+        with self.lock:
+            self.file.write(f"{time.time():.3f},{metric},{value_ms:.2f}\n")
+
+sample_recorder = StreamSampleRecorder(os.getenv("STREAM_SAMPLES_CSV"))
+
+def record_stream_metric(environment, request_type, name, value_ms, exception=None):
+    """Report a streaming latency as a custom locust request event and raw sample"""
+    environment.events.request.fire(
+        request_type=request_type,
+        name=name,
+        response_time=value_ms,
+        response_length=0,
+        exception=exception,
+        context={}
+    )
+    if exception is None:
+        sample_recorder.record(f"{request_type}:{name}", value_ms)
+
+def record_stream_timings(environment, request_type, start, token_times, end):
+    """Fire TTFT, mean inter-token latency and full-response latency for one reply"""
+    if token_times:
+        record_stream_metric(environment, request_type, "ttft", (token_times[0] - start) * 1000)
+    if len(token_times) > 1:
+        gaps = [b - a for a, b in zip(token_times, token_times[1:])]
+        record_stream_metric(environment, request_type, "inter_token", sum(gaps) / len(gaps) * 1000)
+    record_stream_metric(environment, request_type, "full_response", (end - start) * 1000)
+
 class ChatBotTaskSet(TaskSet):
     """
     Task set for testing the scalable LLM chatbot application
@@ -124,13 +196,13 @@ class ChatBotTaskSet(TaskSet):
             else:
                 response.failure(f"Metrics request failed with status {response.status_code}")
 
-class WebSocketChatUser(HttpUser):
+class HttpChatUser(HttpUser):
     """
-    User that primarily uses WebSocket for real-time chat
+    User that chats over the REST API
     """
     wait_time = between(1, 3)
     tasks = [ChatBotTaskSet]
-    weight = 3  # 75% of users use HTTP API
+    weight = 3
     
     def on_start(self):
         """Test initial connection"""
@@ -139,6 +211,125 @@ class WebSocketChatUser(HttpUser):
             logger.error("Backend not healthy, stopping user")
             raise StopUser()
 
+class WebSocketChatUser(User):
+    """
+    User holding one long-lived WebSocket and streaming multi-turn conversations.
+    Records time-to-first-token, mean inter-token latency and full-response
+    latency as custom "WS" events.
+    """
+    wait_time = between(2, 5)  # Reading time between turns
+    weight = 3
+    response_timeout = 180
+    
+    def on_start(self):
+        self.client_id = f"locust-{uuid.uuid4().hex[:8]}"
+        self.ws = None
+        self._connect()
+    
+    def on_stop(self):
+        if self.ws:
+            self.ws.close()
+            self.ws = None
+    
+    def _connect(self):
+        url = self.host.replace("https://", "wss://").replace("http://", "ws://") + f"/ws/{self.client_id}"
+        start = time.time()
+        try:
+            self.ws = websocket.create_connection(url, timeout=self.response_timeout)
+            self.ws.recv()  # Welcome frame
+            record_stream_metric(self.environment, "WS", "connect", (time.time() - start) * 1000)
+        except Exception as e:
+            record_stream_metric(self.environment, "WS", "connect", (time.time() - start) * 1000, exception=e)
+            self.ws = None
+    
+    @task
+    def conversation(self):
+        """Send one multi-turn conversation on the open socket"""
+        if self.ws is None:
+            self._connect()
+            if self.ws is None:
+                return
+        
+        conversation_id = str(uuid.uuid4())
+        for turn, message in enumerate(random.choice(CONVERSATIONS)):
+            if turn:
+                self.wait()
+            if not self._send_turn(message, conversation_id):
+                return
+    
+    def _send_turn(self, message, conversation_id):
+        start = time.time()
+        token_times = []
+        try:
+            self.ws.send(json.dumps({
+                "message": message,
+                "conversation_id": conversation_id,
+                "stream": True
+            }))
+            while True:
+                frame = json.loads(self.ws.recv())
+                if frame.get("type") == "token":
+                    token_times.append(time.time())
+                elif "response" in frame:
+                    break
+                elif frame.get("type") == "error":
+                    raise Exception(frame.get("message", "error frame"))
+        except Exception as e:
+            record_stream_metric(self.environment, "WS", "full_response", (time.time() - start) * 1000, exception=e)
+            # Drop the socket; the next task reconnects
+            try:
+                self.ws.close()
+            finally:
+                self.ws = None
+            return False
+        
+        record_stream_timings(self.environment, "WS", start, token_times, time.time())
+        return True
+
+class SSEStreamingUser(HttpUser):
+    """
+    User streaming responses from POST /chat/stream (Server-Sent Events).
+    Records the same streaming metrics as WebSocketChatUser under "SSE".
+    """
+    wait_time = between(2, 5)
+    weight = 1
+    
+    @task
+    def conversation(self):
+        conversation_id = str(uuid.uuid4())
+        for turn, message in enumerate(random.choice(CONVERSATIONS)):
+            if turn:
+                self.wait()
+            if not self._send_turn(message, conversation_id):
+                return
+    
+    def _send_turn(self, message, conversation_id):
+        start = time.time()
+        token_times = []
+        try:
+            with self.client.post(
+                "/chat/stream",
+                json={"message": message, "conversation_id": conversation_id},
+                stream=True,
+                catch_response=True,
+                name="/chat/stream"
+            ) as response:
+                if response.status_code != 200:
+                    response.failure(f"Stream request failed with status {response.status_code}")
+                    return False
+                for line in response.iter_lines(decode_unicode=True):
+                    if line == "event: token":
+                        token_times.append(time.time())
+                    elif line == "event: done":
+                        break
+                response.success()
+        except Exception as e:
+            record_stream_metric(self.environment, "SSE", "full_response", (time.time() - start) * 1000, exception=e)
+            return False
+        
+        record_stream_timings(self.environment, "SSE", start, token_times, time.time())
+        return True
+
 class HighVolumeUser(HttpUser):
     """
     User that sends high volume of requests to test scaling
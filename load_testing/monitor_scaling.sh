@@ -3,6 +3,12 @@
 # Monitor Kubernetes Auto-Scaling During Load Testing
 # This script watches pod scaling, HPA metrics, and resource usage
 
+HPA_NAME="${HPA_NAME:-llm-chatbot-backend-hpa}"
+# Workload the HPA scales (the simple manifest uses deployment/llm-chatbot-backend)
+BACKEND_WORKLOAD="${BACKEND_WORKLOAD:-statefulset/llm-chatbot-backend}"
+# Machine-readable replica log for post-run reports (set SCALING_LOG="" to disable)
+SCALING_LOG="${SCALING_LOG-load_testing/scaling_log.csv}"
+
 echo "🔍 Starting Kubernetes Auto-Scaling Monitor"
 echo "=================================================="
 
@@ -22,7 +28,7 @@ monitor_pods() {
 # Function to monitor HPA
 monitor_hpa() {
     echo "$(timestamp) - Horizontal Pod Autoscaler:"
-    kubectl get hpa llm-chatbot-hpa --no-headers | \
+    kubectl get hpa "$HPA_NAME" --no-headers | \
     awk '{printf "  Targets: %-20s Min/Max/Current: %s/%s/%s\n", $4, $5, $6, $7}'
     echo
 }
@@ -44,11 +50,12 @@ monitor_endpoints() {
     echo
 }
 
-# Function to get deployment status
+# Function to get backend workload status (same fields for a StatefulSet or a Deployment)
 monitor_deployment() {
-    echo "$(timestamp) - Deployment Status:"
-    kubectl get deployment llm-chatbot-backend --no-headers | \
-    awk '{printf "  Ready: %s  Up-to-date: %s  Available: %s\n", $2, $3, $4}'
+    echo "$(timestamp) - Backend Status ($BACKEND_WORKLOAD):"
+    kubectl get "$BACKEND_WORKLOAD" \
+        -o jsonpath='{.status.readyReplicas},{.spec.replicas},{.status.updatedReplicas}' 2>/dev/null | \
+    awk -F',' '{printf "  Ready: %s/%s  Up-to-date: %s\n", ($1 == "" ? 0 : $1), $2, ($3 == "" ? 0 : $3)}'
     echo
 }
 
@@ -64,8 +71,21 @@ check_load_test_connectivity() {
     echo
 }
 
+# Function to append one replica sample to the scaling log
+log_scaling_sample() {
+    [ -z "$SCALING_LOG" ] && return
+    if [ ! -f "$SCALING_LOG" ]; then
+        echo "timestamp,current_replicas,desired_replicas,ready_replicas,cpu_utilization" > "$SCALING_LOG"
+    fi
+    hpa=$(kubectl get hpa "$HPA_NAME" -o jsonpath='{.status.currentReplicas},{.status.desiredReplicas},{.status.currentMetrics[0].resource.current.averageUtilization}' 2>/dev/null)
+    ready=$(kubectl get "$BACKEND_WORKLOAD" -o jsonpath='{.status.readyReplicas}' 2>/dev/null)
+    IFS=',' read -r current desired cpu <<< "$hpa"
+    echo "$(date +%s),${current:-0},${desired:-0},${ready:-0},${cpu}" >> "$SCALING_LOG"
+}
+
 # Main monitoring loop
 echo "Starting continuous monitoring... (Press Ctrl+C to stop)"
+[ -n "$SCALING_LOG" ] && echo "Logging replica counts to $SCALING_LOG"
 echo
 
 while true; do
@@ -80,6 +100,7 @@ while true; do
     monitor_resources
     monitor_endpoints
     check_load_test_connectivity
+    log_scaling_sample
     
     echo "Refreshing in 10 seconds..."
     echo "Press Ctrl+C to stop monitoring"
@@ -0,0 +1,46 @@
+"""
+Helpers shared by the post-run reports (streaming_report.py, scaling_report.py).
+"""
+import csv
+import os
+import sys
+
+# The reports run as scripts from load_testing/; percentiles come from the app's helper
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app.stats import percentile  # noqa: E402  (re-exported for the reports)
+
+
+def number(value):
+    """float(value), or None for blanks and locust's "N/A" for empty windows"""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def fmt(value, digits=1):
+    return "-" if value is None else f"{value:.{digits}f}"
+
+
+def iter_scaling_log(path):
+    """
+    Yield (timestamp, current, desired, ready, cpu) tuples from monitor_scaling.sh
+    output, in file order, one row at a time. Malformed rows are skipped.
+    """
+    with open(path, newline="") as f:
+        for row in csv.DictReader(f):
+            try:
+                yield (
+                    float(row["timestamp"]),
+                    int(row["current_replicas"] or 0),
+                    int(row.get("desired_replicas") or 0),
+                    int(row["ready_replicas"] or 0),
+                    number(row.get("cpu_utilization"))
+                )
+            except (KeyError, ValueError):
+                continue
+
+
+def load_scaling_log(path):
+    """All samples of iter_scaling_log(), sorted by timestamp"""
+    return sorted(iter_scaling_log(path))
@@ -0,0 +1,365 @@
+"""
+Scaling-efficiency report for a load test run.
+
+Inputs:
+  - locust's `<prefix>_stats_history.csv` (and optionally `<prefix>_stats.csv`)
+    written with `--csv <prefix>`
+  - the replica log written by monitor_scaling.sh (SCALING_LOG)
+
+Both CSVs are read row by row and merged on the timestamp, keeping only
+running aggregates, so multi-hour runs don't need to fit in memory.
+
+Computes throughput per ready replica, latency vs. concurrency curves,
+scale-up reaction times (load step -> HPA decision -> replicas ready) and
+saturation knees (where added users stop adding throughput, and where p95
+latency departs from its low-load level).
+
+Usage:
+  python load_testing/scaling_report.py \
+      --history results_stats_history.csv --stats results_stats.csv \
+      --scaling load_testing/scaling_log.csv \
+      --bucket 30 --json scaling_report.json --output scaling_report.md --html scaling_report.html
+"""
+import argparse
+import csv
+import html
+import json
+import sys
+from collections import defaultdict
+from datetime import datetime
+
+from report_utils import fmt, iter_scaling_log, number
+
+# p95 above this multiple of the lowest-concurrency p95 marks the latency knee
+LATENCY_KNEE_FACTOR = 2.0
+
+
+def iter_history(path):
+    """Yield aggregated locust history rows as dicts, in file (time) order"""
+    with open(path, newline="") as f:
+        for row in csv.DictReader(f):
+            if row.get("Name") != "Aggregated":
+                continue
+            timestamp = number(row.get("Timestamp"))
+            if timestamp is None:
+                continue
+            yield {
+                "timestamp": timestamp,
+                "users": int(number(row.get("User Count")) or 0),
+                "rps": number(row.get("Requests/s")) or 0.0,
+                "failures_per_s": number(row.get("Failures/s")) or 0.0,
+                "p50_ms": number(row.get("50%")),
+                "p95_ms": number(row.get("95%"))
+            }
+
+
+def load_endpoint_stats(path):
+    """Final per-endpoint rows from `<prefix>_stats.csv` (small: one row per endpoint)"""
+    endpoints = []
+    with open(path, newline="") as f:
+        for row in csv.DictReader(f):
+            endpoints.append({
+                "type": row.get("Type") or "",
+                "name": row.get("Name"),
+                "requests": int(number(row.get("Request Count")) or 0),
+                "failures": int(number(row.get("Failure Count")) or 0),
+                "rps": number(row.get("Requests/s")),
+                "p50_ms": number(row.get("50%")),
+                "p95_ms": number(row.get("95%")),
+                "p99_ms": number(row.get("99%"))
+            })
+    return endpoints
+
+
+class _Aggregate:
+    """Running sums for one group of history rows; latencies are rps-weighted means"""
+
+    __slots__ = ("rows", "rps", "failures", "weight", "p50", "p95", "p95_max", "replicas")
+
+    def __init__(self):
+        self.rows = 0
+        self.rps = 0.0
+        self.failures = 0.0
+        self.weight = 0.0
+        self.p50 = 0.0
+        self.p95 = 0.0
+        self.p95_max = None
+        self.replicas = 0
+
+    def add(self, row, ready):
+        self.rows += 1
+        self.rps += row["rps"]
+        self.failures += row["failures_per_s"]
+        self.replicas += ready or 0
+        if row["p95_ms"] is not None and row["rps"] > 0:
+            self.weight += row["rps"]
+            self.p50 += (row["p50_ms"] or 0.0) * row["rps"]
+            self.p95 += row["p95_ms"] * row["rps"]
+            self.p95_max = row["p95_ms"] if self.p95_max is None else max(self.p95_max, row["p95_ms"])
+
+    def summary(self):
+        mean_rps = self.rps / self.rows
+        mean_replicas = self.replicas / self.rows
+        return {
+            "samples": self.rows,
+            "rps": round(mean_rps, 3),
+            "failures_per_s": round(self.failures / self.rows, 3),
+            "p50_ms": round(self.p50 / self.weight, 1) if self.weight else None,
+            "p95_ms": round(self.p95 / self.weight, 1) if self.weight else None,
+            "p95_max_ms": self.p95_max,
+            "ready_replicas": round(mean_replicas, 2),
+            "rps_per_replica": round(mean_rps / mean_replicas, 3) if mean_replicas else None
+        }
+
+
+def merge_timeline(history, scaling):
+    """
+    Yield (history_row, scaling_sample) pairs, pairing each history row with
+    the latest scaling sample at or before it. Scaling samples are also
+    yielded on their own as (None, sample) so callers can track HPA changes.
+    """
+    current = None
+    pending = next(scaling, None)
+    for row in history:
+        while pending is not None and pending[0] <= row["timestamp"]:
+            current = pending
+            yield None, current
+            pending = next(scaling, None)
+        yield row, current
+    while pending is not None:
+        yield None, pending
+        pending = next(scaling, None)
+
+
+def find_throughput_knee(curve):
+    """
+    User count after which added users stop adding throughput: the point of
+    the (users, rps) curve farthest below the chord from first to last point
+    (Kneedle on min-max normalized axes). None for fewer than 3 points.
+    """
+    if len(curve) < 3:
+        return None
+    xs = [point["users"] for point in curve]
+    ys = [point["rps"] for point in curve]
+    x_span = (xs[-1] - xs[0]) or 1
+    y_span = (max(ys) - min(ys)) or 1
+    best, best_distance = None, 0.0
+    for x, y in zip(xs, ys):
+        nx = (x - xs[0]) / x_span
+        ny = (y - min(ys)) / y_span
+        distance = ny - nx
+        if distance > best_distance:
+            best, best_distance = x, distance
+    return best
+
+
+def find_latency_knee(curve, factor=LATENCY_KNEE_FACTOR):
+    """Lowest user count whose p95 exceeds `factor` times the p95 at the lowest user count"""
+    points = [point for point in curve if point["p95_ms"] is not None]
+    if len(points) < 2:
+        return None
+    baseline = points[0]["p95_ms"]
+    for point in points[1:]:
+        if point["p95_ms"] > baseline * factor:
+            return point["users"]
+    return None
+
+
+def build_report(history_path, scaling_path, bucket_seconds, stats_path=None):
+    buckets = defaultdict(_Aggregate)
+    by_users = defaultdict(_Aggregate)
+    by_replicas = defaultdict(_Aggregate)
+
+    scale_events = []
+    open_events = []  # scale-ups waiting for ready replicas to catch up
+    last_desired = None
+    last_users = None
+    last_load_step = None  # timestamp of the most recent increase in users
+    first_ts = last_ts = None
+
+    for row, sample in merge_timeline(iter_history(history_path), iter_scaling_log(scaling_path)):
+        if row is None:
+            ts, _, desired, ready, cpu = sample
+            if last_desired is not None and desired > last_desired:
+                event = {
+                    "decided_at": ts,
+                    "from_replicas": last_desired,
+                    "to_replicas": desired,
+                    "cpu_utilization": cpu,
+                    "decision_delay_s": round(ts - last_load_step, 1) if last_load_step is not None else None,
+                    "ready_delay_s": None
+                }
+                scale_events.append(event)
+                open_events.append(event)
+            for event in list(open_events):
+                if ready >= event["to_replicas"]:
+                    event["ready_delay_s"] = round(ts - event["decided_at"], 1)
+                    open_events.remove(event)
+            last_desired = desired
+            continue
+
+        ts = row["timestamp"]
+        first_ts = ts if first_ts is None else first_ts
+        last_ts = ts
+        if last_users is not None and row["users"] > last_users:
+            last_load_step = ts
+        last_users = row["users"]
+
+        ready = sample[3] if sample else None
+        buckets[int(ts // bucket_seconds) * bucket_seconds].add(row, ready)
+        if row["users"] > 0:
+            by_users[row["users"]].add(row, ready)
+        if ready:
+            by_replicas[ready].add(row, ready)
+
+    timeline = [{"bucket_start": bucket, **aggregate.summary()} for bucket, aggregate in sorted(buckets.items())]
+    concurrency = [{"users": users, **aggregate.summary()} for users, aggregate in sorted(by_users.items())]
+    per_replica = [{"replicas": replicas, **aggregate.summary()} for replicas, aggregate in sorted(by_replicas.items())]
+
+    ready_delays = [e["ready_delay_s"] for e in scale_events if e["ready_delay_s"] is not None]
+    decision_delays = [e["decision_delay_s"] for e in scale_events if e["decision_delay_s"] is not None]
+    return {
+        "bucket_seconds": bucket_seconds,
+        "duration_s": round(last_ts - first_ts, 1) if first_ts is not None else 0.0,
+        "summary": {
+            "peak_rps": max((row["rps"] for row in timeline), default=None),
+            "peak_ready_replicas": max((row["replicas"] for row in per_replica), default=None),
+            "best_rps_per_replica": max((row["rps_per_replica"] for row in per_replica
+                                         if row["rps_per_replica"] is not None), default=None),
+            "scale_up_events": len(scale_events),
+            "mean_decision_delay_s": round(sum(decision_delays) / len(decision_delays), 1) if decision_delays else None,
+            "mean_ready_delay_s": round(sum(ready_delays) / len(ready_delays), 1) if ready_delays else None,
+            "throughput_knee_users": find_throughput_knee(concurrency),
+            "latency_knee_users": find_latency_knee(concurrency)
+        },
+        "scale_events": scale_events,
+        "per_replica": per_replica,
+        "concurrency": concurrency,
+        "timeline": timeline,
+        "endpoints": load_endpoint_stats(stats_path) if stats_path else []
+    }
+
+
+def _sections(report):
+    """Report tables as (title, note, headers, rows), shared by the markdown and HTML renderers"""
+    summary = report["summary"]
+    sections = [(
+        "Summary", None, ["Metric", "Value"],
+        [[key.replace("_", " "), "-" if value is None else str(value)] for key, value in summary.items()]
+    ), (
+        "Throughput per Ready Replica", None,
+        ["Ready replicas", "Samples", "Requests/s", "Requests/s per replica", "p50 (ms)", "p95 (ms)"],
+        [[row["replicas"], row["samples"], fmt(row["rps"], 2), fmt(row["rps_per_replica"], 2),
+          fmt(row["p50_ms"]), fmt(row["p95_ms"])] for row in report["per_replica"]]
+    ), (
+        "Latency vs. Concurrency",
+        f"Throughput knee: {summary['throughput_knee_users'] or '-'} users; "
+        f"latency knee (p95 > {LATENCY_KNEE_FACTOR:g}x low-load p95): {summary['latency_knee_users'] or '-'} users.",
+        ["Users", "Samples", "Requests/s", "Failures/s", "p50 (ms)", "p95 (ms)", "Mean ready replicas"],
+        [[row["users"], row["samples"], fmt(row["rps"], 2), fmt(row["failures_per_s"], 2),
+          fmt(row["p50_ms"]), fmt(row["p95_ms"]), fmt(row["ready_replicas"], 2)] for row in report["concurrency"]]
+    ), (
+        "Scale-up Events",
+        "Decision delay: last increase in users -> HPA raised desired replicas. "
+        "Ready delay: HPA decision -> that many replicas ready.",
+        ["Decided at", "Replicas", "CPU %", "Decision delay (s)", "Ready delay (s)"],
+        [[datetime.fromtimestamp(e["decided_at"]).strftime("%H:%M:%S"), f"{e['from_replicas']} -> {e['to_replicas']}",
+          fmt(e["cpu_utilization"], 0), fmt(e["decision_delay_s"]), fmt(e["ready_delay_s"])]
+         for e in report["scale_events"]]
+    )]
+    if report["endpoints"]:
+        sections.append((
+            "Endpoints", None, ["Type", "Name", "Requests", "Failures", "Requests/s", "p50 (ms)", "p95 (ms)", "p99 (ms)"],
+            [[e["type"], e["name"], e["requests"], e["failures"], fmt(e["rps"], 2), fmt(e["p50_ms"]),
+              fmt(e["p95_ms"]), fmt(e["p99_ms"])] for e in report["endpoints"]]
+        ))
+    sections.append((
+        f"Timeline ({report['bucket_seconds']}s buckets)", None,
+        ["Time", "Requests/s", "p95 (ms)", "Ready replicas", "Requests/s per replica"],
+        [[datetime.fromtimestamp(row["bucket_start"]).strftime("%H:%M:%S"), fmt(row["rps"], 2),
+          fmt(row["p95_ms"]), fmt(row["ready_replicas"], 2), fmt(row["rps_per_replica"], 2)]
+         for row in report["timeline"]]
+    ))
+    return sections
+
+
+def render_markdown(report):
+    lines = ["# Scaling Efficiency Report", ""]
+    for title, note, headers, rows in _sections(report):
+        lines += [f"## {title}", ""]
+        if note:
+            lines += [note, ""]
+        lines.append("| " + " | ".join(headers) + " |")
+        lines.append("|" + "---|" * len(headers))
+        lines += ["| " + " | ".join(str(cell) for cell in row) + " |" for row in rows]
+        lines.append("")
+    return "\n".join(lines)
+
+
+def _timeline_svg(timeline, width=800, height=200):
+    """Inline SVG: requests/s (blue) and ready replicas (orange), each scaled to its own maximum"""
+    if len(timeline) < 2:
+        return ""
+    start, end = timeline[0]["bucket_start"], timeline[-1]["bucket_start"]
+
+    def polyline(key, color):
+        peak = max(row[key] or 0 for row in timeline) or 1
+        points = " ".join(
+            f"{(row['bucket_start'] - start) / ((end - start) or 1) * width:.1f},"
+            f"{height - (row[key] or 0) / peak * (height - 10):.1f}"
+            for row in timeline
+        )
+        return f'<polyline fill="none" stroke="{color}" stroke-width="2" points="{points}"/>'
+
+    return (f'<svg width="{width}" height="{height}" style="border:1px solid #ddd">'
+            f'{polyline("rps", "#1f77b4")}{polyline("ready_replicas", "#ff7f0e")}</svg>'
+            '<p><span style="color:#1f77b4">requests/s</span> vs. '
+            '<span style="color:#ff7f0e">ready replicas</span></p>')
+
+
+def render_html(report):
+    parts = ["<!DOCTYPE html><html><head><meta charset='utf-8'><title>Scaling Efficiency Report</title>",
+             "<style>body{font-family:sans-serif;margin:2em}table{border-collapse:collapse;margin-bottom:2em}"
+             "td,th{border:1px solid #ccc;padding:4px 8px;text-align:right}th{background:#f4f4f4}</style>",
+             "</head><body><h1>Scaling Efficiency Report</h1>", _timeline_svg(report["timeline"])]
+    for title, note, headers, rows in _sections(report):
+        parts.append(f"<h2>{html.escape(title)}</h2>")
+        if note:
+            parts.append(f"<p>{html.escape(note)}</p>")
+        parts.append("<table><tr>" + "".join(f"<th>{html.escape(h)}</th>" for h in headers) + "</tr>")
+        for row in rows:
+            parts.append("<tr>" + "".join(f"<td>{html.escape(str(cell))}</td>" for cell in row) + "</tr>")
+        parts.append("</table>")
+    parts.append("</body></html>")
+    return "\n".join(parts)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Analyze scaling efficiency from locust and HPA logs")
+    parser.add_argument("--history", required=True, help="locust <prefix>_stats_history.csv")
+    parser.add_argument("--stats", help="locust <prefix>_stats.csv (per-endpoint totals)")
+    parser.add_argument("--scaling", required=True, help="CSV written by monitor_scaling.sh")
+    parser.add_argument("--bucket", type=int, default=30, help="Timeline bucket size in seconds")
+    parser.add_argument("--output", help="Markdown report path (default: stdout)")
+    parser.add_argument("--html", help="Also write a static HTML report")
+    parser.add_argument("--json", help="Also write the machine-readable summary as JSON")
+    args = parser.parse_args(argv)
+
+    report = build_report(args.history, args.scaling, args.bucket, args.stats)
+    markdown = render_markdown(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(markdown)
+    else:
+        sys.stdout.write(markdown)
+    if args.html:
+        with open(args.html, "w") as f:
+            f.write(render_html(report))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
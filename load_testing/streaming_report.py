@@ -0,0 +1,144 @@
+"""
+Post-run report correlating streaming latencies with HPA replica counts.
+
+Inputs:
+  - the raw samples CSV written by locustfile.py when STREAM_SAMPLES_CSV is set
+  - the replica log written by monitor_scaling.sh (SCALING_LOG)
+
+Usage:
+  python load_testing/streaming_report.py \
+      --samples stream_samples.csv --scaling load_testing/scaling_log.csv \
+      --bucket 30 --output streaming_report.md
+"""
+import argparse
+import bisect
+import csv
+import json
+import statistics
+import sys
+from collections import defaultdict
+from datetime import datetime
+
+from report_utils import fmt, load_scaling_log, percentile
+
+
+def replicas_at(scaling, timestamps, ts):
+    """Replica counts from the latest scaling sample at or before `ts`"""
+    index = bisect.bisect_right(timestamps, ts) - 1
+    if index < 0:
+        return None
+    return scaling[index][1], scaling[index][3]
+
+
+def correlation(xs, ys):
+    """Pearson correlation, or None when undefined"""
+    if len(xs) < 3 or len(set(xs)) < 2 or len(set(ys)) < 2:
+        return None
+    return statistics.correlation(xs, ys)
+
+
+def build_report(samples_path, scaling_path, bucket_seconds):
+    scaling = load_scaling_log(scaling_path)
+    scaling_ts = [row[0] for row in scaling]
+
+    # (bucket_start, metric) -> values
+    buckets = defaultdict(list)
+    by_replicas = defaultdict(list)
+    with open(samples_path, newline="") as f:
+        for row in csv.DictReader(f):
+            ts = float(row["timestamp"])
+            value = float(row["value_ms"])
+            bucket = int(ts // bucket_seconds) * bucket_seconds
+            buckets[(bucket, row["metric"])].append(value)
+            replicas = replicas_at(scaling, scaling_ts, ts)
+            if replicas is not None:
+                by_replicas[(replicas[1], row["metric"])].append(value)
+
+    timeline = []
+    for (bucket, metric), values in sorted(buckets.items()):
+        replicas = replicas_at(scaling, scaling_ts, bucket + bucket_seconds)
+        timeline.append({
+            "bucket_start": bucket,
+            "metric": metric,
+            "count": len(values),
+            "p50_ms": percentile(values, 50),
+            "p95_ms": percentile(values, 95),
+            "current_replicas": replicas[0] if replicas else None,
+            "ready_replicas": replicas[1] if replicas else None
+        })
+
+    per_replica = [
+        {
+            "ready_replicas": replicas,
+            "metric": metric,
+            "count": len(values),
+            "p50_ms": percentile(values, 50),
+            "p95_ms": percentile(values, 95)
+        }
+        for (replicas, metric), values in sorted(by_replicas.items())
+    ]
+
+    correlations = {}
+    for metric in sorted({row["metric"] for row in timeline}):
+        points = [(row["ready_replicas"], row["p95_ms"]) for row in timeline
+                  if row["metric"] == metric and row["ready_replicas"] is not None]
+        correlations[metric] = correlation([p[0] for p in points], [p[1] for p in points])
+
+    return {
+        "bucket_seconds": bucket_seconds,
+        "timeline": timeline,
+        "per_replica": per_replica,
+        "replica_p95_correlation": correlations
+    }
+
+
+def render_markdown(report):
+    lines = ["# Streaming Latency vs. Replicas", ""]
+    lines += ["## Latency by Ready Replicas", "",
+              "| Ready replicas | Metric | Samples | p50 (ms) | p95 (ms) |",
+              "|---|---|---|---|---|"]
+    for row in report["per_replica"]:
+        lines.append(f"| {row['ready_replicas']} | {row['metric']} | {row['count']} | "
+                     f"{fmt(row['p50_ms'])} | {fmt(row['p95_ms'])} |")
+
+    lines += ["", "## Replica / p95 Correlation", "",
+              "Negative values mean latency fell as replicas were added.", "",
+              "| Metric | Pearson r |", "|---|---|"]
+    for metric, value in report["replica_p95_correlation"].items():
+        lines.append(f"| {metric} | {'-' if value is None else f'{value:+.2f}'} |")
+
+    lines += ["", f"## Timeline ({report['bucket_seconds']}s buckets)", "",
+              "| Time | Metric | Samples | p50 (ms) | p95 (ms) | Replicas (ready/current) |",
+              "|---|---|---|---|---|---|"]
+    for row in report["timeline"]:
+        when = datetime.fromtimestamp(row["bucket_start"]).strftime("%H:%M:%S")
+        replicas = "-" if row["ready_replicas"] is None else f"{row['ready_replicas']}/{row['current_replicas']}"
+        lines.append(f"| {when} | {row['metric']} | {row['count']} | {fmt(row['p50_ms'])} | "
+                     f"{fmt(row['p95_ms'])} | {replicas} |")
+    return "\n".join(lines) + "\n"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Correlate streaming latencies with HPA replica counts")
+    parser.add_argument("--samples", required=True, help="CSV written via STREAM_SAMPLES_CSV")
+    parser.add_argument("--scaling", required=True, help="CSV written by monitor_scaling.sh")
+    parser.add_argument("--bucket", type=int, default=30, help="Timeline bucket size in seconds")
+    parser.add_argument("--output", help="Markdown report path (default: stdout)")
+    parser.add_argument("--json", help="Also write the report as JSON")
+    args = parser.parse_args(argv)
+
+    report = build_report(args.samples, args.scaling, args.bucket)
+    markdown = render_markdown(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(markdown)
+    else:
+        sys.stdout.write(markdown)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -76,7 +76,8 @@ kubectl apply -f /tmp/frontend-deployment.yaml
 
 # Apply services and scaling
 kubectl apply -f k8s/backend-service-cloud.yaml
-kubectl apply -f k8s/hpa-cloud.yaml
+# The simple backend is a Deployment; hpa-cloud.yaml targets the StatefulSet from backend-deployment-cloud.yaml
+sed "s/kind: StatefulSet/kind: Deployment/" k8s/hpa-cloud.yaml | kubectl apply -f -
 kubectl apply -f k8s/frontend-hpa-cloud.yaml
 
 # Wait for deployments
@@ -75,14 +75,15 @@ kubectl create secret generic llm-chatbot-secrets \
     --from-literal=hf_api_token="" \
     --dry-run=client -o yaml | kubectl apply -f -
 
-# Apply deployment and services
+# Apply deployment and services (the backend used to be a Deployment; it is now a StatefulSet)
+kubectl delete deployment llm-chatbot-backend --ignore-not-found
 kubectl apply -f /tmp/backend-deployment-cloud.yaml
 kubectl apply -f k8s/backend-service-cloud.yaml
 kubectl apply -f k8s/hpa-cloud.yaml
 
 # Wait for deployment
 print_status "Waiting for deployment to be ready..."
-kubectl rollout status deployment/llm-chatbot-backend --timeout=300s
+kubectl rollout status statefulset/llm-chatbot-backend --timeout=300s
 
 # Get cluster info
 print_status "Getting cluster information..."
@@ -0,0 +1,80 @@
+import json
+import pytest
+from app.batch import read_checkpoint, run_batch
+
+@pytest.fixture
+def sim_env(monkeypatch):
+    monkeypatch.setenv("LLM_MODEL_PROVIDER", "sim")
+    monkeypatch.setenv("SIM_DECODE_TPS", "5000")
+    monkeypatch.setenv("SIM_PREFILL_TPS", "50000")
+    monkeypatch.setenv("RATE_LIMIT_ENABLED", "false")
+    monkeypatch.delenv("CONVERSATION_STORE_DIR", raising=False)
+
+def _write_prompts(path, count):
+    with open(path, "w") as f:
+        for i in range(count):
+            f.write(json.dumps({"id": f"p{i}", "prompt": f"What is Kubernetes item {i}?"}) + "\n")
+
+def _records(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+@pytest.mark.asyncio
+async def test_batch_run_writes_one_result_per_prompt(tmp_path, sim_env):
+    prompts, results = tmp_path / "in.jsonl", tmp_path / "out.jsonl"
+    _write_prompts(prompts, 12)
+
+    summary = await run_batch(str(prompts), str(results), concurrency=4, progress_interval=0)
+
+    assert summary["processed"] == 12 and summary["failed"] == 0
+    records = _records(results)
+    assert sorted(r["id"] for r in records) == sorted(f"p{i}" for i in range(12))
+    assert all(r["response"] and r["attempts"] == 1 for r in records)
+
+@pytest.mark.asyncio
+async def test_batch_resumes_from_partial_output(tmp_path, sim_env):
+    prompts, results = tmp_path / "in.jsonl", tmp_path / "out.jsonl"
+    _write_prompts(prompts, 6)
+    with open(results, "w") as f:
+        f.write(json.dumps({"id": "p0", "response": "done"}) + "\n")
+        f.write(json.dumps({"id": "p1", "error": "timeout"}) + "\n")
+        f.write(json.dumps({"id": "p2", "response": "done"}) + "\n")
+        f.write('{"id": "p3", "resp')  # torn by a crash
+
+    assert read_checkpoint(str(results)) == {"p0", "p2"}
+    summary = await run_batch(str(prompts), str(results), concurrency=2, progress_interval=0)
+
+    assert summary["skipped"] == 2 and summary["processed"] == 4
+    new_ids = [r["id"] for r in _records(results)[3:]]
+    assert sorted(new_ids) == ["p1", "p3", "p4", "p5"]
+    assert read_checkpoint(str(results)) == {f"p{i}" for i in range(6)}
+
+@pytest.mark.asyncio
+async def test_progress_total_counts_only_runnable_items(tmp_path, sim_env):
+    from app.batch import count_items, iter_items
+    prompts = tmp_path / "in.jsonl"
+    with open(prompts, "w") as f:
+        f.write(json.dumps({"id": "a", "prompt": "one"}) + "\n")
+        f.write(json.dumps({"id": "b"}) + "\n")  # no prompt
+        f.write("not json\n\n")
+        f.write(json.dumps({"id": "a", "prompt": "one again"}) + "\n")  # duplicate of a completed id
+        f.write(json.dumps({"id": "c", "prompt": "two"}) + "\n")
+    items = [item async for item in iter_items(str(prompts), {"a"})]
+    assert count_items(str(prompts), {"a"}) == len(items) == 1
+    assert count_items(str(prompts), set()) == 3
+
+@pytest.mark.asyncio
+async def test_batch_bypasses_the_semantic_cache_unless_asked(tmp_path, sim_env, monkeypatch):
+    monkeypatch.setenv("SEMANTIC_CACHE_ENABLED", "true")
+    prompts = tmp_path / "in.jsonl"
+    with open(prompts, "w") as f:
+        for i in range(3):
+            f.write(json.dumps({"id": f"p{i}", "prompt": "What is a pod in Kubernetes?"}) + "\n")
+
+    summary = await run_batch(str(prompts), str(tmp_path / "fresh.jsonl"), concurrency=1, progress_interval=0)
+    assert summary["processed"] == 3 and summary["cached"] == 0
+    assert not any("cache" in r for r in _records(tmp_path / "fresh.jsonl"))
+
+    summary = await run_batch(str(prompts), str(tmp_path / "cached.jsonl"), use_cache=True, concurrency=1,
+                              progress_interval=0)
+    assert summary["processed"] == 3 and summary["cached"] == 2
@@ -0,0 +1,16 @@
+from benchmarks.harness import compare_results, percentile_ms
+
+def test_percentile_nearest_rank():
+    """Percentiles use nearest rank and tolerate empty input"""
+    values = [v / 1000 for v in range(1, 101)]
+    assert percentile_ms(values, 50) == 50.0
+    assert percentile_ms(values, 99) == 99.0
+    assert percentile_ms([], 99) == 0.0
+
+def test_compare_results_flags_regressions_only():
+    """Only changes in the bad direction beyond the threshold are reported"""
+    baseline = {"chat@c4": {"throughput_rps": 10.0, "latency_p99_ms": 100.0, "rss_mb": 80.0}}
+    current = {"chat@c4": {"throughput_rps": 8.0, "latency_p99_ms": 50.0, "rss_mb": 84.0}}
+    regressions = compare_results(current, baseline, threshold=0.1)
+    assert [r["metric"] for r in regressions] == ["throughput_rps"]
+    assert regressions[0]["change_pct"] == -20.0
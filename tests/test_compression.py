@@ -0,0 +1,119 @@
+import asyncio
+import json
+import threading
+import time
+import uvicorn
+import websockets
+from fastapi import FastAPI, WebSocket
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+from app import compression
+from app.compression import (CompressedWebSocketProtocol, CompressionMiddleware, CompressionStats,
+                             parse_accept_encoding)
+from benchmarks.harness import free_port
+
+def _app(stats):
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, min_size=100, stats=stats)
+
+    @app.get("/big")
+    async def big():
+        return {"items": ["answer"] * 500}
+
+    @app.get("/tiny")
+    async def tiny():
+        return {"ok": True}
+
+    @app.get("/stream")
+    async def stream():
+        async def events():
+            for i in range(3):
+                yield f"data: {'x' * 200}\n\n"
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    @app.websocket("/ws/{client_id}")
+    async def ws(websocket: WebSocket, client_id: str):
+        await websocket.accept()
+        await websocket.send_text("tok")
+        await websocket.send_text(json.dumps({"response": "long answer " * 200}))
+        await websocket.close()
+
+    return app
+
+def test_accept_encoding_q_values():
+    assert parse_accept_encoding("gzip;q=0, br, *;q=0.1") == {"gzip": 0.0, "br": 1.0, "*": 0.1}
+
+def test_rest_compression_is_negotiated_and_thresholded():
+    stats = CompressionStats()
+    client = TestClient(_app(stats))
+
+    response = client.get("/big", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["vary"]
+    assert response.json()["items"][0] == "answer"
+
+    assert "content-encoding" not in client.get("/tiny", headers={"Accept-Encoding": "gzip"}).headers
+    assert "content-encoding" not in client.get("/big", headers={"Accept-Encoding": "identity"}).headers
+    streamed = client.get("/stream", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in streamed.headers and streamed.text.count("data:") == 3
+
+    routes = stats.get_stats()["routes"]
+    assert routes["/big"]["compressed"] == 1 and routes["/big"]["bytes_saved"] > 0
+    assert routes["/big"]["skipped"] == {"not_accepted": 1}
+    assert routes["/tiny"]["skipped"] == {"too_small": 1}
+    assert routes["/stream"]["skipped"] == {"streaming": 1}
+
+def test_websocket_deflate_skips_small_frames():
+    port = free_port()
+    config = uvicorn.Config(_app(CompressionStats()), host="127.0.0.1", port=port, log_level="warning",
+                            ws=CompressedWebSocketProtocol)
+    server = uvicorn.Server(config)
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.02)
+    before = compression.compression_stats.get_stats()["routes"].get("/ws/{client_id}", {"compressed": 0, "skipped": {}})
+    try:
+        async def client():
+            async with websockets.connect(f"ws://127.0.0.1:{port}/ws/c1", compression="deflate") as ws:
+                assert ws.extensions[0].name == "permessage-deflate"
+                return [await ws.recv(), await ws.recv()]
+        small, large = asyncio.run(client())
+    finally:
+        server.should_exit = True
+        thread.join(timeout=10)
+    assert small == "tok" and json.loads(large)["response"].startswith("long answer")
+    after = compression.compression_stats.get_stats()["routes"]["/ws/{client_id}"]
+    assert after["compressed"] == before["compressed"] + 1
+    assert after["skipped"]["too_small"] >= before["skipped"].get("too_small", 0) + 1
+    assert after["bytes_saved"] > 0
+
+def test_serve_entry_point_negotiates_deflate():
+    import os
+    import subprocess
+    import sys
+    import httpx
+    port = free_port()
+    env = dict(os.environ, LLM_MODEL_PROVIDER="sim", LLM_WARMUP="false", RATE_LIMIT_ENABLED="false",
+               UVICORN_LOG_LEVEL="warning")
+    env.pop("CONVERSATION_STORE_DIR", None)
+    process = subprocess.Popen([sys.executable, "-m", "app.serve", "--host", "127.0.0.1", "--port", str(port)],
+                               env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        deadline = time.monotonic() + 30
+        while True:
+            assert process.poll() is None and time.monotonic() < deadline
+            try:
+                if httpx.get(f"http://127.0.0.1:{port}/ready").status_code == 200:
+                    break
+            except httpx.TransportError:
+                pass
+            time.sleep(0.05)
+
+        async def client():
+            async with websockets.connect(f"ws://127.0.0.1:{port}/ws/c1", compression="deflate") as ws:
+                return ws.extensions[0].name, json.loads(await ws.recv())["type"]
+        assert asyncio.run(client()) == ("permessage-deflate", "system")
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
@@ -0,0 +1,83 @@
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app, llm_service
+from app.concurrency_limiter import AdaptiveConcurrencyLimiter, OverloadedError
+
+def _run_samples(limiter, rtt, count, inflight):
+    for _ in range(count):
+        limiter.inflight = inflight
+        limiter.try_acquire("interactive")
+        limiter.release(rtt=rtt)
+
+def test_batch_is_shed_before_interactive():
+    """Lower-priority traffic only gets a share of the limit"""
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=10)
+    limiter.inflight = 5
+    assert limiter.try_acquire("batch") is False
+    assert limiter.try_acquire("standard") is True
+    assert limiter.try_acquire("interactive") is True
+    assert limiter.shed["batch"] == 1
+
+def test_limit_grows_near_baseline_and_shrinks_when_latency_inflates():
+    """Stable latency grows the limit; queueing-inflated latency shrinks it"""
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=4, max_limit=50)
+    _run_samples(limiter, rtt=0.5, count=50, inflight=40)
+    grown = limiter.current_limit
+    assert grown > 4
+
+    _run_samples(limiter, rtt=5.0, count=30, inflight=40)
+    assert limiter.current_limit < grown
+
+def test_limit_ignores_samples_when_underutilized():
+    """The limit does not grow while well under it"""
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=20)
+    _run_samples(limiter, rtt=0.5, count=50, inflight=1)
+    assert limiter.current_limit == 20
+
+def test_shed_rate_uses_a_fixed_ring(monkeypatch):
+    import app.concurrency_limiter as module
+    now = [1000.0]
+    monkeypatch.setattr(module.time, "monotonic", lambda: now[0])
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=1)
+    limiter.inflight = 1
+    for _ in range(300):  # a long overload: one shed every 0.5 s for 150 s
+        limiter.try_acquire("standard")
+        now[0] += 0.5
+    assert len(limiter._shed_counts) == 60
+    assert limiter.get_shed_rate() == pytest.approx(2.0, abs=0.05)
+    now[0] += 60
+    assert limiter.get_shed_rate() == 0
+
+@pytest.mark.asyncio
+async def test_acquire_raises_overloaded_and_marks_drops():
+    """Shed requests raise immediately; failed requests reduce the limit"""
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=10)
+    async with limiter.acquire("standard") as slot:
+        slot.dropped = True
+    assert limiter.current_limit == 9
+
+    limiter.inflight = 9
+    with pytest.raises(OverloadedError):
+        async with limiter.acquire("standard"):
+            pass
+    assert limiter.inflight == 9
+
+def test_chat_returns_503_when_shedding():
+    """/chat sheds with a fast 503 and Retry-After header"""
+    client = TestClient(app)
+    saved = llm_service.limiter.inflight
+    llm_service.limiter.inflight = llm_service.limiter.max_limit
+    try:
+        response = client.post("/chat", json={"message": "hi", "conversation_id": "shed"})
+    finally:
+        llm_service.limiter.inflight = saved
+    assert response.status_code == 503
+    assert "Retry-After" in response.headers
+
+def test_prometheus_metrics_export_limiter_state():
+    """Limiter state is exported in Prometheus format"""
+    client = TestClient(app)
+    response = client.get("/metrics/prometheus")
+    assert response.status_code == 200
+    assert "llm_concurrency_limit" in response.text
+    assert 'llm_requests_shed_total{priority="batch"}' in response.text
@@ -0,0 +1,86 @@
+import pytest
+from app.conversation_store import ConversationJournal
+from app.llm_service import LLMService
+
+def _message(content, role="user"):
+    return {"role": role, "content": content, "timestamp": "2024-01-01T00:00:00"}
+
+@pytest.mark.asyncio
+async def test_restore_replays_snapshot_plus_journal_tail(tmp_path):
+    journal = ConversationJournal(str(tmp_path), flush_interval=60)
+    history = journal.restore()
+    await journal.start(history)
+    for conversation_id, content in [("a", "one"), ("b", "two"), (None, "anonymous")]:
+        history.setdefault(conversation_id, []).append(_message(content))
+        journal.record(conversation_id, _message(content))
+    await journal.flush()
+    await journal.snapshot()
+    history["a"].append(_message("three", "assistant"))
+    journal.record("a", _message("three", "assistant"))
+    await journal.flush()
+    journal._task.cancel()
+
+    restored = ConversationJournal(str(tmp_path)).restore()
+    assert [m["content"] for m in restored["a"]] == ["one", "three"]
+    assert [m["content"] for m in restored["b"]] == ["two"]
+    assert restored[None][0]["content"] == "anonymous"
+    assert journal.get_stats()["journal_flush_ms_p99"] is not None
+
+@pytest.mark.asyncio
+async def test_torn_journal_tail_is_ignored(tmp_path):
+    journal = ConversationJournal(str(tmp_path), flush_interval=60)
+    await journal.start(journal.restore())
+    journal.record("a", _message("kept"))
+    await journal.flush()
+    journal._task.cancel()
+    with open(journal.journal_path, "ab") as f:
+        f.write(b'{"seq": 2, "id": "a", "mess')
+
+    replacement = ConversationJournal(str(tmp_path))
+    restored = replacement.restore()
+    assert [m["content"] for m in restored["a"]] == ["kept"]
+    assert replacement.seq == 1
+
+@pytest.mark.asyncio
+async def test_service_history_survives_restart(tmp_path, monkeypatch):
+    monkeypatch.setenv("LLM_MODEL_PROVIDER", "sim")
+    monkeypatch.setenv("SIM_DECODE_TPS", "5000")
+    monkeypatch.setenv("SIM_PREFILL_TPS", "50000")
+    monkeypatch.setenv("CONVERSATION_STORE_DIR", str(tmp_path))
+    service = LLMService()
+    await service.initialize()
+    await service.process_message("remember me", "persisted")
+    await service.cleanup()
+
+    replacement = LLMService()
+    await replacement.initialize()
+    try:
+        history = replacement.conversations["persisted"]
+        assert [m["role"] for m in history] == ["user", "assistant"]
+        assert history[0]["content"] == "remember me"
+        assert replacement.conversation_store.get_stats()["restore_ms"] is not None
+    finally:
+        await replacement.cleanup()
+
+@pytest.mark.asyncio
+async def test_released_conversations_stay_gone_after_restart(tmp_path, monkeypatch):
+    monkeypatch.setenv("LLM_MODEL_PROVIDER", "sim")
+    monkeypatch.setenv("SIM_DECODE_TPS", "5000")
+    monkeypatch.setenv("SIM_PREFILL_TPS", "50000")
+    monkeypatch.setenv("CONVERSATION_STORE_DIR", str(tmp_path))
+    service = LLMService()
+    await service.initialize()
+    await service.process_message("snapshotted", "handed-off")
+    await service.conversation_store.snapshot()
+    await service.process_message("journaled", "dropped")
+    await service.process_message("stays", "kept")
+    await service.conversation_store.flush()
+    service.release_conversation("handed-off")
+    service.release_conversation("dropped")
+    await service.conversation_store.flush()
+    service.conversation_store._task.cancel()
+
+    # Restore from the journal alone (no final snapshot), as after a crash
+    restored = ConversationJournal(str(tmp_path)).restore()
+    assert set(restored) == {"kept"}
+    await service.cleanup()
@@ -0,0 +1,109 @@
+import asyncio
+import json
+import os
+import signal
+import subprocess
+import sys
+import time
+import httpx
+import pytest
+import websockets
+from app.concurrency_limiter import AdaptiveConcurrencyLimiter, DrainingError
+from app.connection_manager import ConnectionManager
+from app.drain import DrainController
+from benchmarks.harness import free_port
+
+class FakeWebSocket:
+    def __init__(self):
+        self.sent = []
+        self.close_code = None
+        self.closed_at = None
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text):
+        self.sent.append(json.loads(text))
+
+    async def close(self, code=1000):
+        self.close_code = code
+        self.closed_at = time.monotonic()
+
+class FakeService:
+    def __init__(self):
+        self.limiter = AdaptiveConcurrencyLimiter(initial_limit=4)
+
+@pytest.mark.asyncio
+async def test_drain_waits_for_inflight_then_closes_sockets_in_batches(monkeypatch):
+    monkeypatch.setenv("DRAIN_CLOSE_BATCH_SIZE", "2")
+    monkeypatch.setenv("DRAIN_CLOSE_BATCH_INTERVAL", "0.05")
+    service, manager = FakeService(), ConnectionManager()
+    sockets = {f"c{i}": FakeWebSocket() for i in range(5)}
+    for client_id, websocket in sockets.items():
+        await manager.connect(websocket, client_id)
+    drain = DrainController(service, manager)
+
+    async def generation():
+        async with service.limiter.acquire():
+            await asyncio.sleep(0.1)
+
+    inflight = asyncio.create_task(generation())
+    await asyncio.sleep(0)
+    await drain.drain()
+    assert inflight.done() and not inflight.exception()
+
+    with pytest.raises(DrainingError):
+        async with service.limiter.acquire():
+            pass
+    frames = [ws.sent[-1] for ws in sockets.values()]
+    assert all(f["type"] == "reconnect" and 0 <= f["retry_after"] <= drain.reconnect_spread for f in frames)
+    assert all(ws.close_code == 1012 for ws in sockets.values())
+    close_times = sorted(ws.closed_at for ws in sockets.values())
+    assert close_times[-1] - close_times[0] >= 0.1  # three batches
+    stats = drain.get_stats()
+    assert stats["inflight_at_start"] == 1 and stats["inflight_abandoned"] == 0
+    assert stats["sockets_closed"] == 5
+
+@pytest.mark.asyncio
+async def test_grace_period_bounds_the_wait(monkeypatch):
+    monkeypatch.setenv("DRAIN_GRACE_SECONDS", "0.1")
+    service = FakeService()
+    service.limiter.try_acquire()  # never released
+    drain = DrainController(service, ConnectionManager())
+    await drain.drain()
+    assert drain.get_stats()["inflight_abandoned"] == 1
+
+def test_sigterm_drains_websockets_and_exits():
+    port = free_port()
+    env = dict(os.environ, LLM_MODEL_PROVIDER="sim", RATE_LIMIT_ENABLED="false", LOG_LEVEL="WARNING")
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port)],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        deadline = time.time() + 30
+        while True:
+            try:
+                if httpx.get(f"http://127.0.0.1:{port}/ready").status_code == 200:
+                    break
+            except httpx.TransportError:
+                pass
+            assert time.time() < deadline and process.poll() is None
+            time.sleep(0.05)
+
+        async def client():
+            async with websockets.connect(f"ws://127.0.0.1:{port}/ws/drain-test") as ws:
+                assert json.loads(await ws.recv())["type"] == "system"
+                process.send_signal(signal.SIGTERM)
+                frame = json.loads(await ws.recv())
+                with pytest.raises(websockets.ConnectionClosed) as closed:
+                    await ws.recv()
+                return frame, closed.value.rcvd.code
+
+        frame, code = asyncio.run(client())
+        assert frame["type"] == "reconnect"
+        assert code == 1012
+        assert process.wait(timeout=15) == 0
+    finally:
+        if process.poll() is None:
+            process.kill()
@@ -0,0 +1,138 @@
+import asyncio
+import base64
+import pytest
+from fastapi.testclient import TestClient
+from app.embeddings import EmbeddingService, EmbeddingStore, content_key, pack_vector, unpack_vector
+from app.llm_service import LLMService
+from benchmarks.fake_ollama import FakeOllama
+from benchmarks.harness import BackgroundServer
+
+def test_store_persists_and_truncates_torn_records(tmp_path):
+    path = str(tmp_path / "model.f32")
+    store = EmbeddingStore(path, max_bytes=1 << 20)
+    store.put_many({content_key("a"): pack_vector([0.5, -1.0, 2.0]), content_key("b"): pack_vector([1.0, 0.0, 0.25])})
+    store.put_many({content_key("c"): pack_vector([3.0, 3.0, 3.0])})
+    store.close()
+    with open(path, "ab") as f:
+        f.write(b"\x01" * 7)  # crash mid-append
+
+    reopened = EmbeddingStore(path, max_bytes=1 << 20)
+    assert len(reopened) == 3 and reopened.dim == 3
+    assert unpack_vector(reopened.get(content_key("a"))) == [0.5, -1.0, 2.0]
+    assert unpack_vector(reopened.get(content_key("c"))) == [3.0, 3.0, 3.0]
+    assert reopened.get(content_key("missing")) is None
+
+    # A different dimension (e.g. a re-pulled model) clears the cache
+    reopened.put_many({content_key("d"): pack_vector([1.0, 2.0])})
+    assert len(reopened) == 1 and reopened.dim == 2 and reopened.resets == 1
+    reopened.close()
+
+def test_reset_replaces_the_file_instead_of_truncating_it(tmp_path):
+    import os
+    path = str(tmp_path / "model.f32")
+    store = EmbeddingStore(path, max_bytes=1 << 20)
+    store.put_many({content_key("a"): pack_vector([1.0] * 64)})
+    assert store.get(content_key("a")) is not None
+    old_map, old_inode = store._map, os.stat(path).st_ino
+
+    store.put_many({content_key("b"): pack_vector([2.0, 2.0])})
+    # A map taken before the reset still reads its own (now unlinked) file instead of faulting
+    assert os.stat(path).st_ino != old_inode and len(old_map) > 0
+    assert store.get(content_key("a")) is None and unpack_vector(store.get(content_key("b"))) == [2.0, 2.0]
+    store.close()
+
+@pytest.mark.asyncio
+async def test_misses_are_deduplicated_batched_and_cached_on_disk(tmp_path):
+    fake = FakeOllama(embedding_dim=8)
+    server = BackgroundServer(fake.build_app()).start()
+    llm_service = LLMService()
+    llm_service.base_url = server.url
+    try:
+        service = EmbeddingService(llm_service, provider="ollama", model="embedder", cache_dir=str(tmp_path),
+                                   batch_size=4, max_concurrency=2)
+        texts = [f"text {i}" for i in range(10)] + ["text 0", "text 1"]
+        result = await service.embed(texts)
+        assert result["dim"] == 8 and len(result["vectors"]) == 12
+        assert result["computed"] == 10 and result["duplicates"] == 2 and result["cache_hits"] == 0
+        assert sorted(fake.embed_calls) == [2, 4, 4]
+        assert [unpack_vector(v) for v in result["vectors"]] == [fake.embedding(t) for t in texts]
+
+        again = await service.embed(["text 3", "new text"])
+        assert again["cache_hits"] == 1 and again["computed"] == 1 and fake.embed_calls[-1] == 1
+        await service.close()
+
+        # A restarted pod reads the same cache
+        restarted = EmbeddingService(llm_service, provider="ollama", model="embedder", cache_dir=str(tmp_path))
+        warm = await restarted.embed(texts)
+        assert warm["cache_hits"] == 10 and warm["computed"] == 0 and len(fake.embed_calls) == 4
+        assert warm["vectors"] == result["vectors"]
+        stats = restarted.get_stats()
+        assert stats["cache_hit_rate"] == 1.0 and stats["throughput_texts_per_s"] > 0
+        assert stats["caches"]["embedder"]["vectors"] == 11
+        await restarted.close()
+    finally:
+        server.stop()
+        await llm_service.cleanup()
+
+def test_endpoint_encodings_agree(tmp_path, monkeypatch):
+    import app.main as main
+    monkeypatch.setattr(main, "embedding_service",
+                        EmbeddingService(main.llm_service, provider="hashing", cache_dir=str(tmp_path), max_texts=3))
+    client = TestClient(main.app)
+    body = {"texts": ["What is a pod?", "Scale my deployment", "What is a pod?"]}
+
+    as_json = client.post("/embeddings", json=body).json()
+    assert as_json["count"] == 3 and as_json["duplicates"] == 1 and as_json["computed"] == 2
+    assert as_json["embeddings"][0] == as_json["embeddings"][2]
+    dim = as_json["dim"]
+
+    as_base64 = client.post("/embeddings", json={**body, "encoding": "base64"}).json()
+    assert as_base64["cache_hits"] == 2
+    matrix = base64.b64decode(as_base64["data"])
+    assert len(matrix) == 3 * dim * 4
+    assert unpack_vector(matrix[dim * 4:2 * dim * 4]) == as_json["embeddings"][1]
+
+    binary = client.post("/embeddings", json={**body, "encoding": "binary"})
+    assert binary.headers["content-type"] == "application/octet-stream"
+    assert binary.headers["x-embedding-dim"] == str(dim) and binary.headers["x-embedding-count"] == "3"
+    assert binary.content == matrix
+
+    assert client.post("/embeddings", json={"texts": ["a", "b", "c", "d"]}).status_code == 413
+    assert client.get("/stats").json()["embeddings"]["texts"] == 9
+
+def test_malformed_upstream_answer_is_a_bad_gateway(tmp_path, monkeypatch):
+    import app.main as main
+    service = EmbeddingService(main.llm_service, provider="hashing", cache_dir=str(tmp_path))
+
+    async def mismatched(model, batches):
+        raise ValueError("Upstream returned 1 embeddings for 2 texts")
+
+    monkeypatch.setattr(service, "_embed_upstream", mismatched)
+    monkeypatch.setattr(main, "embedding_service", service)
+    response = TestClient(main.app).post("/embeddings", json={"texts": ["a", "b"]})
+    assert response.status_code == 502 and "1 embeddings for 2 texts" in response.json()["detail"]
+
+def test_client_model_cannot_create_cache_files(tmp_path, monkeypatch):
+    import app.main as main
+    from app.embeddings import ModelNotAllowedError
+    monkeypatch.setattr(main, "embedding_service",
+                        EmbeddingService(main.llm_service, provider="hashing", cache_dir=str(tmp_path)))
+    client = TestClient(main.app)
+    for i in range(5):
+        assert client.post("/embeddings", json={"texts": ["a"], "model": f"m{i}"}).json()["model"] == "hashing"
+    assert [p.name for p in tmp_path.iterdir()] == ["hashing-hashing.f32"]
+
+    monkeypatch.setenv("EMBEDDINGS_ALLOWED_MODELS", "small-embedder")
+    service = EmbeddingService(main.llm_service, provider="ollama", model="embedder", cache_dir=str(tmp_path))
+    assert service.resolve_model(None) == "embedder" and service.resolve_model("small-embedder") == "small-embedder"
+    monkeypatch.setattr(main, "embedding_service", service)
+    response = client.post("/embeddings", json={"texts": ["a"], "model": "other"})
+    assert response.status_code == 400 and "not allowed" in response.json()["detail"]
+
+    monkeypatch.setenv("EMBEDDINGS_ALLOWED_MODELS", "*")
+    monkeypatch.setenv("EMBEDDINGS_MAX_MODELS", "1")
+    service = EmbeddingService(main.llm_service, provider="ollama", model="embedder", cache_dir=str(tmp_path))
+    asyncio.run(service._store("embedder"))
+    with pytest.raises(ModelNotAllowedError):
+        asyncio.run(service._store("another"))
+    asyncio.run(service.close())
@@ -0,0 +1,75 @@
+import pytest
+from app.generation_budget import GenerationBudgetController, GenerationProfile
+from app.llm_service import LLMService
+
+def _controller(**kwargs):
+    options = dict(profiles={}, queue_high=4, queue_low=1, p99_target=10.0,
+                   tighten_interval=1.0, relax_interval=5.0, enabled=True)
+    options.update(kwargs)
+    return GenerationBudgetController(**options)
+
+def test_budget_tightens_under_queue_depth_and_relaxes_when_calm():
+    controller = _controller()
+    full = controller.budget_for("phi")
+    assert full["level"] == "normal"
+
+    start = controller.last_change
+    controller.update(queue_depth=6, now=start + 1)
+    controller.update(queue_depth=6, now=start + 1.5)  # Within tighten interval
+    assert controller.level_name == "reduced"
+    controller.update(queue_depth=6, now=start + 2)
+    assert controller.level_name == "constrained"
+
+    budget = controller.budget_for("phi", queue_depth=6)
+    assert budget["num_predict"] < full["num_predict"]
+    assert budget["num_ctx"] < full["num_ctx"]
+    assert budget["context_messages"] < full["context_messages"]
+
+    controller.update(queue_depth=0, now=controller.last_change + 4)
+    assert controller.level_name == "constrained"
+    controller.update(queue_depth=0, now=controller.last_change + 5)
+    assert controller.level_name == "reduced"
+
+def test_high_p99_counts_as_pressure():
+    controller = _controller()
+    for _ in range(10):
+        controller.observe(30.0)
+    controller.update(queue_depth=0, now=controller.last_change + 1)
+    assert controller.level_name == "reduced"
+    # Samples from the old level are discarded
+    assert controller.p99() is None
+
+def test_budget_never_goes_below_floor():
+    controller = _controller(profiles={"tiny": GenerationProfile(num_predict=64, num_ctx=1024)})
+    controller.level = len(controller.LEVELS) - 1
+    budget = controller.budget_for("tiny:latest")
+    assert budget["num_predict"] == controller.MIN_NUM_PREDICT
+    assert budget["num_ctx"] == controller.MIN_NUM_CTX
+
+def test_profiles_can_be_overridden_from_env(monkeypatch):
+    monkeypatch.setenv("LLM_GENERATION_PROFILES", '{"phi": {"num_predict": 99}}')
+    controller = GenerationBudgetController()
+    assert controller.get_profile("phi").num_predict == 99
+    assert controller.get_profile("phi").num_ctx == 2048
+
+def test_ollama_payload_carries_budget_options():
+    service = LLMService()
+    budget = service.budget.budget_for("phi")
+    payload = service._ollama_payload("hello", "conv", budget, stream=False)
+    assert payload["options"]["num_predict"] == budget["num_predict"]
+    assert payload["options"]["stop"] == budget["stop"]
+
+@pytest.mark.asyncio
+async def test_responses_are_tagged_with_budget(monkeypatch):
+    monkeypatch.setenv("LLM_MODEL_PROVIDER", "sim")
+    monkeypatch.setenv("SIM_DECODE_TPS", "5000")
+    monkeypatch.setenv("SIM_PREFILL_TPS", "50000")
+    service = LLMService()
+    await service.initialize()
+    service.budget.level = 3
+    metadata = {}
+    await service.process_message("hello", "budget-test", metadata=metadata)
+    assert metadata["budget"]["level"] == "minimal"
+
+    events = [event async for event in service.stream_message("hello again", "budget-test")]
+    assert events[-1]["budget"]["num_predict"] == metadata["budget"]["num_predict"]
@@ -0,0 +1,66 @@
+import pytest
+from app.generation_telemetry import GenerationTelemetry
+from app.llm_service import LLMService
+from benchmarks.fake_ollama import FakeOllama
+from benchmarks.harness import BackgroundServer
+
+def _timings(prompt_tokens, completion_tokens, load_ms=2.0):
+    return {
+        "prompt_eval_count": prompt_tokens,
+        "prompt_eval_duration": prompt_tokens * 1_000_000,  # 1000 tok/s
+        "eval_count": completion_tokens,
+        "eval_duration": completion_tokens * 50_000_000,  # 20 tok/s
+        "load_duration": int(load_ms * 1e6),
+        "total_duration": int((prompt_tokens + completion_tokens * 50 + load_ms) * 1e6)
+    }
+
+def test_throughput_load_events_and_prompt_buckets():
+    telemetry = GenerationTelemetry(load_event_ms=500)
+    telemetry.record("phi", _timings(100, 40, load_ms=3000), "c1")
+    telemetry.record("phi", _timings(1500, 10), "c1")
+    telemetry.record("phi", _timings(30, 10), "c2")
+
+    stats = telemetry.get_stats()["models"]["phi"]
+    assert stats["prefill_tps_p50"] == 1000.0
+    assert stats["decode_tps_p50"] == 20.0
+    assert stats["load_events"] == 1 and stats["load_seconds"] == 3.0
+    assert set(stats["prompt_sizes"]) == {"<=64", "<=128", "<=2048"}
+    assert stats["prompt_sizes"]["<=2048"]["mean_prefill_ms"] == 1500.0
+    assert telemetry.get_conversation_usage("c1") == {
+        "generations": 2, "prompt_tokens": 1600, "completion_tokens": 50, "total_tokens": 1650
+    }
+
+def test_conversation_usage_is_bounded():
+    telemetry = GenerationTelemetry(max_conversations=2)
+    for conversation_id in ["a", "b", "c"]:
+        telemetry.record("phi", _timings(10, 5), conversation_id)
+    assert telemetry.get_conversation_usage("a") is None
+    assert telemetry.get_stats()["conversations_tracked"] == 2
+
+@pytest.mark.asyncio
+async def test_ollama_generate_and_stream_are_recorded(monkeypatch):
+    server = BackgroundServer(FakeOllama(decode_tps=2000, jitter=0).build_app()).start()
+    monkeypatch.setenv("LLM_MODEL_PROVIDER", "ollama")
+    monkeypatch.setenv("LLM_MODEL_NAME", "tinyllama:latest")
+    monkeypatch.setenv("LLM_BASE_URL", server.url)
+    service = LLMService()
+    try:
+        await service.initialize()
+        await service.process_message("hello", "conv")
+        events = [event async for event in service.stream_message("and again", "conv")]
+        assert events[-1]["timings"]["eval_count"] > 0
+
+        stats = (await service.get_model_status())["generation_telemetry"]["models"]["tinyllama:latest"]
+        assert stats["generations"] == 2
+        assert stats["decode_tps_p50"] > 0
+        usage = service.telemetry.get_conversation_usage("conv")
+        assert usage["generations"] == 2 and usage["completion_tokens"] == stats["completion_tokens"]
+    finally:
+        await service.cleanup()
+        server.stop()
+
+def test_usage_endpoint_404_for_unknown_conversation():
+    from fastapi.testclient import TestClient
+    from app.main import app
+    response = TestClient(app).get("/conversations/never-seen/usage")
+    assert response.status_code == 404
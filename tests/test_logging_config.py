@@ -0,0 +1,69 @@
+import io
+import json
+import logging
+import queue
+import structlog
+from app.logging_config import (
+    NonBlockingQueueHandler, SamplingFilter, configure_logging, get_logging_stats,
+    parse_sample_rates, shutdown_logging
+)
+
+def _record(event, level=logging.INFO):
+    return logging.LogRecord("app.test", level, __file__, 1, {"event": event}, None, None)
+
+def test_structured_json_includes_bound_context():
+    stream = io.StringIO()
+    configure_logging(level="INFO", fmt="json", stream=stream, rate_per_sec=0)
+    try:
+        structlog.contextvars.bind_contextvars(request_id="req-42", conversation_id="conv-7")
+        structlog.get_logger("app.test").info("message_processed", duration_s=0.5)
+        logging.getLogger("app.test").info("plain %s line", "stdlib")
+        structlog.contextvars.clear_contextvars()
+    finally:
+        shutdown_logging()
+        configure_logging()
+    lines = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert lines[0]["event"] == "message_processed"
+    assert lines[0]["duration_s"] == 0.5
+    assert lines[0]["request_id"] == "req-42"
+    assert lines[1]["event"] == "plain stdlib line"
+    assert lines[1]["conversation_id"] == "conv-7"
+    assert lines[1]["level"] == "info"
+
+def test_sampling_and_rate_limiting_spare_warnings():
+    sampler = SamplingFilter(parse_sample_rates("noisy=0"), rate_per_sec=2)
+    assert not sampler.filter(_record("noisy"))
+    assert sampler.filter(_record("noisy", logging.WARNING))
+    results = [sampler.filter(_record("busy")) for _ in range(5)]
+    assert results == [True, True, False, False, False]
+    assert sampler.sampled_out == {"noisy": 1}
+    assert sampler.rate_limited == {"busy": 3}
+
+def test_full_queue_drops_instead_of_blocking():
+    handler = NonBlockingQueueHandler(queue.Queue(maxsize=2))
+    for _ in range(5):
+        handler.handle(_record("event"))
+    assert handler.queue.qsize() == 2
+    assert handler.dropped == 3
+
+def test_logging_stats_are_reported():
+    stats = get_logging_stats()
+    assert set(stats) == {"queued", "dropped_queue_full", "sampled_out", "rate_limited"}
+
+def test_uvicorn_access_logs_go_through_the_queue():
+    access = logging.getLogger("uvicorn.access")
+    access.addHandler(logging.StreamHandler(io.StringIO()))  # as uvicorn's default log config does
+    access.propagate = False
+    access.setLevel(logging.WARNING)  # e.g. --log-level warning
+    stream = io.StringIO()
+    configure_logging(level="INFO", fmt="json", stream=stream, rate_per_sec=0)
+    try:
+        assert access.handlers == [] and access.propagate
+        access.info('%s - "%s %s HTTP/%s" %d', "10.0.0.1:5000", "GET", "/health", "1.1", 200)
+        logging.getLogger("uvicorn.error").info("Application startup complete.")
+    finally:
+        shutdown_logging()
+        configure_logging()
+    lines = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert [line["logger"] for line in lines] == ["uvicorn.access", "uvicorn.error"]
+    assert lines[0]["event"] == '10.0.0.1:5000 - "GET /health HTTP/1.1" 200'
@@ -0,0 +1,69 @@
+import asyncio
+import time
+import pytest
+from app.loop_monitor import LAG_BUCKETS, LoopLagMonitor
+
+def _block_the_loop(seconds):
+    time.sleep(seconds)  # stands in for sync logging or a huge json.dumps
+
+@pytest.mark.asyncio
+async def test_lag_histogram_reflects_blocking_calls():
+    monitor = LoopLagMonitor(interval=0.01, enabled=True, detect_slow=False)
+    assert monitor.start()
+    await asyncio.sleep(0.1)
+    _block_the_loop(0.15)
+    await asyncio.sleep(0.05)
+    await monitor.stop()
+
+    stats = monitor.get_stats()
+    assert stats["samples"] >= 3
+    assert stats["lag_ms_max"] >= 100
+    assert stats["lag_ms_p50"] < 50
+    assert sum(monitor.bucket_counts[LAG_BUCKETS.index(0.25):]) >= 1  # the stall lands above 100 ms
+    assert sum(monitor.bucket_counts) == stats["samples"]
+
+@pytest.mark.asyncio
+async def test_slow_callback_detector_captures_blocking_stack():
+    monitor = LoopLagMonitor(interval=0.01, enabled=True, detect_slow=True, slow_threshold_ms=50, buffer_size=5)
+    monitor.start()
+    await asyncio.sleep(0.05)
+    _block_the_loop(0.2)
+    await asyncio.sleep(0.05)
+    await monitor.stop()
+
+    captures = monitor.get_slow_callbacks()
+    assert len(captures) == 1 and monitor.slow_callback_count == 1
+    capture = captures[0]
+    assert capture["blocked_ms"] >= 100
+    assert any("_block_the_loop" in line for line in capture["stack"])
+
+def test_disabled_monitor_does_not_start():
+    assert not LoopLagMonitor(enabled=False).start()
+
+def test_debug_loop_endpoint_is_opt_in(monkeypatch):
+    from fastapi.testclient import TestClient
+    import app.main as main
+    client = TestClient(main.app)
+    monkeypatch.setattr(main, "debug_loop_enabled", False)
+    assert client.get("/debug/loop").status_code == 404
+    monkeypatch.setattr(main, "debug_loop_enabled", True)
+    monkeypatch.setattr(main, "loop_monitor", LoopLagMonitor(enabled=False))
+    assert client.get("/debug/loop").json()["slow_callbacks"] == []
+
+def test_disabled_monitor_is_never_imported():
+    import os
+    import subprocess
+    import sys
+    env = dict(os.environ, LOOP_MONITOR_ENABLED="false", LLM_MODEL_PROVIDER="sim")
+    code = ("import sys, app.main as main; from app.metrics_exporter import render_metrics; "
+            "body, _ = render_metrics(main.metrics_registry); "
+            "assert 'app.loop_monitor' not in sys.modules and b'llm_event_loop' not in body")
+    subprocess.run([sys.executable, "-c", code], env=env, check=True, timeout=60)
+
+def test_lag_metrics_come_from_the_given_monitor():
+    from app.metrics_exporter import ServiceMetricsCollector
+    monitor = LoopLagMonitor(enabled=False)
+    monitor.observe(0.003)
+    families = list(ServiceMetricsCollector(None, None, loop_monitor=monitor)._collect_loop_lag())
+    assert [f.name for f in families] == ["llm_event_loop_lag_seconds", "llm_event_loop_slow_callbacks"]
+    assert list(ServiceMetricsCollector(None, None)._collect_loop_lag()) == []
@@ -0,0 +1,60 @@
+import pytest
+from fastapi.testclient import TestClient
+import app.main as main
+from app.main import app, llm_service
+from app.memory_profiler import MemoryInspector, deep_sizeof
+
+def test_deep_sizeof_counts_nested_content_once():
+    shared = "x" * 10_000
+    small = deep_sizeof({"a": [1, 2, 3]})
+    large = deep_sizeof({"a": [shared, shared, {"b": shared}]})
+    assert large["bytes"] > small["bytes"] + 10_000
+    assert large["bytes"] < small["bytes"] + 20_000  # the shared string is counted once
+
+    excluded = deep_sizeof({"a": shared}, exclude_ids={id(shared)})
+    assert excluded["bytes"] < 1_000
+    assert deep_sizeof(list(range(1000)), max_objects=10)["truncated"]
+
+@pytest.mark.asyncio
+async def test_report_and_snapshot_diff():
+    inspector = MemoryInspector(enabled=True, max_snapshots=2)
+    state = {"conversations": {}}
+    inspector.register(lambda: {"conversations": state["conversations"], "missing": None})
+
+    base = await inspector.take_snapshot("before")
+    for i in range(200):
+        state["conversations"][f"c{i}"] = [{"content": f"{i}:" + "y" * 500}]
+    report = await inspector.report()
+    assert set(report["objects"]) == {"conversations"}
+    assert report["objects"]["conversations"]["items"] == 200
+    assert report["objects"]["conversations"]["bytes"] > 100_000
+
+    diff = await inspector.diff(base["id"], limit=5)
+    assert diff["base"] == base["id"] and diff["top_diff_bytes"] > 100_000
+    assert any("test_memory_profiler.py" in entry["location"] for entry in diff["top"])
+    assert await inspector.diff(999) is None
+
+    inspector.clear()
+    assert not inspector.tracemalloc_stats()["tracing"]
+
+def test_endpoints_are_guarded_by_config(monkeypatch):
+    client = TestClient(app)
+    monkeypatch.setattr(main, "memory_inspector", None)  # DEBUG_MEMORY_ENABLED unset
+    assert client.get("/debug/memory").status_code == 404
+
+    memory_inspector = main.build_memory_inspector()
+    monkeypatch.setattr(main, "memory_inspector", memory_inspector)
+    llm_service.conversations["mem-test"] = [{"role": "user", "content": "hello"}]
+    try:
+        report = client.get("/debug/memory").json()
+        assert report["objects"]["conversations"]["items"] >= 1
+        assert "websocket_connections" in report["objects"]
+
+        snapshot = client.post("/debug/memory/snapshots", params={"label": "t0"}).json()
+        diff = client.get("/debug/memory/diff", params={"base": snapshot["id"]}).json()
+        assert diff["base"] == snapshot["id"]
+        assert client.get("/debug/memory/diff", params={"base": 12345}).status_code == 404
+        assert client.delete("/debug/memory/snapshots").json()["tracing"] is False
+    finally:
+        llm_service.conversations.pop("mem-test", None)
+        memory_inspector.clear()
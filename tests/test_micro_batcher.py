@@ -0,0 +1,96 @@
+import asyncio
+import pytest
+from fastapi import FastAPI, Request
+from app.llm_service import LLMService
+from app.micro_batcher import BatchError, MicroBatcher
+from benchmarks.harness import BackgroundServer
+
+@pytest.mark.asyncio
+async def test_concurrent_items_with_same_key_share_a_batch():
+    calls = []
+
+    async def send(key, inputs):
+        calls.append((key, list(inputs)))
+        return [f"{key}:{item}" for item in inputs]
+
+    batcher = MicroBatcher(send, max_batch_size=8, max_wait=0.05)
+    results = await asyncio.gather(
+        batcher.submit("a", 1), batcher.submit("a", 2), batcher.submit("b", 3)
+    )
+    assert results == ["a:1", "a:2", "b:3"]
+    assert sorted(calls) == [("a", [1, 2]), ("b", [3])]
+
+@pytest.mark.asyncio
+async def test_full_batch_is_sent_without_waiting():
+    sizes = []
+
+    async def send(key, inputs):
+        sizes.append(len(inputs))
+        return inputs
+
+    batcher = MicroBatcher(send, max_batch_size=2, max_wait=10.0)
+    results = await asyncio.wait_for(asyncio.gather(*(batcher.submit("k", i) for i in range(4))), timeout=1.0)
+    assert results == [0, 1, 2, 3]
+    assert sizes == [2, 2]
+
+@pytest.mark.asyncio
+async def test_errors_map_back_to_individual_callers():
+    async def send(key, inputs):
+        if key == "down":
+            raise BatchError("upstream down", status_code=502)
+        return [BatchError("bad input") if item == "bad" else item for item in inputs]
+
+    batcher = MicroBatcher(send, max_batch_size=8, max_wait=0.01)
+    results = await asyncio.gather(
+        batcher.submit("up", "good"), batcher.submit("up", "bad"),
+        batcher.submit("down", "x"), batcher.submit("down", "y"),
+        return_exceptions=True
+    )
+    assert results[0] == "good"
+    assert str(results[1]) == "bad input"
+    assert all(isinstance(r, BatchError) and r.status_code == 502 for r in results[2:])
+    assert batcher.get_stats()["item_errors"] == 1
+
+def _hf_stand_in(requests):
+    """Local stand-in for the Inference API recording each request body"""
+    app = FastAPI()
+
+    @app.post("/models/{owner}/{model}")
+    async def infer(owner: str, model: str, request: Request):
+        body = await request.json()
+        requests.append(body)
+        inputs = body["inputs"]
+        if isinstance(inputs, str):
+            return [{"generated_text": inputs.upper()}]
+        return [
+            {"error": "input rejected"} if "reject" in text else [{"generated_text": text.upper()}]
+            for text in inputs
+        ]
+
+    return app
+
+@pytest.mark.asyncio
+async def test_huggingface_calls_are_batched_against_stand_in(monkeypatch):
+    requests = []
+    server = BackgroundServer(_hf_stand_in(requests)).start()
+    try:
+        monkeypatch.setenv("LLM_MODEL_PROVIDER", "huggingface")
+        monkeypatch.setenv("LLM_MODEL_NAME", "google/flan-t5-large")
+        monkeypatch.setenv("HF_API_URL", f"{server.url}/models")
+        monkeypatch.setenv("HF_BATCH_MAX_WAIT_MS", "100")
+        service = LLMService()
+        replies = await asyncio.gather(
+            service._process_huggingface_message("one", "c1"),
+            service._process_huggingface_message("two", "c2"),
+            service._process_huggingface_message("please reject", "c3")
+        )
+        single = await service._process_huggingface_message("alone", "c4")
+        await service.cleanup()
+    finally:
+        server.stop()
+
+    assert replies[0] == "QUESTION: ONE"
+    assert replies[1] == "QUESTION: TWO"
+    assert "input rejected" in replies[2]
+    assert single == "QUESTION: ALONE"
+    assert [len(r["inputs"]) if isinstance(r["inputs"], list) else 1 for r in requests] == [3, 1]
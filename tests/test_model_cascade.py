@@ -0,0 +1,101 @@
+import pytest
+from app.llm_service import LLMService
+from app.model_cascade import HeuristicClassifier, ModelCascade
+
+SIZES = {"tinyllama": 1.1, "phi": 2.7, "llama2": 7.0, "deepseek-coder": 6.7}
+
+@pytest.fixture
+def sim_env(monkeypatch):
+    monkeypatch.setenv("LLM_MODEL_PROVIDER", "sim")
+    monkeypatch.setenv("SIM_DECODE_TPS", "5000")
+    monkeypatch.setenv("SIM_PREFILL_TPS", "50000")
+    monkeypatch.setenv("SIM_JITTER", "0")
+    monkeypatch.setenv("CASCADE_ENABLED", "true")
+    monkeypatch.delenv("CONVERSATION_STORE_DIR", raising=False)
+
+@pytest.mark.asyncio
+async def test_heuristic_classifier_levels():
+    classifier = HeuristicClassifier()
+    assert (await classifier.classify("hello!"))["complexity"] == 0
+    assert (await classifier.classify("What is a pod?"))["complexity"] == 0
+    moderate = await classifier.classify("Explain why my deployment keeps restarting")
+    assert moderate["complexity"] == 1
+    complex_ = await classifier.classify(
+        "Compare these designs step by step and analyze the trade-offs:\n```\ndef handler(event):\n    return event\n```")
+    assert complex_["complexity"] == 2 and complex_["code"]
+
+@pytest.mark.asyncio
+async def test_route_picks_smallest_adequate_available_tier():
+    cascade = ModelCascade(tiers=["llama2", "tinyllama", "phi"], sizes=SIZES, code_model="deepseek-coder")
+    assert cascade.tiers == ["tinyllama", "phi", "llama2"]
+    assert (await cascade.route("hi", "default"))["model"] == "tinyllama"
+    assert (await cascade.route("Explain why pods restart", "default"))["model"] == "phi"
+    assert (await cascade.route("Fix this:\n```\nimport os\n```", "default"))["model"] == "deepseek-coder"
+
+    cascade.resolve(["tinyllama:latest", "llama2:7b"])
+    assert cascade.active_tiers == ["tinyllama:latest", "llama2:7b"]
+    # No code model pulled: code requests fall back to the general tiers
+    assert (await cascade.route("Debug and optimize this:\n```\nimport os\n```", "default"))["model"] == "llama2:7b"
+    assert cascade.next_tier("tinyllama:latest") == "llama2:7b"
+    cascade.resolve([])
+    assert (await cascade.route("hi", "default"))["model"] == "default"
+
+def test_assess_confidence_checks():
+    cascade = ModelCascade(tiers=["tinyllama"], sizes=SIZES, min_response_chars=20)
+    assert cascade.assess("What is Kubernetes?", "I'm sorry, I can't help with that request.") == "refusal"
+    assert cascade.assess("What is Kubernetes?", "A thing.") == "too_short"
+    assert cascade.assess("thanks", "You're welcome!") is None
+    answer = "Kubernetes is a container orchestrator."
+    assert cascade.assess("What is Kubernetes?", answer, {"eval_count": 64}, num_predict=64) == "truncated"
+    assert cascade.assess("What is Kubernetes?", answer, {"eval_count": 20}, num_predict=64) is None
+
+@pytest.mark.asyncio
+async def test_short_answer_escalates_one_tier(sim_env, monkeypatch):
+    monkeypatch.setenv("SIM_RESPONSE_TOKENS", "2")
+    service = LLMService()
+    await service.initialize()
+    metadata = {}
+    await service.process_message("What is a pod?", "c1", metadata=metadata)
+
+    route = metadata["cascade"]
+    assert route["complexity"] == "simple"
+    assert route["model"] == "phi"
+    assert route["escalations"] == [{"from": "tinyllama", "to": "phi", "reason": "too_short"}]
+    stats = service.cascade.get_stats()
+    assert stats["per_tier"]["tinyllama"]["escalated_out"] == {"too_short": 1}
+    assert stats["per_tier"]["phi"]["served"] == 1
+    assert stats["escalations"] == 1
+    # Telemetry is attributed to the tier that generated
+    assert set(service.telemetry.models) == {"tinyllama", "phi"}
+    await service.cleanup()
+
+@pytest.mark.asyncio
+async def test_cheap_tier_savings_and_streaming(sim_env):
+    service = LLMService()
+    await service.initialize()
+    for i in range(3):
+        metadata = {}
+        await service.process_message(f"What is a pod number {i}?", f"c{i}", metadata=metadata)
+        assert metadata["cascade"]["model"] == "tinyllama" and not metadata["cascade"]["escalations"]
+
+    events = [event async for event in service.stream_message("Explain why pods restart", "s1")]
+    assert events[-1]["cascade"]["model"] == "phi"
+
+    stats = (await service.get_model_status())["cascade"]
+    assert stats["per_tier"]["tinyllama"]["hit_rate"] == 0.75
+    assert stats["estimated_cost_savings"] > 0.5
+    assert stats["estimated_latency_savings"] > 0
+    await service.cleanup()
+
+@pytest.mark.asyncio
+async def test_shadow_gets_the_served_tiers_timings(sim_env, monkeypatch):
+    monkeypatch.setenv("SHADOW_ENABLED", "true")
+    monkeypatch.setenv("SHADOW_PROVIDER", "sim")
+    monkeypatch.setenv("SHADOW_FRACTION", "1")
+    service = LLMService()
+    await service.initialize()
+    metadata = {}
+    await service.process_message("What is a pod?", "c1", metadata=metadata)
+    primary = service.shadow.get_stats()["primary"][metadata["cascade"]["model"]]
+    assert primary["decode_tps_p50"] is not None and primary["completion_tokens_mean"] > 0
+    await service.cleanup()
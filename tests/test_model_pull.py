@@ -0,0 +1,133 @@
+import pytest
+import asyncio
+from app.llm_service import LLMService
+from app.model_pull import ModelPullJob, PullRejected
+
+def test_pull_job_progress_aggregates_layers():
+    """Progress is summed across layers and never goes backwards"""
+    job = ModelPullJob("phi")
+    job.apply_event({"status": "pulling manifest"})
+    job.apply_event({"status": "downloading", "digest": "sha256:a", "total": 100, "completed": 40})
+    job.apply_event({"status": "downloading", "digest": "sha256:b", "total": 100, "completed": 10})
+    # A resumed attempt may report a lower value for an already downloaded layer
+    job.apply_event({"status": "downloading", "digest": "sha256:a", "total": 100, "completed": 20})
+    assert job.total_bytes == 200
+    assert job.completed_bytes == 50
+    assert job.percent == 25.0
+    assert job.to_dict()["detail"] == "downloading"
+
+@pytest.mark.asyncio
+async def test_pull_job_retries_then_activates():
+    """Transient failures are retried and readiness flips only on success"""
+    service = LLMService()
+    service.pull_retry_delay = 0.01
+    attempts = []
+
+    async def fake_pull(job):
+        attempts.append(job.attempts)
+        if len(attempts) < 3:
+            raise Exception("connection reset")
+        job.apply_event({"status": "success"})
+
+    async def fake_activate(job):
+        service.model_name = job.model_name
+        service.model_loaded = True
+        return True
+
+    service._pull_ollama_model = fake_pull
+    service._activate_pulled_model = fake_activate
+
+    job = service.start_model_pull("llama2")
+    assert service.get_pull_job(job.id) is job
+    assert service.model_loaded is False
+    await asyncio.wait_for(service._pull_task, timeout=5)
+
+    assert attempts == [1, 2, 3]
+    assert job.status == ModelPullJob.SUCCESS
+    assert job.percent == 100.0
+    assert service.model_loaded is True
+
+@pytest.mark.asyncio
+async def test_pull_job_permanent_failure_stops_retrying():
+    """Errors reported as permanent by Ollama are not retried"""
+    service = LLMService()
+    service.pull_retry_delay = 0.01
+
+    async def fake_pull(job):
+        raise PullRejected("pull model manifest: file does not exist")
+
+    service._pull_ollama_model = fake_pull
+    job = service.start_model_pull("no-such-model")
+    await asyncio.wait_for(service._pull_task, timeout=5)
+
+    assert job.status == ModelPullJob.FAILED
+    assert job.attempts == 1
+    assert "does not exist" in job.error
+
+@pytest.mark.asyncio
+async def test_garbled_progress_line_is_retried():
+    """A truncated progress line is a transient glitch, not an unknown model"""
+    service = LLMService()
+    service.pull_retry_delay = 0.01
+    attempts = []
+
+    async def fake_pull(job):
+        attempts.append(job.attempts)
+        if len(attempts) == 1:
+            import json
+            json.loads('{"status": "downlo')
+        job.apply_event({"status": "success"})
+
+    async def fake_activate(job):
+        return True
+
+    service._pull_ollama_model = fake_pull
+    service._activate_pulled_model = fake_activate
+    job = service.start_model_pull("llama2")
+    await asyncio.wait_for(service._pull_task, timeout=5)
+    assert attempts == [1, 2] and job.status == ModelPullJob.SUCCESS
+
+@pytest.mark.asyncio
+async def test_failed_pull_goes_ready_on_fallback_or_fails_liveness():
+    service = LLMService()
+    service.pull_retry_delay = 0.01
+
+    async def fake_pull(job):
+        raise PullRejected("file does not exist")
+
+    service._pull_ollama_model = fake_pull
+    service.model_name = "tinyllama:latest"  # fallback already serving
+    service.current_model_info = {"name": "tinyllama:latest"}
+    await asyncio.wait_for(_finish(service, "llama2"), 5)
+    assert service.model_loaded and service.serving_fallback and service.fatal_error is None
+
+    bare = LLMService()
+    bare._pull_ollama_model = fake_pull
+    bare.model_name = "llama2"  # nothing to fall back to
+    await asyncio.wait_for(_finish(bare, "llama2"), 5)
+    assert not bare.model_loaded and "llama2" in bare.fatal_error
+    assert await bare.health_check() is False
+
+async def _finish(service, model):
+    service.start_model_pull(model)
+    await service._pull_task
+
+@pytest.mark.asyncio
+async def test_failed_startup_retries_provider_init(monkeypatch):
+    """Ollama down at startup: the service keeps retrying until the model is usable"""
+    monkeypatch.setenv("LLM_MODEL_PROVIDER", "ollama")
+    service = LLMService()
+    service.init_retry_delay = 0.01
+    calls = []
+
+    async def flaky_init():
+        calls.append(1)
+        if len(calls) < 3:
+            raise Exception("connection refused")
+
+    service._initialize_ollama = flaky_init
+    await service.initialize()
+    assert service.is_initialized and not service.model_loaded
+    await asyncio.wait_for(service._init_retry_task, timeout=5)
+    assert service.model_loaded and service.init_retries == 1 and len(calls) == 3
+    await service.cleanup()
@@ -0,0 +1,123 @@
+import pytest
+from app.llm_service import LLMService
+from app.ownership import INTERNAL_TOKEN_HEADER, HashRing, OwnershipRouter
+from benchmarks.harness import BackgroundServer, free_port
+
+KEYS = [f"conv-{i}" for i in range(5000)]
+SECRET = "test-secret"
+
+def test_ring_balances_and_moves_few_keys_on_join():
+    three = HashRing(["a:8000", "b:8000", "c:8000"], vnodes=64)
+    shares = {node: sum(1 for key in KEYS if three.owner(key) == node) / len(KEYS) for node in three.nodes}
+    assert all(0.2 < share < 0.47 for share in shares.values())
+
+    four = HashRing(["a:8000", "b:8000", "c:8000", "d:8000"], vnodes=64)
+    moved = [key for key in KEYS if three.owner(key) != four.owner(key)]
+    assert 0.15 < len(moved) / len(KEYS) < 0.35
+    assert all(four.owner(key) == "d:8000" for key in moved)  # keys only move to the new node
+
+def test_members_leave_only_after_missing_rounds():
+    router = OwnershipRouter(LLMService(), enabled=True, peers=[], self_address="self:8000", missing_rounds=2,
+                             shared_secret=SECRET)
+    router.update_members(["self:8000", "b:8000"])
+    assert router.ring.nodes == ["b:8000", "self:8000"]
+    assert router.last_rebalance["joined"] == ["b:8000"]
+
+    router.update_members(["self:8000"])
+    assert "b:8000" in router.ring.nodes  # one missed round (e.g. a DNS blip) is tolerated
+    router.update_members(["self:8000", "b:8000"])
+    router.update_members(["self:8000"])
+    assert "b:8000" in router.ring.nodes
+    router.update_members(["self:8000"])
+    assert router.ring.nodes == ["self:8000"]
+    assert router.owner_of("anything") is None
+
+def _owned_by(router, peer):
+    return next(key for key in KEYS if router.owner_of(key) == peer)
+
+@pytest.mark.asyncio
+async def test_turns_forward_to_owner_with_history_handoff(monkeypatch):
+    monkeypatch.setenv("LLM_MODEL_PROVIDER", "sim")
+    monkeypatch.setenv("SIM_DECODE_TPS", "5000")
+    monkeypatch.setenv("SIM_PREFILL_TPS", "50000")
+    import app.main as main
+    from app.main import app, llm_service as owner_service
+    # The app module may have been imported with another provider; make the owner a fast simulator
+    monkeypatch.setattr(owner_service, "model_provider", "sim")
+    monkeypatch.setattr(owner_service, "sim_engine", None)
+    monkeypatch.setitem(owner_service.sim_config, "decode_tps", 5000.0)
+    monkeypatch.setitem(owner_service.sim_config, "prefill_tps", 50000.0)
+    # The owner accepts forwarded turns; its own ring is irrelevant here
+    monkeypatch.setattr(main, "ownership", OwnershipRouter(owner_service, enabled=False, shared_secret=SECRET))
+
+    server = BackgroundServer(app).start()
+    peer = server.url.removeprefix("http://")
+    local_service = LLMService()
+    await local_service.initialize()
+    router = OwnershipRouter(local_service, enabled=True, peers=[peer], self_address="self:8000",
+                             shared_secret=SECRET)
+    await router.refresh()
+    conversation_id = _owned_by(router, peer)
+    try:
+        # This replica served the conversation before the owner joined
+        local_service.conversations[conversation_id] = [
+            {"role": "user", "content": "earlier question"},
+            {"role": "assistant", "content": "earlier answer"}
+        ]
+        metadata = {}
+        response = await router.process_message("next question", conversation_id, metadata=metadata)
+        assert response and metadata["owner"] == peer
+        assert conversation_id not in local_service.conversations
+        owner_history = [m["content"] for m in owner_service.conversations[conversation_id]]
+        assert owner_history[:3] == ["earlier question", "earlier answer", "next question"]
+
+        events = [event async for event in router.stream_message("streamed", conversation_id)]
+        assert events[-1]["type"] == "done" and events[-1]["owner"] == peer
+        assert len(owner_service.conversations[conversation_id]) == 6
+
+        stats = router.get_stats()
+        assert stats["forwarded"] == 2 and stats["handoffs_sent"] == 1 and stats["local_turns"] == 0
+    finally:
+        owner_service.conversations.pop(conversation_id, None)
+        server.stop()
+        await router.stop()
+        await local_service.cleanup()
+
+@pytest.mark.asyncio
+async def test_unreachable_owner_falls_back_to_local(monkeypatch):
+    monkeypatch.setenv("LLM_MODEL_PROVIDER", "mock")
+    monkeypatch.setenv("MOCK_INIT_DELAY", "0")
+    service = LLMService()
+    await service.initialize()
+    dead_peer = f"127.0.0.1:{free_port()}"
+    router = OwnershipRouter(service, enabled=True, peers=[dead_peer], self_address="self:8000",
+                             shared_secret=SECRET)
+    await router.refresh()
+    conversation_id = _owned_by(router, dead_peer)
+
+    assert await router.process_message("hello", conversation_id)
+    stats = router.get_stats()
+    assert stats["forward_errors"] == 1 and stats["local_turns"] == 1
+    assert dead_peer not in stats["members"]  # dropped until discovery sees it again
+    await router.stop()
+    await service.cleanup()
+
+def test_internal_turns_require_the_shared_secret(monkeypatch):
+    from fastapi.testclient import TestClient
+    import app.main as main
+    client = TestClient(main.app)
+    body = {"message": "hi", "conversation_id": "victim", "history": [{"role": "user", "content": "planted"}]}
+
+    monkeypatch.setattr(main, "ownership", None)
+    assert client.post("/internal/turn", json=body).status_code == 404  # ownership off: no internal endpoint
+    ownership = OwnershipRouter(main.llm_service, enabled=False, shared_secret=None)
+    monkeypatch.setattr(main, "ownership", ownership)
+    assert client.post("/internal/turn", json=body).status_code == 403  # no secret configured: refuse all
+    monkeypatch.setattr(ownership, "shared_secret", SECRET)
+    assert client.post("/internal/turn", json=body).status_code == 403
+    assert client.post("/internal/turn", json=body, headers={INTERNAL_TOKEN_HEADER: "wrong"}).status_code == 403
+
+def test_ownership_without_secret_stays_local(monkeypatch):
+    monkeypatch.delenv("OWNERSHIP_SHARED_SECRET", raising=False)
+    router = OwnershipRouter(LLMService(), enabled=True, peers=["b:8000"], self_address="self:8000")
+    assert not router.enabled
@@ -0,0 +1,98 @@
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app, rate_limiter
+from app.rate_limiter import RateLimiter, RateLimitPolicy, TokenBucket
+from app.resp_store import LocalRespServer
+
+def _limiter(**kwargs):
+    policies = [
+        RateLimitPolicy("user", "requests", per_minute=60, burst=3),
+        RateLimitPolicy("user", "tokens", per_minute=600, burst=100)
+    ]
+    return RateLimiter(policies=policies, enabled=True, **kwargs)
+
+def test_token_bucket_refills_up_to_capacity():
+    bucket = TokenBucket(capacity=5, rate=2.0, now=0.0)
+    bucket.consume(5)
+    assert bucket.retry_after(1) == pytest.approx(0.5)
+    bucket.refill(1.0)
+    assert bucket.tokens == pytest.approx(2.0)
+    bucket.refill(100.0)
+    assert bucket.tokens == 5
+
+def test_requests_over_burst_are_rejected_without_charging():
+    limiter = _limiter()
+    subjects = {"user": "alice"}
+    for _ in range(3):
+        assert limiter.check(subjects).allowed
+    decision = limiter.check(subjects)
+    assert not decision.allowed
+    assert decision.limited_by == "user_requests"
+    assert decision.remaining["requests"] == 0
+    assert decision.headers()["Retry-After"] == "1"
+    # Other users have their own buckets
+    assert limiter.check({"user": "bob"}).allowed
+
+def test_generated_tokens_deficit_blocks_next_request():
+    limiter = _limiter()
+    subjects = {"user": "carol"}
+    assert limiter.check(subjects).allowed
+    assert limiter.record_tokens(subjects, 150) == {"tokens": 0}
+    decision = limiter.check(subjects)
+    assert not decision.allowed
+    assert decision.limited_by == "user_tokens"
+    assert decision.retry_after > 1
+
+def test_bucket_table_is_bounded():
+    limiter = _limiter(max_keys=4)
+    for i in range(10):
+        limiter.check({"user": f"user-{i}"})
+    assert len(limiter.buckets) == 4
+
+@pytest.mark.asyncio
+async def test_replicas_share_consumption_through_backend():
+    server = await LocalRespServer().start()
+    first, second = _limiter(redis_url=server.url), _limiter(redis_url=server.url)
+    try:
+        subjects = {"user": "dave"}
+        assert first.check(subjects).allowed
+        assert first.check(subjects).allowed
+        await first.sync()
+        assert second.check(subjects).allowed
+        await second.sync()
+        # The second replica has seen the first one's two requests
+        assert not second.check(subjects).allowed
+        await first.sync()
+        assert not first.check(subjects).allowed
+    finally:
+        await first.stop()
+        await second.stop()
+        await server.stop()
+
+def test_chat_returns_429_with_quota_headers():
+    client = TestClient(app)
+    payload = {"message": "hi", "conversation_id": "rate-limited", "user_id": "rate-limit-test"}
+    saved = rate_limiter.policies
+    rate_limiter.policies = [RateLimitPolicy("user", "requests", per_minute=1, burst=1)]
+    try:
+        first = client.post("/chat", json=payload)
+        second = client.post("/chat", json=payload)
+    finally:
+        rate_limiter.policies = saved
+    assert first.headers.get("X-RateLimit-Remaining") in ("0", None)
+    assert second.status_code == 429
+    assert second.headers["X-RateLimit-Limit"] == "1"
+    assert int(second.headers["Retry-After"]) >= 1
+
+def test_client_ip_ignores_forged_forwarded_for(monkeypatch):
+    import ipaddress
+    from types import SimpleNamespace
+    import app.main as main
+    monkeypatch.setattr(main, "TRUSTED_PROXIES", [ipaddress.ip_network("10.0.0.0/8")])
+    forged = {"x-forwarded-for": "1.2.3.4"}
+    # Direct caller: the header is client-controlled
+    assert main._client_ip(forged, SimpleNamespace(host="203.0.113.9")) == "203.0.113.9"
+    # Behind the ingress: the rightmost untrusted hop is what the ingress saw
+    via_ingress = {"x-forwarded-for": "1.2.3.4, 203.0.113.9, 10.1.2.3"}
+    assert main._client_ip(via_ingress, SimpleNamespace(host="10.4.0.7")) == "203.0.113.9"
+    assert main._client_ip({}, SimpleNamespace(host="10.4.0.7")) == "10.4.0.7"
@@ -0,0 +1,78 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "load_testing"))
+
+import scaling_report  # noqa: E402
+import streaming_report  # noqa: E402
+from report_utils import load_scaling_log  # noqa: E402
+
+HISTORY = """Timestamp,User Count,Type,Name,Requests/s,Failures/s,50%,95%
+995,0,,Aggregated,0,0,N/A,N/A
+1000,10,,Aggregated,10,0,50,100
+1000,10,POST,/chat,10,0,50,100
+1010,20,,Aggregated,20,0,55,110
+1020,40,,Aggregated,38,0,70,150
+1030,80,,Aggregated,40,1,200,400
+1040,80,,Aggregated,41,1,210,420
+"""
+
+SCALING = """timestamp,current_replicas,desired_replicas,ready_replicas,cpu_utilization
+1000,1,1,1,30
+1025,1,2,1,85
+bad,row,,,
+1045,2,2,2,60
+"""
+
+
+def _write(tmp_path, name, content):
+    path = tmp_path / name
+    path.write_text(content)
+    return str(path)
+
+
+def test_merge_timeline_pairs_rows_with_latest_sample():
+    history = [{"timestamp": t} for t in (5, 10, 20)]
+    scaling = [(0, 1), (10, 2), (30, 3)]
+    merged = [(row and row["timestamp"], sample and sample[0])
+              for row, sample in scaling_report.merge_timeline(iter(history), iter(scaling))]
+    assert merged == [(None, 0), (5, 0), (None, 10), (10, 10), (20, 10), (None, 30)]
+
+
+def test_knees():
+    curve = [{"users": u, "rps": r, "p95_ms": p} for u, r, p in
+             [(10, 10, 100), (20, 20, 110), (40, 38, 150), (80, 40.5, 410)]]
+    assert scaling_report.find_throughput_knee(curve) == 40
+    assert scaling_report.find_latency_knee(curve) == 80
+    assert scaling_report.find_latency_knee(curve, factor=5) is None
+    assert scaling_report.find_throughput_knee(curve[:2]) is None
+    # Linear scaling has no knee
+    linear = [{"users": u, "rps": u} for u in (10, 20, 30, 40)]
+    assert scaling_report.find_throughput_knee(linear) is None
+
+
+def test_report_from_csv_fixtures(tmp_path):
+    history = _write(tmp_path, "history.csv", HISTORY)
+    scaling = _write(tmp_path, "scaling.csv", SCALING)
+    report = scaling_report.build_report(history, scaling, bucket_seconds=20)
+
+    summary = report["summary"]
+    assert summary["throughput_knee_users"] == 40 and summary["latency_knee_users"] == 80
+    assert [row["users"] for row in report["concurrency"]] == [10, 20, 40, 80]
+    assert report["concurrency"][-1]["rps"] == 40.5 and report["concurrency"][-1]["p95_ms"] == 410.1
+
+    # Load step at 1020 -> HPA decision at 1025 -> both replicas ready at 1045
+    [event] = report["scale_events"]
+    assert (event["from_replicas"], event["to_replicas"]) == (1, 2)
+    assert event["decision_delay_s"] == 5.0 and event["ready_delay_s"] == 20.0
+    assert summary["mean_decision_delay_s"] == 5.0 and summary["mean_ready_delay_s"] == 20.0
+    assert report["duration_s"] == 45.0
+    assert "| 1 -> 2 | 85 | 5.0 | 20.0 |" in scaling_report.render_markdown(report)
+
+
+def test_streaming_report_shares_the_scaling_reader(tmp_path):
+    scaling = _write(tmp_path, "scaling.csv", SCALING)
+    assert [row[0] for row in load_scaling_log(scaling)] == [1000.0, 1025.0, 1045.0]
+    samples = _write(tmp_path, "samples.csv", "timestamp,metric,value_ms\n1001,ttft,100\n1030,ttft,300\n1050,ttft,80\n")
+    report = streaming_report.build_report(samples, scaling, bucket_seconds=60)
+    assert [(row["ready_replicas"], row["count"]) for row in report["per_replica"]] == [(1, 2), (2, 1)]
@@ -0,0 +1,83 @@
+import pytest
+from app import llm_service, semantic_cache
+from app.llm_service import LLMService
+from app.semantic_cache import HashingVectorizer, SemanticCache, VectorIndex
+from app.tracing import Tracer
+
+@pytest.mark.asyncio
+async def test_rewording_hits_and_unrelated_prompt_misses():
+    cache = SemanticCache(threshold=0.85, max_entries=10, ttl=60)
+    hit, vector = await cache.lookup("What is a pod in Kubernetes?")
+    assert hit is None
+    await cache.store("What is a pod in Kubernetes?", "A pod is ...", vector)
+
+    hit, _ = await cache.lookup("what are kubernetes pods")
+    assert hit["response"] == "A pod is ..."
+    assert hit["similarity"] >= 0.85
+    hit, _ = await cache.lookup("How do I scale a deployment?")
+    assert hit is None
+    stats = cache.get_stats()
+    assert stats["hits"] == 1 and stats["lookups"] == 3
+
+@pytest.mark.asyncio
+async def test_lru_eviction_and_expiry():
+    cache = SemanticCache(threshold=0.99, max_entries=2, ttl=60)
+    for prompt in ["alpha question", "beta question"]:
+        await cache.store(prompt, prompt.upper())
+    assert (await cache.lookup("alpha question"))[0] is not None  # alpha is now most recent
+    await cache.store("gamma question", "GAMMA")
+    assert (await cache.lookup("beta question"))[0] is None
+    assert (await cache.lookup("alpha question"))[0] is not None
+    assert cache.get_stats()["evictions"] == 1
+
+    cache.ttl = 0
+    assert (await cache.lookup("alpha question"))[0] is None
+    assert cache.get_stats()["expired"] == 1
+
+@pytest.mark.asyncio
+async def test_pure_python_index_matches_vectorized(monkeypatch):
+    vectorizer = HashingVectorizer(dim=256)
+    prompts = ["kubernetes pod restart", "docker image size", "helm chart values"]
+    vectors = [await vectorizer.embed(p) for p in prompts]
+    query = await vectorizer.embed("restart a kubernetes pod")
+
+    monkeypatch.setattr(semantic_cache, "np", None)
+    index = VectorIndex(capacity=4)
+    slots = [index.add(v) for v in vectors]
+    slot, score = index.search(query)
+    assert slot == slots[0] and 0 < score <= 1.0001
+    index.remove(slots[0])
+    assert index.search(query)[0] != slots[0]
+
+@pytest.mark.asyncio
+async def test_service_serves_opening_prompts_from_cache(monkeypatch):
+    monkeypatch.setenv("LLM_MODEL_PROVIDER", "sim")
+    monkeypatch.setenv("SIM_DECODE_TPS", "5000")
+    monkeypatch.setenv("SIM_PREFILL_TPS", "50000")
+    monkeypatch.setenv("SEMANTIC_CACHE_ENABLED", "true")
+    service = LLMService()
+    await service.initialize()
+    try:
+        first = await service.process_message("What is a pod in Kubernetes?", "c1")
+        metadata = {}
+        tracer = Tracer(sample_rate=1.0, enabled=True)
+        monkeypatch.setattr(llm_service, "tracer", tracer)
+        with tracer.trace("request") as trace:
+            second = await service.process_message("what are kubernetes pods", "c2", metadata=metadata)
+        assert second == first
+        assert metadata["cache"]["hit"] is True
+        assert "matched_prompt" not in metadata["cache"]  # never leak another user's prompt
+        lookup = next(s for s in tracer.get_trace(trace.trace_id)["spans"] if s["name"] == "semantic_cache.lookup")
+        assert "What is a pod" not in str(lookup["attributes"]) and lookup["attributes"]["hit"] is True
+        assert [m["role"] for m in service.conversations["c2"]] == ["user", "assistant"]
+
+        # Follow-ups depend on history and always go to the model
+        metadata = {}
+        await service.process_message("What is a pod in Kubernetes?", "c2", metadata=metadata)
+        assert "cache" not in metadata and "budget" in metadata
+
+        events = [e async for e in service.stream_message("kubernetes pods?", "c3")]
+        assert events[-1]["cache"]["hit"] is True
+        assert (await service.get_model_status())["semantic_cache"]["hits"] == 2
+    finally:
+        await service.cleanup()
@@ -0,0 +1,109 @@
+import asyncio
+import pytest
+from app.llm_service import LLMService
+
+@pytest.fixture
+def shadow_env(monkeypatch):
+    monkeypatch.setenv("LLM_MODEL_PROVIDER", "sim")
+    monkeypatch.setenv("SIM_DECODE_TPS", "1000")
+    monkeypatch.setenv("SIM_PREFILL_TPS", "50000")
+    monkeypatch.setenv("SIM_JITTER", "0")
+    monkeypatch.setenv("SIM_RESPONSE_TOKENS", "16")
+    monkeypatch.setenv("SHADOW_ENABLED", "true")
+    monkeypatch.setenv("SHADOW_PROVIDER", "sim")
+    monkeypatch.setenv("SHADOW_MODEL", "candidate")
+    monkeypatch.setenv("SHADOW_FRACTION", "1")
+    monkeypatch.setenv("SHADOW_SIM_DECODE_TPS", "100")
+    monkeypatch.delenv("CONVERSATION_STORE_DIR", raising=False)
+
+async def _drain(shadow):
+    if shadow._tasks:
+        await asyncio.gather(*shadow._tasks)
+
+@pytest.mark.asyncio
+async def test_shadow_is_measured_and_never_reaches_the_user(shadow_env):
+    service = LLMService()
+    await service.initialize()
+    response = await service.process_message("How do pods restart?", "c1")
+    await _drain(service.shadow)
+    events = [event async for event in service.stream_message("And deployments?", "c1")]
+    await _drain(service.shadow)
+
+    assert events[-1]["type"] == "done"
+    history = service.conversations["c1"]
+    assert [m["content"] for m in history if m["role"] == "assistant"] == [response, events[-1]["response"]]
+
+    stats = service.shadow.get_stats()
+    assert stats["sampled"] == 2 and stats["completed"] == 2
+    assert stats["primary"][service.model_name]["samples"] == 2
+    assert stats["shadow"]["model"] == "candidate" and stats["shadow"]["samples"] == 2
+    assert stats["shadow"]["decode_tps_p50"] < stats["primary"][service.model_name]["decode_tps_p50"]
+    assert stats["latency_ratio_p50"] > 0
+    assert (await service.get_model_status())["shadow"]["completed"] == 2
+    await service.cleanup()
+
+@pytest.mark.asyncio
+async def test_shadow_drops_instead_of_queueing(shadow_env, monkeypatch):
+    service = LLMService()
+    await service.initialize()
+    shadow = service.shadow
+    job = shadow.prepare("prompt", {"num_predict": 8})
+
+    shadow._inflight = shadow.max_concurrency  # a shadow is already running
+    shadow.submit(job, "primary", 100.0, "answer")
+    assert shadow.dropped["busy"] == 1 and not shadow._tasks
+
+    shadow._inflight = 0
+    monkeypatch.setattr(service.limiter, "admitting", False)
+    shadow.submit(job, "primary", 100.0, "answer")
+    await _drain(shadow)
+    assert shadow.dropped["load"] == 1 and shadow.completed == 0
+    assert shadow.get_stats()["primary"]["primary"]["samples"] == 2
+    await service.cleanup()
+
+@pytest.mark.asyncio
+async def test_unsampled_requests_are_not_mirrored(shadow_env, monkeypatch):
+    monkeypatch.setenv("SHADOW_FRACTION", "0")
+    service = LLMService()
+    await service.initialize()
+    await service.process_message("hello", "c2")
+    assert service.shadow.get_stats()["sampled"] == 0 and not service.shadow._tasks
+    await service.cleanup()
+
+@pytest.mark.asyncio
+async def test_running_shadow_is_preempted_when_primary_load_rises(shadow_env):
+    service = LLMService()
+    await service.initialize()
+    shadow, limiter = service.shadow, service.limiter
+    shadow.submit(shadow.prepare("prompt", {"num_predict": 64}), "primary", 100.0, "answer")
+    await asyncio.sleep(0.05)
+    assert limiter.inflight == 1 and limiter.accepted["shadow"] == 1  # the shadow holds a slot
+
+    threshold = max(1.0, limiter.limit * limiter.PRIORITY_SHARES["shadow"])
+    primary = 0
+    while primary < threshold:
+        assert limiter.try_acquire("standard")
+        primary += 1
+    await asyncio.gather(*shadow._tasks, return_exceptions=True)
+    assert shadow.dropped["preempted"] == 1 and shadow.completed == 0
+    assert limiter.inflight == primary and shadow.get_stats()["inflight"] == 0
+    assert limiter.get_shed_rate() == 0
+    await service.cleanup()
+
+@pytest.mark.asyncio
+async def test_drain_cancels_running_shadows_instead_of_waiting(shadow_env, monkeypatch):
+    from app.drain import DrainController
+    from app.connection_manager import ConnectionManager
+    monkeypatch.setenv("DRAIN_GRACE_SECONDS", "3")
+    service = LLMService()
+    await service.initialize()
+    shadow = service.shadow
+    shadow.submit(shadow.prepare("prompt", {"num_predict": 256}), "primary", 100.0, "answer")
+    await asyncio.sleep(0.05)
+    assert service.limiter.inflight == 1
+
+    controller = DrainController(service, ConnectionManager())
+    await controller.drain()
+    assert controller.wait_seconds < 1 and controller.inflight_abandoned == 0
+    assert shadow.dropped["preempted"] == 1 and shadow.completed == 0
+    await service.cleanup()
@@ -0,0 +1,51 @@
+import pytest
+import asyncio
+import time
+from app.llm_service import LLMService
+from app.sim_engine import SimulatedInferenceEngine
+
+async def _drain(engine, prompt):
+    parts, timings = [], None
+    async for delta, final in engine.generate(prompt):
+        parts.append(delta)
+        timings = final or timings
+    return "".join(parts), timings
+
+@pytest.mark.asyncio
+async def test_sim_engine_reports_ollama_timings():
+    """The final chunk carries Ollama-compatible timing fields"""
+    engine = SimulatedInferenceEngine(prefill_tps=1e6, decode_tps=1e4, response_tokens=10, jitter=0)
+    text, timings = await _drain(engine, "x" * 400)
+    assert text
+    assert timings["prompt_eval_count"] == 100
+    assert 5 <= timings["eval_count"] <= 15
+    assert timings["total_duration"] >= timings["eval_duration"] > 0
+
+@pytest.mark.asyncio
+async def test_sim_engine_slots_bound_concurrency():
+    """Requests beyond the slot count queue behind running ones"""
+    engine = SimulatedInferenceEngine(prefill_tps=1e6, decode_tps=100, response_tokens=4, jitter=0, slots=2)
+    engine._response_length = lambda max_tokens=None: 4
+    start = time.perf_counter()
+    await asyncio.gather(*(_drain(engine, "hi") for _ in range(4)))
+    elapsed = time.perf_counter() - start
+    # 4 requests x 40 ms on 2 slots take two rounds
+    assert elapsed >= 0.075
+    assert engine.requests_served == 4
+    assert engine.active == 0 and engine.waiting == 0
+
+@pytest.mark.asyncio
+async def test_llm_service_streams_sim_provider():
+    """stream_message yields token events then a done event with timings"""
+    service = LLMService()
+    service.model_provider = "sim"
+    service.sim_config.update(prefill_tps=1e6, decode_tps=1e4, response_tokens=8)
+    await service.initialize()
+
+    events = [event async for event in service.stream_message("What is a pod?", "sim-1")]
+    tokens = [e["content"] for e in events if e["type"] == "token"]
+    done = events[-1]
+    assert done["type"] == "done"
+    assert done["response"] == "".join(tokens)
+    assert done["timings"]["eval_count"] == len(tokens)
+    assert service.conversations["sim-1"][-1]["content"] == done["response"]
@@ -0,0 +1,52 @@
+import asyncio
+import time
+import pytest
+from fastapi.testclient import TestClient
+from app.llm_service import LLMService
+from app.startup import StartupTimer
+
+def test_phases_are_recorded_relative_to_origin():
+    timer = StartupTimer(origin=time.perf_counter())
+    with timer.phase("config"):
+        time.sleep(0.01)
+    timer.mark_ready()
+    data = timer.to_dict()
+    assert data["phases"]["config"]["duration_ms"] >= 10
+    assert data["phases"]["config"]["failed"] is False
+    assert data["time_to_ready_ms"] >= data["phases"]["config"]["duration_ms"]
+
+async def _fail():
+    raise RuntimeError("boom")
+
+@pytest.mark.asyncio
+async def test_deferred_work_runs_after_startup_and_is_timed():
+    timer = StartupTimer()
+    timer.defer("warmup", asyncio.sleep(0.01))
+    timer.defer("broken", _fail())
+    assert timer.to_dict()["deferred_pending"] == ["warmup", "broken"]
+    await asyncio.sleep(0.05)
+    phases = timer.to_dict()["phases"]
+    assert phases["deferred.warmup"]["failed"] is False
+    assert phases["deferred.broken"]["failed"] is True
+    await timer.cancel_deferred()
+
+@pytest.mark.asyncio
+async def test_initialize_times_independent_steps(tmp_path, monkeypatch):
+    monkeypatch.setenv("LLM_MODEL_PROVIDER", "sim")
+    monkeypatch.setenv("CONVERSATION_STORE_DIR", str(tmp_path))
+    timer = StartupTimer()
+    service = LLMService()
+    await service.initialize(timer=timer)
+    try:
+        assert service.model_loaded
+        assert {"conversation_restore", "provider_init.sim"} <= set(timer.phases)
+        assert service.hf_batcher is None
+    finally:
+        await service.cleanup()
+
+def test_stats_reports_startup():
+    from app.main import app
+    with TestClient(app) as client:
+        startup = client.get("/stats").json()["startup"]
+    assert "imports" in startup["phases"]
+    assert "llm_service_init" in startup["phases"]
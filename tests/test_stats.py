@@ -0,0 +1,8 @@
+from collections import deque
+from app.stats import percentile
+
+def test_nearest_rank_percentile():
+    values = deque([5.0, 1.0, 4.0, 2.0, 3.0])
+    assert [percentile(values, p) for p in (0, 20, 50, 90, 100)] == [1.0, 1.0, 3.0, 5.0, 5.0]
+    assert percentile([1.23456], 99, 2) == 1.23
+    assert percentile([], 50) is None and percentile([], 50, 1) is None
@@ -0,0 +1,73 @@
+import asyncio
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app.tracing import Tracer
+
+def test_spans_nest_under_the_current_trace():
+    tracer = Tracer(sample_rate=1.0, enabled=True)
+    with tracer.trace("request") as trace:
+        with tracer.span("outer", step=1):
+            with tracer.span("inner"):
+                pass
+            tracer.add_span("measured", 0.0, 0.001)
+    data = tracer.get_trace(trace.trace_id)
+    names = {span["name"]: span for span in data["spans"]}
+    assert names["outer"]["parent_id"] == names["request"]["span_id"]
+    assert names["inner"]["parent_id"] == names["outer"]["span_id"]
+    assert names["measured"]["parent_id"] == names["outer"]["span_id"]
+    assert names["outer"]["attributes"] == {"step": 1}
+
+def test_unsampled_requests_record_nothing():
+    tracer = Tracer(sample_rate=0.0, enabled=True)
+    with tracer.trace("request") as trace:
+        with tracer.span("work") as span:
+            assert span is None
+    assert trace is None
+    assert tracer.get_traces() == []
+    assert tracer.get_stats()["traces_started"] == 1
+
+def test_buffers_and_span_count_are_bounded():
+    tracer = Tracer(sample_rate=1.0, buffer_size=3, slowest_size=2, max_spans=4, enabled=True)
+    for i in range(6):
+        with tracer.trace(f"request-{i}") as trace:
+            trace.root.start -= i  # Later requests look slower
+            for _ in range(10):
+                with tracer.span("step"):
+                    pass
+    assert [t["name"] for t in tracer.get_traces("recent")] == ["request-5", "request-4", "request-3"]
+    assert [t["name"] for t in tracer.get_traces("slowest")] == ["request-5", "request-4"]
+    slowest = tracer.get_trace(tracer.get_traces("slowest")[0]["trace_id"])
+    assert len(slowest["spans"]) == 4
+    assert slowest["dropped_spans"] == 7
+
+@pytest.mark.asyncio
+async def test_concurrent_tasks_keep_separate_traces():
+    tracer = Tracer(sample_rate=1.0, enabled=True)
+
+    async def request(name):
+        with tracer.trace(name) as trace:
+            async with tracer.span(f"{name}-work"):
+                await asyncio.sleep(0.01)
+        return trace
+
+    first, second = await asyncio.gather(request("a"), request("b"))
+    assert [s["name"] for s in tracer.get_trace(first.trace_id)["spans"]] == ["a", "a-work"]
+    assert [s["name"] for s in tracer.get_trace(second.trace_id)["spans"]] == ["b", "b-work"]
+
+def test_chat_trace_is_viewable_at_debug_endpoint(monkeypatch):
+    import app.main as main
+    client = TestClient(app)
+    assert client.get("/debug/traces").status_code == 404  # DEBUG_TRACES_ENABLED unset
+    monkeypatch.setattr(main, "debug_traces_enabled", True)
+    response = client.post("/chat", headers={"X-Trace": "1"},
+                           json={"message": "hi", "conversation_id": "traced", "user_id": "tracing-test"})
+    trace_id = response.headers["X-Trace-Id"]
+
+    listing = client.get("/debug/traces").json()
+    assert trace_id in [t["trace_id"] for t in listing["traces"]]
+    trace = client.get(f"/debug/traces/{trace_id}").json()
+    names = [span["name"] for span in trace["spans"]]
+    assert names[0] == "POST /chat"
+    assert "llm.process_message" in names
+    assert client.get("/debug/traces/unknown").status_code == 404
@@ -0,0 +1,82 @@
+import json
+import pytest
+from app.traffic_capture import TrafficCapture
+from benchmarks.harness import BackgroundServer
+from benchmarks.replay import load_capture, replay, synthetic_prompt
+
+def test_capture_records_anonymized_shapes(tmp_path):
+    path = str(tmp_path / "capture.jsonl")
+    capture = TrafficCapture(enabled=True, path=path, salt="s")
+    capture.record("alice-conversation", "What is a pod?", "rest")
+    capture.record("alice-conversation", "And a node?", "ws")
+    capture.record("bob", "hi", "sse")
+    capture.close()
+
+    with open(path) as f:
+        raw = f.read()
+    assert "alice" not in raw and "pod" not in raw
+    records = [json.loads(line) for line in raw.splitlines()]
+    assert [(r["n"], r["i"], r["x"]) for r in records] == [(14, 0, "rest"), (11, 1, "ws"), (2, 0, "sse")]
+    assert records[0]["c"] == records[1]["c"] != records[2]["c"]
+    assert records[0]["c"] == TrafficCapture(enabled=True, path=path, salt="s").hash_conversation("alice-conversation")
+    assert records[0]["t"] <= records[1]["t"] <= records[2]["t"]
+
+def test_capture_rolls_over_and_replay_reads_both_files(tmp_path):
+    path = str(tmp_path / "capture.jsonl")
+    capture = TrafficCapture(enabled=True, path=path, max_bytes=200)
+    for i in range(10):
+        capture.record(f"c{i % 3}", "x" * i, "rest")
+    capture.close()
+    assert capture.rotations >= 1
+    assert (tmp_path / "capture.jsonl").stat().st_size <= 200
+    with open(path, "a") as f:
+        f.write('{"t": 1, "c"')  # torn trailing line
+
+    records = load_capture(path)
+    assert 0 < len(records) < 10  # the oldest generation was dropped
+    assert [r["n"] for r in records] == sorted(r["n"] for r in records)
+    assert [r["n"] for r in load_capture(path, limit=2)] == [r["n"] for r in records[:2]]
+
+def test_disabled_capture_writes_nothing(tmp_path):
+    capture = TrafficCapture(enabled=False, path=str(tmp_path / "capture.jsonl"))
+    capture.record("c", "hello", "rest")
+    assert not (tmp_path / "capture.jsonl").exists() and capture.recorded == 0
+
+def test_synthetic_prompt_has_exact_length():
+    assert [len(synthetic_prompt(n, turn)) for n, turn in [(0, 0), (1, 3), (57, 1), (4000, 9)]] == [1, 1, 57, 4000]
+    assert synthetic_prompt(40, 0) != synthetic_prompt(40, 1)
+
+@pytest.mark.asyncio
+async def test_replay_reproduces_captured_shapes_and_timing(tmp_path, monkeypatch):
+    monkeypatch.setenv("LLM_MODEL_PROVIDER", "sim")
+    import app.main as main
+    # The app module may have been imported with another provider; make it a fast simulator
+    monkeypatch.setattr(main.llm_service, "model_provider", "sim")
+    monkeypatch.setattr(main.llm_service, "sim_engine", None)
+    monkeypatch.setitem(main.llm_service.sim_config, "decode_tps", 5000.0)
+    monkeypatch.setitem(main.llm_service.sim_config, "prefill_tps", 50000.0)
+    monkeypatch.setattr(main.rate_limiter, "enabled", False)
+    replayed = TrafficCapture(enabled=True, path=str(tmp_path / "replayed.jsonl"), flush_interval=0)
+    monkeypatch.setattr(main, "traffic_capture", replayed)
+
+    records = [
+        {"t": 100.0, "c": "aaa", "n": 30, "i": 0, "x": "rest"},
+        {"t": 100.2, "c": "bbb", "n": 400, "i": 0, "x": "ws"},
+        {"t": 100.4, "c": "aaa", "n": 12, "i": 1, "x": "sse"},
+        {"t": 100.6, "c": "bbb", "n": 80, "i": 1, "x": "ws_stream"}
+    ]
+    server = BackgroundServer(main.app).start()
+    try:
+        report = await replay(records, server.url, speed=2.0)
+    finally:
+        server.stop()
+        replayed.close()
+
+    assert sum(m["requests"] for m in report["results"].values()) == 4
+    assert all(m["errors"] == 0 and m["shed"] == 0 for m in report["results"].values())
+    assert report["meta"]["captured_span_s"] == pytest.approx(0.6)
+    assert report["meta"]["replayed_span_s"] >= 0.3  # 0.6 s of arrivals at 2x
+    assert report["schedule_slip_p99_ms"] < 100
+
+    shapes = [(r["n"], r["i"], r["x"]) for r in load_capture(replayed.path)]
+    assert shapes == [(r["n"], r["i"], r["x"]) for r in records]